@@ -0,0 +1,293 @@
+import csv
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    type TEXT,
+    price REAL,
+    quantity REAL,
+    profit REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_symbol_ts ON transactions (symbol, ts);
+CREATE INDEX IF NOT EXISTS idx_transactions_symbol_type_ts ON transactions (symbol, type, ts);
+
+CREATE TABLE IF NOT EXISTS balances (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT,
+    ts TEXT NOT NULL,
+    total_value_usdt REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_balances_symbol_ts ON balances (symbol, ts);
+
+CREATE TABLE IF NOT EXISTS prices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    price REAL,
+    usdt_idr REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_prices_symbol_ts ON prices (symbol, ts);
+
+CREATE TABLE IF NOT EXISTS metrics (
+    symbol TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS imports (
+    source TEXT PRIMARY KEY,
+    rows INTEGER,
+    imported_at REAL
+);
+"""
+
+def _record_time(record):
+    """ISO time of a record; transactions use 'time', balances 'timestamp'"""
+    return str(record.get('time') or record.get('timestamp') or '')
+
+def _to_float(value):
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+def _range_clause(start, end):
+    """SQL condition and params for an inclusive-start, exclusive-end ISO time range"""
+    clause, params = '', []
+    if start:
+        clause += ' AND ts >= ?'
+        params.append(start)
+    if end:
+        clause += ' AND ts < ?'
+        params.append(end)
+    return clause, params
+
+class SqliteAnalyticsStore:
+    """
+    Analytics storage in one SQLite database (WAL mode).
+
+    Trades, balances and prices are rows with indexed symbol and time
+    columns, so reports and the dashboard can query a time range instead of
+    loading whole files. The full record is kept as JSON in the data column.
+    Implements write(batch) like JsonAnalyticsStore so it can sit behind the
+    AnalyticsWriter.
+    """
+
+    def __init__(self, db_path, symbol):
+        """
+        Args:
+            db_path (str): Database file, shared by all symbols
+            symbol (str): Symbol the written records belong to
+        """
+        self.db_path = db_path
+        self.symbol = symbol
+        self._local = threading.local()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        """One connection per thread (writer thread, bot loop, dashboard)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _insert_transactions(self, conn, records, symbol):
+        conn.executemany(
+            'INSERT INTO transactions (symbol, ts, type, price, quantity, profit, data) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(symbol, _record_time(r), r.get('type'), _to_float(r.get('price')), _to_float(r.get('quantity')),
+              _to_float(r.get('profit')), json.dumps(r)) for r in records]
+        )
+
+    def _insert_balances(self, conn, records, symbol):
+        conn.executemany(
+            'INSERT INTO balances (symbol, ts, total_value_usdt, data) VALUES (?, ?, ?, ?)',
+            [(symbol, _record_time(r), _to_float(r.get('total_value_usdt')), json.dumps(r)) for r in records]
+        )
+
+    def _insert_prices(self, conn, records, symbol):
+        conn.executemany(
+            'INSERT INTO prices (symbol, ts, price, usdt_idr, data) VALUES (?, ?, ?, ?, ?)',
+            [(symbol, _record_time(r), _to_float(r.get('price')), _to_float(r.get('usdt_idr')), json.dumps(r))
+             for r in records]
+        )
+
+    def _save_metrics(self, conn, metrics):
+        conn.execute(
+            'INSERT OR REPLACE INTO metrics (symbol, data, updated_at) VALUES (?, ?, ?)',
+            (self.symbol, json.dumps(metrics), time.time())
+        )
+
+    def write(self, batch):
+        """Persist one batch from the AnalyticsWriter in a single transaction"""
+        conn = self._connection()
+        with conn:
+            self._insert_transactions(conn, batch['transactions'], self.symbol)
+            self._insert_balances(conn, batch['balances'], self.symbol)
+            self._insert_prices(conn, batch['prices'], self.symbol)
+            if batch['metrics'] is not None:
+                self._save_metrics(conn, batch['metrics'])
+
+    def import_json_logs(self, transactions_file, balance_file, performance_file, price_file):
+        """
+        Import the JSON/CSV logs written by the file backend
+
+        Each file is imported once; the imports table remembers what was done,
+        so calling this on every start is cheap.
+
+        Returns:
+            dict: Rows imported per file (only files imported by this call)
+        """
+        conn = self._connection()
+        done = {row['source'] for row in conn.execute('SELECT source FROM imports')}
+        imported = {}
+
+        def mark(conn, source, rows):
+            conn.execute('INSERT INTO imports (source, rows, imported_at) VALUES (?, ?, ?)', (source, rows, time.time()))
+            imported[source] = rows
+
+        def source_key(path):
+            return os.path.basename(path)
+
+        for path, insert, symbol in ((transactions_file, self._insert_transactions, self.symbol),
+                                     (balance_file, self._insert_balances, None)):
+            key = source_key(path)
+            if key in done or not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'r') as f:
+                    records = json.load(f)
+                with conn:
+                    # balance_history.json dipakai bersama semua symbol
+                    insert(conn, records, symbol)
+                    mark(conn, key, len(records))
+            except Exception as e:
+                logger.error(f"Error importing {path}: {e}")
+
+        key = source_key(price_file)
+        if key not in done and os.path.exists(price_file):
+            try:
+                with open(price_file, 'r', newline='') as f:
+                    records = [{k: (_to_float(v) if k in ('price', 'usdt_idr') else v) for k, v in row.items()}
+                               for row in csv.DictReader(f)]
+                with conn:
+                    self._insert_prices(conn, records, self.symbol)
+                    mark(conn, key, len(records))
+            except Exception as e:
+                logger.error(f"Error importing {price_file}: {e}")
+
+        key = source_key(performance_file)
+        if key not in done and os.path.exists(performance_file):
+            try:
+                with open(performance_file, 'r') as f:
+                    metrics = json.load(f)
+                with conn:
+                    if self.load_metrics() is None:
+                        self._save_metrics(conn, metrics)
+                    mark(conn, key, 1)
+            except Exception as e:
+                logger.error(f"Error importing {performance_file}: {e}")
+
+        if imported:
+            logger.info(f"Imported analytics logs into {self.db_path}: {imported}")
+        return imported
+
+    def load_metrics(self):
+        row = self._connection().execute('SELECT data FROM metrics WHERE symbol = ?', (self.symbol,)).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def _select(self, table, start=None, end=None, limit=None, extra='', extra_params=(), newest=False,
+                include_shared=False):
+        """Records of this symbol in [start, end), oldest first; limit keeps the newest rows if newest=True"""
+        symbol_clause = '(symbol = ? OR symbol IS NULL)' if include_shared else 'symbol = ?'
+        clause, params = _range_clause(start, end)
+        order = 'DESC' if newest else 'ASC'
+        sql = f'SELECT data FROM {table} WHERE {symbol_clause}{clause}{extra} ORDER BY ts {order}, id {order}'
+        params = [self.symbol] + params + list(extra_params)
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        rows = [json.loads(row['data']) for row in self._connection().execute(sql, params)]
+        return rows[::-1] if newest else rows
+
+    def get_transactions(self, start=None, end=None, tx_type=None, limit=None, newest=False):
+        """
+        Transactions of this symbol in a time range
+
+        Args:
+            start (str): ISO time, inclusive (a date such as '2025-06-09' works too)
+            end (str): ISO time, exclusive
+            tx_type (str): 'BUY' or 'SELL'
+            limit (int): Maximum rows
+            newest (bool): With limit, return the latest rows instead of the first
+
+        Returns:
+            list: Transaction dicts, oldest first
+        """
+        extra, extra_params = ('', ()) if tx_type is None else (' AND type = ?', (tx_type,))
+        return self._select('transactions', start, end, limit, extra, extra_params, newest)
+
+    def count_transactions(self, start=None, end=None, tx_type=None):
+        clause, params = _range_clause(start, end)
+        if tx_type is not None:
+            clause += ' AND type = ?'
+            params.append(tx_type)
+        row = self._connection().execute(
+            f'SELECT COUNT(*) FROM transactions WHERE symbol = ?{clause}', [self.symbol] + params).fetchone()
+        return row[0]
+
+    def count_balances(self):
+        row = self._connection().execute(
+            'SELECT COUNT(*) FROM balances WHERE symbol = ? OR symbol IS NULL', (self.symbol,)).fetchone()
+        return row[0]
+
+    def get_prices(self, start=None, end=None, limit=None, newest=False):
+        return self._select('prices', start, end, limit, newest=newest)
+
+    def get_balances(self, start=None, end=None, limit=None, newest=False):
+        # Balance hasil import tidak punya symbol
+        return self._select('balances', start, end, limit, newest=newest, include_shared=True)
+
+    def first_balance(self):
+        rows = self._select('balances', limit=1, include_shared=True)
+        return rows[0] if rows else None
+
+    def last_balance(self):
+        rows = self._select('balances', limit=1, newest=True, include_shared=True)
+        return rows[0] if rows else None
+
+    def profit_by_day(self, start=None, end=None):
+        """Realized profit and number of SELL trades per day"""
+        clause, params = _range_clause(start, end)
+        rows = self._connection().execute(
+            f"SELECT substr(ts, 1, 10) AS day, SUM(profit) AS profit, COUNT(*) AS trades FROM transactions "
+            f"WHERE symbol = ? AND type = 'SELL'{clause} GROUP BY day ORDER BY day",
+            [self.symbol] + params
+        )
+        return [{'date': row['day'], 'profit': row['profit'] or 0, 'trades': row['trades']} for row in rows]
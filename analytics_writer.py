@@ -0,0 +1,285 @@
+import csv
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import config
+from state_journal import atomic_write_json
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class JsonAnalyticsStore:
+    """
+    File storage used by TradingAnalytics.
+
+    Keeps the existing file formats (JSON arrays, CSV, metrics JSON) but only
+    appends new records: JSON arrays are extended in place by seeking back
+    over the closing bracket, CSV rows are appended, and only the small
+    metrics file is rewritten (atomically).
+    """
+
+    def __init__(self, transactions_file, balance_file, performance_file, price_file, price_history_limit=10000):
+        self.transactions_file = transactions_file
+        self.balance_file = balance_file
+        self.performance_file = performance_file
+        self.price_file = price_file
+        self.price_history_limit = price_history_limit
+        self._price_columns = None
+        self._price_rows = None
+
+    @staticmethod
+    def append_json_records(path, records):
+        """Append records to a JSON array file without rewriting it"""
+        if not records:
+            return
+        body = ",\n".join("  " + json.dumps(record) for record in records)
+
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, 'w') as f:
+                f.write("[\n" + body + "\n]")
+            return
+
+        with open(path, 'r+b') as f:
+            # Cari ']' penutup dari belakang, lewati whitespace
+            pos = f.seek(0, os.SEEK_END)
+            closing = None
+            while pos > 0:
+                pos -= 1
+                f.seek(pos)
+                char = f.read(1)
+                if char.isspace():
+                    continue
+                if char == b']':
+                    closing = pos
+                break
+            if closing is None:
+                raise ValueError(f"{path} is not a JSON array")
+
+            # Array kosong jika karakter non-spasi sebelum ']' adalah '['
+            pos = closing
+            empty = False
+            while pos > 0:
+                pos -= 1
+                f.seek(pos)
+                char = f.read(1)
+                if not char.isspace():
+                    empty = char == b'['
+                    break
+
+            f.seek(closing)
+            f.truncate()
+            f.write((("\n" if empty else ",\n") + body + "\n]").encode())
+
+    def _load_price_header(self):
+        if self._price_columns is not None:
+            return
+        self._price_columns = []
+        self._price_rows = 0
+        if os.path.exists(self.price_file) and os.path.getsize(self.price_file) > 0:
+            with open(self.price_file, 'r', newline='') as f:
+                reader = csv.reader(f)
+                self._price_columns = next(reader, [])
+                self._price_rows = sum(1 for _ in reader)
+
+    def append_price_rows(self, rows):
+        """Append price rows to the CSV, compacting it when it grows past twice the history limit"""
+        if not rows:
+            return
+        self._load_price_header()
+        new_columns = [key for row in rows for key in row if key not in self._price_columns]
+        if new_columns or not self._price_columns:
+            # Kolom baru (jarang): tulis ulang file dengan header gabungan
+            self._rewrite_prices(rows, list(dict.fromkeys(self._price_columns + new_columns)))
+            return
+
+        with open(self.price_file, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self._price_columns, extrasaction='ignore')
+            writer.writerows(rows)
+        self._price_rows += len(rows)
+
+        if self._price_rows > 2 * self.price_history_limit:
+            self._rewrite_prices([], self._price_columns)
+
+    def _rewrite_prices(self, extra_rows, columns):
+        """Rewrite the CSV with the last price_history_limit rows (atomic)"""
+        existing = []
+        if os.path.exists(self.price_file) and os.path.getsize(self.price_file) > 0:
+            with open(self.price_file, 'r', newline='') as f:
+                existing = list(csv.DictReader(f))
+        rows = (existing + list(extra_rows))[-self.price_history_limit:]
+        tmp_path = f"{self.price_file}.tmp"
+        with open(tmp_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp_path, self.price_file)
+        self._price_columns = columns
+        self._price_rows = len(rows)
+
+    def write(self, batch):
+        """
+        Persist one batch from the writer
+
+        Args:
+            batch (dict): 'transactions', 'balances', 'prices' (lists) and
+                'metrics' (latest metrics dict or None)
+        """
+        self.append_json_records(self.transactions_file, batch['transactions'])
+        self.append_json_records(self.balance_file, batch['balances'])
+        self.append_price_rows(batch['prices'])
+        if batch['metrics'] is not None:
+            atomic_write_json(self.performance_file, batch['metrics'], indent=2)
+
+class AnalyticsWriter:
+    """
+    Background writer for analytics events.
+
+    Callers only enqueue; a worker thread batches the events, coalesces
+    metrics updates (only the latest snapshot is written) and hands the batch
+    to the store every flush_interval seconds, when the batch gets large, on
+    flush() and on stop(). A metrics event may carry a function instead of a
+    dict; it is called once per batch on the worker thread, so the caller
+    does not pay for copying the metrics.
+    """
+
+    _FLUSH = object()
+    _STOP = object()
+
+    def __init__(self, store, flush_interval=None, max_queue=None, max_batch=1000):
+        """
+        Args:
+            store: Object with write(batch)
+            flush_interval (float): Seconds between flushes
+            max_queue (int): Bound of the event queue
+            max_batch (int): Events that trigger an early flush
+        """
+        self.store = store
+        self.flush_interval = flush_interval if flush_interval is not None else getattr(config, 'ANALYTICS_FLUSH_INTERVAL', 5)
+        self.max_batch = max_batch
+        self._queue = queue.Queue(maxsize=max_queue or getattr(config, 'ANALYTICS_QUEUE_SIZE', 10000))
+        self._thread = None
+        self._pending = self._empty_batch()
+        self._pending_count = 0
+        self.stats = {'enqueued': 0, 'dropped': 0, 'flushes': 0, 'written': 0, 'errors': 0}
+
+    @staticmethod
+    def _empty_batch():
+        return {'transactions': [], 'balances': [], 'prices': [], 'metrics': None}
+
+    def start(self):
+        if self.is_running():
+            return
+        self._thread = threading.Thread(target=self._run, name='analytics-writer', daemon=True)
+        self._thread.start()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, kind, payload):
+        """
+        Enqueue an event without blocking the caller
+
+        Args:
+            kind (str): 'transaction', 'balance', 'price' or 'metrics'
+            payload (dict): Record (already copied by the caller); for 'metrics'
+                also a callable returning the metrics dict when the batch is written
+
+        Returns:
+            bool: False if the queue was full and the event was dropped
+        """
+        try:
+            self._queue.put_nowait((kind, payload))
+            self.stats['enqueued'] += 1
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            if self.stats['dropped'] == 1 or self.stats['dropped'] % 1000 == 0:
+                logger.error(f"Analytics queue full, dropped {self.stats['dropped']} events so far")
+            return False
+
+    def _add(self, kind, payload):
+        if kind == 'metrics':
+            self._pending['metrics'] = payload
+        elif kind == 'transaction':
+            self._pending['transactions'].append(payload)
+        elif kind == 'balance':
+            self._pending['balances'].append(payload)
+        elif kind == 'price':
+            self._pending['prices'].append(payload)
+        self._pending_count += 1
+
+    def _flush_pending(self):
+        if not self._pending_count:
+            return
+        batch, count = self._pending, self._pending_count
+        self._pending = self._empty_batch()
+        self._pending_count = 0
+        try:
+            # Metrik dibangun sekali per batch, di thread writer
+            if callable(batch['metrics']):
+                batch['metrics'] = batch['metrics']()
+            self.store.write(batch)
+            self.stats['flushes'] += 1
+            self.stats['written'] += count
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"Error writing analytics batch ({count} events): {e}")
+
+    def _run(self):
+        next_flush = time.time() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, next_flush - time.time()))
+            except queue.Empty:
+                item = None
+
+            if item is None:
+                pass
+            elif item[0] is self._STOP:
+                self._flush_pending()
+                item[1].set()
+                return
+            elif item[0] is self._FLUSH:
+                self._flush_pending()
+                item[1].set()
+                continue
+            else:
+                self._add(*item)
+
+            if time.time() >= next_flush or self._pending_count >= self.max_batch:
+                self._flush_pending()
+                next_flush = time.time() + self.flush_interval
+
+    def _send_control(self, marker, timeout):
+        if not self.is_running():
+            # Tidak ada worker: tulis sisa antrian secara langsung
+            while True:
+                try:
+                    self._add(*self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._flush_pending()
+            return True
+        done = threading.Event()
+        self._queue.put((marker, done))
+        return done.wait(timeout)
+
+    def flush(self, timeout=10):
+        """Write everything enqueued so far; returns False on timeout"""
+        return self._send_control(self._FLUSH, timeout)
+
+    def stop(self, timeout=10):
+        """Flush and stop the worker"""
+        result = self._send_control(self._STOP, timeout)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        return result
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['queued'] = self._queue.qsize()
+        return stats
@@ -6,9 +6,34 @@ import datetime
 import argparse
 from pathlib import Path
 import numpy as np
+import config
+from analytics_db import SqliteAnalyticsStore
 
-def load_transaction_data(symbol="ADAUSDT"):
-    """Load transaction data from log files"""
+def open_database(symbol="ADAUSDT"):
+    """Open the analytics database if the bot uses the sqlite backend, else None"""
+    db_file = f"trading_logs/{getattr(config, 'ANALYTICS_DB_FILE', 'analytics.db')}"
+    if getattr(config, 'ANALYTICS_BACKEND', 'sqlite') != 'sqlite' or not os.path.exists(db_file):
+        return None
+    return SqliteAnalyticsStore(db_file, symbol)
+
+def _filter_range(records, since=None, until=None):
+    """Keep records whose ISO time/timestamp is in [since, until)"""
+    if not since and not until:
+        return records
+    result = []
+    for record in records:
+        ts = str(record.get('time') or record.get('timestamp') or '')
+        if (not since or ts >= since) and (not until or ts < until):
+            result.append(record)
+    return result
+
+def load_transaction_data(symbol="ADAUSDT", db=None, since=None, until=None):
+    """Load transaction data from the analytics database or log files"""
+    if db is not None:
+        transactions = db.get_transactions(since, until)
+        print(f"Loaded {len(transactions)} transactions for {symbol} from database")
+        return transactions
+    
     transactions_file = f"trading_logs/transactions_{symbol}.json"
     
     if not os.path.exists(transactions_file):
@@ -16,13 +41,18 @@ def load_transaction_data(symbol="ADAUSDT"):
         return None
     
     with open(transactions_file, 'r') as f:
-        transactions = json.load(f)
+        transactions = _filter_range(json.load(f), since, until)
     
     print(f"Loaded {len(transactions)} transactions for {symbol}")
     return transactions
 
-def load_price_data(symbol="ADAUSDT"):
-    """Load price history data from log files"""
+def load_price_data(symbol="ADAUSDT", db=None, since=None, until=None):
+    """Load price history data from the analytics database or log files"""
+    if db is not None:
+        price_data = pd.DataFrame(db.get_prices(since, until))
+        print(f"Loaded {len(price_data)} price data points for {symbol} from database")
+        return price_data
+    
     price_file = f"trading_logs/price_history_{symbol}.csv"
     
     if not os.path.exists(price_file):
@@ -30,11 +60,16 @@ def load_price_data(symbol="ADAUSDT"):
         return None
     
     price_data = pd.read_csv(price_file)
+    if since or until:
+        price_data = pd.DataFrame(_filter_range(price_data.to_dict('records'), since, until))
     print(f"Loaded {len(price_data)} price data points for {symbol}")
     return price_data
 
-def load_performance_metrics(symbol="ADAUSDT"):
-    """Load performance metrics from log files"""
+def load_performance_metrics(symbol="ADAUSDT", db=None):
+    """Load performance metrics from the analytics database or log files"""
+    if db is not None:
+        return db.load_metrics()
+    
     metrics_file = f"trading_logs/performance_metrics_{symbol}.json"
     
     if not os.path.exists(metrics_file):
@@ -46,8 +81,13 @@ def load_performance_metrics(symbol="ADAUSDT"):
     
     return metrics
 
-def load_balance_history():
-    """Load balance history data from log files"""
+def load_balance_history(db=None, since=None, until=None):
+    """Load balance history data from the analytics database or log files"""
+    if db is not None:
+        balance_history = db.get_balances(since, until)
+        print(f"Loaded {len(balance_history)} balance data points from database")
+        return balance_history
+    
     balance_file = "trading_logs/balance_history.json"
     
     if not os.path.exists(balance_file):
@@ -55,7 +95,7 @@ def load_balance_history():
         return None
     
     with open(balance_file, 'r') as f:
-        balance_history = json.load(f)
+        balance_history = _filter_range(json.load(f), since, until)
     
     print(f"Loaded {len(balance_history)} balance data points")
     return balance_history
@@ -139,7 +179,7 @@ def analyze_transactions(transactions):
 
 def analyze_price_data(price_data):
     """Analyze price history data to generate insights"""
-    if not price_data or price_data.empty:
+    if price_data is None or price_data.empty:
         return
     
     print("\n=== PRICE ANALYSIS ===")
@@ -384,6 +424,8 @@ def main():
     parser = argparse.ArgumentParser(description='Analyze trading bot logs')
     parser.add_argument('--symbol', default='ADAUSDT', help='Trading symbol to analyze (default: ADAUSDT)')
     parser.add_argument('--no-plots', action='store_true', help='Skip generating plots')
+    parser.add_argument('--since', help='Only analyze data from this date/time (ISO, e.g. 2025-06-01)')
+    parser.add_argument('--until', help='Only analyze data before this date/time (ISO)')
     args = parser.parse_args()
     
     symbol = args.symbol
@@ -399,11 +441,15 @@ def main():
     print(f"Generated at {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 50)
     
-    # Load and analyze all data
-    transactions = load_transaction_data(symbol)
-    price_data = load_price_data(symbol)
-    balance_data = load_balance_history()
-    metrics = load_performance_metrics(symbol)
+    if args.since or args.until:
+        print(f"Period: {args.since or 'start'} - {args.until or 'now'}")
+    
+    # Load and analyze data (range query on the database if available)
+    db = open_database(symbol)
+    transactions = load_transaction_data(symbol, db, args.since, args.until)
+    price_data = load_price_data(symbol, db, args.since, args.until)
+    balance_data = load_balance_history(db, args.since, args.until)
+    metrics = load_performance_metrics(symbol, db)
     
     # Run analysis
     transactions_df = analyze_transactions(transactions)
@@ -23,8 +23,11 @@ class AutoBalancer:
     1. Membeli base asset (ADA) dengan USDT yang tersedia untuk memastikan bot grid trading bisa memasang sell orders.
     2. Menjual base asset (ADA) menjadi USDT untuk memastikan cukup USDT untuk buy orders.
     """
-    def __init__(self):
-        self.client = BinanceClient()
+    def __init__(self, binance_client=None):
+        # Gunakan client yang sudah ada (berbagi balance snapshot) jika diberikan
+        self.client = binance_client or BinanceClient()
+        # Jeda setelah market order sampai saldo terbarukan (client simulasi backtest tidak perlu menunggu)
+        self.settle_delay = getattr(self.client, 'balance_settle_delay', 5)
         self.symbol = config.SYMBOL
         self.base_asset = self.symbol.replace('USDT', '')
         self.quote_asset = 'USDT'
@@ -137,8 +140,9 @@ class AutoBalancer:
             )
             
             logger.info(f"AUTO BALANCER - Market sell berhasil: {result}")
-            logger.info(f"Tunggu 5 detik untuk memastikan order terekam di sistem...")
-            time.sleep(5)  # Tunggu beberapa saat agar balance terbarukan
+            self.client.invalidate_balance_cache()
+            logger.info(f"Tunggu {self.settle_delay} detik untuk memastikan order terekam di sistem...")
+            time.sleep(self.settle_delay)  # Tunggu beberapa saat agar balance terbarukan
             
             # Cek balance setelah penjualan
             new_usdt_balance = self.client.get_account_balance(self.quote_asset)
@@ -292,8 +296,9 @@ class AutoBalancer:
                             raise e
                     
                     logger.info(f"AUTO BALANCER - Market buy berhasil: {result}")
-                    logger.info(f"Tunggu 5 detik untuk memastikan order terekam di sistem...")
-                    time.sleep(5)  # Tunggu beberapa saat agar balance terbarukan
+                    self.client.invalidate_balance_cache()
+                    logger.info(f"Tunggu {self.settle_delay} detik untuk memastikan order terekam di sistem...")
+                    time.sleep(self.settle_delay)  # Tunggu beberapa saat agar balance terbarukan
                     
                     # Cek balance setelah pembelian
                     new_balance = self.client.get_account_balance(self.base_asset)
@@ -2,6 +2,7 @@ import logging
 import time
 import math
 import os
+import json
 from binance_client import BinanceClient
 import config
 
@@ -207,13 +208,92 @@ class AutoConfig:
             logger.error(f"Error saat menganalisis modal tersedia: {e}")
             return capital_info
     
-    def generate_optimal_config(self):
+    def config_from_sweep(self, sweep_file=None):
+        """
+        Konfigurasi dari hasil peringkat teratas param_sweep.py
+        
+        Lebar dan bias rentang dari hasil sweep (relatif terhadap harga awal data
+        historis) diterapkan pada harga saat ini.
+        
+        Args:
+            sweep_file (str): File hasil sweep (default config.SWEEP_RESULTS_FILE)
+            
+        Return:
+            dict: Konfigurasi optimal, atau None jika hasil sweep tidak tersedia
+        """
+        sweep_file = sweep_file or getattr(config, 'SWEEP_RESULTS_FILE', 'trading_logs/param_sweep.json')
+        if not os.path.exists(sweep_file):
+            logger.warning(f"File hasil sweep {sweep_file} tidak ditemukan")
+            return None
+        
+        try:
+            with open(sweep_file, 'r') as file:
+                sweep = json.load(file)
+            # Hasil yang terkena stop loss tidak dipakai: angkanya hasil exit, bukan grid
+            best = next((r for r in sweep.get('results', [])
+                         if 'error' not in r and not r.get('stop_loss_triggers') and not r.get('emergency_exits')), None)
+            if best is None:
+                logger.warning(f"Tidak ada hasil sweep yang valid tanpa stop loss di {sweep_file}")
+                return None
+            sweep_stop_loss = sweep.get('settings', {}).get('stop_loss_percentage')
+            if sweep_stop_loss is not None and sweep_stop_loss != config.STOP_LOSS_PERCENTAGE:
+                logger.warning(f"Sweep memakai stop loss {sweep_stop_loss}%, config memakai {config.STOP_LOSS_PERCENTAGE}%")
+            
+            current_price = self.client.get_symbol_price(self.symbol)
+            if not current_price:
+                logger.error("Gagal mendapatkan harga terkini")
+                return None
+            
+            from param_sweep import grid_range
+            params = best['params']
+            lower_price, upper_price = grid_range(current_price, params['width'], params['bias'])
+            optimal_config = {
+                'symbol': self.symbol,
+                'upper_price': upper_price,
+                'lower_price': lower_price,
+                'grid_number': params['grid_number'],
+                'quantity': int(params['quantity']) if float(params['quantity']).is_integer() else params['quantity'],
+                'max_investment': config.MAX_INVESTMENT,
+                'stop_loss_percentage': config.STOP_LOSS_PERCENTAGE,
+                'grid_adjust_interval': int(params['adjust_interval']),  # 0 = grid tidak pernah di-re-center
+                'recenter_margin': params['recenter_margin']
+            }
+            
+            logger.info(f"==== KONFIGURASI DARI SWEEP (peringkat 1 dari {sweep.get('evaluated')} menurut {sweep.get('rank_by')}) ====")
+            logger.info(f"Lebar {params['width']}%, bias {params['bias']}, re-center {params['recenter']}")
+            logger.info(f"Backtest: PnL {best['pnl_pct']:.2f}%, Sharpe {best['sharpe']:.2f}, drawdown {best['max_drawdown_pct']:.2f}%")
+            logger.info(f"Rentang harga: {lower_price} - {upper_price}, {params['grid_number']} grid, quantity {optimal_config['quantity']}")
+            
+            # Peringatkan jika modal tidak cukup untuk quantity hasil sweep
+            capital_info = self.analyze_available_capital()
+            required = optimal_config['quantity'] * optimal_config['grid_number'] * current_price
+            if capital_info['total_value'] and required > capital_info['total_value']:
+                logger.warning(f"Modal ({capital_info['total_value']:.2f} USDT) lebih kecil dari kebutuhan grid ({required:.2f} USDT)")
+            
+            return optimal_config
+            
+        except Exception as e:
+            logger.error(f"Error saat membaca hasil sweep: {e}")
+            return None
+    
+    def generate_optimal_config(self, sweep_file=None, use_sweep=False):
         """
         Menghasilkan konfigurasi optimal berdasarkan analisis pasar dan modal
         
+        Args:
+            sweep_file (str): Hasil param_sweep.py; jika diberikan (atau use_sweep=True)
+                konfigurasi diambil dari hasil peringkat teratas
+            use_sweep (bool): Pakai config.SWEEP_RESULTS_FILE
+        
         Return:
             dict: Konfigurasi optimal untuk bot trading
         """
+        if sweep_file or use_sweep:
+            optimal_config = self.config_from_sweep(sweep_file)
+            if optimal_config:
+                return optimal_config
+            logger.warning("Hasil sweep tidak bisa dipakai, kembali ke perhitungan heuristik")
+        
         try:
             # Analisis kondisi pasar dan modal
             market_info = self.analyze_market_conditions()
@@ -334,6 +414,10 @@ class AutoConfig:
                     new_config_content.append(f"GRID_NUMBER = {optimal_config['grid_number']}         # Auto-configured: Optimized grid number\n")
                 elif line.strip().startswith('QUANTITY ='):
                     new_config_content.append(f"QUANTITY = {optimal_config['quantity']}           # Auto-configured: Optimized quantity\n")
+                elif line.strip().startswith('GRID_ADJUST_INTERVAL =') and optimal_config.get('grid_adjust_interval') is not None:
+                    new_config_content.append(f"GRID_ADJUST_INTERVAL = {optimal_config['grid_adjust_interval']}     # Auto-configured: Detik antar adjust_grid\n")
+                elif line.strip().startswith('GRID_RECENTER_MARGIN =') and optimal_config.get('recenter_margin'):
+                    new_config_content.append(f"GRID_RECENTER_MARGIN = {optimal_config['recenter_margin']}    # Auto-configured: Lebar grid baru di tiap sisi harga\n")
                 else:
                     new_config_content.append(line)
             
@@ -352,10 +436,14 @@ class AutoConfig:
             return False
 
 # Fungsi utama untuk dijalankan langsung
-def auto_configure():
+def auto_configure(sweep_file=None, use_sweep=False):
     """
     Fungsi utama untuk melakukan konfigurasi otomatis
     
+    Args:
+        sweep_file (str): Pilih konfigurasi dari hasil param_sweep.py ini
+        use_sweep (bool): Pilih konfigurasi dari config.SWEEP_RESULTS_FILE
+    
     Return:
         bool: True jika berhasil, False jika gagal
     """
@@ -363,7 +451,7 @@ def auto_configure():
         logger.info("Memulai proses Auto-Configure...")
         
         auto_config = AutoConfig()
-        optimal_config = auto_config.generate_optimal_config()
+        optimal_config = auto_config.generate_optimal_config(sweep_file, use_sweep)
         
         # Tanyakan konfirmasi ke pengguna
         print("\n==== KONFIGURASI OPTIMAL YANG DIHASILKAN ====")
@@ -371,6 +459,10 @@ def auto_configure():
         print(f"Rentang harga: {optimal_config['lower_price']} - {optimal_config['upper_price']}")
         print(f"Jumlah grid: {optimal_config['grid_number']}")
         print(f"Quantity per order: {optimal_config['quantity']} {optimal_config['symbol'].replace('USDT', '')}")
+        if optimal_config.get('grid_adjust_interval') == 0:
+            print("Re-center: tidak pernah")
+        elif optimal_config.get('recenter_margin'):
+            print(f"Re-center: {optimal_config['recenter_margin'] * 100:.1f}% tiap sisi, cek tiap {optimal_config['grid_adjust_interval']} detik")
         print("==========================================\n")
         
         confirm = input("Terapkan konfigurasi ini? (y/n): ")
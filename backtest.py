@@ -0,0 +1,779 @@
+import argparse
+import datetime
+import json
+import logging
+import time
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+from binance.exceptions import BinanceAPIException
+import config
+from grid_bot import GridTradingBot
+from symbol_rules import SymbolRules
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def _api_error(code, message):
+    """BinanceAPIException as raised by python-binance for a rejected request"""
+    return BinanceAPIException(None, 400, json.dumps({'code': code, 'msg': message}))
+
+def _to_epoch_seconds(values):
+    """Epoch seconds from a column of epoch s/ms/us numbers or date strings (naive = UTC)"""
+    numeric = pd.to_numeric(values, errors='coerce')
+    if not numeric.isna().any():
+        seconds = numeric.to_numpy(dtype=float)
+        # data.binance.vision memakai milidetik, sejak 2025 mikrodetik untuk spot
+        scale = abs(seconds[0]) if len(seconds) else 0
+        if scale > 1e14:
+            return seconds / 1e6
+        if scale > 1e11:
+            return seconds / 1e3
+        return seconds
+    times = pd.to_datetime(values.astype(str).str.replace(',', '.', regex=False), utc=True)
+    return times.astype('int64').to_numpy(dtype=float) / 1e9
+
+def load_market_data(path):
+    """
+    Load klines or trades from a CSV file
+
+    Supported layouts:
+        - Binance klines without header (data.binance.vision, 12 columns)
+        - Binance trades (7 columns) or aggTrades (8 columns) without header
+        - Any CSV with a header containing open/high/low/close or price, plus
+          a time column (open_time, time, timestamp or date); this includes
+          the bot's own trading_logs/price_history_<symbol>.csv
+
+    Returns:
+        dict: 'kind' ('klines' or 'trades'), 'interval' (seconds, 0 for trades)
+              and NumPy arrays 'time' (epoch seconds), 'open', 'high', 'low', 'close'
+    """
+    with open(path, 'r') as f:
+        first_cell = f.readline().split(',')[0].strip()
+    try:
+        float(first_cell)
+        has_header = False
+    except ValueError:
+        has_header = True
+
+    if has_header:
+        df = pd.read_csv(path)
+        df.columns = [str(c).strip().lower() for c in df.columns]
+        time_column = next((c for c in ('open_time', 'time', 'timestamp', 'date', 'datetime') if c in df.columns), None)
+        if time_column is None:
+            raise ValueError(f"{path}: no time column found in {list(df.columns)}")
+        if all(c in df.columns for c in ('open', 'high', 'low', 'close')):
+            kind, columns = 'klines', ('open', 'high', 'low', 'close')
+        elif 'price' in df.columns:
+            kind, columns = 'trades', ('price',) * 4
+        else:
+            raise ValueError(f"{path}: expected open/high/low/close or price columns")
+    else:
+        df = pd.read_csv(path, header=None)
+        if df.shape[1] >= 12:
+            kind, time_column, columns = 'klines', 0, (1, 2, 3, 4)
+        elif df.shape[1] == 8:
+            kind, time_column, columns = 'trades', 5, (1,) * 4
+        elif df.shape[1] == 7:
+            kind, time_column, columns = 'trades', 4, (1,) * 4
+        else:
+            raise ValueError(f"{path}: unknown layout with {df.shape[1]} columns")
+
+    df = df.dropna(subset=[time_column, columns[0]])
+    data = {'kind': kind, 'time': _to_epoch_seconds(df[time_column])}
+    for name, column in zip(('open', 'high', 'low', 'close'), columns):
+        data[name] = df[column].to_numpy(dtype=float)
+
+    order = np.argsort(data['time'], kind='stable')
+    for name in ('time', 'open', 'high', 'low', 'close'):
+        data[name] = data[name][order]
+    steps = np.diff(data['time'])
+    data['interval'] = float(np.median(steps)) if kind == 'klines' and len(steps) else 0.0
+    return data
+
+class NullStateJournal:
+    """State journal that keeps nothing; a backtest always starts from a fresh grid"""
+
+    snapshot_path = None
+
+    def load(self):
+        return None
+
+    def append(self, record_type, data):
+        pass
+
+    def needs_snapshot(self):
+        return False
+
+    def write_snapshot(self, state):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+class BacktestAnalytics:
+    """In-memory stand-in for TradingAnalytics; keeps transactions, counts the rest"""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.transactions = []
+        self.balance_history = []
+        self.price_updates = 0
+
+    def log_transaction(self, transaction_data):
+        self.transactions.append(transaction_data)
+        return len(self.transactions)
+
+    def log_price_data(self, price_data):
+        self.price_updates += 1
+
+    def log_balance(self, balance_data):
+        self.balance_history.append(balance_data)
+        return len(self.balance_history)
+
+    def generate_daily_report(self):
+        pass
+
+    def flush(self, timeout=10):
+        return True
+
+    def get_performance_summary(self):
+        sells = [t for t in self.transactions if t.get('type') == 'SELL']
+        profit = sum(t.get('profit', 0) for t in sells)
+        wins = sum(1 for t in sells if t.get('profit', 0) > 0)
+        return {
+            'total_trades': len(self.transactions),
+            'win_rate': wins / len(sells) * 100 if sells else 0,
+            'avg_profit_per_trade': profit / len(sells) if sells else 0,
+            'roi': 0
+        }
+
+class SimulatedExchange:
+    """
+    In-memory exchange that implements the BinanceClient methods the bot uses.
+
+    Limit orders rest in the book and fill at their limit price when the
+    replayed price reaches them (maker fee); orders that are marketable when
+    placed, and MARKET orders, fill at once at the current price (taker fee).
+    Balances are locked per order and fees are charged like Binance without
+    BNB: buys pay in the base asset, sells in the quote asset. Every fill is
+    queued as an execution report event for the bot's push fill path.
+    Order ids are sequential, so a replay is fully deterministic.
+    """
+
+    def __init__(self, symbol, quote_balance, base_balance, maker_fee=None, taker_fee=None, market=None):
+        """
+        Args:
+            symbol (str): Trading pair, e.g. ADAUSDT
+            quote_balance (float): Starting free quote asset (USDT)
+            base_balance (float): Starting free base asset
+            maker_fee (float): Fee rate for resting limit orders (default config.BACKTEST_MAKER_FEE)
+            taker_fee (float): Fee rate for orders that match on arrival (default config.BACKTEST_TAKER_FEE)
+            market (dict): Data from load_market_data, served through get_klines
+        """
+        self.symbol = symbol
+        self.base_asset = symbol.replace('USDT', '')
+        self.quote_asset = 'USDT'
+        self.maker_fee = getattr(config, 'BACKTEST_MAKER_FEE', 0.001) if maker_fee is None else maker_fee
+        self.taker_fee = getattr(config, 'BACKTEST_TAKER_FEE', 0.001) if taker_fee is None else taker_fee
+        self.market = market
+        self.rules = SymbolRules(
+            symbol, self.base_asset, self.quote_asset,
+            tick_size=Decimal(1).scaleb(-getattr(config, 'PRICE_PRECISION', 4)),
+            min_notional=getattr(config, 'MIN_NOTIONAL', None),
+            quantity_precision=getattr(config, 'QUANTITY_PRECISION', None)
+        )
+        self.balances = {
+            self.quote_asset: {'free': float(quote_balance), 'locked': 0.0},
+            self.base_asset: {'free': float(base_balance), 'locked': 0.0}
+        }
+        self.fx_rate = getattr(config, 'FX_FALLBACK_RATE', 16350.0)
+        self.price = None
+        self.now = None
+        self.orders = {}        # Semua order (untuk get_order_status)
+        self.open_orders = {}   # order_id -> order yang masih di book
+        self._locks = {}        # order_id -> (asset, jumlah terkunci)
+        self._next_order_id = 1
+        self._next_trade_id = 1
+        self.events = []
+        self.stats = {
+            'placed': 0, 'cancelled': 0, 'rejected': 0,
+            'buy_fills': 0, 'sell_fills': 0, 'maker_fills': 0, 'taker_fills': 0, 'market_orders': 0,
+            'volume': 0.0, 'fees': 0.0
+        }
+        # Permukaan python-binance mentah (create_order, get_klines) untuk RiskManager/AutoBalancer
+        self.client = self
+        # Saldo langsung terbarui setelah market order, AutoBalancer tidak perlu menunggu
+        self.balance_settle_delay = 0
+
+    def set_market(self, price, now):
+        self.price = float(price)
+        self.now = now
+
+    def _timestamp_ms(self):
+        return int(self.now.timestamp() * 1000) if self.now else 0
+
+    # --- BinanceClient interface ---
+
+    def get_symbol_rules(self, symbol):
+        return self.rules
+
+    def format_price(self, symbol, price):
+        return self.rules.format_price(price)
+
+    def format_quantity(self, symbol, quantity):
+        return self.rules.format_quantity(quantity)
+
+    def validate_order(self, symbol, quantity, price):
+        return self.rules.validate(self.rules.quantize_price(price), self.rules.quantize_quantity(quantity))
+
+    def get_symbol_price(self, symbol=None):
+        return self.price
+
+    def get_account_balance(self, asset=None, max_age=None):
+        if asset:
+            balance = self.balances.get(asset)
+            return dict(balance) if balance else None
+        return {name: dict(b) for name, b in self.balances.items() if b['free'] > 0 or b['locked'] > 0}
+
+    def get_balance_snapshot(self, assets, max_age=None):
+        balances = {asset: dict(self.balances[asset]) for asset in assets if asset in self.balances}
+        return balances, self.now.timestamp() if self.now else None
+
+    def invalidate_balance_cache(self):
+        pass
+
+    def get_balance_cache_stats(self):
+        return {'hits': 0, 'misses': 0, 'invalidations': 0, 'hit_rate': 0.0, 'ttl': 0}
+
+    def get_rate_budget(self):
+        # Satu worker GridOrderPlacer: order id tetap berurutan dan hasil replay deterministik
+        return {'utilization': 0.0, 'orders_available': 1}
+
+    def get_usdt_idr_rate(self):
+        return self.fx_rate
+
+    def prefetch_order_fills(self, order_ids, symbol=None):
+        return 0
+
+    def place_limit_order(self, symbol, side, quantity, price):
+        formatted_price = self.format_price(symbol, price)
+        formatted_quantity = self.format_quantity(symbol, quantity)
+        rejection = self.validate_order(symbol, formatted_quantity, formatted_price)
+        if rejection:
+            self.stats['rejected'] += 1
+            logger.error(f"Order {side} {formatted_quantity} {symbol} at {formatted_price} rejected locally: {rejection}")
+            return None
+        try:
+            return self._new_order(side, 'LIMIT', float(formatted_quantity), float(formatted_price))
+        except BinanceAPIException as e:
+            logger.error(f"Failed to place {side} order: {e}")
+            return None
+
+    def get_open_orders(self, symbol=None):
+        return [dict(order) for order in self.open_orders.values()]
+
+    def get_order_status(self, order_id, symbol=None):
+        order = self.orders.get(order_id)
+        return dict(order) if order else None
+
+    def cancel_order(self, order_id, symbol=None):
+        order = self.open_orders.pop(order_id, None)
+        if order is None:
+            logger.error(f"Failed to cancel order {order_id}: APIError(code=-2011): Unknown order sent.")
+            return None
+        asset, amount = self._locks.pop(order_id)
+        self.balances[asset]['locked'] -= amount
+        self.balances[asset]['free'] += amount
+        order['status'] = 'CANCELED'
+        order['updateTime'] = self._timestamp_ms()
+        self.stats['cancelled'] += 1
+        return dict(order)
+
+    def cancel_all_orders(self, symbol=None):
+        result = {'cancelled': [], 'failed': [], 'method': 'bulk' if self.open_orders else 'none'}
+        for order_id in list(self.open_orders):
+            self.cancel_order(order_id)
+            result['cancelled'].append(order_id)
+        return result
+
+    # --- python-binance Client interface (self.client) ---
+
+    def create_order(self, symbol, side, type, quantity=None, price=None, quoteOrderQty=None, **kwargs):
+        if type == 'MARKET':
+            if quantity is None:
+                quantity = self.rules.quantize_quantity(float(quoteOrderQty) / self.price)
+            self.stats['market_orders'] += 1
+            return self._new_order(side, 'MARKET', float(quantity), None)
+        return self._new_order(side, type, float(quantity), float(price))
+
+    def get_klines(self, symbol, interval=None, startTime=None, endTime=None, limit=500, **kwargs):
+        """Replayed bars in a window ending at the simulated time"""
+        if self.market is None or self.now is None:
+            return []
+        # Panjang window diambil dari request; titik akhirnya waktu simulasi, bukan jam dinding
+        window = (endTime - startTime) / 1000 if startTime and endTime else limit * 60
+        end = self.now.replace(tzinfo=datetime.timezone.utc).timestamp()
+        times = self.market['time']
+        lo, hi = np.searchsorted(times, [end - window, end], side='right')
+        lo = max(lo, hi - limit)
+        return [
+            [int(times[i] * 1000), str(self.market['open'][i]), str(self.market['high'][i]),
+             str(self.market['low'][i]), str(self.market['close'][i]), '0']
+            for i in range(lo, hi)
+        ]
+
+    # --- Matching engine ---
+
+    def _new_order(self, side, order_type, quantity, price):
+        """Lock the balance, then rest the order or fill it at once when marketable"""
+        reference = price if price is not None else self.price
+        if side == 'BUY':
+            asset, amount = self.quote_asset, quantity * reference
+        else:
+            asset, amount = self.base_asset, quantity
+        balance = self.balances[asset]
+        if amount > balance['free'] + 1e-9:
+            self.stats['rejected'] += 1
+            raise _api_error(-2010, 'Account has insufficient balance for requested action.')
+        balance['free'] -= amount
+        balance['locked'] += amount
+
+        order_id = self._next_order_id
+        self._next_order_id += 1
+        order = {
+            'symbol': self.symbol,
+            'orderId': order_id,
+            'price': f"{reference:.8f}",
+            'origQty': f"{quantity:.8f}",
+            'executedQty': '0.00000000',
+            'cummulativeQuoteQty': '0.00000000',
+            'status': 'NEW',
+            'timeInForce': 'GTC',
+            'type': order_type,
+            'side': side,
+            'transactTime': self._timestamp_ms()
+        }
+        self.orders[order_id] = order
+        self.open_orders[order_id] = order
+        self._locks[order_id] = (asset, amount)
+        self.stats['placed'] += 1
+
+        marketable = price is None or (side == 'BUY' and price >= self.price) or (side == 'SELL' and price <= self.price)
+        if marketable:
+            self._fill(order, self.price, taker=True)
+        return dict(order)
+
+    def _fill(self, order, price, taker=False):
+        order_id = order['orderId']
+        quantity = float(order['origQty'])
+        fee_rate = self.taker_fee if taker else self.maker_fee
+        asset, amount = self._locks.pop(order_id)
+        del self.open_orders[order_id]
+        self.balances[asset]['locked'] -= amount
+        quote = self.balances[self.quote_asset]
+        base = self.balances[self.base_asset]
+        if order['side'] == 'BUY':
+            # Sisa lock (limit di atas harga match) kembali ke saldo free
+            quote['free'] += amount - quantity * price
+            commission, commission_asset = quantity * fee_rate, self.base_asset
+            base['free'] += quantity - commission
+            fee_value = commission * price
+            self.stats['buy_fills'] += 1
+        else:
+            commission, commission_asset = quantity * price * fee_rate, self.quote_asset
+            quote['free'] += quantity * price - commission
+            fee_value = commission
+            self.stats['sell_fills'] += 1
+        self.stats['taker_fills' if taker else 'maker_fills'] += 1
+        self.stats['volume'] += quantity * price
+        self.stats['fees'] += fee_value
+
+        order.update({
+            'status': 'FILLED',
+            'executedQty': order['origQty'],
+            'cummulativeQuoteQty': f"{quantity * price:.8f}",
+            'updateTime': self._timestamp_ms(),
+            'fills': [{
+                'price': f"{price:.8f}",
+                'qty': order['origQty'],
+                'commission': f"{commission:.8f}",
+                'commissionAsset': commission_asset,
+                'tradeId': self._next_trade_id
+            }]
+        })
+        self._next_trade_id += 1
+        self.events.append({'e': 'executionReport', 's': self.symbol, 'i': order_id, 'S': order['side'],
+                            'X': 'FILLED', 'L': f"{price:.8f}", 'T': self._timestamp_ms()})
+
+    def fill_next(self, target):
+        """
+        Move the price towards target, stopping at the first resting order crossed
+
+        Returns:
+            bool: True if an order was filled (the price is then at its limit),
+                  False if the target was reached without a fill
+        """
+        best = None
+        if target < self.price:
+            for order in self.open_orders.values():
+                if order['side'] == 'BUY':
+                    limit = float(order['price'])
+                    if limit >= target and (best is None or limit > best[0]):
+                        best = (limit, order)
+        elif target > self.price:
+            for order in self.open_orders.values():
+                if order['side'] == 'SELL':
+                    limit = float(order['price'])
+                    if limit <= target and (best is None or limit < best[0]):
+                        best = (limit, order)
+        if best is None:
+            self.price = target
+            return False
+        self.price = best[0]
+        self._fill(best[1], best[0])
+        return True
+
+    def drain_events(self):
+        events, self.events = self.events, []
+        return events
+
+    def total_value(self, price=None):
+        """Quote value of all balances at price (default: current price)"""
+        price = self.price if price is None else price
+        quote = self.balances[self.quote_asset]
+        base = self.balances[self.base_asset]
+        return quote['free'] + quote['locked'] + (base['free'] + base['locked']) * price
+
+class Backtest:
+    """
+    Replay historical klines or trades through the real GridTradingBot logic.
+
+    The bot runs unchanged against a SimulatedExchange: setup_grid at the
+    first price, fills delivered through its execution-report path
+    (process_fill_events), check_filled_orders for price updates and the stop
+    loss after every bar with an open-order reconcile pass every
+    RECONCILE_INTERVAL, and adjust_grid on the bot's own interval, both in
+    simulated time. Each bar is walked open -> low -> high -> close (open ->
+    high -> low -> close for a down bar), one crossed order at a time, so a
+    counter order placed after a fill can fill later in the same bar.
+    """
+
+    def __init__(self, data, symbol=None, lower_price=None, upper_price=None, grid_number=None, quantity=None,
+                 quote_balance=None, base_balance=None, maker_fee=None, taker_fee=None,
+                 max_investment=None, stop_loss_percentage=None, adjust_interval=None, recenter_margin=None,
+                 reconcile_interval=None):
+        """
+        Args:
+            data (dict): Market data from load_market_data
+            symbol (str): Trading pair (default config.SYMBOL)
+            lower_price, upper_price, grid_number, quantity: Grid parameters (default from config)
+            quote_balance, base_balance (float): Starting balances; by default enough
+                for the buy levels below / sell levels above the first price, plus one order
+            maker_fee, taker_fee (float): Fee rates (default from config)
+            max_investment (float): Override config.MAX_INVESTMENT
+            stop_loss_percentage (float): Override config.STOP_LOSS_PERCENTAGE
+            adjust_interval (float): Seconds between adjust_grid calls (default
+                config.GRID_ADJUST_INTERVAL); 0 never re-centers the grid
+            recenter_margin (float): Grid width on each side of the price when
+                re-centering (default config.GRID_RECENTER_MARGIN)
+            reconcile_interval (float): Seconds between open-order reconcile passes
+                (default config.RECONCILE_INTERVAL, like the live loop with the feed connected)
+        """
+        if not len(data['time']):
+            raise ValueError("no market data to replay")
+        self.data = data
+        self.symbol = symbol or config.SYMBOL
+        self.lower_price = config.LOWER_PRICE if lower_price is None else lower_price
+        self.upper_price = config.UPPER_PRICE if upper_price is None else upper_price
+        self.grid_number = grid_number or config.GRID_NUMBER
+        self.quantity = quantity or config.QUANTITY
+        self.quote_balance = quote_balance
+        self.base_balance = base_balance
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.max_investment = max_investment
+        self.stop_loss_percentage = stop_loss_percentage
+        self.adjust_interval = adjust_interval
+        self.recenter_margin = recenter_margin
+        self.reconcile_interval = getattr(config, 'RECONCILE_INTERVAL', 120) if reconcile_interval is None else reconcile_interval
+        self.exchange = None
+        self.bot = None
+        self.daily_equity = []  # (YYYY-MM-DD, nilai portfolio di akhir hari)
+
+    @staticmethod
+    def _datetime(ts):
+        # Waktu simulasi naive dalam UTC, sama formatnya dengan datetime.now() di bot
+        return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).replace(tzinfo=None)
+
+    def _create_bot(self, first_price, start):
+        # Default: saldo untuk setiap level di sisi masing-masing plus satu order cadangan
+        grid_prices = np.linspace(self.lower_price, self.upper_price, self.grid_number + 1)
+        buy_levels = int((grid_prices < first_price).sum()) + 1
+        sell_levels = int((grid_prices > first_price).sum()) + 1
+        quote_balance = self.quote_balance
+        if quote_balance is None:
+            quote_balance = buy_levels * self.quantity * first_price
+        base_balance = sell_levels * self.quantity if self.base_balance is None else self.base_balance
+
+        self.exchange = SimulatedExchange(self.symbol, quote_balance, base_balance,
+                                          self.maker_fee, self.taker_fee, market=self.data)
+        self.exchange.set_market(first_price, start)
+        exchange = self.exchange
+
+        bot = GridTradingBot(client=exchange, analytics=BacktestAnalytics(self.symbol),
+                             state_journal=NullStateJournal(), clock=lambda: exchange.now)
+        bot.symbol = self.symbol
+        bot.lower_price = self.lower_price
+        bot.upper_price = self.upper_price
+        bot.grid_number = self.grid_number
+        bot.grid_size = (self.upper_price - self.lower_price) / self.grid_number
+        bot.quantity = self.quantity
+        bot.grid_prices = bot._calculate_grid_prices()
+        if self.adjust_interval is not None:
+            bot.grid_adjust_interval = self.adjust_interval
+        if self.recenter_margin is not None:
+            bot.recenter_margin = self.recenter_margin
+        if self.max_investment is not None:
+            bot.risk_manager.max_investment = self.max_investment
+        if self.stop_loss_percentage is not None:
+            bot.risk_manager.stop_loss_percentage = self.stop_loss_percentage
+        return bot
+
+    def _deliver_fills(self):
+        """Feed queued fills to the bot; its counter orders may fill in turn"""
+        while self.exchange.events:
+            for event in self.exchange.drain_events():
+                self.bot.fill_events.put(event)
+            self.bot.process_fill_events()
+
+    def _move(self, target):
+        while self.exchange.fill_next(target):
+            self._deliver_fills()
+
+    def run(self):
+        """
+        Replay all data
+
+        Returns:
+            dict: Report (see _report)
+        """
+        started = time.time()
+        data = self.data
+        times = data['time'].tolist()
+        opens, highs, lows, closes = (data[name].tolist() for name in ('open', 'high', 'low', 'close'))
+
+        start = self._datetime(times[0])
+        bot = self.bot = self._create_bot(opens[0], start)
+        exchange = self.exchange
+        initial_value = exchange.total_value()
+        initial_base = exchange.balances[exchange.base_asset]['free']
+        initial_quote = exchange.balances[exchange.quote_asset]['free']
+
+        if not bot.setup_grid():
+            raise RuntimeError("grid setup failed at the first price")
+        self._deliver_fills()
+        bot.last_grid_adjustment = start
+        last_reconcile = start
+
+        peak = initial_value
+        max_drawdown = 0.0
+        day = start.date()
+        regrids = 0
+        adjust = bot.grid_adjust_interval > 0
+        try:
+            for i in range(len(times)):
+                now = self._datetime(times[i])
+                exchange.now = now
+                if now.date() != day:
+                    self.daily_equity.append((day.isoformat(), exchange.total_value()))
+                    day = now.date()
+
+                o, h, l, c = opens[i], highs[i], lows[i], closes[i]
+                self._move(o)
+                if c >= o:
+                    self._move(l)
+                    self._move(h)
+                else:
+                    self._move(h)
+                    self._move(l)
+                self._move(c)
+
+                # Sama dengan satu putaran loop bot: harga, stop loss, rekonsiliasi open order
+                # per RECONCILE_INTERVAL, lalu adjust_grid per interval
+                reconcile = (now - last_reconcile).total_seconds() >= self.reconcile_interval
+                bot.check_filled_orders(reconcile=reconcile)
+                if reconcile:
+                    last_reconcile = now
+                self._deliver_fills()
+                if adjust and (now - bot.last_grid_adjustment).total_seconds() > bot.grid_adjust_interval:
+                    lower = bot.lower_price
+                    bot.adjust_grid()
+                    bot.last_grid_adjustment = now
+                    self._deliver_fills()
+                    if bot.lower_price != lower:
+                        regrids += 1
+
+                value = exchange.total_value()
+                peak = max(peak, value)
+                max_drawdown = max(max_drawdown, (peak - value) / peak if peak else 0)
+            self.daily_equity.append((day.isoformat(), exchange.total_value()))
+        finally:
+            if GridTradingBot.instance is bot:
+                GridTradingBot.instance = None
+
+        elapsed = time.time() - started
+        return self._report(initial_value, initial_quote, initial_base, max_drawdown, regrids, elapsed)
+
+    def _sharpe(self, initial_value):
+        """Annualized Sharpe ratio of the daily portfolio returns (risk-free rate 0)"""
+        values = np.array([initial_value] + [value for _, value in self.daily_equity])
+        if len(values) < 3 or not values[:-1].all():
+            return 0.0
+        returns = np.diff(values) / values[:-1]
+        std = returns.std(ddof=1)
+        return float(returns.mean() / std * np.sqrt(365)) if std > 0 else 0.0
+
+    def _report(self, initial_value, initial_quote, initial_base, max_drawdown, regrids, elapsed):
+        exchange, bot, data = self.exchange, self.bot, self.data
+        last_price = exchange.price
+        final_value = exchange.total_value()
+        quote = exchange.balances[exchange.quote_asset]
+        base = exchange.balances[exchange.base_asset]
+        base_total = base['free'] + base['locked']
+        hold_value = initial_quote + initial_base * last_price
+        bars = len(data['time'])
+        return {
+            'symbol': self.symbol,
+            'kind': data['kind'],
+            'start': self._datetime(data['time'][0]).isoformat(),
+            'end': self._datetime(data['time'][-1]).isoformat(),
+            'bars': bars,
+            'elapsed': elapsed,
+            'bars_per_second': bars / elapsed if elapsed else None,
+            'params': {
+                'lower_price': self.lower_price,
+                'upper_price': self.upper_price,
+                'grid_number': self.grid_number,
+                'quantity': self.quantity,
+                'maker_fee': exchange.maker_fee,
+                'taker_fee': exchange.taker_fee,
+                'max_investment': bot.risk_manager.max_investment,
+                'stop_loss_percentage': bot.risk_manager.stop_loss_percentage,
+                'adjust_interval': bot.grid_adjust_interval,
+                'recenter_margin': bot.recenter_margin,
+                'reconcile_interval': self.reconcile_interval
+            },
+            'initial': {'quote': initial_quote, 'base': initial_base, 'price': float(data['open'][0]), 'value': initial_value},
+            'final': {'quote': quote['free'] + quote['locked'], 'base': base_total, 'price': last_price, 'value': final_value},
+            'pnl': final_value - initial_value,
+            'pnl_pct': (final_value - initial_value) / initial_value * 100 if initial_value else 0,
+            'hold_pnl': hold_value - initial_value,
+            'realized_profit': bot.total_profit,
+            'fees': exchange.stats['fees'],
+            'volume': exchange.stats['volume'],
+            'fills': {
+                'buy': exchange.stats['buy_fills'],
+                'sell': exchange.stats['sell_fills'],
+                'maker': exchange.stats['maker_fills'],
+                'taker': exchange.stats['taker_fills'],
+                'total': exchange.stats['buy_fills'] + exchange.stats['sell_fills']
+            },
+            'orders': {
+                'placed': exchange.stats['placed'],
+                'cancelled': exchange.stats['cancelled'],
+                'rejected': exchange.stats['rejected'],
+                'market': exchange.stats['market_orders'],
+                'open': len(exchange.open_orders)
+            },
+            'inventory': {
+                'base': base_total,
+                'change': base_total - initial_base,
+                'value': base_total * last_price
+            },
+            'max_drawdown_pct': max_drawdown * 100,
+            'sharpe': self._sharpe(initial_value),
+            'calmar': (final_value - initial_value) / initial_value / max_drawdown if max_drawdown and initial_value else None,
+            'regrids': regrids,
+            # Hasil setelah stop loss bukan hasil strategi grid; param_sweep memisahkannya
+            'risk': dict(bot.risk_manager.stats),
+            'grid': {'lower_price': bot.lower_price, 'upper_price': bot.upper_price, 'grid_size': bot.grid_size},
+            'metrics': bot.metrics.all_time()
+        }
+
+def run_backtest(path, **params):
+    """Load a CSV and replay it; params are passed to Backtest"""
+    return Backtest(load_market_data(path), **params).run()
+
+def print_report(report):
+    print("=" * 50)
+    print(f"BACKTEST {report['symbol']}: {report['start']} - {report['end']}")
+    print("=" * 50)
+    params = report['params']
+    print(f"Grid: {params['lower_price']:.4f} - {params['upper_price']:.4f}, {params['grid_number']} grids, quantity {params['quantity']}")
+    print(f"Replayed {report['bars']} {report['kind']} in {report['elapsed']:.2f}s ({report['bars_per_second'] or 0:.0f}/s)")
+    print(f"Initial value: {report['initial']['value']:.4f} USDT ({report['initial']['quote']:.4f} USDT + {report['initial']['base']:.4f} base)")
+    print(f"Final value: {report['final']['value']:.4f} USDT ({report['final']['quote']:.4f} USDT + {report['final']['base']:.4f} base)")
+    print(f"PnL: {report['pnl']:.4f} USDT ({report['pnl_pct']:.2f}%), buy and hold: {report['hold_pnl']:.4f} USDT")
+    print(f"Realized grid profit: {report['realized_profit']:.4f} USDT, fees: {report['fees']:.4f} USDT")
+    fills = report['fills']
+    print(f"Fills: {fills['total']} ({fills['buy']} buy / {fills['sell']} sell, {fills['taker']} taker)")
+    orders = report['orders']
+    print(f"Orders: {orders['placed']} placed, {orders['cancelled']} cancelled, {orders['rejected']} rejected, {orders['market']} market")
+    print(f"Inventory change: {report['inventory']['change']:+.4f} base, max drawdown: {report['max_drawdown_pct']:.2f}%, Sharpe: {report['sharpe']:.2f}")
+    print(f"Grid re-centered {report['regrids']} times, final range {report['grid']['lower_price']:.4f} - {report['grid']['upper_price']:.4f}")
+    risk = report['risk']
+    if risk['stop_loss_triggers'] or risk['emergency_exits']:
+        print(f"WARNING: stop loss triggered {risk['stop_loss_triggers']} times, {risk['emergency_exits']} emergency exits")
+
+def main():
+    """Run a backtest from the command line"""
+    parser = argparse.ArgumentParser(description='Replay klines or trades through the grid bot logic')
+    parser.add_argument('data', help='CSV with klines or trades (Binance format or with a header)')
+    parser.add_argument('--symbol', default=config.SYMBOL, help=f'Trading symbol (default: {config.SYMBOL})')
+    parser.add_argument('--lower', type=float, help='Lower grid price (default: config.LOWER_PRICE)')
+    parser.add_argument('--upper', type=float, help='Upper grid price (default: config.UPPER_PRICE)')
+    parser.add_argument('--grids', type=int, help='Number of grids (default: config.GRID_NUMBER)')
+    parser.add_argument('--quantity', type=float, help='Order quantity (default: config.QUANTITY)')
+    parser.add_argument('--quote', type=float, help='Starting quote balance (default: enough for the buy levels)')
+    parser.add_argument('--base', type=float, help='Starting base balance (default: enough for the sell levels)')
+    parser.add_argument('--maker-fee', type=float, help='Maker fee rate, e.g. 0.001')
+    parser.add_argument('--taker-fee', type=float, help='Taker fee rate, e.g. 0.001')
+    parser.add_argument('--max-investment', type=float, help='Override MAX_INVESTMENT')
+    parser.add_argument('--stop-loss', type=float, help='Override STOP_LOSS_PERCENTAGE')
+    parser.add_argument('--adjust-interval', type=float, help='Seconds between grid adjustments (0 = never re-center)')
+    parser.add_argument('--recenter-margin', type=float, help='Grid width on each side when re-centering, e.g. 0.02')
+    parser.add_argument('--reconcile-interval', type=float, help='Seconds between open-order reconcile passes (default: config.RECONCILE_INTERVAL)')
+    parser.add_argument('--json', help='Write the report as JSON to this file ("-" for stdout)')
+    parser.add_argument('--verbose', action='store_true', help='Show the full bot log (default: errors only)')
+    args = parser.parse_args()
+
+    # Log backtest hanya ke console, bukan ke bot.log milik bot live
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.ERROR,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler()],
+        force=True
+    )
+
+    report = run_backtest(
+        args.data, symbol=args.symbol, lower_price=args.lower, upper_price=args.upper,
+        grid_number=args.grids, quantity=args.quantity, quote_balance=args.quote, base_balance=args.base,
+        maker_fee=args.maker_fee, taker_fee=args.taker_fee, max_investment=args.max_investment,
+        stop_loss_percentage=args.stop_loss, adjust_interval=args.adjust_interval,
+        recenter_margin=args.recenter_margin, reconcile_interval=args.reconcile_interval
+    )
+    if args.json == '-':
+        print(json.dumps(report, indent=2))
+        return
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}")
+
+if __name__ == "__main__":
+    main()
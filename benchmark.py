@@ -0,0 +1,473 @@
+import argparse
+import contextlib
+import datetime
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+# Ukuran default (lengkap, --quick)
+SIZES = {
+    'check_filled_orders': ([(10, 0), (10, 5), (100, 10), (500, 50)], [(10, 0), (50, 5)]),
+    'save_state': ([100, 1000, 10000], [100, 1000]),
+    'analytics': ([1000, 10000, 100000], [1000, 10000]),
+    'parse_trades_from_log': ([10000, 100000, 500000], [10000, 50000]),
+    'dashboard': ([100, 1000, 10000], [100, 1000]),
+}
+
+BENCHMARKS = ('check_filled_orders', 'save_state', 'analytics', 'format_order', 'place_limit_order',
+              'parse_trades_from_log', 'dashboard')
+
+def measure(name, params, run, repeat, setup=None, warmup=1):
+    """
+    Time run(context) repeat times
+
+    Args:
+        name (str): Benchmark name
+        params (dict): Benchmark parameters, part of the result key
+        run (callable): Timed function, receives the setup result
+        repeat (int): Number of timed samples
+        setup (callable): Untimed per-sample preparation
+        warmup (int): Untimed runs before sampling
+
+    Returns:
+        dict: Timings in milliseconds (min, median, mean, p95, max) and ops/s
+    """
+    for _ in range(warmup):
+        run(setup() if setup else None)
+    samples = []
+    for _ in range(repeat):
+        context = setup() if setup else None
+        started = time.perf_counter()
+        run(context)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    median = statistics.median(samples)
+    result = {
+        'name': name,
+        'params': params,
+        'repeat': repeat,
+        'min_ms': round(samples[0], 4),
+        'median_ms': round(median, 4),
+        'mean_ms': round(statistics.fmean(samples), 4),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        'max_ms': round(samples[-1], 4),
+        'ops_per_sec': round(1000 / median, 2) if median else None
+    }
+    logger.info(f"{name} {params}: median {result['median_ms']:.3f} ms")
+    return result
+
+def result_key(result):
+    """Identity of a result across runs: name plus sorted params"""
+    return f"{result['name']}[{','.join(f'{k}={v}' for k, v in sorted(result['params'].items()))}]"
+
+# --- Data sintetis ---
+
+def synthetic_trades(count, price=0.65, seed=1):
+    """Bot trade history alternating BUY/SELL around price"""
+    rng = random.Random(seed)
+    start = datetime.datetime(2025, 1, 1)
+    trades = []
+    for i in range(count):
+        side = 'BUY' if i % 2 == 0 else 'SELL'
+        trade_price = round(price * (1 + rng.uniform(-0.05, 0.05)), 4)
+        trade = {
+            'time': (start + datetime.timedelta(minutes=7 * i)).isoformat(),
+            'type': side,
+            'side': side,
+            'price': trade_price,
+            'quantity': float(config.QUANTITY),
+            'symbol': config.SYMBOL,
+            'value': trade_price * config.QUANTITY
+        }
+        if side == 'SELL':
+            trade['profit'] = round(rng.uniform(-0.02, 0.08), 6)
+        trades.append(trade)
+    return trades
+
+def synthetic_transactions(count, seed=2):
+    """Analytics transactions as logged by the bot"""
+    transactions = []
+    total = 0.0
+    for trade in synthetic_trades(count, seed=seed):
+        profit = trade.get('profit', 0.0)
+        total += profit
+        transactions.append({
+            'time': trade['time'], 'timestamp': trade['time'], 'type': trade['type'], 'price': trade['price'],
+            'quantity': trade['quantity'], 'profit': profit, 'total_profit': total, 'grid_level': 3
+        })
+    return transactions
+
+def write_bot_log(path, lines, trade_every=20, seed=3):
+    """bot.log with one trade line every trade_every lines, the rest routine INFO lines"""
+    rng = random.Random(seed)
+    start = datetime.datetime(2025, 1, 1)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(lines):
+            stamp = (start + datetime.timedelta(seconds=10 * i)).strftime('%Y-%m-%d %H:%M:%S,%f')[:-3]
+            price = 0.65 * (1 + rng.uniform(-0.05, 0.05))
+            if i % trade_every == 0:
+                if i % (2 * trade_every) == 0:
+                    message = f"Buy order at {price:.4f} filled. Placing sell order at {price * 1.01:.4f}"
+                else:
+                    message = f"Sell order at {price:.4f} filled. Net Profit: {rng.uniform(-0.02, 0.08):.4f} USDT (0.55%). Total profit: 1.2345 USDT"
+                f.write(f"{stamp} - grid_bot - INFO - {message}\n")
+            else:
+                f.write(f"{stamp} - binance_client - INFO - Placed BUY order for 21 {config.SYMBOL} at {price:.4f}\n")
+
+# --- Bot tanpa jaringan ---
+
+def create_offline_bot(state_journal=None, balance=1e7):
+    """GridTradingBot on a SimulatedExchange (no network, no files unless a journal is given)"""
+    from backtest import BacktestAnalytics, NullStateJournal, SimulatedExchange
+    from grid_bot import GridTradingBot
+
+    exchange = SimulatedExchange(config.SYMBOL, balance, balance)
+    exchange.set_market(0.65, datetime.datetime(2025, 1, 1))
+    bot = GridTradingBot(client=exchange, analytics=BacktestAnalytics(config.SYMBOL),
+                         state_journal=state_journal or NullStateJournal(), clock=lambda: exchange.now)
+    bot.risk_manager.max_investment = float('inf')
+    bot.risk_manager.stop_loss_percentage = 100.0
+    return bot, exchange
+
+def bench_check_filled_orders(sizes, repeat):
+    """check_filled_orders(reconcile=True) with N grid orders open and M of them filled since the last check"""
+    results = []
+    for orders, fills in sizes:
+        def setup(orders=orders, fills=fills):
+            bot, exchange = create_offline_bot()
+            bot.grid_number = orders
+            bot.lower_price, bot.upper_price = 0.65 * 0.8, 0.65 * 1.2
+            bot.grid_size = (bot.upper_price - bot.lower_price) / orders
+            bot.grid_prices = bot._calculate_grid_prices()
+            bot.setup_grid()
+            # Fill terlewat: harga bergerak turun melewati M order beli
+            for _ in range(fills):
+                if not exchange.fill_next(bot.lower_price * 0.9):
+                    break
+            exchange.drain_events()
+            return bot
+        results.append(measure('check_filled_orders', {'orders': orders, 'fills': fills},
+                               lambda bot: bot.check_filled_orders(reconcile=True), repeat, setup))
+    return results
+
+def bench_save_state(sizes, repeat, workdir):
+    """_save_state journal append (amortized snapshots) and forced snapshot with H trades of history"""
+    from state_journal import StateJournal
+
+    results = []
+    for history in sizes:
+        path = os.path.join(workdir, f"grid_state_bench_{history}.json")
+        bot, _ = create_offline_bot(StateJournal(path))
+        bot.state_journal.load()
+        bot.trades = synthetic_trades(history)
+        for trade in bot.trades:
+            bot.metrics.apply(trade)
+        bot.last_price = 0.65
+        results.append(measure('save_state', {'trades': history}, lambda _: bot._save_state(), repeat * 10))
+        results.append(measure('save_state_snapshot', {'trades': history},
+                               lambda _: bot._save_state(snapshot=True), repeat))
+        bot.state_journal.close()
+    return results
+
+def bench_analytics(sizes, repeat, workdir, backends=('sqlite', 'json')):
+    """TradingAnalytics.log_transaction (trading loop cost) and a writer flush of 100 transactions, by stored history"""
+    from analytics_db import SqliteAnalyticsStore
+    from analytics_writer import JsonAnalyticsStore
+    from trading_analytics import TradingAnalytics
+
+    results = []
+    for backend in backends:
+        for history in sizes:
+            log_dir = os.path.join(workdir, f"analytics_{backend}_{history}")
+            os.makedirs(log_dir, exist_ok=True)
+            batch = {'transactions': synthetic_transactions(history), 'balances': [], 'prices': [], 'metrics': None}
+            if backend == 'sqlite':
+                store = SqliteAnalyticsStore(os.path.join(log_dir, getattr(config, 'ANALYTICS_DB_FILE', 'analytics.db')), config.SYMBOL)
+                store.write(batch)
+                store.close()
+            else:
+                JsonAnalyticsStore(
+                    f"{log_dir}/transactions_{config.SYMBOL}.json", f"{log_dir}/balance_history.json",
+                    f"{log_dir}/performance_metrics_{config.SYMBOL}.json", f"{log_dir}/price_history_{config.SYMBOL}.csv"
+                ).write(batch)
+
+            analytics = TradingAnalytics(config.SYMBOL, log_dir=log_dir, backend=backend)
+            # Writer hanya flush saat diminta, supaya sampel log_transaction tidak ikut menulis
+            analytics.writer.flush_interval = 3600
+            transactions = iter(synthetic_transactions(repeat * 200, seed=5) * 2)
+            params = {'backend': backend, 'history': history}
+            results.append(measure('analytics_log_transaction', params,
+                                   lambda _: analytics.log_transaction(dict(next(transactions))), repeat * 10))
+            analytics.flush()
+
+            def log_and_flush(_):
+                for _ in range(100):
+                    analytics.log_transaction(dict(next(transactions)))
+                analytics.flush()
+            results.append(measure('analytics_flush_100', params, log_and_flush, repeat))
+            analytics.close()
+    return results
+
+@contextlib.contextmanager
+def mock_binance_client():
+    """BinanceClient connected to an in-process mock exchange on localhost"""
+    from mock_exchange import FaultInjector, MockExchangeServer, create_mock_exchange
+
+    exchange = create_mock_exchange(speed=1, seed=1, warmup=0, balances={'USDT': 1e9, config.SYMBOL.replace('USDT', ''): 1e9})
+    server = MockExchangeServer(exchange, faults=FaultInjector())
+    server.start()
+    previous = (config.BINANCE_API_URL, config.API_KEY, config.API_SECRET)
+    config.BINANCE_API_URL = server.url
+    config.API_KEY = config.API_KEY or 'benchmark'
+    config.API_SECRET = config.API_SECRET or 'benchmark'
+    try:
+        from binance_client import BinanceClient
+        yield BinanceClient(), exchange
+    finally:
+        config.BINANCE_API_URL, config.API_KEY, config.API_SECRET = previous
+        server.stop()
+
+def bench_orders(repeat, names):
+    """place_limit_order price/quantity formatting and validation, and the full call against the mock exchange"""
+    results = []
+    rng = random.Random(4)
+    prices = [0.65 * (1 + rng.uniform(-0.1, 0.1)) for _ in range(1000)]
+    quantities = [config.QUANTITY * rng.uniform(0.9, 1.1) for _ in range(1000)]
+    with mock_binance_client() as (client, exchange):
+        if 'format_order' in names:
+            def format_order(_):
+                for price, quantity in zip(prices, quantities):
+                    formatted_price = client.format_price(config.SYMBOL, price)
+                    formatted_quantity = client.format_quantity(config.SYMBOL, quantity)
+                    client.validate_order(config.SYMBOL, formatted_quantity, formatted_price)
+            results.append(measure('format_order', {'orders': len(prices)}, format_order, repeat))
+        if 'place_limit_order' in names:
+            # Order beli jauh di bawah harga: tetap di book dan tidak pernah fill
+            below = itertools.cycle([p * 0.7 for p in prices])
+            quantity = 2 * config.QUANTITY  # Tetap di atas MIN_NOTIONAL pada harga rendah
+
+            def place(_):
+                if client.place_limit_order(config.SYMBOL, 'BUY', quantity, next(below)) is None:
+                    raise RuntimeError("place_limit_order was rejected")
+            results.append(measure('place_limit_order', {'transport': 'mock_http'}, place, repeat * 10))
+    return results
+
+def bench_parse_trades_from_log(sizes, repeat, workdir, append=100):
+    """
+    Trade index of a bot.log of L lines (5% trade lines): a cold build without
+    index on disk, and dashboard.parse_trades_from_log after appending lines
+    """
+    import dashboard
+    from log_tail import LogTradeIndex
+
+    results = []
+    for lines in sizes:
+        directory = os.path.join(workdir, f"log_{lines}")
+        os.makedirs(directory, exist_ok=True)
+        write_bot_log(os.path.join(directory, 'bot.log'), lines)
+        with _chdir(directory):
+            def cold_index():
+                index_path = os.path.join(tempfile.mkdtemp(dir=directory), 'index')
+                return LogTradeIndex('bot.log', index_path)
+            results.append(measure('parse_trades_from_log', {'lines': lines},
+                                   lambda index: index.trades(), repeat, setup=cold_index))
+
+            extra = os.path.join(directory, 'append.log')
+            write_bot_log(extra, append, seed=lines)
+            with open(extra, 'r', encoding='utf-8') as f:
+                appended = f.read()
+            def append_lines():
+                with open('bot.log', 'a', encoding='utf-8') as f:
+                    f.write(appended)
+            results.append(measure('parse_trades_from_log_incremental', {'lines': lines, 'append': append},
+                                   lambda _: dashboard.parse_trades_from_log(), repeat, setup=append_lines))
+    return results
+
+def bench_dashboard(sizes, repeat, workdir):
+    """/api/status and /api/trades through the Flask test client, from the state file and from a running bot's snapshot"""
+    import dashboard
+    from grid_bot import GridTradingBot
+    from bot_snapshot import get_snapshot_store
+    from state_journal import atomic_write_json
+
+    client = dashboard.app.test_client()
+    results = []
+    for history in sizes:
+        directory = os.path.join(workdir, f"dashboard_{history}")
+        os.makedirs(directory, exist_ok=True)
+        trades = synthetic_trades(history)
+        atomic_write_json(os.path.join(directory, f"grid_state_{config.SYMBOL}.json"), {
+            'total_profit': sum(t.get('profit', 0) for t in trades), 'trades': trades,
+            'last_update': datetime.datetime(2025, 1, 1).isoformat(), 'last_price': 0.65,
+            'price_range': [config.LOWER_PRICE, config.UPPER_PRICE], 'grid_number': config.GRID_NUMBER
+        })
+        write_bot_log(os.path.join(directory, 'bot.log'), 1000)
+        with _chdir(directory):
+            for source in ('state_file', 'bot_instance'):
+                GridTradingBot.instance = None
+                get_snapshot_store().clear()
+                if source == 'bot_instance':
+                    bot, _ = create_offline_bot()
+                    bot.trades = synthetic_trades(history)
+                    bot.last_price = 0.65
+                    bot._publish_snapshot()
+                for endpoint in ('/api/status', '/api/trades'):
+                    def request(_, endpoint=endpoint):
+                        response = client.get(endpoint)
+                        if response.status_code != 200:
+                            raise RuntimeError(f"{endpoint} returned {response.status_code}")
+                    results.append(measure(f"dashboard{endpoint.replace('/', '_')}",
+                                           {'trades': history, 'source': source}, request, repeat))
+        GridTradingBot.instance = None
+        get_snapshot_store().clear()
+    return results
+
+@contextlib.contextmanager
+def _chdir(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+def environment_info():
+    """Version and machine details stored with the results"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': datetime.datetime.now().isoformat()
+    }
+
+def run_benchmarks(names=None, quick=False, repeat=None):
+    """
+    Run the selected benchmarks in a temporary directory
+
+    Args:
+        names (list): Benchmarks from BENCHMARKS (default: all)
+        quick (bool): Smaller sizes and fewer samples
+        repeat (int): Samples per benchmark (default 20, quick 5)
+
+    Returns:
+        dict: 'schema', 'environment' and 'results' (see measure)
+    """
+    names = list(names or BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks {sorted(unknown)}, choose from {BENCHMARKS}")
+    repeat = repeat or (5 if quick else 20)
+    sizes = {name: values[1] if quick else values[0] for name, values in SIZES.items()}
+    started = time.time()
+    results = []
+    with tempfile.TemporaryDirectory(prefix='grid_bench_') as workdir, _chdir(workdir):
+        if 'check_filled_orders' in names:
+            results += bench_check_filled_orders(sizes['check_filled_orders'], repeat)
+        if 'save_state' in names:
+            results += bench_save_state(sizes['save_state'], repeat, workdir)
+        if 'analytics' in names:
+            results += bench_analytics(sizes['analytics'], repeat, workdir)
+        if 'format_order' in names or 'place_limit_order' in names:
+            results += bench_orders(repeat, names)
+        if 'parse_trades_from_log' in names:
+            results += bench_parse_trades_from_log(sizes['parse_trades_from_log'], repeat, workdir)
+        if 'dashboard' in names:
+            results += bench_dashboard(sizes['dashboard'], repeat, workdir)
+    return {
+        'schema': SCHEMA_VERSION,
+        'environment': environment_info(),
+        'quick': quick,
+        'elapsed': round(time.time() - started, 2),
+        'results': results
+    }
+
+def compare(baseline, current, threshold=0.2):
+    """
+    Compare median timings of two runs
+
+    Args:
+        baseline (dict): Earlier run_benchmarks output
+        current (dict): New run_benchmarks output
+        threshold (float): Relative slowdown counted as a regression (0.2 = 20%)
+
+    Returns:
+        list: One dict per result present in both runs with 'key', 'baseline_ms',
+              'current_ms', 'ratio' and 'regression'
+    """
+    previous = {result_key(r): r for r in baseline['results']}
+    rows = []
+    for result in current['results']:
+        key = result_key(result)
+        if key not in previous:
+            continue
+        before, after = previous[key]['median_ms'], result['median_ms']
+        ratio = after / before if before else None
+        rows.append({'key': key, 'baseline_ms': before, 'current_ms': after, 'ratio': ratio,
+                     'regression': ratio is not None and ratio > 1 + threshold})
+    return rows
+
+def main():
+    """Run the benchmarks from the command line"""
+    parser = argparse.ArgumentParser(description='Benchmark the trading loop hot paths without network access')
+    parser.add_argument('--only', help=f'Comma separated benchmarks (default: all of {",".join(BENCHMARKS)})')
+    parser.add_argument('--quick', action='store_true', help='Smaller sizes and fewer samples')
+    parser.add_argument('--repeat', type=int, help='Samples per benchmark')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', help='Earlier results JSON; exit 1 when a median regresses beyond --threshold')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Regression threshold for --compare (default 0.2 = 20%%)')
+    args = parser.parse_args()
+
+    # Record log tetap dibuat (bagian dari biaya hot path) tetapi tidak ditampilkan
+    logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()], force=True)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+
+    report = run_benchmarks(args.only.split(',') if args.only else None, args.quick, args.repeat)
+    # Handler dari modul bot (bot.log di folder sementara) tidak dipakai lagi
+    logging.basicConfig(level=logging.WARNING, handlers=[logging.StreamHandler()], force=True)
+
+    print(f"{'benchmark':<62} {'median ms':>11} {'p95 ms':>11} {'ops/s':>11}")
+    for result in report['results']:
+        print(f"{result_key(result):<62} {result['median_ms']:>11.3f} {result['p95_ms']:>11.3f} {result['ops_per_sec'] or 0:>11.1f}")
+    print(f"\n{len(report['results'])} results in {report['elapsed']:.1f}s (commit {report['environment']['commit']})")
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        rows = compare(baseline, report, args.threshold)
+        print(f"\nCompared with {baseline_path} (commit {baseline.get('environment', {}).get('commit')}):")
+        for row in rows:
+            flag = '  REGRESSION' if row['regression'] else ''
+            print(f"  {row['key']:<60} {row['baseline_ms']:>10.3f} -> {row['current_ms']:>10.3f} ms (x{row['ratio']:.2f}){flag}")
+        regressions = [row for row in rows if row['regression']]
+        if regressions:
+            print(f"{len(regressions)} regressions beyond {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
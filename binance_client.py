@@ -2,9 +2,15 @@ from binance.client import Client
 from binance.exceptions import BinanceAPIException
 import config
 import logging
-import math
+import json
+import threading
 import time
 import requests
+from fill_resolver import FillResolver
+from fx_rate import get_rate_provider
+from request_metrics import create_session, get_request_metrics
+from rate_limiter import get_rate_governor
+from symbol_rules import SymbolRules
 
 # Configure logging
 logging.basicConfig(
@@ -17,18 +23,63 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class PooledClient(Client):
+    """
+    python-binance Client whose REST traffic goes through the shared keep-alive
+    session pool and the process-wide rate limit governor
+
+    One instance is shared by the threads of GridOrderPlacer. Client._request
+    stores each response on self.response and reads it back, so the attribute
+    is kept per thread; the session's connection pool is thread-safe.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._thread_state = threading.local()
+        super().__init__(*args, **kwargs)
+
+    @property
+    def response(self):
+        return getattr(self._thread_state, 'response', None)
+
+    @response.setter
+    def response(self, value):
+        self._thread_state.response = value
+
+    def _init_session(self):
+        return create_session(headers=self._get_headers(), governor=get_rate_governor())
+
+    def _create_api_uri(self, path, signed=True, version=Client.PUBLIC_API_VERSION):
+        # BINANCE_API_URL mengarahkan REST ke server lain, mis. mock_exchange.py
+        api_url = getattr(config, 'BINANCE_API_URL', '')
+        if not api_url:
+            return super()._create_api_uri(path, signed, version)
+        return f"{api_url.rstrip('/')}/{self.PRIVATE_API_VERSION if signed else version}/{path}"
+
 class BinanceClient:
     def __init__(self):
         """Initialize Binance client with API credentials"""
         try:
-            self.client = Client(config.API_KEY, config.API_SECRET, testnet=config.TESTNET)
+            self.client = PooledClient(config.API_KEY, config.API_SECRET, testnet=config.TESTNET)
             account_info = self.client.get_account()
             logger.info(f"Successfully connected to Binance{'_testnet' if config.TESTNET else ''}")
             logger.info(f"Account status: {account_info['accountType']}")
             
-            # Get symbol info for price precision
+            # Balance snapshot cache, diisi dari get_account yang baru saja dipanggil
+            self.balance_cache_ttl = getattr(config, 'BALANCE_CACHE_TTL', 5)
+            self._balance_lock = threading.Lock()
+            self._balance_snapshot = None
+            self._balance_snapshot_time = 0
+            self._balance_fetched_at = None  # Waktu fetch snapshot, tidak di-reset oleh invalidate
+            self.balance_cache_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+            self._store_balance_snapshot(account_info)
+            
+            # Index fill/fee per order agar myTrades tidak di-scan ulang
+            self.fill_resolver = FillResolver(self.client)
+            
+            # Aturan trading (tick/step/min notional) hanya untuk simbol yang dikonfigurasi
             self.exchange_info = {}
-            self._load_exchange_info()
+            self.symbol_rules = {}
+            self._load_exchange_info(self._configured_symbols())
             
         except BinanceAPIException as e:
             if "Invalid API-key" in str(e):
@@ -41,62 +92,70 @@ class BinanceClient:
                 logger.error(f"Failed to connect to Binance API: {e}")
             raise
 
-    def _load_exchange_info(self):
-        """Load exchange info for symbol precision"""
+    @staticmethod
+    def _configured_symbols():
+        """Symbols this deployment trades"""
+        symbols = getattr(config, 'SYMBOLS', None) or [config.SYMBOL]
+        return list(dict.fromkeys(symbols))
+
+    def _load_exchange_info(self, symbols):
+        """Load exchange info and compile trading rules for the given symbols only"""
         try:
-            info = self.client.get_exchange_info()
+            if len(symbols) == 1:
+                info = self.client._get('exchangeInfo', data={'symbol': symbols[0]})
+            else:
+                info = self.client._get('exchangeInfo', data={'symbols': json.dumps(symbols, separators=(',', ':'))})
             for symbol_data in info['symbols']:
-                self.exchange_info[symbol_data['symbol']] = {
+                symbol = symbol_data['symbol']
+                self.exchange_info[symbol] = {
                     'baseAsset': symbol_data['baseAsset'],
                     'quoteAsset': symbol_data['quoteAsset'],
                     'filters': symbol_data['filters']
                 }
-            logger.info(f"Loaded exchange info for {len(self.exchange_info)} symbols")
+                quantity_precision = config.QUANTITY_PRECISION if symbol == config.SYMBOL and hasattr(config, 'QUANTITY_PRECISION') else None
+                self.symbol_rules[symbol] = SymbolRules.from_symbol_info(symbol_data, quantity_precision)
+            logger.info(f"Loaded exchange info for {len(self.symbol_rules)} symbols: {', '.join(self.symbol_rules)}")
         except BinanceAPIException as e:
             logger.error(f"Failed to load exchange info: {e}")
 
+    def get_symbol_rules(self, symbol):
+        """Get compiled trading rules for a symbol, loading them on first use"""
+        rules = self.symbol_rules.get(symbol)
+        if rules is None and symbol not in self.exchange_info:
+            self._load_exchange_info([symbol])
+            rules = self.symbol_rules.get(symbol)
+            if rules is None:
+                # Jangan coba lagi untuk simbol yang tidak dikenal
+                self.exchange_info[symbol] = None
+        return rules
+
     def get_price_precision(self, symbol):
         """Get price precision for a symbol"""
-        if symbol not in self.exchange_info:
-            # Default precision if symbol not found
-            return 2
-        
-        for filter_data in self.exchange_info[symbol]['filters']:
-            if filter_data['filterType'] == 'PRICE_FILTER':
-                tick_size = float(filter_data['tickSize'])
-                # Calculate precision from tick size (e.g. 0.00001 -> 5)
-                precision = int(round(-math.log10(float(tick_size))))
-                return precision
-        return 2  # Default precision
+        rules = self.get_symbol_rules(symbol)
+        return rules.price_precision if rules else 2  # Default precision
 
     def get_quantity_precision(self, symbol):
         """Get quantity precision for a symbol"""
+        rules = self.get_symbol_rules(symbol)
+        if rules:
+            return rules.quantity_precision
         # Preferentially use configuration if available
         if symbol == config.SYMBOL and hasattr(config, 'QUANTITY_PRECISION'):
             return config.QUANTITY_PRECISION
-        
-        # Otherwise try to get from exchange info
-        if symbol not in self.exchange_info:
-            # Default precision if symbol not found
-            return 2
-        
-        for filter_data in self.exchange_info[symbol]['filters']:
-            if filter_data['filterType'] == 'LOT_SIZE':
-                step_size = float(filter_data['stepSize'])
-                # Calculate precision from step size (e.g. 0.00001 -> 5)
-                if step_size == 1.0:  # Whole number precision
-                    return 0
-                precision = int(round(-math.log10(float(step_size))))
-                return precision
         return 2  # Default precision
 
     def format_price(self, symbol, price):
         """Format price according to symbol's precision requirements"""
-        precision = self.get_price_precision(symbol)
-        return "{:.{}f}".format(float(price), precision)
+        rules = self.get_symbol_rules(symbol)
+        if rules:
+            return rules.format_price(price)
+        return "{:.{}f}".format(float(price), self.get_price_precision(symbol))
 
     def format_quantity(self, symbol, quantity):
         """Format quantity according to symbol's precision requirements"""
+        rules = self.get_symbol_rules(symbol)
+        if rules:
+            return rules.format_quantity(quantity)
         precision = self.get_quantity_precision(symbol)
         formatted_quantity = "{:.{}f}".format(float(quantity), precision)
         # Remove trailing zeros for integer values
@@ -104,6 +163,17 @@ class BinanceClient:
             return str(int(float(formatted_quantity)))
         return formatted_quantity
 
+    def validate_order(self, symbol, quantity, price):
+        """Check an order against the symbol's filters before sending it
+        
+        Returns:
+            str: Rejection reason, or None if the order passes (or rules are unknown)
+        """
+        rules = self.get_symbol_rules(symbol)
+        if not rules:
+            return None
+        return rules.validate(rules.quantize_price(price), rules.quantize_quantity(quantity))
+
     def get_symbol_price(self, symbol=config.SYMBOL):
         """Get current price of a symbol"""
         try:
@@ -113,33 +183,91 @@ class BinanceClient:
             logger.error(f"Failed to get {symbol} price: {e}")
             return None
 
-    def get_account_balance(self, asset=None):
-        """Get account balance for a specific asset or all assets"""
-        try:
+    def _store_balance_snapshot(self, account):
+        """Store all balances from a get_account response (caller holds the lock or is __init__)"""
+        self._balance_snapshot = {
+            bal['asset']: {
+                'free': float(bal['free']),
+                'locked': float(bal['locked'])
+            }
+            for bal in account['balances']
+        }
+        self._balance_snapshot_time = time.time()
+        self._balance_fetched_at = self._balance_snapshot_time
+
+    def _get_balance_snapshot(self, max_age=None):
+        """Return (balances for all assets, fetch time), fetching the account only when the snapshot is stale"""
+        ttl = self.balance_cache_ttl if max_age is None else max_age
+        with self._balance_lock:
+            age = time.time() - self._balance_snapshot_time
+            if self._balance_snapshot is not None and age < ttl:
+                self.balance_cache_stats['hits'] += 1
+                return self._balance_snapshot, self._balance_fetched_at
+            
+            # Fetch di dalam lock supaya pemanggil bersamaan berbagi satu request
+            self.balance_cache_stats['misses'] += 1
             account = self.client.get_account()
-            balances = account['balances']
+            self._store_balance_snapshot(account)
+            return self._balance_snapshot, self._balance_fetched_at
+
+    def invalidate_balance_cache(self):
+        """Mark the balance snapshot stale (after fills, order placement or cancellation)"""
+        with self._balance_lock:
+            self._balance_snapshot_time = 0
+            self.balance_cache_stats['invalidations'] += 1
+
+    def get_balance_cache_stats(self):
+        """Get hit/miss counters of the balance snapshot cache"""
+        with self._balance_lock:
+            stats = dict(self.balance_cache_stats)
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = (stats['hits'] / lookups * 100) if lookups else 0
+            stats['snapshot_age'] = time.time() - self._balance_snapshot_time if self._balance_snapshot_time else None
+            stats['ttl'] = self.balance_cache_ttl
+            return stats
+
+    def get_account_balance(self, asset=None, max_age=None):
+        """Get account balance for a specific asset or all assets
+        
+        Args:
+            asset (str): Asset to return, or None for all non-zero assets
+            max_age (float): Override the snapshot TTL in seconds (0 forces a fetch)
+        """
+        try:
+            balances, _ = self._get_balance_snapshot(max_age)
             
             if asset:
-                for balance in balances:
-                    if balance['asset'] == asset:
-                        return {
-                            'free': float(balance['free']),
-                            'locked': float(balance['locked'])
-                        }
+                if asset in balances:
+                    return dict(balances[asset])
                 logger.warning(f"Asset {asset} not found in account")
                 return None
             else:
                 return {
-                    bal['asset']: {
-                        'free': float(bal['free']), 
-                        'locked': float(bal['locked'])
-                    } 
-                    for bal in balances if float(bal['free']) > 0 or float(bal['locked']) > 0
+                    name: dict(bal)
+                    for name, bal in balances.items() if bal['free'] > 0 or bal['locked'] > 0
                 }
         except BinanceAPIException as e:
             logger.error(f"Failed to get account balance: {e}")
             return None
 
+    def get_balance_snapshot(self, assets, max_age=None):
+        """Get the balances of several assets from one account snapshot
+        
+        Args:
+            assets (iterable): Assets to return (assets not in the account are left out)
+            max_age (float): Override the snapshot TTL in seconds (0 forces a fetch)
+            
+        Returns:
+            tuple: (dict asset -> balance, epoch seconds the snapshot was fetched),
+                   or (None, None) if the account could not be fetched
+        """
+        try:
+            balances, fetched_at = self._get_balance_snapshot(max_age)
+            return {asset: dict(balances[asset]) for asset in assets if asset in balances}, fetched_at
+        except BinanceAPIException as e:
+            logger.error(f"Failed to get account balance: {e}")
+            return None, None
+
     def place_limit_order(self, symbol, side, quantity, price):
         """Place a limit order"""
         # Format price to match symbol's precision requirements
@@ -148,6 +276,12 @@ class BinanceClient:
         # Format quantity to match symbol's precision requirements (NEW)
         formatted_quantity = self.format_quantity(symbol, quantity)
         
+        # Tolak order yang pasti ditolak exchange (LOT_SIZE/MIN_NOTIONAL) tanpa round trip
+        rejection = self.validate_order(symbol, formatted_quantity, formatted_price)
+        if rejection:
+            logger.error(f"Order {side} {formatted_quantity} {symbol} at {formatted_price} rejected locally: {rejection}")
+            return None
+        
         try:
             order = self.client.create_order(
                 symbol=symbol,
@@ -158,6 +292,7 @@ class BinanceClient:
                 price=formatted_price
             )
             logger.info(f"Placed {side} order for {formatted_quantity} {symbol} at {formatted_price}")
+            self.invalidate_balance_cache()
             return order
         except BinanceAPIException as e:
             if "Account has insufficient balance" in str(e):
@@ -176,53 +311,91 @@ class BinanceClient:
             logger.error(f"Failed to get open orders: {e}")
             return None
 
+    def get_request_metrics(self):
+        """Per-endpoint latency histograms, error counts and used request weight"""
+        metrics = get_request_metrics().get_snapshot()
+        metrics['balance_cache'] = self.get_balance_cache_stats()
+        metrics['fill_resolver'] = self.fill_resolver.get_stats()
+        metrics['fx_rate'] = get_rate_provider().get_stats()
+        metrics['rate_limit'] = self.get_rate_budget()
+        return metrics
+
+    def get_rate_budget(self):
+        """Current request weight budget (see RateLimitGovernor.get_budget)"""
+        return get_rate_governor().get_budget()
+
     def get_usdt_idr_rate(self):
-        """Mendapatkan harga USDT/IDR dari API publik untuk memastikan data realtime"""
-        try:
-            # Coba dapatkan dari API Indodax (Bursa crypto Indonesia)
-            # API Indodax untuk USDT/IDR
-            response = requests.get('https://indodax.com/api/ticker/usdtidr', timeout=5)
-            
-            if response.status_code == 200:
-                data = response.json()
-                # Ambil harga terakhir (last) dari ticker
-                if 'ticker' in data and 'last' in data['ticker']:
-                    usdt_idr_rate = float(data['ticker']['last'])
-                    logger.info(f"Realtime USDT/IDR dari Indodax: {usdt_idr_rate}")
-                    return usdt_idr_rate
-            
-            # Fallback ke Binance P2P rate (estimasi)
-            # Coba dapatkan dari API lain
-            response = requests.get('https://api.binance.com/api/v3/ticker/price?symbol=USDTBIDR', timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                if 'price' in data:
-                    # BIDR digunakan sebagai proxy untuk IDR di Binance (1000 BIDR = 1000 IDR)
-                    usdt_bidr_rate = float(data['price'])
-                    logger.info(f"Realtime USDT/BIDR dari Binance: {usdt_bidr_rate}")
-                    return usdt_bidr_rate
-                    
-            # Fallback ke nilai yang lebih akurat berdasarkan kurs pasar terkini
-            return 16350.0  # Update dari nilai statis 15700 ke nilai yang lebih akurat per Mei 2025
-            
-        except Exception as e:
-            # Log error hanya sekali setiap jam untuk menghindari spam log
-            current_time = int(time.time())
-            if not hasattr(self, 'last_idr_error_time') or current_time - self.last_idr_error_time > 3600:
-                logger.warning(f"Gagal mendapatkan harga USDT/IDR realtime: {e}")
-                self.last_idr_error_time = current_time
-            return 16350.0  # Nilai fallback yang lebih akurat
+        """Mendapatkan harga USDT/IDR terakhir (di-refresh di background, tidak pernah blocking)"""
+        return get_rate_provider().get_rate()
 
     def cancel_order(self, order_id, symbol=config.SYMBOL):
         """Cancel an order by its ID"""
         try:
             result = self.client.cancel_order(symbol=symbol, orderId=order_id)
             logger.info(f"Cancelled order {order_id} for {symbol}")
+            self.invalidate_balance_cache()
             return result
         except BinanceAPIException as e:
             logger.error(f"Failed to cancel order {order_id}: {e}")
             return None
 
+    def cancel_all_orders(self, symbol=config.SYMBOL):
+        """Cancel every open order of a symbol with a single request
+        
+        Falls back to cancelling order by order when the bulk request fails,
+        including on network errors, so an emergency exit still gets to its
+        market sell.
+        
+        Args:
+            symbol (str): Symbol whose open orders are cancelled
+            
+        Returns:
+            dict: 'cancelled' (order IDs), 'failed' (order IDs) and
+                  'method' ('bulk', 'per_order' or 'none' if nothing was open)
+        """
+        result = {'cancelled': [], 'failed': [], 'method': 'bulk'}
+        try:
+            # DELETE /api/v3/openOrders - satu round trip berapapun jumlah order
+            response = self.client.cancel_all_open_orders(symbol=symbol)
+            for entry in response:
+                # Order OCO dilaporkan sebagai satu entry dengan orderReports
+                for report in entry.get('orderReports', [entry]):
+                    result['cancelled'].append(report['orderId'])
+            logger.info(f"Cancelled {len(result['cancelled'])} open orders for {symbol} in one request")
+            self.invalidate_balance_cache()
+            return result
+        except BinanceAPIException as e:
+            if e.code == -2011:
+                # Unknown order sent: tidak ada order terbuka
+                result['method'] = 'none'
+                return result
+            logger.warning(f"Bulk cancel failed for {symbol}, falling back to per-order cancel: {e}")
+        except requests.RequestException as e:
+            # Timeout atau koneksi putus: status bulk cancel tidak diketahui, cek order satu per satu
+            logger.warning(f"Bulk cancel request for {symbol} failed, falling back to per-order cancel: {e}")
+        
+        result['method'] = 'per_order'
+        try:
+            open_orders = self.get_open_orders(symbol)
+        except requests.RequestException as e:
+            logger.error(f"Failed to get open orders for per-order cancel: {e}")
+            return result
+        if not open_orders:
+            if open_orders is not None:
+                result['method'] = 'none'
+            return result
+        for order in open_orders:
+            try:
+                cancelled = self.cancel_order(order['orderId'], symbol)
+            except requests.RequestException as e:
+                logger.error(f"Failed to cancel order {order['orderId']}: {e}")
+                cancelled = None
+            if cancelled:
+                result['cancelled'].append(order['orderId'])
+            else:
+                result['failed'].append(order['orderId'])
+        return result
+
     def get_order_status(self, order_id, symbol=config.SYMBOL):
         """Get detailed information about an order including fees
         
@@ -238,29 +411,26 @@ class BinanceClient:
             
             # For filled orders, try to get more details including fee information
             if order['status'] == 'FILLED':
-                # Get trades for this order to extract fee information
-                trades = self.client.get_my_trades(symbol=symbol)
-                
-                # Filter trades for this specific order
-                order_trades = [trade for trade in trades if trade['orderId'] == order_id]
+                # Trades di-query per order dan di-cache, bukan seluruh riwayat akun
+                fills = self.fill_resolver.get_fills(symbol, order_id, order.get('executedQty'))
                 
                 # If we found trades, add the fills information
-                if order_trades:
-                    fills = []
-                    for trade in order_trades:
-                        fill = {
-                            'price': trade['price'],
-                            'qty': trade['qty'],
-                            'commission': trade['commission'],
-                            'commissionAsset': trade['commissionAsset'],
-                            'tradeId': trade['id']
-                        }
-                        fills.append(fill)
-                    
-                    # Add fills to order data
+                if fills:
                     order['fills'] = fills
             
             return order
         except BinanceAPIException as e:
             logger.error(f"Failed to get order status for {order_id}: {e}")
-            return None 
\ No newline at end of file
+            return None
+
+    def prefetch_order_fills(self, order_ids, symbol=config.SYMBOL):
+        """Index fills for several filled orders in one batched trade lookup
+        
+        Call before get_order_status on a batch of fills so their fee lookups
+        are served from the local index instead of one query per order.
+        """
+        try:
+            return self.fill_resolver.prefetch(symbol, order_ids)
+        except Exception as e:
+            logger.warning(f"Failed to prefetch fills: {e}")
+            return 0 
\ No newline at end of file
@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class BotSnapshot:
+    """
+    Immutable view of a running bot, published by the bot and served by the dashboard.
+
+    Everything the dashboard shows (price, price history, grid, balances, open
+    grid orders, profit, trades) is copied at publish time, so reading a
+    snapshot never touches the exchange or the bot's live objects. Attributes
+    cannot be reassigned; trades and balances are private copies and
+    price_history is a read-only PriceRing.
+    """
+
+    __slots__ = ('version', 'published_at', 'symbol', 'status', 'last_price', 'price_history',
+                 'upper_price', 'lower_price', 'grid_number', 'quantity', 'grid_levels',
+                 'quote_asset', 'base_asset', 'balances', 'balances_updated_at', 'usdt_idr_rate',
+                 'buy_orders', 'sell_orders', 'total_profit', 'trades')
+
+    def __init__(self, **fields):
+        unknown = set(fields) - set(self.__slots__)
+        if unknown:
+            raise TypeError(f"Unknown snapshot fields: {', '.join(sorted(unknown))}")
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("BotSnapshot is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("BotSnapshot is immutable")
+
+    def __repr__(self):
+        return f"BotSnapshot(version={self.version}, symbol={self.symbol}, last_price={self.last_price})"
+
+    def balance(self, asset):
+        """{'free', 'locked'} of an asset, zeros when unknown"""
+        return dict(self.balances.get(asset) or {'free': 0.0, 'locked': 0.0})
+
+    def orders(self):
+        """Open grid orders in the /api/orders format"""
+        return [
+            {'orderId': order_id, 'side': side, 'price': price, 'origQty': self.quantity, 'status': 'NEW'}
+            for side, orders in (('BUY', self.buy_orders), ('SELL', self.sell_orders))
+            for price, order_id in orders
+        ]
+
+    def age(self):
+        """Seconds since the snapshot was published"""
+        return time.time() - self.published_at
+
+def freeze_trades(trades, previous=()):
+    """
+    Tuple of private copies of the trade dicts, reusing the copies of a previous snapshot
+
+    Trades are append-only, so only the ones added since the previous
+    snapshot are copied; if the history was replaced, everything is copied.
+
+    Args:
+        trades (list): Live trade history of the bot
+        previous (tuple): Trades of the previous snapshot
+    """
+    kept = len(previous)
+    if kept > len(trades) or (kept and previous[-1] != trades[kept - 1]):
+        kept, previous = 0, ()
+    return previous + tuple(dict(trade) for trade in trades[kept:])
+
+class SnapshotStore:
+    """Holds the latest BotSnapshot; publishing swaps the reference, readers never block the bot"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current = None
+        self._version = 0
+
+    def publish(self, **fields):
+        """
+        Publish a new snapshot with the next version number
+
+        Returns:
+            BotSnapshot: The published snapshot
+        """
+        with self._lock:
+            self._version += 1
+            snapshot = BotSnapshot(version=self._version, published_at=time.time(), **fields)
+            self._current = snapshot
+        return snapshot
+
+    def get(self):
+        """Latest snapshot, None when no bot is publishing"""
+        return self._current
+
+    def clear(self):
+        """Withdraw the current snapshot (bot stopped); the version keeps counting"""
+        with self._lock:
+            self._current = None
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_snapshot_store():
+    """Shared snapshot store of this process"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SnapshotStore()
+        return _store
+
+def get_snapshot():
+    """
+    Latest bot snapshot: published in this process, otherwise read from the
+    state bus of a bot running in another process (e.g. under gunicorn)
+
+    Returns:
+        BotSnapshot: Snapshot, None when no bot is running
+    """
+    snapshot = get_snapshot_store().get()
+    if snapshot is None and getattr(config, 'STATE_BUS_ENABLED', True):
+        from state_bus import get_state_bus_reader
+        snapshot = get_state_bus_reader().read()
+    return snapshot
@@ -8,6 +8,7 @@ load_dotenv()
 API_KEY = os.getenv('API_KEY')
 API_SECRET = os.getenv('API_SECRET')
 TESTNET = os.getenv('BINANCE_TESTNET', 'True').lower() in ('true', 'yes', '1')
+BINANCE_API_URL = os.getenv('BINANCE_API_URL', '')  # Kosong = Binance/testnet; mis. http://127.0.0.1:9000/api untuk mock_exchange.py
 
 # Grid trading parameters - Dioptimalkan berdasarkan modal dan kondisi pasar terbaru
 SYMBOL = 'ADAUSDT'      # Trading pair
@@ -30,6 +31,70 @@ MIN_NOTIONAL = 10.0     # Minimal order value dalam USDT (untuk ADAUSDT sebaikny
 MAX_INVESTMENT = 180    # Berdasarkan total modal ~237 USDT, dengan buffer untuk fluktuasi
 STOP_LOSS_PERCENTAGE = 2.0 # Sedikit ditingkatkan untuk memberi ruang fluktuasi harga
 
+# Fill detection
+# 'binance' = websocket user data stream, 'tcp://host:port' = local stand-in server, 'off' = polling saja
+USER_DATA_STREAM = os.getenv('USER_DATA_STREAM', 'binance')
+POLL_INTERVAL = 10        # Detik antar update harga (dan lama menunggu fill event)
+RECONCILE_INTERVAL = 120  # Detik antar rekonsiliasi get_open_orders selama stream aktif
+
+# Balance snapshot cache - semua aset dilayani dari satu panggilan get_account
+BALANCE_CACHE_TTL = 5     # Detik; 0 = selalu ambil dari API
+SNAPSHOT_BALANCE_MAX_AGE = 60  # Detik; umur maksimal saldo di snapshot dashboard (fill selalu memicu refresh)
+
+# Kurs USDT/IDR (di-refresh di background)
+FX_RATE_TTL = 60          # Detik sebelum kurs dianggap basi dan di-refresh
+FX_FALLBACK_RATE = 16350.0  # Dipakai sampai fetch pertama berhasil
+
+# Rate limit governor (request weight Binance)
+RATE_LIMIT_WEIGHT_1M = 1200   # Weight per menit yang boleh dipakai bot
+RATE_LIMIT_ORDERS_10S = 50    # Order per 10 detik
+RATE_LIMIT_RESERVE = 0.2      # Porsi budget yang disisakan untuk place/cancel order
+ORDER_PLACEMENT_WORKERS = 5   # Order grid yang dikirim bersamaan saat setup
+GRID_RECENTER_MAX_SPACING_DRIFT = 0.25  # Selisih spasi grid maksimum untuk re-center bertahap (selebihnya rebuild penuh)
+GRID_ADJUST_INTERVAL = 900     # Detik antar pengecekan posisi grid terhadap harga (adjust_grid), 0 = tidak pernah
+GRID_RECENTER_MARGIN = 0.02    # Lebar grid baru di tiap sisi harga saat grid di-re-center
+
+# Penyimpanan state (journal append-only + snapshot berkala)
+STATE_FSYNC_POLICY = 'interval'  # 'always', 'interval' atau 'never'
+STATE_FSYNC_INTERVAL = 1.0       # Detik antar fsync untuk policy 'interval'
+STATE_SNAPSHOT_EVERY = 500       # Jumlah record journal sebelum snapshot dipadatkan
+PROCESSED_FILLS_KEPT = 5000      # Order ID fill terproses yang diingat untuk exactly-once
+
+# Penulisan data analytics di background
+ANALYTICS_FLUSH_INTERVAL = 5     # Detik antar penulisan batch ke file
+ANALYTICS_QUEUE_SIZE = 10000     # Maksimum event dalam antrian sebelum dibuang
+ANALYTICS_BACKEND = 'sqlite'     # 'sqlite' (database terindeks) atau 'json' (file JSON/CSV lama)
+ANALYTICS_DB_FILE = 'analytics.db'  # Nama file database di dalam trading_logs
+ANALYTICS_PRICE_HISTORY_SIZE = 10000  # Sampel harga yang disimpan di memori oleh analytics
+
+# Ring buffer price history bot dan dashboard
+PRICE_HISTORY_SIZE = 1000
+
+# State bus: snapshot bot di memory-mapped file, dibaca worker gunicorn tanpa parsing file state/log
+STATE_BUS_ENABLED = True
+STATE_BUS_FILE = ''             # Default state_bus_<SYMBOL>.mmap di folder kerja
+STATE_BUS_SIZE = 4 * 1024 * 1024  # Ukuran awal file dalam byte; membesar otomatis
+STATE_BUS_MAX_AGE = 120         # Detik; snapshot lebih tua dianggap bot tidak berjalan
+
+# Server-Sent Events dashboard (/stream)
+SSE_QUEUE_SIZE = 50          # Pesan per klien sebelum yang tertua dibuang
+SSE_HEARTBEAT_INTERVAL = 15  # Detik tanpa pesan sebelum heartbeat dikirim
+
+# Index trade dari bot.log untuk dashboard (trading_logs/<nama>.json + .jsonl)
+LOG_TRADE_INDEX_FILE = 'log_trade_index'
+
+# Backtest (python backtest.py)
+BACKTEST_MAKER_FEE = 0.001  # Fee order limit yang menunggu di order book
+BACKTEST_TAKER_FEE = 0.001  # Fee order market / limit yang langsung match
+SWEEP_RESULTS_FILE = 'trading_logs/param_sweep.json'  # Hasil param_sweep.py, dipakai auto-config jika ada
+
+# Mock exchange (python mock_exchange.py)
+MOCK_EXCHANGE_PORT = 9000      # Port HTTP mock exchange
+MOCK_SPEED = 60                # Detik simulasi per detik nyata
+MOCK_LATENCY_MS = 0            # Latency tambahan per request
+MOCK_LATENCY_JITTER_MS = 0     # Variasi latency (+/-)
+MOCK_ERROR_RATE = 0.0          # Porsi request yang gagal dengan error acak (0-1)
+
 # Dashboard settings
 DASHBOARD_USERNAME = os.getenv('DASHBOARD_USERNAME', 'admin')
 DASHBOARD_PASSWORD = os.getenv('DASHBOARD_PASSWORD', 'Grid@Trading123')
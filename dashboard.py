@@ -15,8 +15,15 @@ import secrets
 from functools import wraps
 import config
 import random
+from rate_limiter import request_priority, PRIORITY_LOW
+from state_journal import load_state
+from analytics_db import SqliteAnalyticsStore
+from price_ring import PriceRing
+from bot_snapshot import get_snapshot
+from log_tail import get_log_trade_index
+from sse_broker import SSEBroker
+from stream_delta import StreamDeltaEncoder
 import psutil
-import re
 
 # Konfigurasi security
 DASHBOARD_USERNAME = os.getenv('DASHBOARD_USERNAME', 'admin')
@@ -40,7 +47,7 @@ logger = logging.getLogger(__name__)
 # Data global untuk dashboard
 bot_status = "Tidak Aktif"
 latest_price = None
-price_history = []
+price_history = PriceRing(getattr(config, 'PRICE_HISTORY_SIZE', 1000))  # Ring buffer milik dashboard atau bot aktif
 bot_profit = 0
 trades_history = []
 grid_levels = []
@@ -67,8 +74,20 @@ data_lock = Lock()
 # Cek jika SSE dinonaktifkan
 SSE_DISABLED = os.getenv('DISABLE_SSE', 'false').lower() == 'true'
 
-# SSE clients
-sse_clients = [] if not SSE_DISABLED else None  # Gunakan None jika SSE dinonaktifkan
+# Protokol delta /stream: snapshot lengkap saat connect, lalu hanya perubahan
+stream_encoder = StreamDeltaEncoder(price_window=100, trade_window=10)
+_stream_key = None  # Ringkasan state terakhir yang diberikan ke encoder
+_stream_lock = Lock()  # Urutan update encoder, publish dan subscribe; satu thread membangun state
+_update_thread_pid = None  # Proses yang sudah menjalankan update_data_thread
+_update_thread_lock = Lock()
+
+# SSE broker (antrian per klien, serialisasi sekali per broadcast)
+sse_broker = SSEBroker(resync=stream_encoder.snapshot_message) if not SSE_DISABLED else None  # Gunakan None jika SSE dinonaktifkan
+
+def price_series(n=100):
+    """Waktu (datetime) dan harga dari n sampel terakhir price history, untuk grafik"""
+    data = price_history.copy(n)
+    return [datetime.datetime.fromtimestamp(ts) for ts in data[0]], data[1]
 
 # Helper function for emoji handling
 def safe_emoji(text):
@@ -141,20 +160,29 @@ def price_chart():
     # Refresh data to ensure we have the latest
     load_bot_data()
     
+    # Tanpa bot aktif, ambil 100 harga terakhir dari database analytics
+    if not price_history:
+        db = get_analytics_db()
+        if db is not None:
+            try:
+                history = PriceRing(100)
+                history.extend(p for p in db.get_prices(limit=100, newest=True) if p.get('price') is not None)
+                price_history = history
+            except Exception as e:
+                logger.error(f"Error reading price history from analytics database: {e}")
+    
     # Jika tidak ada data price history, buat data dummy
     if not price_history and latest_price is not None:
         # Create dummy data point based on latest price
         now = datetime.datetime.now()
         five_min_ago = now - datetime.timedelta(minutes=5)
-        price_history = [
-            {"time": five_min_ago.strftime("%Y-%m-%d %H:%M:%S"), "price": latest_price},
-            {"time": now.strftime("%Y-%m-%d %H:%M:%S"), "price": latest_price}
-        ]
+        price_history = PriceRing(getattr(config, 'PRICE_HISTORY_SIZE', 1000))
+        price_history.append(latest_price, ts=five_min_ago)
+        price_history.append(latest_price, ts=now)
     
     if price_history:
         # Limited to last 100 data points to improve performance
-        timestamps = [entry['time'] for entry in price_history[-100:]]
-        prices = [entry['price'] for entry in price_history[-100:]]
+        timestamps, prices = price_series(100)
         
         fig = go.Figure()
         fig.add_trace(go.Scatter(x=timestamps, y=prices, mode='lines', name='Harga ADA'))
@@ -213,38 +241,35 @@ def get_trades():
     try:
         trades_data = []
         
-        # Coba dapatkan dari instance bot aktif
-        try:
-            from grid_bot import GridTradingBot
-            if hasattr(GridTradingBot, 'instance') and GridTradingBot.instance is not None:
-                bot = GridTradingBot.instance
-                if hasattr(bot, 'trades'):
-                    trades_data = bot.trades
-        except Exception as e:
-            logger.error(f"Error getting trades from bot instance: {e}")
+        # Snapshot yang diterbitkan bot aktif
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            trades_data = snapshot.trades
         
-        # Jika tidak dapat dari instance bot, coba load dari file state
-        if not trades_data:
+        # Jika tidak ada bot aktif, coba load dari file state
+        if snapshot is None and not trades_data:
             state_files = [f for f in os.listdir(".") if f.startswith("grid_state_") and f.endswith(".json")]
             if state_files:
                 latest_state_file = state_files[0]
                 try:
-                    with open(latest_state_file, "r") as f:
-                        state = json.load(f)
-                        trades_data = state.get("trades", [])
-                        logger.info(f"Loaded {len(trades_data)} trades from state file {latest_state_file}")
+                    # Snapshot + journal tail
+                    state = load_state(latest_state_file)
+                    trades_data = state.get("trades", [])
+                    logger.info(f"Loaded {len(trades_data)} trades from state file {latest_state_file}")
                 except Exception as e:
                     logger.error(f"Error reading trades from state file: {e}")
         
         # Jika masih belum ada data, coba parse dari log
-        if not trades_data:
+        if snapshot is None and not trades_data:
             try:
                 trades_data = parse_trades_from_log()
             except Exception as e:
                 logger.error(f"Error parsing trades from log: {e}")
         
-        # Normalisasi format data perdagangan
+        # Normalisasi format data perdagangan (salinan, trade snapshot tidak diubah)
+        normalized = []
         for trade in trades_data:
+            trade = dict(trade)
             # Pastikan semua trade memiliki field 'side' untuk dashboard baru
             if 'side' not in trade and 'type' in trade:
                 trade['side'] = trade['type']
@@ -268,79 +293,20 @@ def get_trades():
                 trade['profit'] = trade['actual_profit']
             elif 'profit' not in trade and 'potential_profit' in trade:
                 trade['profit'] = trade['potential_profit']
+            normalized.append(trade)
             
-        return jsonify({"status": "success", "trades": trades_data})
+        return jsonify({"status": "success", "trades": normalized})
     except Exception as e:
         logger.error(f"Error in trades API: {e}")
         return jsonify({"status": "error", "trades": [], "message": str(e)})
 
 def parse_trades_from_log():
-    """Parse riwayat transaksi dari file log"""
-    trades = []
+    """Riwayat transaksi dari bot.log (index inkremental: hanya byte yang baru ditulis yang di-parse)"""
     try:
-        with open("bot.log", "r", encoding="utf-8") as log_file:
-            lines = log_file.readlines()
-            
-            for line in lines:
-                # Cari baris log yang berisi informasi transaksi
-                if "TRADE FILLED" in line or "Order filled" in line or "Buy order at" in line or "Sell order at" in line:
-                    try:
-                        # Contoh format: "BUY order filled at 0.7850"
-                        parts = line.split(" - ")
-                        if len(parts) >= 2:
-                            timestamp = parts[0].strip()
-                            message = parts[1]
-                            
-                            # Ekstrak informasi
-                            if "BUY" in message or "Buy order at" in message:
-                                type_order = "BUY"
-                            elif "SELL" in message or "Sell order at" in message:
-                                type_order = "SELL"
-                            else:
-                                continue
-                            
-                            # Coba ekstrak harga
-                            price_match = re.search(r'at\s+(\d+\.\d+)', message)
-                            if not price_match:
-                                price_match = re.search(r'order at (\d+\.\d+)', message)
-                            
-                            if price_match:
-                                price = float(price_match.group(1))
-                            else:
-                                continue
-                            
-                            # Parse quantity (jumlah)
-                            # Contoh: "Order filled: BUY 13.0 ADA at 0.7850"
-                            qty_match = re.search(r'(\d+\.?\d*)\s+ADA', message)
-                            quantity = float(qty_match.group(1)) if qty_match else config.QUANTITY
-                            
-                            # Coba ekstrak profit jika ada
-                            profit_match = re.search(r'Profit:\s+(\-?\d+\.?\d*)', message)
-                            if not profit_match:
-                                profit_match = re.search(r'profit:\s+(\-?\d+\.?\d*)', message)
-                            
-                            profit = float(profit_match.group(1)) if profit_match else 0.0
-                            
-                            # Nilai transaksi
-                            value = price * quantity
-                            
-                            trade = {
-                                "time": timestamp,
-                                "side": type_order,
-                                "type": type_order,  # Untuk kompatibilitas dengan format lama
-                                "price": price,
-                                "quantity": quantity,
-                                "value": value,
-                                "profit": profit
-                            }
-                            trades.append(trade)
-                    except Exception as e:
-                        logger.debug(f"Failed to parse trade from log line: {e}")
-    
+        return get_log_trade_index("bot.log").trades()
     except Exception as e:
         logger.error(f"Error reading log file for trades: {e}")
-    
-    return trades
+        return []
 
 @app.route('/api/status')
 # @login_required (dinonaktifkan)
@@ -377,16 +343,13 @@ def get_status():
         "quantity": config.QUANTITY
     }
     
-    # Coba dapatkan data grid dari instance bot
-    try:
-        from grid_bot import GridTradingBot
-        if GridTradingBot.instance:
-            grid_info["upper_price"] = GridTradingBot.instance.upper_price
-            grid_info["lower_price"] = GridTradingBot.instance.lower_price
-            grid_info["grid_number"] = GridTradingBot.instance.grid_number
-            grid_info["quantity"] = GridTradingBot.instance.quantity
-    except Exception as e:
-        logger.warning(f"Failed to get grid info from bot instance: {e}")
+    # Data grid dari snapshot bot aktif
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        grid_info["upper_price"] = snapshot.upper_price
+        grid_info["lower_price"] = snapshot.lower_price
+        grid_info["grid_number"] = snapshot.grid_number
+        grid_info["quantity"] = snapshot.quantity
     
     # Jika data grid masih kosong, ambil dari konfigurasi
     if grid_info["upper_price"] is None:
@@ -411,7 +374,8 @@ def get_status():
             "total_idr_value": total_idr_value,
             "last_update": balance_info["last_update"]
         },
-        "price_history": price_history[-100:] if price_history else []
+        "price_history": price_history.to_records(100),
+        "price_stats": price_history.stats(100)
     }
     return jsonify(status_data)
 
@@ -420,50 +384,26 @@ def get_status():
 def stream():
     """Server-Sent Events endpoint untuk update realtime"""
     # Return empty response if SSE is disabled
-    if SSE_DISABLED:
+    if SSE_DISABLED or sse_broker is None:
         return Response("SSE disabled", status=503)
         
-    def event_stream():
-        client_id = str(uuid.uuid4())
-        client = {'id': client_id, 'queue': [], 'request_context': request}
-        
-        with data_lock:
-            sse_clients.append(client)
-        
-        try:
-            # Send initial data
-            initial_data = get_initial_data()
-            if initial_data:
-                yield f"data: {json.dumps(initial_data)}\n\n"
-            
-            while True:
-                # Check message queue
-                with data_lock:
-                    if client['queue']:
-                        while client['queue']:
-                            yield client['queue'].pop(0)
-                
-                # Heartbeat to keep connection alive
-                yield f": heartbeat\n\n"
-                
-                # Sleep to reduce CPU usage
-                time.sleep(1)
-                
-        except Exception as e:
-            logger.error(f"SSE error: {e}")
-        finally:
-            with data_lock:
-                if client in sse_clients:
-                    sse_clients.remove(client)
-                    logger.info(f"Removed SSE client {client_id}")
+    # Worker gunicorn tidak menjalankan run_dashboard: mulai thread update di proses ini
+    start_update_thread()
+    
+    # Klien baru langsung mendapat snapshot lengkap dari data terbaru, lalu hanya delta berikutnya
+    with data_lock:
+        load_bot_data()
+    with _stream_lock:
+        refresh_stream()
+        client = sse_broker.subscribe(stream_encoder.snapshot_message())
     
-    response = Response(event_stream(), mimetype="text/event-stream")
+    response = Response(sse_broker.stream(client), mimetype="text/event-stream")
     response.headers['Cache-Control'] = 'no-cache'
     response.headers['X-Accel-Buffering'] = 'no'  # For NGINX
     return response
 
 def get_initial_data():
-    """Dapatkan data awal untuk stream"""
+    """State lengkap untuk stream; grafik digambar di browser dari titik harga"""
     global latest_price, usdt_idr_rate, balance_info
     
     # Pastikan selalu ada nilai harga
@@ -483,44 +423,19 @@ def get_initial_data():
     total_usdt_value = total_usdt + (total_ada * latest_price)
     total_idr_value = total_usdt_value * usdt_idr_rate
     
-    # Dapatkan data grafik
-    chart_data = None
-    if price_history:
-        timestamps = [entry['time'] for entry in price_history[-100:]]
-        prices = [entry['price'] for entry in price_history[-100:]]
-        
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x=timestamps, y=prices, mode='lines', name='Harga ADA'))
-        
-        # Tambahkan garis grid jika tersedia
-        if grid_levels:
-            for level in grid_levels:
-                fig.add_shape(
-                    type="line",
-                    x0=timestamps[0] if timestamps else 0,
-                    y0=level,
-                    x1=timestamps[-1] if timestamps else 1,
-                    y1=level,
-                    line=dict(color="Red", width=1, dash="dash"),
-                )
-        
-        fig.update_layout(
-            title='Pergerakan Harga ADA',
-            xaxis_title='Waktu',
-            yaxis_title='Harga (USDT)',
-            template='plotly_dark'
-        )
-        
-        chart_data = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    # Titik grafik [timestamp, harga] dari 100 sampel terakhir
+    data = price_history.copy(100)
+    prices = [[ts, price] for ts, price in zip(data[0].tolist(), data[1].tolist())]
     
     # Siapkan data untuk dikirim
     return {
         "status": safe_emoji(bot_status),
         "latest_price": latest_price,
         "profit": bot_profit,
-        "chart": chart_data,
-        "trades": trades_history[-10:] if trades_history else [],
-        "grid_levels": grid_levels,
+        "prices": prices,
+        "trades": list(trades_history[-10:]) if trades_history else [],
+        "trade_count": len(trades_history) if trades_history else 0,
+        "grid_levels": list(grid_levels or []),
         "usdt_idr_rate": usdt_idr_rate,
         "ada_idr_value": ada_idr_value,
         "balance": {
@@ -534,89 +449,77 @@ def get_initial_data():
         }
     }
 
+def _broadcast_key():
+    """Ringkasan murah dari semua data yang dikirim get_initial_data (tanpa timestamp saldo)"""
+    last_trade = trades_history[-1] if trades_history else None
+    return (
+        bot_status, latest_price, bot_profit, usdt_idr_rate,
+        len(trades_history), json.dumps(last_trade, sort_keys=True, default=str),
+        tuple(grid_levels or ()),
+        balance_info["usdt_free"], balance_info["usdt_locked"],
+        balance_info["ada_free"], balance_info["ada_locked"],
+        len(price_history), price_history.last_time()
+    )
+
+def refresh_stream():
+    """
+    Berikan state terbaru ke encoder stream jika data berubah dan kirim deltanya
+    ke klien yang terhubung (caller memegang _stream_lock)
+    """
+    global _stream_key
+    if _stream_key is not None and _stream_key == _broadcast_key():
+        return
+    state = get_initial_data()
+    # Ringkasan diambil sesudah get_initial_data (yang bisa mengisi harga/kurs fallback)
+    _stream_key = _broadcast_key()
+    message = stream_encoder.update(state)
+    # Delta harus sampai ke semua klien, termasuk saat dipicu oleh klien yang baru connect
+    if message is not None and sse_broker is not None:
+        sse_broker.publish(message)
+
 def broadcast_update():
-    """Broadcast update ke semua klien SSE"""
-    # Skip if SSE is disabled
-    if SSE_DISABLED or not sse_clients:
+    """Broadcast update ke semua klien SSE, hanya jika data berubah sejak broadcast terakhir"""
+    # Skip if SSE is disabled or nobody is listening
+    if sse_broker is None or not sse_broker.client_count():
         return
         
     try:
-        # Get current data
-        data = get_initial_data()
-        if not data:
-            return
-            
-        # Create SSE message
-        message = f"data: {json.dumps(data)}\n\n"
-        
-        # Send to all clients
-        with data_lock:
-            for client in list(sse_clients):
-                try:
-                    client['queue'].append(message)
-                except Exception as e:
-                    logger.error(f"Error queuing message: {e}")
-                    if client in sse_clients:
-                        sse_clients.remove(client)
+        # Serialisasi sekali, string delta yang sama masuk ke antrian semua klien
+        with _stream_lock:
+            refresh_stream()
     except Exception as e:
         logger.error(f"Error in broadcast_update: {e}")
 
 def load_bot_data():
-    """Load data dari file state bot"""
+    """Load data dari snapshot bot aktif, atau dari file state bot jika bot tidak berjalan di proses ini"""
     global bot_status, latest_price, bot_profit, trades_history, grid_levels, price_history, usdt_idr_rate, balance_info
     
     try:
         # Check if bot process is running
         bot_is_running = False
         
-        try:
-            from grid_bot import GridTradingBot
-            if hasattr(GridTradingBot, 'instance') and GridTradingBot.instance:
-                bot_is_running = True
-                bot_status = "Aktif"
-                
-                # Get data directly from bot instance
-                if hasattr(GridTradingBot.instance, 'last_price'):
-                    latest_price = GridTradingBot.instance.last_price
-                
-                if hasattr(GridTradingBot.instance, 'total_profit'):
-                    bot_profit = GridTradingBot.instance.total_profit
-                
-                if hasattr(GridTradingBot.instance, 'trades'):
-                    trades_history = GridTradingBot.instance.trades
-                
-                if hasattr(GridTradingBot.instance, 'grid_prices'):
-                    grid_levels = GridTradingBot.instance.grid_prices.tolist()
-                
-                if hasattr(GridTradingBot.instance, 'price_history'):
-                    price_history = GridTradingBot.instance.price_history
-                
-                # Get balance info
-                try:
-                    # Coba dapatkan saldo langsung dari client
-                    if hasattr(GridTradingBot.instance, 'client'):
-                        quote_asset = 'USDT'
-                        base_asset = 'ADA'
-                        
-                        usdt_balance = GridTradingBot.instance.client.get_account_balance(quote_asset)
-                        ada_balance = GridTradingBot.instance.client.get_account_balance(base_asset)
-                        
-                        if usdt_balance:
-                            balance_info["usdt_free"] = usdt_balance['free']
-                            balance_info["usdt_locked"] = usdt_balance['locked']
-                        
-                        if ada_balance:
-                            balance_info["ada_free"] = ada_balance['free']
-                            balance_info["ada_locked"] = ada_balance['locked']
-                        
-                        balance_info["last_update"] = datetime.datetime.now().isoformat()
-                        
-                        # Dapatkan kurs USDT/IDR
-                        usdt_idr_rate = GridTradingBot.instance.client.get_usdt_idr_rate()
-                except Exception as e:
-                    logger.warning(f"Failed to get balance info from bot instance: {e}")
-        except Exception as e:
-            logger.warning(f"Failed to get data from bot instance: {e}")
+        # Bot di proses ini menerbitkan snapshot; dashboard tidak pernah memanggil exchange
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            bot_is_running = True
+            bot_status = snapshot.status
+            latest_price = snapshot.last_price
+            bot_profit = snapshot.total_profit
+            trades_history = snapshot.trades
+            grid_levels = list(snapshot.grid_levels)
+            price_history = snapshot.price_history
+            
+            quote_balance = snapshot.balance(snapshot.quote_asset)
+            base_balance = snapshot.balance(snapshot.base_asset)
+            balance_info = {
+                "usdt_free": quote_balance['free'],
+                "usdt_locked": quote_balance['locked'],
+                "ada_free": base_balance['free'],
+                "ada_locked": base_balance['locked'],
+                "last_update": snapshot.balances_updated_at
+            }
+            if snapshot.usdt_idr_rate is not None:
+                usdt_idr_rate = snapshot.usdt_idr_rate
         
         # If bot is not running, load data from state file
         if not bot_is_running:
@@ -625,43 +528,48 @@ def load_bot_data():
             
             if os.path.exists(state_file):
                 try:
-                    with open(state_file, 'r') as f:
-                        state = json.load(f)
-                        
-                        if 'total_profit' in state:
-                            bot_profit = state['total_profit']
-                        
-                        if 'trades' in state:
-                            trades_history = state['trades']
-                        
-                        if 'last_price' in state:
-                            latest_price = state['last_price']
+                    # Snapshot + journal tail yang ditulis bot
+                    state = load_state(state_file)
+                    
+                    if 'total_profit' in state:
+                        bot_profit = state['total_profit']
+                    
+                    if 'trades' in state:
+                        trades_history = state['trades']
+                    
+                    if 'last_price' in state:
+                        latest_price = state['last_price']
+                    
+                    if 'price_range' in state and len(state['price_range']) == 2:
+                        lower_price = state['price_range'][0]
+                        upper_price = state['price_range'][1]
+                        grid_number = state.get('grid_number', config.GRID_NUMBER)
                         
-                        if 'price_range' in state and len(state['price_range']) == 2:
-                            lower_price = state['price_range'][0]
-                            upper_price = state['price_range'][1]
-                            grid_number = state.get('grid_number', config.GRID_NUMBER)
-                            
-                            # Calculate grid levels
-                            grid_levels = np.linspace(lower_price, upper_price, grid_number + 1).tolist()
+                        # Calculate grid levels
+                        grid_levels = np.linspace(lower_price, upper_price, grid_number + 1).tolist()
                 except Exception as e:
                     logger.error(f"Failed to load grid state: {e}")
             
             # Fallback for grid levels if none available
             if not grid_levels:
                 grid_levels = np.linspace(config.LOWER_PRICE, config.UPPER_PRICE, config.GRID_NUMBER + 1).tolist()
+            
+            # Ring dari snapshot bot yang sudah berhenti read-only; lanjutkan di ring milik dashboard
+            if price_history.read_only:
+                history = PriceRing(getattr(config, 'PRICE_HISTORY_SIZE', 1000))
+                history.extend(price_history.to_records())
+                price_history = history
         
         # Fallback for price history if none available
         if not price_history and latest_price:
-            now = datetime.datetime.now().isoformat()
-            five_min_ago = (datetime.datetime.now() - datetime.timedelta(minutes=5)).isoformat()
-            price_history = [
-                {"time": five_min_ago, "price": latest_price, "usdt_idr": usdt_idr_rate or 16350.0},
-                {"time": now, "price": latest_price, "usdt_idr": usdt_idr_rate or 16350.0}
-            ]
+            now = datetime.datetime.now()
+            five_min_ago = now - datetime.timedelta(minutes=5)
+            price_history = PriceRing(getattr(config, 'PRICE_HISTORY_SIZE', 1000))
+            price_history.append(latest_price, usdt_idr_rate or 16350.0, five_min_ago)
+            price_history.append(latest_price, usdt_idr_rate or 16350.0, now)
         
-        # Parse trades from log if no trades available
-        if not trades_history:
+        # Parse trades from log if no trades available (snapshot bot aktif sudah lengkap)
+        if not trades_history and not bot_is_running:
             trades_history = parse_trades_from_log()
     
     except Exception as e:
@@ -671,8 +579,8 @@ def update_data_thread():
     """Thread untuk update data secara periodik"""
     last_fetch_time = 0
     
-    # Create application context for this thread
-    with app.app_context():
+    # Create application context for this thread; semua request REST dari thread ini berprioritas rendah
+    with app.app_context(), request_priority(PRIORITY_LOW):
         while True:
             current_time = time.time()
             
@@ -689,50 +597,27 @@ def update_data_thread():
                     global latest_price, bot_status
                     if latest_price is None:
                         try:
-                            # Coba dari instansi bot terlebih dahulu
-                            try:
-                                from grid_bot import GridTradingBot
-                                if hasattr(GridTradingBot, 'instance') and GridTradingBot.instance:
-                                    if hasattr(GridTradingBot.instance, 'last_price'):
-                                        latest_price = GridTradingBot.instance.last_price
-                                        logger.info(f"Got price directly from bot instance: {latest_price}")
-                                    
-                                    # Set bot status to active since we have a running bot instance
-                                    bot_status = "Aktif"
-                            except:
-                                pass
+                            # Bot aktif belum punya harga: tunggu snapshot berikutnya
+                            if get_snapshot() is not None:
+                                bot_status = "Aktif"
                                 
-                            # Jika masih None, coba dari API
-                            if latest_price is None:
+                            # Tanpa bot aktif, coba dari API (thread background, bukan handler request)
+                            else:
                                 from binance_client import BinanceClient
                                 client = BinanceClient()
                                 current_price = client.get_symbol_price(config.SYMBOL)
                                 if current_price:
                                     latest_price = current_price
                                     logger.info(f"Thread update got price from API: {latest_price}")
-                                    # Tambahkan ke history jika belum ada
-                                    current_time_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                                    if not price_history:
-                                        price_history.append({
-                                            "time": current_time_str,
-                                            "price": current_price,
-                                            "usdt_idr": client.get_usdt_idr_rate()
-                                        })
-                                    else:
-                                        # Only add if more than 5 seconds from last entry to avoid too many entries
-                                        last_entry_time = datetime.datetime.strptime(price_history[-1]["time"], "%Y-%m-%d %H:%M:%S,%f" if "," in price_history[-1]["time"] else "%Y-%m-%d %H:%M:%S")
-                                        current_dt = datetime.datetime.strptime(current_time_str, "%Y-%m-%d %H:%M:%S")
-                                        if (current_dt - last_entry_time).total_seconds() > 5:
-                                            price_history.append({
-                                                "time": current_time_str,
-                                                "price": current_price,
-                                                "usdt_idr": client.get_usdt_idr_rate()
-                                            })
+                                    # Tambahkan ke history jika kosong atau entry terakhir > 5 detik lalu
+                                    last_entry_time = price_history.last_time()
+                                    if last_entry_time is None or time.time() - last_entry_time > 5:
+                                        price_history.append(current_price, client.get_usdt_idr_rate())
                         except Exception as e:
                             logger.error(f"Thread update failed to get price: {e}")
                 
                 # Broadcast update ke semua klien setiap kali data diperbarui
-                if sse_clients and not SSE_DISABLED:
+                if sse_broker is not None and sse_broker.client_count():
                     try:
                         broadcast_update()
                     except Exception as e:
@@ -741,6 +626,21 @@ def update_data_thread():
             # Jangan sleep terlalu lama untuk menghindari delay dalam respon
             time.sleep(0.5)
 
+def start_update_thread():
+    """
+    Jalankan update_data_thread sekali per proses (dev server atau tiap worker gunicorn);
+    thread ini satu-satunya yang mengirim delta ke klien /stream
+    """
+    global _update_thread_pid
+    with _update_thread_lock:
+        # Thread tidak ikut ter-fork: proses anak menjalankan thread sendiri
+        if _update_thread_pid == os.getpid():
+            return
+        _update_thread_pid = os.getpid()
+        update_thread = Thread(target=update_data_thread)
+        update_thread.daemon = True
+        update_thread.start()
+
 def create_templates():
     """Buat folder templates dan file template HTML jika belum ada"""
     if not os.path.exists("templates"):
@@ -1188,39 +1088,195 @@ def create_templates():
             // Update riwayat transaksi
             $.get('/api/trades', function(data) {
                 if(data.status === 'success' && data.trades) {
-                    if(data.trades.length > 0) {
-                        let tradesHtml = '';
-                        
-                        // Tampilkan transaksi terbaru terlebih dahulu (reverse)
-                        data.trades.reverse().forEach(trade => {
-                            const tradeTime = new Date(trade.time).toLocaleString();
-                            const tradeType = trade.side || trade.type;
-                            const typeClass = tradeType === 'SELL' || tradeType === 'sell' ? 'profit' : 'neutral';
-                            const profit = trade.actual_profit || trade.profit;
-                            const profitClass = profit > 0 ? 'profit' : 'loss';
-                            
-                            tradesHtml += `<tr>
-                                <td>${tradeTime}</td>
-                                <td class="${typeClass}">${tradeType}</td>
-                                <td>${formatNumber(trade.price)}</td>
-                                <td>${trade.quantity}</td>
-                                <td>${formatNumber(trade.value || (trade.price * trade.quantity), 2)}</td>
-                                <td class="${profitClass}">${profit ? formatNumber(profit, 4) : '-'}</td>
-                            </tr>`;
-                        });
-                        
-                        $('#trades-table').html(tradesHtml);
-                    }
+                    renderTrades(data.trades);
+                }
+            });
+        }
+        
+        // Fungsi untuk menampilkan riwayat transaksi
+        function renderTrades(trades) {
+            if(trades.length > 0) {
+                let tradesHtml = '';
+                
+                // Tampilkan transaksi terbaru terlebih dahulu (reverse)
+                trades.slice().reverse().forEach(trade => {
+                    const tradeTime = new Date(trade.time).toLocaleString();
+                    const tradeType = trade.side || trade.type;
+                    const typeClass = tradeType === 'SELL' || tradeType === 'sell' ? 'profit' : 'neutral';
+                    const profit = trade.actual_profit || trade.profit;
+                    const profitClass = profit > 0 ? 'profit' : 'loss';
+                    
+                    tradesHtml += `<tr>
+                        <td>${tradeTime}</td>
+                        <td class="${typeClass}">${tradeType}</td>
+                        <td>${formatNumber(trade.price)}</td>
+                        <td>${trade.quantity}</td>
+                        <td>${formatNumber(trade.value || (trade.price * trade.quantity), 2)}</td>
+                        <td class="${profitClass}">${profit ? formatNumber(profit, 4) : '-'}</td>
+                    </tr>`;
+                });
+                
+                $('#trades-table').html(tradesHtml);
+            }
+        }
+        
+        // Stream realtime (/stream): satu snapshot lengkap, lalu hanya delta
+        const STREAM_PROTOCOL = 1;
+        const stream = { source: null, seq: null, state: null, priceWindow: 100, tradeWindow: 10, lastDelta: 0 };
+        
+        function connectStream() {
+            if(!window.EventSource) {
+                return;
+            }
+            const source = new EventSource('/stream');
+            stream.source = source;
+            stream.seq = null;
+            
+            source.addEventListener('snapshot', function(e) {
+                const msg = JSON.parse(e.data);
+                if(msg.protocol !== STREAM_PROTOCOL) {
+                    // Versi protokol tidak dikenal: tetap pakai polling
+                    source.close();
+                    return;
                 }
+                stream.seq = msg.seq;
+                stream.state = msg.state;
+                stream.priceWindow = msg.price_window;
+                stream.tradeWindow = msg.trade_window;
+                renderStreamState(stream.state, true);
             });
+            
+            source.addEventListener('delta', function(e) {
+                const msg = JSON.parse(e.data);
+                // Sudah tercakup dalam snapshot yang diterima
+                if(stream.seq === null || msg.seq <= stream.seq) {
+                    return;
+                }
+                // Ada delta yang terlewat: sambung ulang untuk snapshot baru
+                if(msg.base !== stream.seq) {
+                    source.close();
+                    connectStream();
+                    return;
+                }
+                const state = stream.state;
+                Object.assign(state, msg.fields || {});
+                if(msg.prices) {
+                    state.prices = state.prices.concat(msg.prices).slice(-stream.priceWindow);
+                }
+                if(msg.trades) {
+                    state.trades = state.trades.concat(msg.trades).slice(-stream.tradeWindow);
+                }
+                stream.seq = msg.seq;
+                stream.lastDelta = Date.now();
+                renderStreamState(state, !!msg.trades);
+            });
+            
+            // Browser menyambung ulang sendiri dan server mengirim snapshot baru
+            source.onerror = function() {
+                stream.seq = null;
+            };
+        }
+        
+        // Stream dianggap hidup hanya jika delta benar-benar datang; heartbeat saja tidak cukup
+        function streamConnected() {
+            return stream.source !== null && stream.source.readyState === EventSource.OPEN && stream.seq !== null &&
+                Date.now() - stream.lastDelta < 30000;
+        }
+        
+        // Fungsi untuk menampilkan state dari stream
+        function renderStreamState(state, tradesChanged) {
+            $('#bot-status').text(state.status);
+            if(state.status === 'Aktif') {
+                $('#bot-status').removeClass('status-inactive').addClass('status-active');
+            } else {
+                $('#bot-status').removeClass('status-active').addClass('status-inactive');
+            }
+            
+            if(state.latest_price) {
+                $('#current-price').text(formatNumber(state.latest_price));
+                $('#price-time').text('Terakhir diperbarui: ' + new Date().toLocaleTimeString());
+                if(state.prices.length > 1) {
+                    const oldPrice = state.prices[0][1];
+                    const change = ((state.latest_price - oldPrice) / oldPrice) * 100;
+                    const changeClass = change > 0 ? 'profit' : (change < 0 ? 'loss' : 'neutral');
+                    $('#price-change').html(`<span class="${changeClass}">(${change.toFixed(2)}%)</span>`);
+                }
+            }
+            
+            $('#ada-free').text(formatNumber(state.balance.ada_free));
+            $('#ada-locked').text(formatNumber(state.balance.ada_locked));
+            $('#usdt-free').text(formatNumber(state.balance.usdt_free, 2));
+            $('#usdt-locked').text(formatNumber(state.balance.usdt_locked, 2));
+            if(state.usdt_idr_rate) {
+                $('#usdt-idr').text(formatIDR(state.usdt_idr_rate));
+                $('#ada-idr').text(formatIDR(state.ada_idr_value));
+            }
+            if(state.balance.last_update) {
+                $('#balance-update-time').text('Terakhir diperbarui: ' + new Date(state.balance.last_update).toLocaleTimeString());
+            }
+            
+            if(state.profit) {
+                $('#total-profit').text(formatNumber(state.profit, 2) + ' USDT');
+            }
+            
+            if(state.grid_levels && state.grid_levels.length > 0) {
+                let gridHtml = '';
+                state.grid_levels.forEach(level => {
+                    const levelClass = level > state.latest_price ? 'profit' : (level < state.latest_price ? 'loss' : 'neutral');
+                    gridHtml += `<div class="grid-item">
+                        <span>Level:</span>
+                        <span class="${levelClass}">${formatNumber(level)}</span>
+                    </div>`;
+                });
+                $('#grid-levels').html(gridHtml);
+            }
+            
+            if(tradesChanged) {
+                renderTrades(state.trades);
+            }
+            
+            // Grafik digambar dari titik harga; Plotly.react hanya memperbarui yang berubah
+            if(state.prices.length > 0) {
+                const times = state.prices.map(point => new Date(point[0] * 1000));
+                const shapes = (state.grid_levels || []).map(level => ({
+                    type: 'line',
+                    x0: times[0],
+                    y0: level,
+                    x1: times[times.length - 1],
+                    y1: level,
+                    line: { color: 'Red', width: 1, dash: 'dash' }
+                }));
+                Plotly.react('price-chart', [{
+                    x: times,
+                    y: state.prices.map(point => point[1]),
+                    mode: 'lines',
+                    name: 'Harga ADA'
+                }], {
+                    title: 'Pergerakan Harga ADA/USDT',
+                    xaxis: { title: 'Waktu' },
+                    yaxis: { title: 'Harga (USDT)' },
+                    paper_bgcolor: '#111111',
+                    plot_bgcolor: '#111111',
+                    font: { color: '#f2f5fa' },
+                    autosize: true,
+                    height: 500,
+                    margin: { l: 50, r: 50, t: 50, b: 50 },
+                    shapes: shapes
+                });
+            }
         }
         
         // Perbarui data saat halaman dimuat
         $(document).ready(function() {
             updateDashboard();
+            connectStream();
             
-            // Perbarui data secara berkala setiap 10 detik
-            setInterval(updateDashboard, 10000);
+            // Perbarui data secara berkala setiap 10 detik selama stream tidak mengirim delta
+            setInterval(function() {
+                if(!streamConnected()) {
+                    updateDashboard();
+                }
+            }, 10000);
             
             // Tombol refresh manual
             $('#refresh-data').click(function() {
@@ -1241,50 +1297,99 @@ def create_templates():
 def get_orders():
     """API endpoint untuk mendapatkan data order spot aktif"""
     try:
-        # Coba dapatkan dari instance bot aktif
-        from grid_bot import GridTradingBot
-        orders = []
+        # Order grid dari snapshot bot aktif
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            return jsonify({'orders': snapshot.orders()})
         
-        if hasattr(GridTradingBot, 'instance') and GridTradingBot.instance is not None:
-            bot = GridTradingBot.instance
-            
-            # Dapatkan info order dari instance bot
-            if hasattr(bot, 'buy_orders'):
-                for price, order_id in bot.buy_orders.items():
-                    orders.append({
-                        'orderId': order_id,
-                        'side': 'BUY',
-                        'price': price,
-                        'origQty': bot.quantity,
-                        'status': 'NEW'
-                    })
-            
-            if hasattr(bot, 'sell_orders'):
-                for price, order_id in bot.sell_orders.items():
+        # Tanpa bot aktif: peta order terakhir di file state (handler tidak memanggil exchange)
+        orders = []
+        state_file = f"grid_state_{config.SYMBOL}.json"
+        if os.path.exists(state_file):
+            state = load_state(state_file) or {}
+            quantity = state.get('quantity', config.QUANTITY)
+            for side, key in (('BUY', 'buy_orders'), ('SELL', 'sell_orders')):
+                for price, order_id in state.get(key) or []:
                     orders.append({
                         'orderId': order_id,
-                        'side': 'SELL',
+                        'side': side,
                         'price': price,
-                        'origQty': bot.quantity,
+                        'origQty': quantity,
                         'status': 'NEW'
                     })
         
-        # Jika tidak ada data dari bot instance, coba dapatkan dari API
-        if not orders:
-            try:
-                from binance_client import BinanceClient
-                client = BinanceClient()
-                open_orders = client.get_open_orders(config.SYMBOL)
-                if open_orders:
-                    orders = open_orders
-            except Exception as e:
-                logger.error(f"Error getting orders from Binance API: {e}")
-        
         return jsonify({'orders': orders})
     except Exception as e:
         logger.error(f"Error getting order data: {e}")
         return jsonify({'orders': []})
 
+@app.route('/api/metrics')
+# @login_required (dinonaktifkan)
+def get_metrics():
+    """API endpoint untuk metrik request ke exchange (latency, error, weight)"""
+    try:
+        from grid_bot import GridTradingBot
+        
+        if hasattr(GridTradingBot, 'instance') and GridTradingBot.instance is not None:
+            metrics = GridTradingBot.instance.client.get_request_metrics()
+        else:
+            # Tanpa bot aktif, tampilkan metrik request dari proses dashboard saja
+            from request_metrics import get_request_metrics
+            metrics = get_request_metrics().get_snapshot()
+        if sse_broker is not None:
+            metrics['sse'] = sse_broker.get_stats()
+            metrics['sse']['protocol'] = stream_encoder.get_stats()
+        return jsonify(metrics)
+    except Exception as e:
+        logger.error(f"Error getting request metrics: {e}")
+        return jsonify({'error': str(e)}), 500
+
+_analytics_db = None
+
+def get_analytics_db():
+    """Store analytics SQLite untuk query rentang waktu, None jika backend bukan sqlite"""
+    global _analytics_db
+    if _analytics_db is None:
+        db_file = f"trading_logs/{getattr(config, 'ANALYTICS_DB_FILE', 'analytics.db')}"
+        if getattr(config, 'ANALYTICS_BACKEND', 'sqlite') != 'sqlite' or not os.path.exists(db_file):
+            return None
+        _analytics_db = SqliteAnalyticsStore(db_file, config.SYMBOL)
+    return _analytics_db
+
+@app.route('/api/analytics')
+# @login_required (dinonaktifkan)
+def get_analytics_data():
+    """
+    API endpoint untuk data analytics dalam rentang waktu
+    
+    Query params: since, until (ISO tanggal/waktu), limit (maks. baris per seri, default 500)
+    """
+    db = get_analytics_db()
+    if db is None:
+        return jsonify({'status': 'no_data', 'message': 'Analytics database not available'})
+    
+    since = request.args.get('since')
+    until = request.args.get('until')
+    try:
+        limit = min(int(request.args.get('limit', 500)), 5000)
+    except ValueError:
+        limit = 500
+    
+    try:
+        return jsonify({
+            'status': 'success',
+            'since': since,
+            'until': until,
+            'daily_profit': db.profit_by_day(since, until),
+            'trade_count': db.count_transactions(since, until),
+            'trades': db.get_transactions(since, until, limit=limit, newest=True),
+            'balances': db.get_balances(since, until, limit=limit, newest=True),
+            'prices': db.get_prices(since, until, limit=limit, newest=True)
+        })
+    except Exception as e:
+        logger.error(f"Error querying analytics database: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 def run_dashboard():
     """Jalankan dashboard web"""
     # Buat templates jika belum ada
@@ -1293,15 +1398,13 @@ def run_dashboard():
     # Muat data bot
     load_bot_data()
     
-    # Initialize sse_clients if not disabled
-    global sse_clients
-    if sse_clients is None and not SSE_DISABLED:
-        sse_clients = []
+    # Initialize SSE broker if not disabled
+    global sse_broker
+    if sse_broker is None and not SSE_DISABLED:
+        sse_broker = SSEBroker(resync=stream_encoder.snapshot_message)
     
     # Jalankan thread untuk update data
-    update_thread = Thread(target=update_data_thread)
-    update_thread.daemon = True
-    update_thread.start()
+    start_update_thread()
     
     # Jalankan thread untuk session cleanup
     session_cleanup_thread = Thread(target=check_for_session_timeout)
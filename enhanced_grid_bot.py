@@ -79,11 +79,9 @@ class EnhancedGridTradingBot:
             # Here you could automatically adjust grid parameters based on volatility
         
         # Cancel all existing open orders
-        open_orders = self.client.get_open_orders(self.symbol)
-        if open_orders:
-            for order in open_orders:
-                self.client.cancel_order(order['orderId'], self.symbol)
-            logger.info("Cancelled all existing orders")
+        cancel_result = self.client.cancel_all_orders(self.symbol)
+        if cancel_result['cancelled']:
+            logger.info(f"Cancelled all existing orders ({len(cancel_result['cancelled'])})")
         
         # Place buy orders below current price
         buy_orders_placed = 0
@@ -238,11 +236,9 @@ class EnhancedGridTradingBot:
             logger.error(f"An error occurred: {e}")
         finally:
             # Cancel all open orders when shutting down
-            open_orders = self.client.get_open_orders(self.symbol)
-            if open_orders:
-                for order in open_orders:
-                    self.client.cancel_order(order['orderId'], self.symbol)
-                logger.info("Cancelled all open orders")
+            cancel_result = self.client.cancel_all_orders(self.symbol)
+            if cancel_result['cancelled']:
+                logger.info(f"Cancelled all open orders ({len(cancel_result['cancelled'])})")
             logger.info("Enhanced grid trading bot stopped")
 
 if __name__ == "__main__":
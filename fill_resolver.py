@@ -0,0 +1,227 @@
+import logging
+import threading
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from binance.exceptions import BinanceAPIException
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class FillResolver:
+    """
+    Resolve fills (and their fees) for filled orders without scanning the
+    whole account trade history.
+
+    Trades are fetched scoped to a single order (myTrades?orderId=...) or, for
+    several orders at once, through one fromId window that starts after the
+    newest trade already indexed. Every trade is kept in a local index keyed
+    by order id, so a fill that has been seen once - through REST or through
+    the user data stream - is never fetched again.
+    """
+
+    MAX_TRADES_PER_REQUEST = 1000  # Batas limit endpoint myTrades
+
+    def __init__(self, client, max_orders=5000):
+        """
+        Args:
+            client: python-binance Client instance
+            max_orders (int): Number of orders kept in the local index
+        """
+        self.client = client
+        self.max_orders = max_orders
+        self._fills = OrderedDict()    # Key: (symbol, order_id), Value: {trade_id: fill}
+        self._complete = set()         # (symbol, order_id) yang semua fill-nya sudah diketahui
+        self._last_trade_id = {}       # Key: symbol, Value: trade id terbesar yang sudah diindeks
+        self._lock = threading.Lock()
+        self.trade_requests = 0        # Jumlah request myTrades yang benar-benar dikirim
+
+    @staticmethod
+    def _to_decimal(value):
+        try:
+            return Decimal(str(value))
+        except (InvalidOperation, TypeError, ValueError):
+            return None
+
+    def _store_fill(self, symbol, order_id, fill):
+        """Add a fill to the index (caller holds the lock)"""
+        key = (symbol, order_id)
+        fills = self._fills.get(key)
+        if fills is None:
+            fills = {}
+            self._fills[key] = fills
+            # Buang order tertua agar index tidak tumbuh tanpa batas
+            while len(self._fills) > self.max_orders:
+                old_key, _ = self._fills.popitem(last=False)
+                self._complete.discard(old_key)
+        else:
+            self._fills.move_to_end(key)
+        fills[fill['tradeId']] = fill
+
+        if fill['tradeId'] > self._last_trade_id.get(symbol, -1):
+            self._last_trade_id[symbol] = fill['tradeId']
+
+    @staticmethod
+    def _fill_from_trade(trade):
+        """Convert a get_my_trades entry to the fill format used by get_order_status"""
+        return {
+            'price': trade['price'],
+            'qty': trade['qty'],
+            'commission': trade['commission'],
+            'commissionAsset': trade['commissionAsset'],
+            'tradeId': trade['id']
+        }
+
+    def index_trade(self, symbol, trade):
+        """Index one entry returned by get_my_trades"""
+        with self._lock:
+            self._store_fill(symbol, trade['orderId'], self._fill_from_trade(trade))
+
+    def index_execution_report(self, event):
+        """Index the trade carried by a user data stream execution report"""
+        if event.get('x') != 'TRADE' or event.get('t', -1) < 0:
+            return
+        fill = {
+            'price': event['L'],
+            'qty': event['l'],
+            'commission': event['n'],
+            'commissionAsset': event['N'],
+            'tradeId': event['t']
+        }
+        symbol = event['s']
+        order_id = event['i']
+        with self._lock:
+            self._store_fill(symbol, order_id, fill)
+            if event.get('X') == 'FILLED':
+                self._complete.add((symbol, order_id))
+
+    def _is_complete(self, symbol, order_id, executed_qty=None):
+        """Check whether the index already holds every fill of the order"""
+        key = (symbol, order_id)
+        if key in self._complete:
+            return True
+        fills = self._fills.get(key)
+        if not fills or executed_qty is None:
+            return False
+        target = self._to_decimal(executed_qty)
+        if target is None:
+            return False
+        filled = sum((self._to_decimal(f['qty']) or Decimal(0)) for f in fills.values())
+        if filled >= target:
+            self._complete.add(key)
+            return True
+        return False
+
+    def _cached_fills(self, symbol, order_id):
+        fills = self._fills.get((symbol, order_id), {})
+        return [fills[trade_id] for trade_id in sorted(fills)]
+
+    def _fetch_order_trades(self, symbol, order_id):
+        """Fetch trades for a single order (scoped query)"""
+        self.trade_requests += 1
+        trades = self.client.get_my_trades(symbol=symbol, orderId=order_id)
+        with self._lock:
+            for trade in trades:
+                self._store_fill(symbol, trade['orderId'], self._fill_from_trade(trade))
+            # Query per order selalu mengembalikan semua fill order tersebut
+            self._complete.add((symbol, order_id))
+
+    def _fetch_trade_window(self, symbol):
+        """Fetch every trade newer than the index watermark, in pages"""
+        with self._lock:
+            from_id = self._last_trade_id.get(symbol)
+        if from_id is None:
+            return 0
+
+        fetched = 0
+        while True:
+            self.trade_requests += 1
+            trades = self.client.get_my_trades(
+                symbol=symbol,
+                fromId=from_id + 1,
+                limit=self.MAX_TRADES_PER_REQUEST
+            )
+            for trade in trades:
+                self.index_trade(symbol, trade)
+            fetched += len(trades)
+            if len(trades) < self.MAX_TRADES_PER_REQUEST:
+                return fetched
+            from_id = max(trade['id'] for trade in trades)
+
+    def get_fills(self, symbol, order_id, executed_qty=None):
+        """
+        Get fills for a filled order, fetching only what is not indexed yet
+
+        Args:
+            symbol (str): Trading pair
+            order_id (int): Order ID
+            executed_qty (str/float): executedQty of the order, used to know
+                whether the indexed fills are complete
+
+        Returns:
+            list: Fill dicts (price, qty, commission, commissionAsset, tradeId)
+        """
+        with self._lock:
+            if self._is_complete(symbol, order_id, executed_qty):
+                return self._cached_fills(symbol, order_id)
+
+        self._fetch_order_trades(symbol, order_id)
+        with self._lock:
+            return self._cached_fills(symbol, order_id)
+
+    def prefetch(self, symbol, orders):
+        """
+        Index fills for several filled orders with a single fromId window
+
+        Only trades newer than the index watermark are requested, so fills
+        already seen are not downloaded again. Orders still incomplete after
+        the window are left for get_fills to query individually.
+
+        Args:
+            symbol (str): Trading pair
+            orders (list): Order IDs, or (order_id, executed_qty) tuples
+
+        Returns:
+            int: Number of trades fetched
+        """
+        wanted = [tuple(order) if isinstance(order, (tuple, list)) else (order, None) for order in orders]
+        with self._lock:
+            missing = [oid for oid, qty in wanted if not self._is_complete(symbol, oid, qty)]
+        if len(missing) < 2:
+            return 0
+        try:
+            return self._fetch_trade_window(symbol)
+        except BinanceAPIException as e:
+            logger.warning(f"Batched trade lookup failed, falling back to per-order queries: {e}")
+            return 0
+
+    def resolve_many(self, symbol, orders):
+        """
+        Resolve fills for several filled orders in one batched pass
+
+        Args:
+            symbol (str): Trading pair
+            orders (list): Order IDs, or (order_id, executed_qty) tuples
+
+        Returns:
+            dict: Key: order_id, Value: list of fills
+        """
+        wanted = [tuple(order) if isinstance(order, (tuple, list)) else (order, None) for order in orders]
+        self.prefetch(symbol, wanted)
+
+        results = {}
+        for order_id, executed_qty in wanted:
+            try:
+                results[order_id] = self.get_fills(symbol, order_id, executed_qty)
+            except BinanceAPIException as e:
+                logger.error(f"Failed to resolve fills for order {order_id}: {e}")
+                results[order_id] = []
+        return results
+
+    def get_stats(self):
+        """Index size and request counters"""
+        with self._lock:
+            return {
+                'orders_indexed': len(self._fills),
+                'orders_complete': len(self._complete),
+                'trade_requests': self.trade_requests
+            }
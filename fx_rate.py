@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+import config
+from request_metrics import create_session
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class UsdtIdrRateProvider:
+    """
+    USDT/IDR rate refreshed in a background thread.
+
+    get_rate() never does network I/O: it returns the last known good rate
+    (or the fallback rate before the first successful fetch). When the cached
+    rate is older than the TTL the refresher thread is woken up, so callers get
+    the stale value immediately while a new one is fetched
+    (stale-while-revalidate).
+    """
+
+    INDODAX_URL = 'https://indodax.com/api/ticker/usdtidr'
+    BINANCE_BIDR_URL = 'https://api.binance.com/api/v3/ticker/price?symbol=USDTBIDR'
+
+    def __init__(self, ttl=None, fallback_rate=None, timeout=5, session=None):
+        """
+        Args:
+            ttl (float): Seconds a fetched rate is considered fresh
+            fallback_rate (float): Rate used until the first successful fetch
+            timeout (float): HTTP timeout per source in seconds
+            session: Optional requests.Session used for the HTTP calls
+        """
+        self.ttl = ttl if ttl is not None else getattr(config, 'FX_RATE_TTL', 60)
+        self.fallback_rate = fallback_rate if fallback_rate is not None else getattr(config, 'FX_FALLBACK_RATE', 16350.0)
+        self.timeout = timeout
+        self.session = session or create_session()
+
+        self._rate = None
+        self._source = None
+        self._updated_at = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._last_error_time = 0
+        self.stats = {'reads': 0, 'stale_reads': 0, 'refreshes': 0, 'failures': 0}
+
+    def start(self):
+        """Start the background refresher (idempotent)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='fx-rate-refresher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout * 2 + 1)
+            self._thread = None
+
+    def _run(self):
+        """Refresh loop: fetch, then sleep until the TTL expires or a reader finds the rate stale"""
+        while not self._stop_event.is_set():
+            self.refresh()
+            self._wake.clear()
+            self._wake.wait(self.ttl)
+
+    def _fetch(self):
+        """Fetch the rate from the public sources, returns (rate, source) or (None, None)"""
+        # Coba dapatkan dari API Indodax (Bursa crypto Indonesia)
+        response = self.session.get(self.INDODAX_URL, timeout=self.timeout)
+        if response.status_code == 200:
+            data = response.json()
+            if 'ticker' in data and 'last' in data['ticker']:
+                return float(data['ticker']['last']), 'indodax'
+
+        # Fallback ke Binance USDT/BIDR (1000 BIDR = 1000 IDR)
+        response = self.session.get(self.BINANCE_BIDR_URL, timeout=self.timeout)
+        if response.status_code == 200:
+            data = response.json()
+            if 'price' in data:
+                return float(data['price']), 'binance_bidr'
+
+        return None, None
+
+    def refresh(self):
+        """Fetch a new rate synchronously; keeps the last known good value on failure"""
+        try:
+            rate, source = self._fetch()
+        except Exception as e:
+            rate, source = None, None
+            # Log error hanya sekali setiap jam untuk menghindari spam log
+            now = time.time()
+            if now - self._last_error_time > 3600:
+                logger.warning(f"Gagal mendapatkan harga USDT/IDR realtime: {e}")
+                self._last_error_time = now
+
+        with self._lock:
+            if rate:
+                changed = rate != self._rate
+                self._rate = rate
+                self._source = source
+                self._updated_at = time.time()
+                self.stats['refreshes'] += 1
+            else:
+                changed = False
+                self.stats['failures'] += 1
+
+        if changed:
+            logger.info(f"Realtime USDT/IDR dari {source}: {rate}")
+        return rate
+
+    def get_rate(self):
+        """Get the current rate without blocking"""
+        if self._thread is None:
+            self.start()
+        with self._lock:
+            self.stats['reads'] += 1
+            rate = self._rate
+            stale = rate is None or time.time() - self._updated_at > self.ttl
+            if stale:
+                self.stats['stale_reads'] += 1
+        if stale:
+            self._wake.set()
+        return rate if rate is not None else self.fallback_rate
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['rate'] = self._rate
+            stats['source'] = self._source
+            stats['age'] = time.time() - self._updated_at if self._updated_at else None
+            stats['ttl'] = self.ttl
+            return stats
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def get_rate_provider():
+    """Shared, already started USDT/IDR rate provider"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = UsdtIdrRateProvider()
+            _provider.start()
+        return _provider
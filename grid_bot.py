@@ -6,9 +6,18 @@ from binance_client import BinanceClient
 from risk_management import RiskManager
 import config
 import datetime
-import json
-import os
+import queue
+from collections import deque
 from trading_analytics import get_analytics  # Import the analytics module
+from user_data_stream import create_execution_feed
+from rate_limiter import request_priority, PRIORITY_LOW
+from order_placement import GridOrderPlacer
+from grid_diff import align_grid, diff_grid
+from state_journal import StateJournal
+from price_ring import PriceRing
+from metrics_engine import MetricsEngine, audit
+from bot_snapshot import get_snapshot_store, freeze_trades
+from state_bus import publish_snapshot, clear_snapshot
 
 # Configure logging
 logging.basicConfig(
@@ -25,12 +34,20 @@ class GridTradingBot:
     # Simpan instance untuk diakses oleh dashboard
     instance = None
     
-    def __init__(self):
-        """Initialize the grid trading bot"""
+    def __init__(self, client=None, analytics=None, state_journal=None, clock=None):
+        """Initialize the grid trading bot
+        
+        Args:
+            client: Exchange client, defaults to a live BinanceClient
+            analytics: Analytics recorder, defaults to get_analytics(symbol)
+            state_journal: State persistence, defaults to StateJournal(grid_state_<symbol>.json)
+            clock: Function returning the current datetime (a backtest passes simulated time)
+        """
         # Set instance untuk referensi global
         GridTradingBot.instance = self
         
-        self.client = BinanceClient()
+        self.clock = clock or datetime.datetime.now
+        self.client = client or BinanceClient()
         self.risk_manager = RiskManager(self.client)
         self.symbol = config.SYMBOL
         self.upper_price = config.UPPER_PRICE
@@ -40,7 +57,7 @@ class GridTradingBot:
         self.quantity = config.QUANTITY
         
         # Initialize analytics
-        self.analytics = get_analytics(self.symbol)
+        self.analytics = analytics or get_analytics(self.symbol)
         
         # Calculate price levels for the grid
         self.grid_prices = self._calculate_grid_prices()
@@ -49,15 +66,22 @@ class GridTradingBot:
         self.buy_orders = {}  # Key: price, Value: order_id
         self.sell_orders = {}  # Key: price, Value: order_id
         
+        # Push-based fill detection: feed thread enqueues, main loop handles
+        self.fill_events = queue.Queue()
+        self.execution_feed = None
+        
         # Price tracking
         self.last_price = None
-        self.price_history = []  # Store recent price history, format: {"time": ISO-string, "price": float, "usdt_idr": float}
-        self.price_update_time = datetime.datetime.now()
-        self.last_grid_adjustment = datetime.datetime.now()
+        self.price_history = PriceRing(getattr(config, 'PRICE_HISTORY_SIZE', 1000))  # Recent (time, price, usdt_idr) samples
+        self.price_update_time = self.clock()
+        self.last_grid_adjustment = self.clock()
+        self.grid_adjust_interval = getattr(config, 'GRID_ADJUST_INTERVAL', 900)  # Detik antar adjust_grid
+        self.recenter_margin = getattr(config, 'GRID_RECENTER_MARGIN', 0.02)  # Lebar grid baru di tiap sisi harga
         
         # Profit tracking
         self.total_profit = 0
         self.trades = []
+        self.metrics = MetricsEngine()  # Agregat profit per hari/minggu/level/side, diperbarui per trade
         
         # Track entry prices for stop loss calculation
         self.entry_prices = {}  # Key: price, Value: entry_timestamp
@@ -65,7 +89,13 @@ class GridTradingBot:
         # Initial price for overall stop loss
         self.initial_price = None
         
-        # Load previous state if exists
+        # Order yang fill-nya sudah diproses (exactly-once lintas restart)
+        self.processed_fills = set()
+        self._processed_fill_order = deque()
+        self._restored_state = None
+        
+        # Load previous state if exists (snapshot + journal)
+        self.state_journal = state_journal or StateJournal(f"grid_state_{self.symbol}.json")
         self._load_state()
         
         logger.info(f"Grid bot initialized for {self.symbol}")
@@ -80,37 +110,166 @@ class GridTradingBot:
         return np.linspace(self.lower_price, self.upper_price, self.grid_number + 1)
 
     def _load_state(self):
-        """Load previous state from file if exists"""
-        state_file = f"grid_state_{self.symbol}.json"
-        if os.path.exists(state_file):
-            try:
-                with open(state_file, 'r') as f:
-                    state = json.load(f)
-                    self.total_profit = state.get('total_profit', 0)
-                    self.trades = state.get('trades', [])
-                    self.last_price = state.get('last_price', None)
-                    logger.info(f"Loaded previous state from {state_file}")
-                    logger.info(f"Loaded previous profit: {self.total_profit:.4f} USDT")
-            except Exception as e:
-                logger.error(f"Failed to load previous state: {e}")
+        """Load previous state (last snapshot plus journal tail) if exists"""
+        try:
+            state = self.state_journal.load()
+            if state:
+                self.total_profit = state.get('total_profit', 0)
+                self.trades = state.get('trades', [])
+                self.last_price = state.get('last_price', None)
+                
+                # Fill yang sudah diproses: snapshot, record journal dan trade yang tercatat
+                processed = list(state.get('processed_fills', []))
+                processed += [r['order_id'] for r in state.get('journal_records', {}).get('fill_processed', [])]
+                processed += [t['order_id'] for t in self.trades if t.get('order_id') is not None]
+                for order_id in processed:
+                    self._remember_processed_fill(order_id)
+                
+                # Checkpoint metrik dari snapshot, lalu hanya trade setelahnya yang dihitung
+                self.metrics = MetricsEngine.from_dict(state.get('metrics'))
+                applied = self.metrics.catch_up(self.trades)
+                if applied:
+                    logger.info(f"Applied {applied} trades after the metrics checkpoint")
+                
+                # Peta order disimpan untuk direkonsiliasi saat run(), belum dipercaya
+                if state.get('buy_orders') or state.get('sell_orders'):
+                    self._restored_state = state
+                logger.info(f"Loaded previous state from {self.state_journal.snapshot_path}")
+                logger.info(f"Loaded previous profit: {self.total_profit:.4f} USDT")
+        except Exception as e:
+            logger.error(f"Failed to load previous state: {e}")
+
+    def _state_fields(self):
+        """Small state fields journaled on every save"""
+        return {
+            'total_profit': self.total_profit,
+            'last_update': self.clock().isoformat(),
+            'price_range': [self.lower_price, self.upper_price],
+            'grid_number': self.grid_number,
+            'grid_size': self.grid_size,
+            'quantity': self.quantity,
+            'initial_price': self.initial_price,
+            'last_price': self.last_price,  # Simpan harga terakhir dalam state
+            # Peta harga -> orderId (list pasangan karena key JSON harus string)
+            'buy_orders': [[float(price), order_id] for price, order_id in self.buy_orders.items()],
+            'sell_orders': [[float(price), order_id] for price, order_id in self.sell_orders.items()],
+            'entry_prices': [[float(price), ts] for price, ts in self.entry_prices.items()]
+        }
 
-    def _save_state(self):
-        """Save current state to file"""
-        state_file = f"grid_state_{self.symbol}.json"
+    def _save_state(self, snapshot=False):
+        """Journal current state; write a compacted snapshot when due
+
+        Args:
+            snapshot (bool): Force a full snapshot (e.g. on shutdown)
+        """
         try:
-            state = {
-                'total_profit': self.total_profit,
-                'trades': self.trades,
-                'last_update': datetime.datetime.now().isoformat(),
-                'price_range': [self.lower_price, self.upper_price],
-                'grid_number': self.grid_number,
-                'last_price': self.last_price  # Simpan harga terakhir dalam state
-            }
-            with open(state_file, 'w') as f:
-                json.dump(state, f, indent=2)
+            self.state_journal.append('state', self._state_fields())
+            if snapshot or self.state_journal.needs_snapshot():
+                state = self._state_fields()
+                state['trades'] = self.trades
+                state['processed_fills'] = list(self._processed_fill_order)
+                state['metrics'] = self.metrics.to_dict()
+                self.state_journal.write_snapshot(state)
         except Exception as e:
             logger.error(f"Failed to save state: {e}")
 
+    def _publish_snapshot(self):
+        """Publish an immutable snapshot for the dashboard, which never queries the exchange itself"""
+        try:
+            quote_asset = self.symbol[len(self.symbol)-4:]
+            base_asset = self.symbol[:len(self.symbol)-4]
+            
+            # Saldo dari snapshot cache client; fill meng-invalidate cache sehingga langsung di-refresh.
+            # Waktu update adalah waktu fetch snapshot itu (bisa sampai SNAPSHOT_BALANCE_MAX_AGE lalu)
+            with request_priority(PRIORITY_LOW):
+                balances, fetched_at = self.client.get_balance_snapshot(
+                    (quote_asset, base_asset), max_age=getattr(config, 'SNAPSHOT_BALANCE_MAX_AGE', 60))
+            balances_updated_at = datetime.datetime.fromtimestamp(fetched_at).isoformat() if fetched_at else None
+            
+            store = get_snapshot_store()
+            previous = store.get()
+            snapshot = store.publish(
+                symbol=self.symbol,
+                status='Aktif',
+                last_price=self.last_price,
+                price_history=self.price_history.frozen(),
+                upper_price=self.upper_price,
+                lower_price=self.lower_price,
+                grid_number=self.grid_number,
+                quantity=self.quantity,
+                grid_levels=tuple(float(price) for price in self.grid_prices),
+                quote_asset=quote_asset,
+                base_asset=base_asset,
+                balances=balances or {},
+                balances_updated_at=balances_updated_at,
+                usdt_idr_rate=self.client.get_usdt_idr_rate(),
+                buy_orders=tuple((float(price), order_id) for price, order_id in self.buy_orders.items()),
+                sell_orders=tuple((float(price), order_id) for price, order_id in self.sell_orders.items()),
+                total_profit=self.total_profit,
+                trades=freeze_trades(self.trades, previous.trades if previous else ())
+            )
+            # Worker dashboard di proses lain (gunicorn) membaca lewat state bus
+            publish_snapshot(snapshot)
+        except Exception as e:
+            logger.error(f"Failed to publish dashboard snapshot: {e}")
+
+    def _remember_processed_fill(self, order_id):
+        """Add an order id to the bounded processed-fill set"""
+        if order_id in self.processed_fills:
+            return
+        self.processed_fills.add(order_id)
+        self._processed_fill_order.append(order_id)
+        while len(self._processed_fill_order) > getattr(config, 'PROCESSED_FILLS_KEPT', 5000):
+            self.processed_fills.discard(self._processed_fill_order.popleft())
+
+    def _mark_fill_processed(self, order_id):
+        """Remember a handled fill, in memory and in the journal"""
+        self._remember_processed_fill(order_id)
+        try:
+            self.state_journal.append('fill_processed', {'order_id': order_id})
+        except Exception as e:
+            logger.error(f"Failed to journal processed fill {order_id}: {e}")
+
+    def _process_fill(self, side, price, order_id, counter_order_id=None):
+        """Handle a filled grid order exactly once
+
+        Args:
+            side (str): 'BUY' or 'SELL'
+            price (float): Grid level of the filled order
+            order_id (int): Filled order
+            counter_order_id (int): Counter order already open on the exchange
+                (adopted after a restart); no new counter order is placed
+
+        Returns:
+            bool: True if the fill was handled now, False if it was already processed
+        """
+        orders = self.buy_orders if side == 'BUY' else self.sell_orders
+        if order_id in self.processed_fills:
+            logger.info(f"Fill of {side} order {order_id} at {price} already processed, skipping")
+            if orders.get(price) == order_id:
+                del orders[price]
+            return False
+        
+        if side == 'BUY':
+            self._handle_buy_fill(price, order_id, counter_order_id)
+        else:
+            self._handle_sell_fill(price, order_id, counter_order_id)
+        self._mark_fill_processed(order_id)
+        
+        # Handler bisa keluar lebih awal (limit investasi); fill tetap tidak diulang
+        if orders.get(price) == order_id:
+            del orders[price]
+        return True
+
+    def _record_trade(self, trade):
+        """Add a trade to the history and append it to the journal"""
+        self.trades.append(trade)
+        self.metrics.apply(trade)
+        try:
+            self.state_journal.append('trade', trade)
+        except Exception as e:
+            logger.error(f"Failed to journal trade: {e}")
+
     def setup_grid(self):
         """Setup the initial grid orders"""
         try:
@@ -183,7 +342,7 @@ class GridTradingBot:
                 }
                 
                 # Jalankan auto-balancer dengan kebutuhan grid
-                balancer = AutoBalancer()
+                balancer = AutoBalancer(binance_client=self.client)
                 balance_result = balancer.execute_auto_balance(safe_mode=False, required_for_grid=grid_requirements)
                 
                 if balance_result:
@@ -281,251 +440,391 @@ class GridTradingBot:
                 return False
             
             # Cancel all existing open orders
-            open_orders = self.client.get_open_orders(self.symbol)
-            if open_orders:
-                for order in open_orders:
-                    self.client.cancel_order(order['orderId'], self.symbol)
-                logger.info("Cancelled all existing orders")
+            cancel_result = self.client.cancel_all_orders(self.symbol)
+            if cancel_result['cancelled']:
+                logger.info(f"Cancelled all existing orders ({len(cancel_result['cancelled'])})")
+            if cancel_result['failed']:
+                logger.warning(f"Failed to cancel orders: {cancel_result['failed']}")
+            
+            # Buy orders below and sell orders above current price, placed concurrently
+            buy_prices = [price for price in self.grid_prices if price < current_price]
+            sell_prices = [price for price in self.grid_prices if price > current_price]
+            levels = [{'side': 'BUY', 'price': price, 'quantity': self.quantity} for price in buy_prices]
+            levels += [{'side': 'SELL', 'price': price, 'quantity': self.quantity} for price in sell_prices]
+            
+            # Level terdekat dari harga wajib terpasang jika saldonya cukup
+            if buy_prices and usdt_free >= required_usdt:
+                levels[len(buy_prices) - 1]['required'] = True
+            if sell_prices and ada_free >= required_ada:
+                levels[len(buy_prices)]['required'] = True
+            
+            report = GridOrderPlacer(self.client).place(self.symbol, levels)
+            if report['rolled_back']:
+                if report['not_cancelled']:
+                    self._clean_up_failed_rollback(report)
+                logger.error("Grid setup aborted: required grid levels could not be placed")
+                return False
             
-            # Place buy orders below current price
             buy_orders_placed = 0
-            for price in self.grid_prices:
-                if price < current_price:
-                    order = self.client.place_limit_order(
-                        symbol=self.symbol,
-                        side="BUY",
-                        quantity=self.quantity,
-                        price=price
-                    )
-                    if order:
-                        self.buy_orders[price] = order['orderId']
-                        buy_orders_placed += 1
-            
-            # Place sell orders above current price
             sell_orders_placed = 0
-            for price in self.grid_prices:
-                if price > current_price:
-                    order = self.client.place_limit_order(
-                        symbol=self.symbol,
-                        side="SELL",
-                        quantity=self.quantity,
-                        price=price
-                    )
-                    if order:
-                        self.sell_orders[price] = order['orderId']
-                        sell_orders_placed += 1
+            for result in report['results']:
+                if not result['order']:
+                    continue
+                if result['side'] == 'BUY':
+                    self.buy_orders[result['price']] = result['order']['orderId']
+                    buy_orders_placed += 1
+                else:
+                    self.sell_orders[result['price']] = result['order']['orderId']
+                    sell_orders_placed += 1
             
+            if report['failed']:
+                logger.warning(f"{len(report['failed'])} grid levels failed: " + ", ".join(f"{r['side']} {r['price']:.4f}" for r in report['failed']))
             logger.info(f"Grid setup complete. {buy_orders_placed} buy orders and {sell_orders_placed} sell orders placed.")
+            
+            # Simpan peta order agar bisa diadopsi setelah restart
+            self._save_state()
             return True
             
         except Exception as e:
             logger.error(f"Error setting up grid: {e}")
             return False
 
-    def check_filled_orders(self):
-        """Check if any grid orders have been filled"""
+    def _clean_up_failed_rollback(self, report):
+        """
+        Deal with orders a rolled back grid setup could not cancel
+
+        Cancels all open orders of the symbol; orders that still survive are
+        tracked and saved so the reconciler (or the next start) handles them
+        instead of leaving them live and unknown.
+
+        Args:
+            report (dict): Rolled back report from GridOrderPlacer.place
+        """
+        try:
+            cancel_result = self.client.cancel_all_orders(self.symbol)
+        except Exception as e:
+            logger.error(f"Failed to cancel open orders after the rollback: {e}")
+            cancel_result = {'cancelled': [], 'failed': [], 'method': 'per_order'}
+        if cancel_result['method'] in ('bulk', 'none') and not cancel_result['failed']:
+            remaining = set()
+        else:
+            # Order yang tidak bisa dipastikan batal tetap dilacak; kalau ternyata sudah fill,
+            # rekonsiliasi memprosesnya sebagai fill
+            remaining = set(report['not_cancelled']) - set(cancel_result['cancelled'])
+        if not remaining:
+            logger.info(f"Cancelled the {len(report['not_cancelled'])} orders the rollback left open")
+            return
+        
+        for result in report['results']:
+            if result['order'] and result['order']['orderId'] in remaining:
+                orders = self.buy_orders if result['side'] == 'BUY' else self.sell_orders
+                orders[result['price']] = result['order']['orderId']
+        logger.error(f"Orders still open after the failed grid setup, tracking them: {sorted(remaining)}")
+        self._save_state()
+
+    def check_filled_orders(self, reconcile=True):
+        """Update price, check stop loss and reconcile grid orders against open orders
+
+        Args:
+            reconcile (bool): Fetch open orders and process any tracked order that
+                is no longer open. When the execution report feed is connected,
+                fills arrive through process_fill_events and this snapshot diff
+                only runs as an occasional fallback.
+        """
         try:
             # Get all open orders
-            open_orders = self.client.get_open_orders(self.symbol)
-            open_order_ids = [order['orderId'] for order in open_orders]
+            open_order_ids = None
+            if reconcile:
+                open_orders = self.client.get_open_orders(self.symbol)
+                if open_orders is None:
+                    logger.error("Failed to get open orders")
+                    reconcile = False
+                else:
+                    open_order_ids = set(order['orderId'] for order in open_orders)
             
             # Update latest price
             current_price = self.client.get_symbol_price(self.symbol)
             if current_price and (not self.last_price or abs(current_price - self.last_price) > 0.0001):
                 self.last_price = current_price
                 price_data = {
-                    "time": datetime.datetime.now().isoformat(),
+                    "time": self.clock().isoformat(),
                     "price": current_price,
                     "usdt_idr": self.client.get_usdt_idr_rate()
                 }
-                self.price_history.append(price_data)
-                self.price_update_time = datetime.datetime.now()
+                self.price_history.append_record(price_data)
+                self.price_update_time = self.clock()
                 
                 # Log price data to analytics
                 self.analytics.log_price_data(price_data)
-                
-                # Keep only recent price history to save memory
-                if len(self.price_history) > 1000:
-                    self.price_history = self.price_history[-1000:]
             
             # Check overall stop loss
             if self.initial_price and self.risk_manager.check_stop_loss(self.initial_price):
                 logger.warning("Overall stop loss triggered!")
                 self.risk_manager.execute_emergency_exit()
+                # Semua order sudah dibatalkan: jangan dilacak (atau diproses sebagai fill) lagi.
+                # Stop loss aktif lagi saat setup_grid memasang grid baru.
+                self.buy_orders = {}
+                self.sell_orders = {}
+                self.initial_price = None
+                self._save_state()
+                return
+            
+            if not reconcile:
                 return
             
             # Check if any buy orders have been filled
             for price, order_id in list(self.buy_orders.items()):
                 if order_id not in open_order_ids:
-                    # Buy order was filled, place a sell order at the next price level
-                    sell_price = price + self.grid_size
-                    
-                    # Record entry price for this position
-                    self.entry_prices[price] = time.time()
-                    
-                    # Log the filled buy order - tanpa menambahkan profit pada BUY order
-                    logger.info(f"Buy order at {price} filled. Setting up sell order at {sell_price}")
-                    
-                    # Check investment limit before placing new order
-                    if not self.risk_manager.check_investment_limit():
-                        logger.warning("Investment limit reached. Not placing sell order.")
-                        continue
-                    
-                    # Place a new sell order at the next price level
-                    order = self.client.place_limit_order(
-                        symbol=self.symbol,
-                        side="SELL",
-                        quantity=self.quantity,
-                        price=sell_price
-                    )
-                    
-                    if order:
-                        self.sell_orders[sell_price] = order['orderId']
-                        
-                        # Record the trade
-                        trade = {
-                            'time': datetime.datetime.now().isoformat(),
-                            'side': 'BUY',
-                            'price': price,
-                            'quantity': self.quantity,
-                            'value': price * self.quantity,
-                            'next_target': sell_price,
-                            'potential_profit': 0  # Profit potensial, belum direalisasikan
-                        }
-                        self.trades.append(trade)
-                        
-                        # Log detailed transaction in analytics
-                        self.analytics.log_transaction({
-                            'time': datetime.datetime.now().isoformat(),
-                            'type': 'BUY',
-                            'price': price,
-                            'quantity': self.quantity,
-                            'value': price * self.quantity,
-                            'target_sell_price': sell_price,
-                            'profit': 0,
-                            'grid_level': list(self.grid_prices).index(price) if price in self.grid_prices else -1,
-                            'market_conditions': {
-                                'current_price': self.last_price,
-                                'usdt_idr': self.client.get_usdt_idr_rate(),
-                                'grid_range': [self.lower_price, self.upper_price]
-                            }
-                        })
-                        
-                        # Save updated state
-                        self._save_state()
-                    
-                    # Remove the filled buy order from our tracking
-                    del self.buy_orders[price]
+                    self._process_fill('BUY', price, order_id)
             
             # Check if any sell orders have been filled
-            for price, order_id in list(self.sell_orders.items()):
-                if order_id not in open_order_ids:
-                    # Sell order was filled, place a buy order at the next price level
-                    buy_price = price - self.grid_size
-                    
-                    # Dapatkan detail order yang terpenuhi untuk mendapatkan fee yang dibayarkan
-                    order_details = self.client.get_order_status(order_id, self.symbol)
-                    
-                    # Hitung fee berdasarkan data order
-                    fee_percentage = 0.1  # Default 0.1% fee Binance
-                    fee_amount = 0
-                    actual_filled_quantity = self.quantity
-                    
-                    if order_details and 'fills' in order_details:
-                        # Akumulasi fee dari semua fills
-                        for fill in order_details['fills']:
-                            if fill['commissionAsset'] == 'USDT':
-                                fee_amount += float(fill['commission'])
-                            elif fill['commissionAsset'] == self.symbol.replace('USDT', ''):
-                                # Jika fee dalam bentuk base asset (ADA), konversi ke USDT
-                                fee_amount += float(fill['commission']) * price
-                        
-                        # Catat actual executed quantity jika berbeda
-                        if 'executedQty' in order_details:
-                            actual_filled_quantity = float(order_details['executedQty'])
-                    
-                    # Hitung profit dengan memperhitungkan fee
-                    gross_profit = (price - buy_price) * actual_filled_quantity
-                    net_profit = gross_profit - fee_amount
-                    self.total_profit += net_profit
-                    
-                    # Hitung profit percentage berdasarkan profit bersih
-                    profit_percentage = (net_profit / (buy_price * actual_filled_quantity)) * 100
-                    
-                    # Detail perhitungan untuk logging
-                    logger.info(f"[PROFIT DETAIL] Sell Price: {price}, Buy Price: {buy_price}, Quantity: {actual_filled_quantity}")
-                    logger.info(f"[PROFIT CALCULATION] Gross: ({price} - {buy_price}) * {actual_filled_quantity} = {gross_profit:.4f} USDT")
-                    logger.info(f"[PROFIT CALCULATION] Fee: {fee_amount:.4f} USDT")
-                    logger.info(f"[PROFIT CALCULATION] Net: {gross_profit:.4f} - {fee_amount:.4f} = {net_profit:.4f} USDT")
-                    
-                    # Log the filled sell order dengan profit bersih
-                    logger.info(f"Sell order at {price} filled. Net Profit: {net_profit:.4f} USDT ({profit_percentage:.2f}%). Total profit: {self.total_profit:.4f} USDT")
-                    
-                    # Check investment limit before placing new order
-                    if not self.risk_manager.check_investment_limit():
-                        logger.warning("Investment limit reached. Not placing buy order.")
-                        continue
-                    
-                    # Place a new buy order at the next price level
-                    order = self.client.place_limit_order(
-                        symbol=self.symbol,
-                        side="BUY",
-                        quantity=self.quantity,
-                        price=buy_price
-                    )
-                    
-                    if order:
-                        self.buy_orders[buy_price] = order['orderId']
-                        
-                        # Record the trade dengan fee dan profit bersih
-                        trade = {
-                            'time': datetime.datetime.now().isoformat(),
-                            'side': 'SELL',
-                            'price': price,
-                            'quantity': actual_filled_quantity,
-                            'value': price * actual_filled_quantity,
-                            'next_target': buy_price,
-                            'fee': fee_amount,
-                            'gross_profit': gross_profit,
-                            'actual_profit': net_profit,
-                            'total_profit': self.total_profit
-                        }
-                        self.trades.append(trade)
-                        
-                        # Log detailed transaction in analytics dengan data fee
-                        self.analytics.log_transaction({
-                            'time': datetime.datetime.now().isoformat(),
-                            'type': 'SELL',
-                            'price': price,
-                            'quantity': actual_filled_quantity,
-                            'value': price * actual_filled_quantity,
-                            'buy_price': buy_price,
-                            'profit': net_profit,
-                            'gross_profit': gross_profit,
-                            'fee': fee_amount,
-                            'profit_percentage': profit_percentage,
-                            'total_profit': self.total_profit,
-                            'grid_level': list(self.grid_prices).index(price) if price in self.grid_prices else -1,
-                            'market_conditions': {
-                                'current_price': self.last_price,
-                                'usdt_idr': self.client.get_usdt_idr_rate(),
-                                'grid_range': [self.lower_price, self.upper_price]
-                            }
-                        })
-                        
-                        # Save updated state
-                        self._save_state()
-                    
-                    # Remove the filled sell order from our tracking
-                    del self.sell_orders[price]
-                    
-                    # Remove corresponding entry price
-                    if buy_price in self.entry_prices:
-                        del self.entry_prices[buy_price]
+            filled_sells = [(price, order_id) for price, order_id in self.sell_orders.items()
+                            if order_id not in open_order_ids]
+            if len(filled_sells) > 1:
+                # Satu lookup trade untuk semua fee, bukan satu query per order
+                self.client.prefetch_order_fills([order_id for _, order_id in filled_sells], self.symbol)
+            for price, order_id in filled_sells:
+                self._process_fill('SELL', price, order_id)
         
         except Exception as e:
             logger.error(f"Error checking filled orders: {e}")
 
+    def _on_execution_report(self, event):
+        """Callback for the execution report feed (runs on the feed thread)"""
+        if event.get('s') != self.symbol:
+            return
+        # Simpan fee dari event supaya get_order_status tidak perlu query myTrades
+        self.client.fill_resolver.index_execution_report(event)
+        # Hanya fill penuh yang memicu order pengganti; partial fill tetap menunggu
+        if event.get('X') == 'FILLED':
+            self.fill_events.put(event)
+
+    def process_fill_events(self, timeout=0):
+        """Handle pushed fills as they arrive, waiting up to timeout seconds
+
+        Returns:
+            int: Number of grid fills handled
+        """
+        handled = 0
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            try:
+                if remaining > 0:
+                    event = self.fill_events.get(timeout=remaining)
+                else:
+                    event = self.fill_events.get_nowait()
+            except queue.Empty:
+                return handled
+            
+            try:
+                if self._handle_filled_order(event['i']):
+                    handled += 1
+            except Exception as e:
+                logger.error(f"Error processing fill event for order {event.get('i')}: {e}")
+
+    def _handle_filled_order(self, order_id):
+        """Dispatch a filled order id to the buy or sell handler
+
+        Returns:
+            bool: True if the order belonged to the grid
+        """
+        for price, tracked_id in list(self.buy_orders.items()):
+            if tracked_id == order_id:
+                self._process_fill('BUY', price, order_id)
+                return True
+        for price, tracked_id in list(self.sell_orders.items()):
+            if tracked_id == order_id:
+                self._process_fill('SELL', price, order_id)
+                return True
+        # Sudah diproses oleh reconciler atau bukan order grid
+        return False
+
+    def _handle_buy_fill(self, price, order_id, counter_order_id=None):
+        """Place the counter sell order for a filled grid buy (or take over counter_order_id)"""
+        # Fill mengubah saldo, snapshot balance harus diambil ulang
+        self.client.invalidate_balance_cache()
+        
+        # Buy order was filled, place a sell order at the next price level
+        sell_price = price + self.grid_size
+        
+        # Record entry price for this position
+        self.entry_prices[price] = self.clock().timestamp()
+        
+        # Log the filled buy order - tanpa menambahkan profit pada BUY order
+        logger.info(f"Buy order at {price} filled. Setting up sell order at {sell_price}")
+        
+        if counter_order_id is not None:
+            # Order jual pengganti sudah terpasang sebelum bot mati, jangan pasang lagi
+            logger.info(f"Counter sell order {counter_order_id} at {sell_price} is already open")
+            order = {'orderId': counter_order_id}
+        else:
+            # Check investment limit before placing new order
+            if not self.risk_manager.check_investment_limit():
+                logger.warning("Investment limit reached. Not placing sell order.")
+                return
+            
+            # Place a new sell order at the next price level
+            order = self.client.place_limit_order(
+                symbol=self.symbol,
+                side="SELL",
+                quantity=self.quantity,
+                price=sell_price
+            )
+        
+        if order:
+            self.sell_orders[sell_price] = order['orderId']
+            
+            # Record the trade
+            trade = {
+                'time': self.clock().isoformat(),
+                'side': 'BUY',
+                'price': price,
+                'quantity': self.quantity,
+                'value': price * self.quantity,
+                'next_target': sell_price,
+                'potential_profit': 0,  # Profit potensial, belum direalisasikan
+                'order_id': order_id
+            }
+            self._record_trade(trade)
+            
+            # Log detailed transaction in analytics
+            self.analytics.log_transaction({
+                'time': self.clock().isoformat(),
+                'type': 'BUY',
+                'price': price,
+                'quantity': self.quantity,
+                'value': price * self.quantity,
+                'target_sell_price': sell_price,
+                'profit': 0,
+                'grid_level': list(self.grid_prices).index(price) if price in self.grid_prices else -1,
+                'market_conditions': {
+                    'current_price': self.last_price,
+                    'usdt_idr': self.client.get_usdt_idr_rate(),
+                    'grid_range': [self.lower_price, self.upper_price]
+                }
+            })
+            
+            # Save updated state
+            self._save_state()
+        
+        # Remove the filled buy order from our tracking
+        del self.buy_orders[price]
+
+    def _handle_sell_fill(self, price, order_id, counter_order_id=None):
+        """Book profit and place the counter buy order for a filled grid sell (or take over counter_order_id)"""
+        # Fill mengubah saldo, snapshot balance harus diambil ulang
+        self.client.invalidate_balance_cache()
+        
+        # Sell order was filled, place a buy order at the next price level
+        buy_price = price - self.grid_size
+        
+        # Dapatkan detail order yang terpenuhi untuk mendapatkan fee yang dibayarkan
+        order_details = self.client.get_order_status(order_id, self.symbol)
+        
+        # Hitung fee berdasarkan data order
+        fee_percentage = 0.1  # Default 0.1% fee Binance
+        fee_amount = 0
+        actual_filled_quantity = self.quantity
+        
+        if order_details and 'fills' in order_details:
+            # Akumulasi fee dari semua fills
+            for fill in order_details['fills']:
+                if fill['commissionAsset'] == 'USDT':
+                    fee_amount += float(fill['commission'])
+                elif fill['commissionAsset'] == self.symbol.replace('USDT', ''):
+                    # Jika fee dalam bentuk base asset (ADA), konversi ke USDT
+                    fee_amount += float(fill['commission']) * price
+            
+            # Catat actual executed quantity jika berbeda
+            if 'executedQty' in order_details:
+                actual_filled_quantity = float(order_details['executedQty'])
+        
+        # Hitung profit dengan memperhitungkan fee
+        gross_profit = (price - buy_price) * actual_filled_quantity
+        net_profit = gross_profit - fee_amount
+        self.total_profit += net_profit
+        
+        # Hitung profit percentage berdasarkan profit bersih
+        profit_percentage = (net_profit / (buy_price * actual_filled_quantity)) * 100
+        
+        # Detail perhitungan untuk logging
+        logger.info(f"[PROFIT DETAIL] Sell Price: {price}, Buy Price: {buy_price}, Quantity: {actual_filled_quantity}")
+        logger.info(f"[PROFIT CALCULATION] Gross: ({price} - {buy_price}) * {actual_filled_quantity} = {gross_profit:.4f} USDT")
+        logger.info(f"[PROFIT CALCULATION] Fee: {fee_amount:.4f} USDT")
+        logger.info(f"[PROFIT CALCULATION] Net: {gross_profit:.4f} - {fee_amount:.4f} = {net_profit:.4f} USDT")
+        
+        # Log the filled sell order dengan profit bersih
+        logger.info(f"Sell order at {price} filled. Net Profit: {net_profit:.4f} USDT ({profit_percentage:.2f}%). Total profit: {self.total_profit:.4f} USDT")
+        
+        if counter_order_id is not None:
+            # Order beli pengganti sudah terpasang sebelum bot mati, jangan pasang lagi
+            logger.info(f"Counter buy order {counter_order_id} at {buy_price} is already open")
+            order = {'orderId': counter_order_id}
+        else:
+            # Check investment limit before placing new order
+            if not self.risk_manager.check_investment_limit():
+                logger.warning("Investment limit reached. Not placing buy order.")
+                return
+            
+            # Place a new buy order at the next price level
+            order = self.client.place_limit_order(
+                symbol=self.symbol,
+                side="BUY",
+                quantity=self.quantity,
+                price=buy_price
+            )
+        
+        if order:
+            self.buy_orders[buy_price] = order['orderId']
+            
+            # Record the trade dengan fee dan profit bersih
+            trade = {
+                'time': self.clock().isoformat(),
+                'side': 'SELL',
+                'price': price,
+                'quantity': actual_filled_quantity,
+                'value': price * actual_filled_quantity,
+                'next_target': buy_price,
+                'fee': fee_amount,
+                'gross_profit': gross_profit,
+                'actual_profit': net_profit,
+                'total_profit': self.total_profit,
+                'order_id': order_id
+            }
+            self._record_trade(trade)
+            
+            # Log detailed transaction in analytics dengan data fee
+            self.analytics.log_transaction({
+                'time': self.clock().isoformat(),
+                'type': 'SELL',
+                'price': price,
+                'quantity': actual_filled_quantity,
+                'value': price * actual_filled_quantity,
+                'buy_price': buy_price,
+                'profit': net_profit,
+                'gross_profit': gross_profit,
+                'fee': fee_amount,
+                'profit_percentage': profit_percentage,
+                'total_profit': self.total_profit,
+                'grid_level': list(self.grid_prices).index(price) if price in self.grid_prices else -1,
+                'market_conditions': {
+                    'current_price': self.last_price,
+                    'usdt_idr': self.client.get_usdt_idr_rate(),
+                    'grid_range': [self.lower_price, self.upper_price]
+                }
+            })
+            
+            # Save updated state
+            self._save_state()
+        
+        # Remove the filled sell order from our tracking
+        del self.sell_orders[price]
+        
+        # Remove corresponding entry price
+        if buy_price in self.entry_prices:
+            del self.entry_prices[buy_price]
+
     def _log_current_balance(self):
         """Log current account balance"""
         quote_asset = self.symbol[len(self.symbol)-4:]  # USDT for ADAUSDT
@@ -541,13 +840,15 @@ class GridTradingBot:
         
         # Log balance information
         logger.info(f"[BALANCE] {quote_asset}: {usdt_free:.4f} (Free) + {usdt_locked:.4f} (Locked) | {base_asset}: {ada_free:.4f} (Free) + {ada_locked:.4f} (Locked)")
+        cache_stats = self.client.get_balance_cache_stats()
+        logger.debug(f"[BALANCE] Snapshot cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['hit_rate']:.1f}%)")
         
         # Log to analytics with more details
         current_price = self.last_price or self.client.get_symbol_price(self.symbol)
         total_value_usdt = (ada_free + ada_locked) * (current_price or 0) + usdt_free + usdt_locked
         
         balance_data = {
-            'timestamp': datetime.datetime.now().isoformat(),
+            'timestamp': self.clock().isoformat(),
             'base_asset': base_asset,
             'quote_asset': quote_asset,
             'base_free': ada_free,
@@ -582,35 +883,39 @@ class GridTradingBot:
                 if self.risk_manager.monitor_market_volatility():
                     logger.warning("High market volatility detected during grid adjustment")
                 
-                # Cancel all existing orders
-                open_orders = self.client.get_open_orders(self.symbol)
-                if open_orders:
-                    for order in open_orders:
-                        self.client.cancel_order(order['orderId'], self.symbol)
-                    logger.info("Cancelled all existing orders for grid adjustment")
-                
-                # Reset order tracking
-                self.buy_orders = {}
-                self.sell_orders = {}
-                
-                # Set new grid around current price with 2% di kedua sisi
-                margin_percentage = 0.02
-                self.lower_price = current_price * (1 - margin_percentage)
-                self.upper_price = current_price * (1 + margin_percentage)
-                self.grid_size = (self.upper_price - self.lower_price) / self.grid_number
-                self.grid_prices = self._calculate_grid_prices()
-                
-                # Hitung dan log level-level grid yang dibuat
-                grid_levels_str = ", ".join([f"{price:.4f}" for price in self.grid_prices])
-                logger.info(f"Grid levels adjusted to: {grid_levels_str}")
-                
-                logger.info(f"New grid range: {self.lower_price:.4f} - {self.upper_price:.4f}")
+                # Set new grid around current price (default 2% di kedua sisi)
+                margin_percentage = self.recenter_margin
                 
-                # Set up new grid
-                self.setup_grid()
+                # Geser grid lama per langkah grid jika spasinya masih sesuai,
+                # sehingga order di level yang tetap tidak perlu dibatalkan
+                if not self._recenter_grid_incremental(current_price, margin_percentage):
+                    # Cancel all existing orders
+                    cancel_result = self.client.cancel_all_orders(self.symbol)
+                    if cancel_result['cancelled']:
+                        logger.info(f"Cancelled all existing orders for grid adjustment ({len(cancel_result['cancelled'])})")
+                    if cancel_result['failed']:
+                        logger.warning(f"Failed to cancel orders: {cancel_result['failed']}")
+                    
+                    # Reset order tracking
+                    self.buy_orders = {}
+                    self.sell_orders = {}
+                    
+                    self.lower_price = current_price * (1 - margin_percentage)
+                    self.upper_price = current_price * (1 + margin_percentage)
+                    self.grid_size = (self.upper_price - self.lower_price) / self.grid_number
+                    self.grid_prices = self._calculate_grid_prices()
+                    
+                    # Hitung dan log level-level grid yang dibuat
+                    grid_levels_str = ", ".join([f"{price:.4f}" for price in self.grid_prices])
+                    logger.info(f"Grid levels adjusted to: {grid_levels_str}")
+                    
+                    logger.info(f"New grid range: {self.lower_price:.4f} - {self.upper_price:.4f}")
+                    
+                    # Set up new grid
+                    self.setup_grid()
                 
                 # Update last grid adjustment time
-                self.last_grid_adjustment = datetime.datetime.now()
+                self.last_grid_adjustment = self.clock()
                 
             # Log current grid status
             logger.info(f"Current grid status: {len(self.buy_orders)} buy orders, {len(self.sell_orders)} sell orders")
@@ -619,6 +924,184 @@ class GridTradingBot:
         except Exception as e:
             logger.error(f"Error adjusting grid: {e}")
 
+    def _recenter_grid_incremental(self, current_price, margin_percentage):
+        """Re-center the grid by moving only the levels that change
+
+        The grid is shifted by whole grid steps, so surviving levels keep their
+        exact price and their orders (and queue priority). Only orders on levels
+        that leave the grid are cancelled and only new levels are placed.
+
+        Returns:
+            bool: False if a full rebuild is needed instead
+        """
+        target_lower = current_price * (1 - margin_percentage)
+        target_size = (current_price * (1 + margin_percentage) - target_lower) / self.grid_number
+        
+        # Spasi grid lama terlalu jauh dari spasi yang diinginkan: bangun ulang penuh
+        max_drift = getattr(config, 'GRID_RECENTER_MAX_SPACING_DRIFT', 0.25)
+        if not self.grid_size or abs(self.grid_size - target_size) / target_size > max_drift:
+            return False
+        if not self.buy_orders and not self.sell_orders:
+            return False
+        
+        new_lower, new_upper, steps = align_grid(self.lower_price, self.grid_size, self.grid_number, target_lower)
+        if steps == 0:
+            return True
+        
+        self.lower_price = new_lower
+        self.upper_price = new_upper
+        self.grid_prices = self._calculate_grid_prices()
+        
+        # Referensi stop loss ikut grid baru, sama seperti setup_grid (disimpan lewat _save_state di bawah)
+        self.initial_price = current_price
+        
+        rules = self.client.get_symbol_rules(self.symbol)
+        tolerance = float(rules.tick_size) if rules and rules.tick_size else 10 ** -getattr(config, 'PRICE_PRECISION', 4)
+        diff = diff_grid(self.buy_orders, self.sell_orders, self.grid_prices, current_price, tolerance)
+        
+        logger.info(f"Shifting grid {steps:+d} levels to {self.lower_price:.4f} - {self.upper_price:.4f}: "
+                    f"keeping {len(diff['keep_buys']) + len(diff['keep_sells'])} orders, "
+                    f"cancelling {len(diff['cancel'])}, placing {len(diff['place'])}")
+        
+        # Batalkan order di level yang keluar dari grid
+        for side, price, order_id in diff['cancel']:
+            if self.client.cancel_order(order_id, self.symbol):
+                orders = self.buy_orders if side == 'BUY' else self.sell_orders
+                orders.pop(price, None)
+            else:
+                # Kemungkinan sudah terisi; tetap dilacak agar rekonsiliasi memprosesnya
+                logger.warning(f"Could not cancel {side} order {order_id} at {price:.4f}, keeping it tracked")
+        
+        # Pasang order hanya untuk level baru
+        levels = [{'side': side, 'price': price, 'quantity': self.quantity} for side, price in diff['place']]
+        report = GridOrderPlacer(self.client).place(self.symbol, levels)
+        for result in report['results']:
+            if not result['order']:
+                continue
+            if result['side'] == 'BUY':
+                self.buy_orders[result['price']] = result['order']['orderId']
+            else:
+                self.sell_orders[result['price']] = result['order']['orderId']
+        if report['failed']:
+            logger.warning(f"{len(report['failed'])} new grid levels failed: " + ", ".join(f"{r['side']} {r['price']:.4f}" for r in report['failed']))
+        
+        self._save_state()
+        return True
+
+    def _restore_grid_from_state(self):
+        """Reconcile the persisted order map against the exchange after a restart
+
+        Tracked orders that are still open are adopted without cancellation.
+        Orders that filled while the bot was down are processed (exactly once,
+        through the processed-fill set); cancelled or expired ones are dropped.
+        Untracked open orders sitting on a grid level are adopted as well, which
+        covers a counter order placed just before a crash: an offline fill whose
+        counter level already holds an open order of the opposite side takes
+        that order over instead of placing a second one.
+
+        Returns:
+            bool: True if the grid was restored, False if a fresh setup is needed
+        """
+        state = self._restored_state
+        self._restored_state = None
+        if not state:
+            return False
+        
+        open_orders = self.client.get_open_orders(self.symbol)
+        if open_orders is None:
+            logger.warning("Cannot fetch open orders, rebuilding grid instead of restoring it")
+            return False
+        open_by_id = {order['orderId']: order for order in open_orders}
+        
+        # Kembalikan parameter grid supaya harga order cocok dengan level grid
+        price_range = state.get('price_range')
+        if price_range and len(price_range) == 2:
+            self.lower_price, self.upper_price = price_range
+        self.grid_number = state.get('grid_number', self.grid_number)
+        self.grid_size = state.get('grid_size') or (self.upper_price - self.lower_price) / self.grid_number
+        self.quantity = state.get('quantity', self.quantity)
+        self.initial_price = state.get('initial_price') or self.client.get_symbol_price(self.symbol)
+        self.grid_prices = self._calculate_grid_prices()
+        self.entry_prices = {float(price): ts for price, ts in state.get('entry_prices', [])}
+        
+        self.buy_orders = {}
+        self.sell_orders = {}
+        offline_fills = []
+        adopted = 0
+        for side, pairs in (('BUY', state.get('buy_orders', [])), ('SELL', state.get('sell_orders', []))):
+            orders = self.buy_orders if side == 'BUY' else self.sell_orders
+            for price, order_id in pairs:
+                price = float(price)
+                if order_id in open_by_id:
+                    orders[price] = order_id
+                    adopted += 1
+                    continue
+                # Tidak lagi terbuka: cek apakah terisi atau dibatalkan saat bot mati
+                status = self.client.get_order_status(order_id, self.symbol)
+                if status is None:
+                    logger.warning(f"Cannot get status of {side} order {order_id}, leaving it to the reconciler")
+                    orders[price] = order_id
+                elif status['status'] == 'FILLED':
+                    orders[price] = order_id
+                    offline_fills.append((side, price, order_id))
+                elif status['status'] in ('NEW', 'PARTIALLY_FILLED'):
+                    orders[price] = order_id
+                    adopted += 1
+                else:
+                    logger.info(f"{side} order {order_id} at {price} was {status['status']} while offline, dropping it")
+        
+        # Order terbuka yang tidak tercatat tetapi berada tepat di level grid
+        rules = self.client.get_symbol_rules(self.symbol)
+        tolerance = float(rules.tick_size) if rules and rules.tick_size else 10 ** -getattr(config, 'PRICE_PRECISION', 4)
+        tracked_ids = set(self.buy_orders.values()) | set(self.sell_orders.values())
+        for order_id, order in open_by_id.items():
+            if order_id in tracked_ids:
+                continue
+            order_price = float(order['price'])
+            level = next((float(p) for p in self.grid_prices if abs(float(p) - order_price) <= tolerance), None)
+            orders = self.buy_orders if order['side'] == 'BUY' else self.sell_orders
+            if level is not None and level not in orders:
+                orders[level] = order_id
+                adopted += 1
+                logger.info(f"Adopted untracked {order['side']} order {order_id} at grid level {level:.4f}")
+        
+        logger.info(f"Restored grid {self.lower_price:.4f} - {self.upper_price:.4f}: adopted {adopted} open orders, "
+                    f"{len(offline_fills)} fills while offline")
+        
+        # Proses fill yang terjadi saat bot mati, masing-masing tepat sekali
+        sells = [order_id for side, _, order_id in offline_fills if side == 'SELL']
+        if len(sells) > 1:
+            self.client.prefetch_order_fills(sells, self.symbol)
+        for side, price, order_id in offline_fills:
+            counter_side_orders = self.sell_orders if side == 'BUY' else self.buy_orders
+            counter_price = price + self.grid_size if side == 'BUY' else price - self.grid_size
+            counter_level = next((level for level in counter_side_orders if abs(level - counter_price) <= tolerance), None)
+            counter_order_id = None
+            if (order_id not in self.processed_fills and counter_level is not None
+                    and counter_side_orders[counter_level] in open_by_id):
+                # Handler mencatatnya lagi di harga counter_price
+                counter_order_id = counter_side_orders.pop(counter_level)
+            self._process_fill(side, price, order_id, counter_order_id)
+        
+        if not self.buy_orders and not self.sell_orders:
+            logger.info("No grid orders left after reconciliation, setting up a new grid")
+            return False
+        
+        self._save_state()
+        return True
+
+    def _start_execution_feed(self):
+        """Start the execution report feed; polling stays as fallback if it fails"""
+        try:
+            self.execution_feed = create_execution_feed()
+            if self.execution_feed is None:
+                logger.info("Execution report feed disabled. Using polling for fill detection.")
+                return
+            self.execution_feed.start(self._on_execution_report)
+        except Exception as e:
+            logger.error(f"Failed to start execution report feed, using polling: {e}")
+            self.execution_feed = None
+
     def run(self):
         """Run the grid trading bot"""
         logger.info("Starting grid trading bot...")
@@ -629,8 +1112,9 @@ class GridTradingBot:
         except Exception as e:
             logger.error(f"Error generating daily report: {e}")
         
-        # Cek dan verifikasi nilai profit
-        recalculated_profit = self.recalculate_profit_from_trades()
+        # Cek nilai profit terhadap agregat metrik (tanpa menghitung ulang semua trade;
+        # hitung ulang penuh lewat 'python run.py audit')
+        recalculated_profit = self.metrics.all_time()['profit']
         if abs(recalculated_profit - self.total_profit) > 0.01:
             logger.warning(f"Perbedaan profit terdeteksi! Nilai lama: {self.total_profit:.4f}, Nilai seharusnya: {recalculated_profit:.4f}")
             logger.warning("Untuk menghindari masalah perhitungan, profit direkalkulasi. Nilai lama diabaikan.")
@@ -638,30 +1122,45 @@ class GridTradingBot:
             self._save_state()
             logger.info(f"Total profit diperbarui menjadi: {self.total_profit:.4f} USDT")
         
-        # Set up the initial grid
-        if not self.setup_grid():
-            logger.error("Failed to set up grid. Exiting.")
-            return
+        # Adopt the orders that survived the restart, otherwise set up the initial grid
+        if not self._restore_grid_from_state():
+            if not self.setup_grid():
+                logger.error("Failed to set up grid. Exiting.")
+                return
+        
+        # Start push-based fill detection
+        self._start_execution_feed()
+        poll_interval = getattr(config, 'POLL_INTERVAL', 10)
+        reconcile_interval = getattr(config, 'RECONCILE_INTERVAL', 120)
+        last_reconcile = 0
         
         try:
             # Track last daily report time
-            last_daily_report = datetime.datetime.now().date()
+            last_daily_report = self.clock().date()
             
             # Main bot loop
             while True:
                 try:
-                    # Check for filled orders
-                    self.check_filled_orders()
+                    # Fills normally arrive through the execution feed; the full
+                    # open-order diff only runs as a fallback reconciler
+                    stream_active = self.execution_feed is not None and self.execution_feed.connected
+                    reconcile = not stream_active or time.time() - last_reconcile >= reconcile_interval
+                    self.check_filled_orders(reconcile=reconcile)
+                    if reconcile:
+                        last_reconcile = time.time()
+                    self._publish_snapshot()
                     
-                    # Check if we need to adjust the grid (every 15 minutes)
-                    now = datetime.datetime.now()
-                    if (now - self.last_grid_adjustment).total_seconds() > 900:  # 15 minutes
+                    # Check if we need to adjust the grid (default every 15 minutes)
+                    now = self.clock()
+                    # GRID_ADJUST_INTERVAL = 0: grid tidak pernah di-re-center
+                    if self.grid_adjust_interval > 0 and (now - self.last_grid_adjustment).total_seconds() > self.grid_adjust_interval:
                         self.adjust_grid()
                         self.last_grid_adjustment = now
                     
                     # Log current balance occasionally (every hour)
                     if not hasattr(self, 'last_balance_log') or (now - self.last_balance_log).total_seconds() > 3600:
-                        self._log_current_balance()
+                        with request_priority(PRIORITY_LOW):
+                            self._log_current_balance()
                         self.last_balance_log = now
                     
                     # Generate daily report at new day
@@ -678,16 +1177,33 @@ class GridTradingBot:
                         self._save_state()
                         self.last_state_save = now
                     
-                    # Sleep to avoid API rate limits
-                    time.sleep(10)
+                    # Perlambat polling saat budget request weight hampir habis
+                    budget = self.client.get_rate_budget()
+                    wait_interval = poll_interval * 3 if budget['utilization'] > 0.8 else poll_interval
+                    
+                    # Wait for pushed fills instead of sleeping blindly
+                    if self.process_fill_events(timeout=wait_interval):
+                        self._publish_snapshot()
                     
                 except Exception as e:
                     logger.error(f"Error in bot main loop: {e}")
                     time.sleep(30)  # Sleep longer on error
         finally:
+            if self.execution_feed is not None:
+                self.execution_feed.stop()
+            
+            # Snapshot penuh saat berhenti agar startup berikutnya tidak perlu replay panjang
+            self._save_state(snapshot=True)
+            self.state_journal.close()
+            
+            # Tulis sisa antrian analytics sebelum keluar
+            self.analytics.flush()
+            
             # Hapus instance referensi ketika bot berhenti
             if GridTradingBot.instance == self:
                 GridTradingBot.instance = None
+                get_snapshot_store().clear()
+                clear_snapshot()
             
             # Log final performance metrics
             try:
@@ -702,72 +1218,29 @@ class GridTradingBot:
             logger.info(f"Grid trading bot stopped. Total profit: {self.total_profit:.4f} USDT")
 
     def recalculate_profit_from_trades(self):
-        """Menghitung ulang total profit dari riwayat transaksi"""
+        """Menghitung ulang total profit dari seluruh riwayat transaksi (audit penuh)"""
         try:
-            total_profit = 0
-            trades_analyzed = 0
-            sell_count = 0
-            buy_count = 0
-            total_fee = 0
-            
-            logger.info("Menghitung ulang profit dari riwayat transaksi...")
-            
-            for trade in self.trades:
-                # Hanya hitung profit dari transaksi SELL yang memiliki data profit
-                if trade.get('side') == 'SELL' or trade.get('type') == 'SELL':
-                    sell_count += 1
-                    
-                    # Cek ada fee dalam trade
-                    fee = 0
-                    if 'fee' in trade:
-                        fee = trade['fee']
-                        total_fee += fee
-                    
-                    # Coba ambil profit bersih (setelah fee) jika tersedia
-                    if 'actual_profit' in trade:
-                        # Dalam format baru actual_profit sudah memperhitungkan fee
-                        profit = trade['actual_profit']
-                        total_profit += profit
-                        trades_analyzed += 1
-                    elif 'gross_profit' in trade and 'fee' in trade:
-                        # Jika ada gross_profit dan fee, hitung profit bersih
-                        profit = trade['gross_profit'] - trade['fee']
-                        total_profit += profit
-                        trades_analyzed += 1
-                    elif 'profit' in trade and trade['profit'] > 0:
-                        # Untuk riwayat transaksi lama tanpa fee, coba ambil nilai profit
-                        profit = trade['profit']
-                        # Estimasi fee sebagai 0.1% dari nilai transaksi (default Binance)
-                        estimated_fee = 0
-                        if 'value' in trade:
-                            estimated_fee = trade['value'] * 0.001
-                            total_fee += estimated_fee
-                            
-                        # Kurangi estimasi fee dari profit
-                        adjusted_profit = profit - estimated_fee
-                        total_profit += adjusted_profit
-                        trades_analyzed += 1
-                        
-                        # Log penyesuaian yang dilakukan
-                        logger.info(f"Adjusted old trade record: Original profit: {profit:.4f}, Estimated fee: {estimated_fee:.4f}, Adjusted profit: {adjusted_profit:.4f}")
-                        
-                elif trade.get('side') == 'BUY' or trade.get('type') == 'BUY':
-                    buy_count += 1
-            
-            logger.info(f"Analisis selesai: {trades_analyzed} transaksi profit ditemukan dari {sell_count} transaksi SELL dan {buy_count} transaksi BUY")
-            logger.info(f"Total fee yang diakumulasi: {total_fee:.4f} USDT")
-            logger.info(f"Total profit dari analisis: {total_profit:.4f} USDT (sebelumnya: {self.total_profit:.4f} USDT)")
-            
-            if abs(total_profit - self.total_profit) > 0.01:
-                logger.warning(f"Perbedaan signifikan dalam perhitungan profit: {abs(total_profit - self.total_profit):.4f} USDT")
-                logger.warning(f"Profit lama: {self.total_profit:.4f} USDT, Profit setelah penyesuaian fee: {total_profit:.4f} USDT")
-            
-            return total_profit
-            
+            return self.audit_metrics()['recalculated']['profit']
         except Exception as e:
             logger.error(f"Error menghitung ulang profit: {e}")
             return self.total_profit
 
+    def audit_metrics(self):
+        """
+        Recalculate all metrics from the full trade history and verify the running aggregates
+
+        Returns:
+            dict: Audit report from metrics_engine.audit
+        """
+        logger.info(f"Auditing metrics over {len(self.trades)} trades...")
+        report = audit(self.trades, self.metrics, self.total_profit)
+        if report['ok']:
+            logger.info(f"Metrics audit OK: profit {report['recalculated']['profit']:.4f} USDT from {report['trades']} trades")
+        else:
+            for difference in report['differences'][:20]:
+                logger.warning(f"Metrics audit mismatch {difference['field']}: expected {difference['expected']}, got {difference['actual']}")
+        return report
+
 if __name__ == "__main__":
     bot = GridTradingBot()
     bot.run() 
\ No newline at end of file
@@ -0,0 +1,88 @@
+import logging
+import bisect
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def align_grid(lower_price, grid_size, grid_number, target_lower):
+    """
+    Shift a grid by a whole number of steps so it starts as close as possible
+    to target_lower. Levels that exist in both grids then have identical
+    prices, so their orders can be kept.
+
+    Args:
+        lower_price (float): Current lower bound
+        grid_size (float): Distance between levels
+        grid_number (int): Number of grid intervals
+        target_lower (float): Desired new lower bound
+
+    Returns:
+        tuple: (new_lower, new_upper, steps shifted)
+    """
+    steps = int(round((target_lower - lower_price) / grid_size))
+    new_lower = lower_price + steps * grid_size
+    return new_lower, new_lower + grid_number * grid_size, steps
+
+def _match_side(old_orders, new_prices, tolerance):
+    """
+    Pair existing orders with new levels of the same side
+
+    Args:
+        old_orders (dict): Key: price, Value: order_id
+        new_prices (list): New level prices for this side
+        tolerance (float): Max price difference for an order to be kept
+
+    Returns:
+        tuple: (kept {old_price: order_id}, to_cancel [(price, order_id)], to_place [price])
+    """
+    old_prices = sorted(old_orders)
+    used = set()
+    kept = {}
+    to_place = []
+    for price in sorted(new_prices):
+        # Order lama terdekat yang belum dipakai, dalam toleransi tick
+        i = bisect.bisect_left(old_prices, price - tolerance)
+        match = None
+        while i < len(old_prices) and old_prices[i] <= price + tolerance:
+            if i not in used and (match is None or abs(old_prices[i] - price) < abs(old_prices[match] - price)):
+                match = i
+            i += 1
+        if match is None:
+            to_place.append(price)
+        else:
+            used.add(match)
+            kept[old_prices[match]] = old_orders[old_prices[match]]
+    to_cancel = [(old_prices[i], old_orders[old_prices[i]]) for i in range(len(old_prices)) if i not in used]
+    return kept, to_cancel, to_place
+
+def diff_grid(buy_orders, sell_orders, new_prices, current_price, tolerance):
+    """
+    Compute the minimal set of changes to move from the current orders to a new grid
+
+    Levels below current_price want a BUY, levels above want a SELL. An
+    existing order is kept when a new level of the same side lies within
+    tolerance of its price; everything else is cancelled or placed.
+
+    Args:
+        buy_orders (dict): Current buy orders, Key: price, Value: order_id
+        sell_orders (dict): Current sell orders, Key: price, Value: order_id
+        new_prices (iterable): Price levels of the new grid
+        current_price (float): Current market price
+        tolerance (float): Price tolerance, normally one tick
+
+    Returns:
+        dict: 'keep_buys', 'keep_sells' ({price: order_id}),
+              'cancel' ([(side, price, order_id)]), 'place' ([(side, price)])
+    """
+    new_buys = [float(p) for p in new_prices if p < current_price]
+    new_sells = [float(p) for p in new_prices if p > current_price]
+
+    keep_buys, cancel_buys, place_buys = _match_side(buy_orders, new_buys, tolerance)
+    keep_sells, cancel_sells, place_sells = _match_side(sell_orders, new_sells, tolerance)
+
+    return {
+        'keep_buys': keep_buys,
+        'keep_sells': keep_sells,
+        'cancel': [('BUY', p, oid) for p, oid in cancel_buys] + [('SELL', p, oid) for p, oid in cancel_sells],
+        'place': [('BUY', p) for p in place_buys] + [('SELL', p) for p in place_sells]
+    }
@@ -0,0 +1,248 @@
+import json
+import logging
+import os
+import re
+import threading
+import config
+from state_journal import atomic_write_json
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TRADE_MARKERS = ("TRADE FILLED", "Order filled", "Buy order at", "Sell order at")
+HEAD_BYTES = 64               # Awal file untuk mendeteksi log yang ditulis ulang (copytruncate)
+READ_CHUNK = 4 * 1024 * 1024  # Byte per baca saat mengejar log besar
+INDEX_SAVE_BYTES = 1024 * 1024  # Offset tanpa trade baru disimpan paling sering tiap 1 MB log
+
+_PRICE_RE = re.compile(r'at\s+(\d+\.\d+)')
+_QUANTITY_RE = re.compile(r'(\d+\.?\d*)\s+' + re.escape(config.SYMBOL[:-4]))
+_PROFIT_RE = re.compile(r'[Pp]rofit:\s+(\-?\d+\.?\d*)')
+
+def parse_trade_line(line):
+    """
+    Parse one bot.log line into a trade
+
+    Accepts the '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format of run.py/grid_bot.py as well as the older 'time - message' one.
+
+    Returns:
+        dict: time, side, type, price, quantity, value and profit, or None if the line is no trade
+    """
+    if not any(marker in line for marker in TRADE_MARKERS):
+        return None
+    parts = line.rstrip('\r\n').split(" - ")
+    if len(parts) < 2:
+        return None
+    timestamp = parts[0].strip()
+    message = " - ".join(parts[3:]) if len(parts) >= 4 else parts[1]
+
+    if "BUY" in message or "Buy order at" in message:
+        side = "BUY"
+    elif "SELL" in message or "Sell order at" in message:
+        side = "SELL"
+    else:
+        return None
+
+    price_match = _PRICE_RE.search(message)
+    if not price_match:
+        return None
+    price = float(price_match.group(1))
+
+    # Contoh: "Order filled: BUY 13.0 ADA at 0.7850"
+    quantity_match = _QUANTITY_RE.search(message)
+    quantity = float(quantity_match.group(1)) if quantity_match else config.QUANTITY
+
+    # "Net Profit: 0.0123 USDT", baru "Total profit: ..." jika tidak ada
+    profit_match = _PROFIT_RE.search(message)
+    profit = float(profit_match.group(1)) if profit_match else 0.0
+
+    return {
+        "time": timestamp,
+        "side": side,
+        "type": side,  # Untuk kompatibilitas dengan format lama
+        "price": price,
+        "quantity": quantity,
+        "value": price * quantity,
+        "profit": profit
+    }
+
+def trade_lines(text):
+    """
+    Lines of text containing a trade marker, in order
+
+    Searches the whole block for each marker instead of testing every line,
+    since only a few percent of bot.log lines are trades.
+    """
+    starts = set()
+    for marker in TRADE_MARKERS:
+        i = text.find(marker)
+        while i != -1:
+            starts.add(text.rfind('\n', 0, i) + 1)
+            i = text.find(marker, i + len(marker))
+    lines = []
+    for start in sorted(starts):
+        end = text.find('\n', start)
+        lines.append(text[start:] if end == -1 else text[start:end])
+    return lines
+
+class LogTradeIndex:
+    """
+    Tail-following trade parser for bot.log with a parsed-trade index on disk.
+
+    Remembers the byte offset, inode and first bytes of the log, so each
+    update() only reads bytes appended since the previous call. A new inode
+    (rotation) or a shrunk or rewritten file (truncation) restarts at offset
+    0; trades parsed from the old file stay in the index. Trades are kept in
+    <index>.jsonl and the offset in <index>.json, so a restart resumes where
+    the previous process stopped instead of re-reading the whole log.
+    """
+
+    def __init__(self, log_path='bot.log', index_path=None):
+        """
+        Args:
+            log_path (str): Log file to follow
+            index_path (str): Index base path without extension, default
+                trading_logs/<LOG_TRADE_INDEX_FILE> next to the log
+        """
+        self.log_path = log_path
+        if index_path is None:
+            index_path = os.path.join(os.path.dirname(os.path.abspath(log_path)), 'trading_logs',
+                                      getattr(config, 'LOG_TRADE_INDEX_FILE', 'log_trade_index'))
+        self.meta_path = f"{index_path}.json"
+        self.trades_path = f"{index_path}.jsonl"
+        self._lock = threading.Lock()
+        self._trades = []
+        self._inode = None
+        self._offset = 0
+        self._head = b''
+        self._saved_offset = 0
+        self._saved_trades = 0  # Trade yang sudah ada di .jsonl
+        self.stats = {'updates': 0, 'bytes_read': 0, 'lines': 0, 'rotations': 0}
+        self._load_index()
+
+    def _load_index(self):
+        """Restore trades and position from disk; trades written after the last meta save are dropped"""
+        try:
+            with open(self.meta_path, 'r') as f:
+                meta = json.load(f)
+            with open(self.trades_path, 'rb') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error(f"Failed to load log trade index {self.meta_path}, rebuilding: {e}")
+            return
+
+        count = meta.get('trades', 0)
+        if len(lines) < count:
+            logger.warning(f"Log trade index {self.trades_path} is incomplete, rebuilding")
+            return
+        if len(lines) > count:
+            # Crash di antara append trade dan simpan meta
+            with open(self.trades_path, 'wb') as f:
+                f.write(b''.join(line + b'\n' for line in lines[:count]))
+        self._trades = [json.loads(line) for line in lines[:count]]
+        self._saved_trades = count
+        self._inode = meta.get('inode')
+        self._offset = self._saved_offset = meta.get('offset', 0)
+        self._head = bytes.fromhex(meta.get('head', ''))
+
+    def _save_index(self):
+        """Append unsaved trades, then record the position that covers them"""
+        os.makedirs(os.path.dirname(self.meta_path) or '.', exist_ok=True)
+        # Index baru (atau dibangun ulang) menimpa .jsonl lama
+        with open(self.trades_path, 'ab' if self._saved_trades else 'wb') as f:
+            f.write(b''.join(json.dumps(trade).encode() + b'\n' for trade in self._trades[self._saved_trades:]))
+        self._saved_trades = len(self._trades)
+        atomic_write_json(self.meta_path, {
+            'log': os.path.abspath(self.log_path),
+            'inode': self._inode,
+            'offset': self._offset,
+            'head': self._head.hex(),
+            'trades': len(self._trades)
+        })
+        self._saved_offset = self._offset
+
+    def _restart(self, reason):
+        logger.info(f"{self.log_path} {reason}, following it from the start")
+        self.stats['rotations'] += 1
+        self._offset = 0
+        self._head = b''
+
+    def update(self):
+        """
+        Parse the bytes appended to the log since the previous call
+
+        Returns:
+            int: Number of new trades
+        """
+        with self._lock:
+            try:
+                st = os.stat(self.log_path)
+            except FileNotFoundError:
+                return 0
+            self.stats['updates'] += 1
+
+            inode = f"{st.st_dev}:{st.st_ino}"
+            if self._inode is not None and inode != self._inode:
+                self._restart("rotated")
+            elif st.st_size < self._offset:
+                self._restart("truncated")
+            self._inode = inode
+            if st.st_size == self._offset:
+                return 0
+
+            new_trades = []
+            with open(self.log_path, 'rb') as f:
+                head = f.read(HEAD_BYTES)
+                if self._offset and not head.startswith(self._head):
+                    self._restart("rewritten")
+                self._head = head
+
+                f.seek(self._offset)
+                pending = b''
+                while True:
+                    chunk = f.read(READ_CHUNK)
+                    if not chunk:
+                        break
+                    self.stats['bytes_read'] += len(chunk)
+                    data = pending + chunk
+                    # Baris terakhir yang belum lengkap dibaca lagi pada panggilan berikutnya
+                    end = data.rfind(b'\n') + 1
+                    pending = data[end:]
+                    self._offset += end
+                    text = data[:end].decode('utf-8', errors='replace')
+                    self.stats['lines'] += text.count('\n')
+                    for line in trade_lines(text):
+                        try:
+                            trade = parse_trade_line(line)
+                        except Exception as e:
+                            logger.debug(f"Failed to parse trade from log line: {e}")
+                            continue
+                        if trade:
+                            new_trades.append(trade)
+
+            self._trades.extend(new_trades)
+            if new_trades or self._offset - self._saved_offset >= INDEX_SAVE_BYTES or self._offset < self._saved_offset:
+                try:
+                    self._save_index()
+                except Exception as e:
+                    logger.error(f"Failed to save log trade index {self.meta_path}: {e}")
+            return len(new_trades)
+
+    def trades(self):
+        """All trades parsed from the log so far, after reading newly appended bytes"""
+        self.update()
+        with self._lock:
+            return list(self._trades)
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_log_trade_index(log_path='bot.log'):
+    """Shared LogTradeIndex for a log file"""
+    key = os.path.abspath(log_path)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = LogTradeIndex(log_path)
+        return _indexes[key]
@@ -0,0 +1,249 @@
+import datetime
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+ESTIMATED_FEE_RATE = 0.001  # Fee default Binance untuk trade lama tanpa data fee
+
+def trade_side(trade):
+    return trade.get('side') or trade.get('type')
+
+def trade_profit(trade):
+    """
+    Net profit of a bot trade record (grid_state trades)
+
+    SELL trades use actual_profit, else gross_profit - fee; old records with
+    only 'profit' get an estimated 0.1% fee deducted. BUY trades have no profit.
+    """
+    if trade_side(trade) != 'SELL':
+        return 0.0
+    if 'actual_profit' in trade:
+        return trade['actual_profit']
+    if 'gross_profit' in trade and 'fee' in trade:
+        return trade['gross_profit'] - trade['fee']
+    if trade.get('profit', 0) > 0:
+        return trade['profit'] - trade.get('value', 0) * ESTIMATED_FEE_RATE
+    return 0.0
+
+def transaction_profit(transaction):
+    """Profit of an analytics transaction record (already net of fees)"""
+    if trade_side(transaction) != 'SELL':
+        return 0.0
+    return transaction.get('profit', 0) or 0.0
+
+def _trade_fee(trade):
+    if 'fee' in trade:
+        return trade['fee']
+    if trade_side(trade) == 'SELL' and 'actual_profit' not in trade and trade.get('profit', 0) > 0:
+        return trade.get('value', 0) * ESTIMATED_FEE_RATE
+    return 0.0
+
+def _empty_aggregate():
+    return {
+        'trades': 0, 'buys': 0, 'sells': 0,
+        'volume': 0.0, 'profit': 0.0, 'fees': 0.0,
+        'wins': 0, 'losses': 0,
+        'largest_profit': 0.0, 'largest_loss': 0.0
+    }
+
+def _add(aggregate, side, volume, profit, fee):
+    aggregate['trades'] += 1
+    aggregate['volume'] += volume
+    aggregate['fees'] += fee
+    if side == 'BUY':
+        aggregate['buys'] += 1
+    elif side == 'SELL':
+        aggregate['sells'] += 1
+        aggregate['profit'] += profit
+        if profit > 0:
+            aggregate['wins'] += 1
+            aggregate['largest_profit'] = max(aggregate['largest_profit'], profit)
+        elif profit < 0:
+            aggregate['losses'] += 1
+            aggregate['largest_loss'] = min(aggregate['largest_loss'], profit)
+
+def _with_rates(aggregate):
+    """Copy of an aggregate with derived win rate and average profit"""
+    result = dict(aggregate)
+    closed = aggregate['wins'] + aggregate['losses']
+    result['win_rate'] = aggregate['wins'] / closed * 100 if closed else 0
+    result['avg_profit_per_sell'] = aggregate['profit'] / aggregate['sells'] if aggregate['sells'] else 0
+    return result
+
+def day_key(trade):
+    ts = str(trade.get('time') or trade.get('timestamp') or '')
+    return ts[:10] if len(ts) >= 10 else 'unknown'
+
+def week_key(day):
+    """ISO week of a YYYY-MM-DD date, e.g. 2025-W24"""
+    try:
+        year, week, _ = datetime.date.fromisoformat(day).isocalendar()
+        return f"{year}-W{week:02d}"
+    except ValueError:
+        return 'unknown'
+
+def level_key(price):
+    return f"{float(price):.8g}"
+
+class MetricsEngine:
+    """
+    Running performance aggregates, updated per trade.
+
+    Totals, per day, per ISO week, per grid level (fill price) and per side
+    are kept as counters, so summaries are dictionary lookups instead of a
+    scan of the trade history. The engine is checkpointed together with the
+    trade list (to_dict / from_dict); 'applied' is the number of trades
+    already counted, so after a restart only newer trades are applied.
+    audit() recomputes everything from scratch to verify the aggregates.
+    """
+
+    def __init__(self, profit_fn=trade_profit):
+        """
+        Args:
+            profit_fn: Function returning the net profit of a trade record
+        """
+        self.profit_fn = profit_fn
+        self.applied = 0
+        self.totals = _empty_aggregate()
+        self.days = {}
+        self.weeks = {}
+        self.levels = {}
+        self.sides = {}
+
+    def apply(self, trade):
+        """Count one trade"""
+        side = trade_side(trade)
+        price = trade.get('price') or 0
+        volume = trade.get('value', price * (trade.get('quantity') or 0)) or 0
+        profit = self.profit_fn(trade)
+        fee = _trade_fee(trade)
+
+        day = day_key(trade)
+        buckets = [
+            self.totals,
+            self.days.setdefault(day, _empty_aggregate()),
+            self.weeks.setdefault(week_key(day), _empty_aggregate()),
+            self.sides.setdefault(side or 'UNKNOWN', _empty_aggregate())
+        ]
+        if price:
+            buckets.append(self.levels.setdefault(level_key(price), _empty_aggregate()))
+        for aggregate in buckets:
+            _add(aggregate, side, volume, profit, fee)
+        self.applied += 1
+
+    def apply_many(self, trades):
+        for trade in trades:
+            self.apply(trade)
+
+    def reset(self):
+        self.__init__(self.profit_fn)
+
+    def catch_up(self, trades):
+        """
+        Apply the trades after the checkpoint
+
+        Args:
+            trades (list): Full trade history the checkpoint was taken from
+
+        Returns:
+            int: Number of trades applied
+        """
+        if self.applied > len(trades):
+            # Riwayat lebih pendek dari checkpoint: checkpoint tidak cocok, hitung ulang
+            logger.warning(f"Metrics checkpoint covers {self.applied} trades but history has {len(trades)}; rebuilding")
+            self.reset()
+        new_trades = trades[self.applied:]
+        self.apply_many(new_trades)
+        return len(new_trades)
+
+    def all_time(self):
+        return _with_rates(self.totals)
+
+    def day(self, date=None):
+        """Aggregate of one day (datetime.date or YYYY-MM-DD, default today)"""
+        date = (date or datetime.date.today())
+        key = date if isinstance(date, str) else date.isoformat()
+        return _with_rates(self.days.get(key, _empty_aggregate()))
+
+    def week(self, date=None):
+        """Aggregate of the ISO week containing date (default this week)"""
+        date = (date or datetime.date.today())
+        key = week_key(date if isinstance(date, str) else date.isoformat())
+        return _with_rates(self.weeks.get(key, _empty_aggregate()))
+
+    def by_level(self):
+        return {level: _with_rates(agg) for level, agg in self.levels.items()}
+
+    def by_side(self):
+        return {side: _with_rates(agg) for side, agg in self.sides.items()}
+
+    def summary(self, date=None):
+        """Daily, weekly and all-time summaries"""
+        return {'day': self.day(date), 'week': self.week(date), 'all_time': self.all_time()}
+
+    def to_dict(self):
+        """Checkpoint of the aggregates (JSON-serializable)"""
+        return {
+            'version': CHECKPOINT_VERSION,
+            'applied': self.applied,
+            'totals': dict(self.totals),
+            'days': {k: dict(v) for k, v in self.days.items()},
+            'weeks': {k: dict(v) for k, v in self.weeks.items()},
+            'levels': {k: dict(v) for k, v in self.levels.items()},
+            'sides': {k: dict(v) for k, v in self.sides.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data, profit_fn=trade_profit):
+        """Restore a checkpoint; an unknown or missing checkpoint gives an empty engine"""
+        engine = cls(profit_fn)
+        if not data or data.get('version') != CHECKPOINT_VERSION:
+            return engine
+        engine.applied = data.get('applied', 0)
+        engine.totals = dict(_empty_aggregate(), **data.get('totals', {}))
+        for name in ('days', 'weeks', 'levels', 'sides'):
+            setattr(engine, name, {k: dict(_empty_aggregate(), **v) for k, v in data.get(name, {}).items()})
+        return engine
+
+def _compare(path, expected, actual, tolerance, differences):
+    """Collect differences between two aggregates (or dicts of aggregates)"""
+    for key in sorted(set(expected) | set(actual)):
+        e, a = expected.get(key), actual.get(key)
+        if isinstance(e, dict) or isinstance(a, dict):
+            _compare(f"{path}.{key}", e or {}, a or {}, tolerance, differences)
+        elif e is None or a is None or abs((e or 0) - (a or 0)) > tolerance:
+            differences.append({'field': f"{path}.{key}", 'expected': e, 'actual': a})
+
+def audit(trades, engine, recorded_profit=None, tolerance=1e-6):
+    """
+    Recalculate all metrics from the full trade history and compare them with an engine
+
+    Args:
+        trades (list): Complete trade history
+        engine (MetricsEngine): Incrementally maintained engine to verify
+        recorded_profit (float): Stored running total (e.g. total_profit) to verify too
+        tolerance (float): Allowed absolute difference for float fields
+
+    Returns:
+        dict: 'ok', 'trades', 'recalculated' (all-time totals), 'differences'
+    """
+    fresh = MetricsEngine(engine.profit_fn)
+    fresh.apply_many(trades)
+
+    differences = []
+    if engine.applied != fresh.applied:
+        differences.append({'field': 'applied', 'expected': fresh.applied, 'actual': engine.applied})
+    expected, actual = fresh.to_dict(), engine.to_dict()
+    for name in ('totals', 'days', 'weeks', 'levels', 'sides'):
+        _compare(name, expected[name], actual[name], tolerance, differences)
+    if recorded_profit is not None and abs(recorded_profit - fresh.totals['profit']) > max(tolerance, 0.01):
+        differences.append({'field': 'recorded_profit', 'expected': fresh.totals['profit'], 'actual': recorded_profit})
+
+    return {
+        'ok': not differences,
+        'trades': len(trades),
+        'recalculated': fresh.all_time(),
+        'differences': differences
+    }
@@ -0,0 +1,1131 @@
+import argparse
+import bisect
+import datetime
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import config
+from rate_limiter import endpoint_weight
+from symbol_rules import SymbolRules
+from user_data_stream import LocalUserDataServer
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+EPSILON = 1e-9
+KLINE_HISTORY = 20000  # Jumlah bar 1m yang disimpan untuk endpoint klines
+
+KLINE_INTERVALS = {
+    '1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
+    '1h': 3600, '2h': 7200, '4h': 14400, '6h': 21600, '8h': 28800, '12h': 43200, '1d': 86400
+}
+
+# Error yang dipilih acak oleh error_rate (HTTP status, kode Binance, pesan)
+RANDOM_ERRORS = [
+    (503, -1001, 'Internal error; unable to process your request. Please try again.'),
+    (500, -1000, 'An unknown error occured while processing the request.'),
+    (400, -1021, 'Timestamp for this request is outside of the recvWindow.')
+]
+
+class MockAPIError(Exception):
+    """Error returned to the client as a Binance JSON error body"""
+
+    def __init__(self, code, message, status=400, headers=None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.status = status
+        self.headers = headers or {}
+
+def _mandatory(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        raise MockAPIError(-1102, f"Mandatory parameter '{name}' was not sent, was empty/null, or malformed.")
+    return value
+
+def _number(params, name, required=True):
+    value = _mandatory(params, name) if required else params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise MockAPIError(-1100, f"Illegal characters found in parameter '{name}'; legal range is '^([0-9]{{1,20}})(\\.[0-9]{{1,20}})?$'.")
+
+class SimClock:
+    """
+    Simulated wall clock running `speed` times faster than real time.
+
+    now() has the signature of datetime.datetime.now, so it can be passed to
+    GridTradingBot(clock=...) and the bot's re-center, balance-log and daily
+    report timers run on simulated time.
+    """
+
+    def __init__(self, origin, speed=1.0):
+        """
+        Args:
+            origin (float): Simulated epoch seconds at start
+            speed (float): Simulated seconds per real second
+        """
+        self.origin = origin
+        self.speed = speed
+        self._started = time.monotonic()
+
+    def epoch(self):
+        return self.origin + (time.monotonic() - self._started) * self.speed
+
+    def now(self):
+        return datetime.datetime.fromtimestamp(self.epoch())
+
+class RandomWalkFeed:
+    """Seeded geometric random walk sampled on a fixed simulated time grid"""
+
+    def __init__(self, price, start, volatility=0.04, step=1.0, seed=None):
+        """
+        Args:
+            price (float): Starting price
+            start (float): Epoch seconds of the starting price
+            volatility (float): Daily volatility (0.04 = 4% per day)
+            step (float): Simulated seconds between ticks
+            seed (int): Random seed; the same seed gives the same price path
+        """
+        self.price = float(price)
+        self.time = float(start)
+        self.step = step
+        self.sigma = volatility * math.sqrt(step / 86400.0)
+        self._random = random.Random(seed)
+
+    def ticks(self, until):
+        """Yield (epoch, price) for every grid point up to until"""
+        while self.time + self.step <= until:
+            self.time += self.step
+            self.price *= math.exp(self._random.gauss(0.0, self.sigma))
+            yield self.time, self.price
+
+    def set_price(self, price):
+        self.price = float(price)
+
+class ReplayFeed:
+    """Klines or trades from backtest.load_market_data, replayed on simulated time"""
+
+    def __init__(self, data):
+        self.data = data
+        self.index = 0
+        self.price = float(data['open'][0])
+        self.time = float(data['time'][0])
+        self.finished = False
+
+    def ticks(self, until):
+        data = self.data
+        times = data['time']
+        while self.index < len(times) and times[self.index] <= until:
+            i = self.index
+            self.index += 1
+            self.time = float(times[i])
+            o, h, l, c = (float(data[k][i]) for k in ('open', 'high', 'low', 'close'))
+            # Urutan intrabar seperti backtest: bar naik O-L-H-C, bar turun O-H-L-C
+            path = (o, l, h, c) if c >= o else (o, h, l, c)
+            quarter = data['interval'] / 4.0
+            for n, price in enumerate(path):
+                self.price = price
+                yield self.time + n * quarter, price
+        if self.index >= len(times) and not self.finished:
+            self.finished = True
+            logger.warning("Replay data exhausted, price stays at the last close")
+
+    def set_price(self, price):
+        raise MockAPIError(-1013, 'Price override is not supported while replaying market data.')
+
+class OrderBook:
+    """
+    Resting limit orders of one symbol in price-time priority.
+
+    Each side maps integer tick prices to a FIFO queue; the sorted tick lists
+    give the best level in O(1) and new levels are inserted with bisect.
+    """
+
+    def __init__(self):
+        self.levels = {'BUY': {}, 'SELL': {}}
+        self.prices = {'BUY': [], 'SELL': []}
+
+    def add(self, order):
+        levels = self.levels[order.side]
+        queue = levels.get(order.ticks)
+        if queue is None:
+            queue = levels[order.ticks] = deque()
+            bisect.insort(self.prices[order.side], order.ticks)
+        queue.append(order)
+
+    def remove(self, order):
+        levels = self.levels[order.side]
+        queue = levels.get(order.ticks)
+        if queue is None:
+            return
+        try:
+            queue.remove(order)
+        except ValueError:
+            return
+        if not queue:
+            del levels[order.ticks]
+            prices = self.prices[order.side]
+            del prices[bisect.bisect_left(prices, order.ticks)]
+
+    def crossing(self, side, limit=None):
+        """
+        Resting orders of side that trade at limit, best price first and
+        oldest first within a price (limit None = every order on the side)
+        """
+        prices = self.prices[side]
+        if side == 'BUY':
+            start = 0 if limit is None else bisect.bisect_left(prices, limit)
+            levels = prices[start:][::-1]
+        else:
+            end = len(prices) if limit is None else bisect.bisect_right(prices, limit)
+            levels = prices[:end]
+        for ticks in levels:
+            queue = self.levels[side].get(ticks)
+            if queue:
+                yield from list(queue)
+
+    def depth(self, side, limit=20):
+        """[[price ticks, total quantity], ...] best level first"""
+        prices = self.prices[side]
+        levels = prices[::-1] if side == 'BUY' else prices
+        return [[ticks, sum(o.remaining for o in self.levels[side][ticks])] for ticks in levels[:limit]]
+
+class MockOrder:
+    __slots__ = ('account', 'order_id', 'client_order_id', 'side', 'type', 'ticks', 'price', 'quantity',
+                 'executed', 'quote', 'lock_price', 'status', 'time', 'update_time', 'fills')
+
+    def __init__(self, account, order_id, client_order_id, side, order_type, ticks, price, quantity, lock_price, now_ms):
+        self.account = account
+        self.order_id = order_id
+        self.client_order_id = client_order_id
+        self.side = side
+        self.type = order_type
+        self.ticks = ticks
+        self.price = price
+        self.quantity = quantity
+        self.executed = 0.0
+        self.quote = 0.0
+        self.lock_price = lock_price
+        self.status = 'NEW'
+        self.time = now_ms
+        self.update_time = now_ms
+        self.fills = []
+
+    @property
+    def remaining(self):
+        return self.quantity - self.executed
+
+    def to_dict(self, symbol):
+        return {
+            'symbol': symbol,
+            'orderId': self.order_id,
+            'orderListId': -1,
+            'clientOrderId': self.client_order_id,
+            'price': f"{self.price or 0:.8f}",
+            'origQty': f"{self.quantity:.8f}",
+            'executedQty': f"{self.executed:.8f}",
+            'cummulativeQuoteQty': f"{self.quote:.8f}",
+            'status': self.status,
+            'timeInForce': 'GTC',
+            'type': self.type,
+            'side': self.side,
+            'stopPrice': '0.00000000',
+            'icebergQty': '0.00000000',
+            'time': self.time,
+            'updateTime': self.update_time,
+            'isWorking': True,
+            'origQuoteOrderQty': '0.00000000'
+        }
+
+class MockAccount:
+    """Balances, orders and trades of one API key"""
+
+    def __init__(self, api_key, balances):
+        self.api_key = api_key
+        self.balances = {asset: {'free': float(amount), 'locked': 0.0} for asset, amount in balances.items()}
+        self.orders = {}
+        self.trades = []
+
+    def _balance(self, asset):
+        return self.balances.setdefault(asset, {'free': 0.0, 'locked': 0.0})
+
+    def lock(self, asset, amount):
+        balance = self._balance(asset)
+        if amount > balance['free'] + EPSILON:
+            raise MockAPIError(-2010, 'Account has insufficient balance for requested action.')
+        balance['free'] -= amount
+        balance['locked'] += amount
+
+    def release(self, asset, amount, to_free=True):
+        balance = self._balance(asset)
+        balance['locked'] -= amount
+        if abs(balance['locked']) < EPSILON:
+            balance['locked'] = 0.0
+        if to_free:
+            balance['free'] += amount
+
+    def credit(self, asset, amount):
+        self._balance(asset)['free'] += amount
+
+class FaultInjector:
+    """Seeded latency and error injection for the mock REST API"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, seed=None):
+        """
+        Args:
+            latency_ms (float): Mean added latency per request
+            jitter_ms (float): Latency varies uniformly by +/- jitter_ms
+            error_rate (float): Probability (0-1) that a request fails with one of RANDOM_ERRORS
+            seed (int): Random seed
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._scheduled = []
+        self._lock = threading.Lock()
+        self.stats = {'delayed': 0, 'injected_errors': 0}
+
+    def delay(self):
+        """Seconds to sleep before answering a request"""
+        if not self.latency_ms and not self.jitter_ms:
+            return 0.0
+        with self._lock:
+            latency = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+            self.stats['delayed'] += 1
+        return max(0.0, latency) / 1000.0
+
+    def fail_next(self, endpoint=None, status=503, code=-1001, message=None, count=1):
+        """
+        Make the next matching requests fail
+
+        Args:
+            endpoint (str): 'METHOD /api/v3/path', or None for any request
+            status (int): HTTP status
+            code (int): Binance error code
+            message (str): Error message (default: the message of RANDOM_ERRORS for the status)
+            count (int): Number of requests that fail
+        """
+        if message is None:
+            message = next((m for s, _, m in RANDOM_ERRORS if s == status), 'Injected failure.')
+        with self._lock:
+            self._scheduled.append([endpoint, status, code, message, count])
+
+    def pick(self, endpoint):
+        """Return (status, code, message) if this request must fail, else None"""
+        with self._lock:
+            for fault in self._scheduled:
+                if fault[0] is None or fault[0] == endpoint:
+                    fault[4] -= 1
+                    if fault[4] <= 0:
+                        self._scheduled.remove(fault)
+                    self.stats['injected_errors'] += 1
+                    return tuple(fault[1:4])
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.stats['injected_errors'] += 1
+                return self._random.choice(RANDOM_ERRORS)
+        return None
+
+class MockExchange:
+    """
+    In-process spot exchange for one symbol.
+
+    Limit orders rest in a price-time priority OrderBook shared by every
+    account (one account per API key). An incoming order first matches the
+    opposite side of the book, then whatever is still marketable against the
+    reference price trades as taker against outside liquidity, and the rest
+    rests in the book. The reference price comes from a RandomWalkFeed or a
+    ReplayFeed advanced on a SimClock; each price move lets outside flow
+    sweep the crossed levels (limited to `liquidity` base units per tick,
+    which produces partial fills). Fees are charged like Binance without BNB:
+    buys pay in the base asset, sells in the quote asset. Order updates are
+    pushed as executionReport events to a LocalUserDataServer.
+    """
+
+    def __init__(self, symbol=None, feed=None, clock=None, balances=None, maker_fee=None, taker_fee=None,
+                 liquidity=None, stream=None):
+        """
+        Args:
+            symbol (str): Trading pair (default config.SYMBOL)
+            feed: RandomWalkFeed or ReplayFeed providing the reference price
+            clock (SimClock): Simulated time
+            balances (dict): Starting balances of every new account, asset -> amount
+            maker_fee (float): Fee rate for resting orders (default config.BACKTEST_MAKER_FEE)
+            taker_fee (float): Fee rate for orders that match on arrival (default config.BACKTEST_TAKER_FEE)
+            liquidity (float): Base quantity outside flow can trade per tick (None = unlimited)
+            stream (LocalUserDataServer): Receives executionReport events
+        """
+        self.symbol = symbol or config.SYMBOL
+        self.base_asset = self.symbol.replace('USDT', '')
+        self.quote_asset = 'USDT'
+        self.tick_size = Decimal(1).scaleb(-getattr(config, 'PRICE_PRECISION', 4))
+        self.step_size = Decimal(1).scaleb(-getattr(config, 'QUANTITY_PRECISION', 0))
+        self.rules = SymbolRules(
+            self.symbol, self.base_asset, self.quote_asset,
+            tick_size=self.tick_size, step_size=self.step_size, min_qty=self.step_size,
+            max_qty='9000000', min_notional=getattr(config, 'MIN_NOTIONAL', None)
+        )
+        self._tick = float(self.tick_size)
+        self.clock = clock or SimClock(time.time())
+        self.feed = feed or RandomWalkFeed(0.65, self.clock.epoch())
+        self.default_balances = balances or {self.quote_asset: 1000.0, self.base_asset: 1500.0}
+        self.maker_fee = getattr(config, 'BACKTEST_MAKER_FEE', 0.001) if maker_fee is None else maker_fee
+        self.taker_fee = getattr(config, 'BACKTEST_TAKER_FEE', 0.001) if taker_fee is None else taker_fee
+        self.liquidity = liquidity
+        self.stream = stream
+
+        self.book = OrderBook()
+        self.accounts = {}
+        self.price = self.feed.price
+        self.klines = deque(maxlen=KLINE_HISTORY)
+        self._order_ids = itertools.count(1)
+        self._trade_ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._events = []
+        self._ticker = None
+        self._stop_event = threading.Event()
+        self.stats = {'orders': 0, 'cancels': 0, 'rejected': 0, 'trades': 0, 'maker_fills': 0,
+                      'taker_fills': 0, 'partial_fills': 0, 'ticks': 0}
+
+    # --- Waktu dan harga referensi ---
+
+    def _now_ms(self):
+        return int(self.clock.epoch() * 1000)
+
+    def _to_ticks(self, price):
+        return int(round(price / self._tick))
+
+    def warm_up(self):
+        """Run the feed up to the clock origin so klines have history before the start"""
+        with self._lock:
+            for epoch, price in self.feed.ticks(self.clock.origin):
+                self._record_price(epoch, price)
+            self.price = self.feed.price
+
+    def advance(self):
+        """Move the reference price to the current simulated time and let outside flow trade"""
+        with self._lock:
+            for epoch, price in self.feed.ticks(self.clock.epoch()):
+                self._on_price(epoch, price)
+        self._flush_events()
+
+    def set_price(self, price):
+        """Jump the reference price (incident reproduction), crossed orders fill at once"""
+        with self._lock:
+            self.feed.set_price(price)
+            self._on_price(self.clock.epoch(), float(price))
+        self._flush_events()
+
+    def _record_price(self, epoch, price, volume=0.0):
+        minute = int(epoch // 60) * 60
+        if self.klines and self.klines[-1][0] == minute:
+            bar = self.klines[-1]
+            bar[2] = max(bar[2], price)
+            bar[3] = min(bar[3], price)
+            bar[4] = price
+            bar[5] += volume
+        else:
+            self.klines.append([minute, price, price, price, price, volume])
+
+    def _on_price(self, epoch, price):
+        self.price = price
+        self.stats['ticks'] += 1
+        self._record_price(epoch, price)
+        ticks = self._to_ticks(price)
+        now_ms = int(epoch * 1000)
+        # Penjual luar memukul bid >= harga, pembeli luar mengangkat ask <= harga
+        for side in ('BUY', 'SELL'):
+            available = self.liquidity
+            for order in self.book.crossing(side, ticks):
+                if available is not None and available <= EPSILON:
+                    break
+                quantity = order.remaining if available is None else min(order.remaining, available)
+                self._fill(order, quantity, order.price, maker=True, now_ms=now_ms)
+                if available is not None:
+                    available -= quantity
+
+    def start(self, tick_interval=0.05):
+        """Advance the market in a background thread every tick_interval real seconds"""
+        self._stop_event.clear()
+        self._ticker = threading.Thread(target=self._run_ticker, args=(tick_interval,), name='mock-exchange-ticker', daemon=True)
+        self._ticker.start()
+
+    def _run_ticker(self, tick_interval):
+        while not self._stop_event.wait(tick_interval):
+            try:
+                self.advance()
+            except Exception as e:
+                logger.error(f"Mock exchange tick failed: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._ticker is not None:
+            self._ticker.join(timeout=2)
+            self._ticker = None
+
+    # --- Matching engine ---
+
+    def _fill(self, order, quantity, price, maker, now_ms):
+        """Execute quantity of order at price and settle its account (caller holds the lock)"""
+        account = order.account
+        fee_rate = self.maker_fee if maker else self.taker_fee
+        quote_amount = quantity * price
+        if order.side == 'BUY':
+            account.release(self.quote_asset, quantity * order.lock_price, to_free=False)
+            # Selisih lock (limit di atas harga match) kembali ke saldo free
+            account.credit(self.quote_asset, quantity * (order.lock_price - price))
+            commission, commission_asset = quantity * fee_rate, self.base_asset
+            account.credit(self.base_asset, quantity - commission)
+        else:
+            account.release(self.base_asset, quantity, to_free=False)
+            commission, commission_asset = quote_amount * fee_rate, self.quote_asset
+            account.credit(self.quote_asset, quote_amount - commission)
+
+        order.executed += quantity
+        order.quote += quote_amount
+        order.update_time = now_ms
+        if order.remaining <= EPSILON:
+            order.status = 'FILLED'
+            self.book.remove(order)
+        else:
+            order.status = 'PARTIALLY_FILLED'
+            self.stats['partial_fills'] += 1
+
+        trade_id = next(self._trade_ids)
+        fill = {'price': f"{price:.8f}", 'qty': f"{quantity:.8f}", 'commission': f"{commission:.8f}",
+                'commissionAsset': commission_asset, 'tradeId': trade_id}
+        order.fills.append(fill)
+        account.trades.append({
+            'symbol': self.symbol, 'id': trade_id, 'orderId': order.order_id, 'orderListId': -1,
+            'price': fill['price'], 'qty': fill['qty'], 'quoteQty': f"{quote_amount:.8f}",
+            'commission': fill['commission'], 'commissionAsset': commission_asset, 'time': now_ms,
+            'isBuyer': order.side == 'BUY', 'isMaker': maker, 'isBestMatch': True
+        })
+        self.stats['trades'] += 1
+        self.stats['maker_fills' if maker else 'taker_fills'] += 1
+        self._record_price(now_ms / 1000.0, self.price, quantity)
+        self._emit(order, 'TRADE', now_ms, fill, maker)
+
+    def _emit(self, order, execution_type, now_ms, fill=None, maker=False):
+        """Queue an executionReport for the user data stream (caller holds the lock)"""
+        if self.stream is None:
+            return
+        self._events.append({
+            'e': 'executionReport', 'E': now_ms, 's': self.symbol, 'c': order.client_order_id,
+            'S': order.side, 'o': order.type, 'f': 'GTC', 'q': f"{order.quantity:.8f}",
+            'p': f"{order.price or 0:.8f}", 'x': execution_type, 'X': order.status, 'r': 'NONE',
+            'i': order.order_id, 'l': fill['qty'] if fill else '0.00000000',
+            'z': f"{order.executed:.8f}", 'L': fill['price'] if fill else '0.00000000',
+            'n': fill['commission'] if fill else '0', 'N': fill['commissionAsset'] if fill else None,
+            'T': now_ms, 't': fill['tradeId'] if fill else -1, 'w': order.status in ('NEW', 'PARTIALLY_FILLED'),
+            'm': maker, 'O': order.time, 'Z': f"{order.quote:.8f}"
+        })
+
+    def _flush_events(self):
+        """Publish queued events outside the lock so a slow stream client cannot stall matching"""
+        with self._lock:
+            events, self._events = self._events, []
+        for event in events:
+            self.stream.publish(event)
+
+    def _submit(self, account, side, order_type, quantity, ticks, client_order_id):
+        """Lock the balance, match, and rest what is left of a limit order (caller holds the lock)"""
+        now_ms = self._now_ms()
+        price = ticks * self._tick if ticks is not None else None
+        lock_price = price if price is not None else self.price
+        if side == 'BUY':
+            account.lock(self.quote_asset, quantity * lock_price)
+        else:
+            account.lock(self.base_asset, quantity)
+
+        order = MockOrder(account, next(self._order_ids), client_order_id, side, order_type,
+                          ticks, price, quantity, lock_price, now_ms)
+        account.orders[order.order_id] = order
+        self.stats['orders'] += 1
+        self._emit(order, 'NEW', now_ms)
+
+        # 1. Order lain di book, prioritas harga lalu waktu (order sendiri dilewati)
+        opposite = 'SELL' if side == 'BUY' else 'BUY'
+        for resting in self.book.crossing(opposite, ticks):
+            if order.remaining <= EPSILON:
+                break
+            if resting.account is account:
+                continue
+            quantity = min(order.remaining, resting.remaining)
+            self._fill(resting, quantity, resting.price, maker=True, now_ms=now_ms)
+            self._fill(order, quantity, resting.price, maker=False, now_ms=now_ms)
+
+        # 2. Sisa yang masih marketable terhadap harga referensi diisi likuiditas luar
+        reference = self._to_ticks(self.price)
+        marketable = ticks is None or (side == 'BUY' and ticks >= reference) or (side == 'SELL' and ticks <= reference)
+        if order.remaining > EPSILON and marketable:
+            self._fill(order, order.remaining, self.price, maker=False, now_ms=now_ms)
+
+        # 3. Sisanya menunggu di book
+        if order.remaining > EPSILON:
+            self.book.add(order)
+        return order
+
+    def _cancel(self, order):
+        """Cancel an open order and unlock its remaining balance (caller holds the lock)"""
+        self.book.remove(order)
+        if order.side == 'BUY':
+            order.account.release(self.quote_asset, order.remaining * order.lock_price)
+        else:
+            order.account.release(self.base_asset, order.remaining)
+        order.status = 'CANCELED'
+        order.update_time = self._now_ms()
+        self.stats['cancels'] += 1
+        self._emit(order, 'CANCELED', order.update_time)
+
+    # --- REST endpoints ---
+
+    def get_account(self, api_key):
+        with self._lock:
+            account = self.accounts.get(api_key)
+            if account is None:
+                account = self.accounts[api_key] = MockAccount(api_key, self.default_balances)
+                logger.info(f"Created mock account for API key {api_key[:6]}...")
+            return account
+
+    def _check_symbol(self, params):
+        symbol = _mandatory(params, 'symbol')
+        if symbol != self.symbol:
+            raise MockAPIError(-1121, 'Invalid symbol.')
+        return symbol
+
+    def _find_order(self, account, params, missing_code=-2013, missing_message='Order does not exist.'):
+        self._check_symbol(params)
+        order_id = params.get('orderId')
+        order = None
+        if order_id not in (None, ''):
+            order = account.orders.get(int(order_id))
+        elif params.get('origClientOrderId'):
+            order = next((o for o in account.orders.values() if o.client_order_id == params['origClientOrderId']), None)
+        else:
+            raise MockAPIError(-1102, "Param 'origClientOrderId' or 'orderId' must be sent, but both were empty/null!")
+        if order is None:
+            raise MockAPIError(missing_code, missing_message)
+        return order
+
+    def ping(self, params, account=None):
+        return {}
+
+    def server_time(self, params, account=None):
+        return {'serverTime': int(time.time() * 1000)}
+
+    def exchange_info(self, params, account=None):
+        requested = params.get('symbol')
+        if params.get('symbols'):
+            requested = json.loads(params['symbols'])
+        if requested and self.symbol not in ([requested] if isinstance(requested, str) else requested):
+            raise MockAPIError(-1121, 'Invalid symbol.')
+        return {
+            'timezone': 'UTC',
+            'serverTime': int(time.time() * 1000),
+            'rateLimits': [
+                {'rateLimitType': 'REQUEST_WEIGHT', 'interval': 'MINUTE', 'intervalNum': 1, 'limit': 6000},
+                {'rateLimitType': 'ORDERS', 'interval': 'SECOND', 'intervalNum': 10, 'limit': 100}
+            ],
+            'symbols': [{
+                'symbol': self.symbol,
+                'status': 'TRADING',
+                'baseAsset': self.base_asset,
+                'baseAssetPrecision': 8,
+                'quoteAsset': self.quote_asset,
+                'quotePrecision': 8,
+                'orderTypes': ['LIMIT', 'MARKET'],
+                'filters': [
+                    {'filterType': 'PRICE_FILTER', 'minPrice': str(self.tick_size), 'maxPrice': '1000.00000000',
+                     'tickSize': str(self.tick_size)},
+                    {'filterType': 'LOT_SIZE', 'minQty': str(self.step_size), 'maxQty': '9000000.00000000',
+                     'stepSize': str(self.step_size)},
+                    {'filterType': 'NOTIONAL', 'minNotional': str(getattr(config, 'MIN_NOTIONAL', 5.0)),
+                     'applyMinToMarket': True}
+                ]
+            }]
+        }
+
+    def ticker_price(self, params, account=None):
+        with self._lock:
+            price = f"{self.price:.8f}"
+        if params.get('symbol'):
+            self._check_symbol(params)
+            return {'symbol': self.symbol, 'price': price}
+        return [{'symbol': self.symbol, 'price': price}]
+
+    def get_klines(self, params, account=None):
+        self._check_symbol(params)
+        interval = KLINE_INTERVALS.get(_mandatory(params, 'interval'))
+        if interval is None:
+            raise MockAPIError(-1120, 'Invalid interval.')
+        limit = min(int(params.get('limit') or 500), 1000)
+        start = _number(params, 'startTime', required=False)
+        end = _number(params, 'endTime', required=False)
+        with self._lock:
+            bars = list(self.klines)
+        rows = []
+        for bar in bars:
+            open_ms = bar[0] * 1000
+            if (start is not None and open_ms < start) or (end is not None and open_ms > end):
+                continue
+            bucket = bar[0] // interval * interval
+            if rows and rows[-1][0] == bucket:
+                row = rows[-1]
+                row[2] = max(row[2], bar[2])
+                row[3] = min(row[3], bar[3])
+                row[4] = bar[4]
+                row[5] += bar[5]
+            else:
+                rows.append([bucket] + bar[1:])
+        rows = rows[:limit] if start is not None else rows[-limit:]
+        return [
+            [t * 1000, f"{o:.8f}", f"{h:.8f}", f"{l:.8f}", f"{c:.8f}", f"{v:.8f}",
+             (t + interval) * 1000 - 1, '0', 0, '0', '0', '0']
+            for t, o, h, l, c, v in rows
+        ]
+
+    def account_info(self, params, account):
+        with self._lock:
+            balances = [
+                {'asset': asset, 'free': f"{b['free']:.8f}", 'locked': f"{b['locked']:.8f}"}
+                for asset, b in account.balances.items()
+            ]
+        return {
+            'makerCommission': int(self.maker_fee * 10000), 'takerCommission': int(self.taker_fee * 10000),
+            'canTrade': True, 'canWithdraw': True, 'canDeposit': True, 'updateTime': self._now_ms(),
+            'accountType': 'SPOT', 'balances': balances, 'permissions': ['SPOT']
+        }
+
+    def new_order(self, params, account):
+        self._check_symbol(params)
+        side = _mandatory(params, 'side').upper()
+        order_type = _mandatory(params, 'type').upper()
+        if side not in ('BUY', 'SELL'):
+            raise MockAPIError(-1117, 'Invalid side.')
+        if order_type not in ('LIMIT', 'MARKET'):
+            raise MockAPIError(-1116, 'Invalid orderType.')
+        client_order_id = params.get('newClientOrderId') or f"mock_{random.getrandbits(48):012x}"
+
+        with self._lock:
+            try:
+                if order_type == 'LIMIT':
+                    if params.get('timeInForce', 'GTC') != 'GTC':
+                        raise MockAPIError(-1115, 'Invalid timeInForce.')
+                    price = _number(params, 'price')
+                    quantity = _number(params, 'quantity')
+                    ticks = price / self._tick
+                    if abs(ticks - round(ticks)) > 1e-6:
+                        raise MockAPIError(-1013, 'Filter failure: PRICE_FILTER')
+                    ticks = int(round(ticks))
+                else:
+                    ticks = None
+                    quantity = _number(params, 'quantity', required=False)
+                    if quantity is None:
+                        quote_quantity = _number(params, 'quoteOrderQty', required=False)
+                        if quote_quantity is None:
+                            raise MockAPIError(-1102, "Param 'quantity' or 'quoteOrderQty' must be sent, but both were empty/null!")
+                        quantity = float(self.rules.quantize_quantity(quote_quantity / self.price))
+                    price = self.price
+                steps = quantity / float(self.step_size)
+                if abs(steps - round(steps)) > 1e-6:
+                    raise MockAPIError(-1013, 'Filter failure: LOT_SIZE')
+                rejection = self.rules.validate(Decimal(str(round(price, 8))), Decimal(str(quantity)))
+                if rejection:
+                    raise MockAPIError(-1013, f"Filter failure: {rejection.split(':')[0]}")
+                order = self._submit(account, side, order_type, quantity, ticks, client_order_id)
+            except MockAPIError:
+                self.stats['rejected'] += 1
+                raise
+            response = order.to_dict(self.symbol)
+            response['transactTime'] = order.time
+            response['fills'] = [dict(fill) for fill in order.fills]
+        self._flush_events()
+        return response
+
+    def query_order(self, params, account):
+        with self._lock:
+            return self._find_order(account, params).to_dict(self.symbol)
+
+    def cancel_order(self, params, account):
+        with self._lock:
+            order = self._find_order(account, params, -2011, 'Unknown order sent.')
+            if order.status not in ('NEW', 'PARTIALLY_FILLED'):
+                raise MockAPIError(-2011, 'Unknown order sent.')
+            self._cancel(order)
+            response = order.to_dict(self.symbol)
+        self._flush_events()
+        return response
+
+    def open_orders(self, params, account):
+        if params.get('symbol'):
+            self._check_symbol(params)
+        with self._lock:
+            return [
+                order.to_dict(self.symbol) for order in account.orders.values()
+                if order.status in ('NEW', 'PARTIALLY_FILLED')
+            ]
+
+    def cancel_open_orders(self, params, account):
+        self._check_symbol(params)
+        with self._lock:
+            orders = [o for o in account.orders.values() if o.status in ('NEW', 'PARTIALLY_FILLED')]
+            if not orders:
+                raise MockAPIError(-2011, 'Unknown order sent.')
+            response = []
+            for order in orders:
+                self._cancel(order)
+                response.append(order.to_dict(self.symbol))
+        self._flush_events()
+        return response
+
+    def my_trades(self, params, account):
+        self._check_symbol(params)
+        limit = min(int(params.get('limit') or 500), 1000)
+        with self._lock:
+            trades = account.trades
+            if params.get('orderId'):
+                order_id = int(params['orderId'])
+                return [dict(t) for t in trades if t['orderId'] == order_id][:limit]
+            if params.get('fromId'):
+                # Trade id naik berurutan, cari posisi awal dengan bisect
+                from_id = int(params['fromId'])
+                start = bisect.bisect_left([t['id'] for t in trades], from_id)
+                return [dict(t) for t in trades[start:start + limit]]
+            return [dict(t) for t in trades[-limit:]]
+
+    def get_state(self, params=None, account=None):
+        """Market, book and account summary for the /mock/state endpoint"""
+        with self._lock:
+            return {
+                'symbol': self.symbol,
+                'price': self.price,
+                'sim_time': self.clock.now().isoformat(),
+                'speed': self.clock.speed,
+                'bids': [[ticks * self._tick, qty] for ticks, qty in self.book.depth('BUY')],
+                'asks': [[ticks * self._tick, qty] for ticks, qty in self.book.depth('SELL')],
+                'accounts': {
+                    key[:6] + '...': {asset: dict(b) for asset, b in account.balances.items()}
+                    for key, account in self.accounts.items()
+                },
+                'stats': dict(self.stats)
+            }
+
+class _MockRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive, sesuai session pool BinanceClient; tanpa Nagle header dan body
+    # yang ditulis terpisah menunggu delayed ACK (~40 ms per request)
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _dispatch(self, method):
+        parsed = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            body = self.rfile.read(length).decode('utf-8')
+            params.update({key: values[-1] for key, values in parse_qs(body).items()})
+        status, payload, headers = self.server.mock.handle(method, parsed.path, params, self.headers.get('X-MBX-APIKEY'))
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+class MockExchangeServer:
+    """
+    Localhost HTTP server exposing a MockExchange through the Binance REST paths.
+
+    Point the bot at it with config.BINANCE_API_URL = server.url. Responses
+    carry X-MBX-USED-WEIGHT-1M / X-MBX-ORDER-COUNT-10S computed with the same
+    weight table as the client-side governor; with weight_limit set, going
+    over it returns 429 with Retry-After. Signed endpoints only need an
+    X-MBX-APIKEY header (signatures are not verified); each key gets its own
+    account. Injected errors are returned before the request is executed.
+    """
+
+    # (method, path setelah /api/vN/) -> (method MockExchange, signed)
+    ROUTES = {
+        ('GET', 'ping'): ('ping', False),
+        ('GET', 'time'): ('server_time', False),
+        ('GET', 'exchangeInfo'): ('exchange_info', False),
+        ('GET', 'ticker/price'): ('ticker_price', False),
+        ('GET', 'klines'): ('get_klines', False),
+        ('GET', 'account'): ('account_info', True),
+        ('POST', 'order'): ('new_order', True),
+        ('GET', 'order'): ('query_order', True),
+        ('DELETE', 'order'): ('cancel_order', True),
+        ('GET', 'openOrders'): ('open_orders', True),
+        ('DELETE', 'openOrders'): ('cancel_open_orders', True),
+        ('GET', 'myTrades'): ('my_trades', True),
+    }
+
+    def __init__(self, exchange, host='127.0.0.1', port=0, faults=None, weight_limit=None, order_limit=None):
+        """
+        Args:
+            exchange (MockExchange): Exchange to serve
+            host (str): Bind address
+            port (int): Port (0 = any free port)
+            faults (FaultInjector): Latency and error injection
+            weight_limit (int): Request weight per minute before 429 (None = not enforced)
+            order_limit (int): Orders per 10 seconds before 429 (None = not enforced)
+        """
+        self.exchange = exchange
+        self.faults = faults or FaultInjector()
+        self.weight_limit = weight_limit
+        self.order_limit = order_limit
+        self._httpd = ThreadingHTTPServer((host, port), _MockRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = None
+        self._usage_lock = threading.Lock()
+        self._weight_window = (0, 0)   # (menit, weight terpakai)
+        self._order_window = (0, 0)    # (periode 10 detik, jumlah order)
+        self.requests = 0
+
+    @property
+    def url(self):
+        """Base URL for config.BINANCE_API_URL"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='mock-exchange-http', daemon=True)
+        self._thread.start()
+        logger.info(f"Mock exchange listening on {self.url}")
+        return self.url
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _account_usage(self, weight, orders):
+        """Add the request to the real-time minute/10s windows
+
+        Returns:
+            tuple: (used weight this minute, orders this 10s period, seconds until the minute resets)
+        """
+        now = time.time()
+        minute, period = int(now // 60), int(now // 10)
+        with self._usage_lock:
+            used = (self._weight_window[1] if self._weight_window[0] == minute else 0) + weight
+            self._weight_window = (minute, used)
+            count = (self._order_window[1] if self._order_window[0] == period else 0) + orders
+            self._order_window = (period, count)
+            self.requests += 1
+        return used, count, 60 - now % 60
+
+    def handle(self, method, path, params, api_key):
+        """
+        Serve one request
+
+        Returns:
+            tuple: (HTTP status, JSON payload, extra headers)
+        """
+        if path.startswith('/mock/'):
+            return self._handle_admin(method, path[len('/mock/'):], params)
+
+        parts = path.strip('/').split('/', 2)
+        route = self.ROUTES.get((method, parts[2])) if len(parts) == 3 and parts[0] == 'api' else None
+        endpoint, weight, orders = endpoint_weight(method, f"/api/v3/{parts[-1]}", params)
+        used, order_count, retry_after = self._account_usage(weight, orders)
+        headers = {'X-MBX-USED-WEIGHT-1M': used, 'X-MBX-ORDER-COUNT-10S': order_count}
+
+        if route is None:
+            return 404, {'code': -1000, 'msg': f"Mock exchange does not implement {method} {path}"}, headers
+        if self.weight_limit and used > self.weight_limit:
+            headers['Retry-After'] = int(retry_after) + 1
+            return 429, {'code': -1003, 'msg': f"Too much request weight used; current limit is {self.weight_limit} request weight per 1 MINUTE."}, headers
+        if self.order_limit and order_count > self.order_limit:
+            headers['Retry-After'] = 10
+            return 429, {'code': -1015, 'msg': f"Too many new orders; current limit is {self.order_limit} orders per 10 SECOND."}, headers
+
+        delay = self.faults.delay()
+        if delay:
+            time.sleep(delay)
+        fault = self.faults.pick(endpoint)
+        if fault:
+            status, code, message = fault
+            return status, {'code': code, 'msg': message}, headers
+
+        name, signed = route
+        try:
+            self.exchange.advance()
+            account = None
+            if signed:
+                if not api_key:
+                    raise MockAPIError(-2014, 'API-key format invalid.', status=401)
+                account = self.exchange.get_account(api_key)
+            return 200, getattr(self.exchange, name)(params, account), headers
+        except MockAPIError as e:
+            headers.update(e.headers)
+            return e.status, {'code': e.code, 'msg': e.message}, headers
+        except Exception as e:
+            logger.exception(f"Mock exchange failed on {method} {path}")
+            return 500, {'code': -1000, 'msg': str(e)}, headers
+
+    def _handle_admin(self, method, action, params):
+        """Control endpoints: GET state, POST price (price=...), POST fault (endpoint, status, code, msg, count)"""
+        try:
+            if action == 'state':
+                state = self.exchange.get_state()
+                state['faults'] = dict(self.faults.stats)
+                state['requests'] = self.requests
+                return 200, state, {}
+            if action == 'price' and method == 'POST':
+                self.exchange.set_price(_number(params, 'price'))
+                return 200, {'price': self.exchange.price}, {}
+            if action == 'fault' and method == 'POST':
+                self.faults.fail_next(
+                    params.get('endpoint'), int(params.get('status', 503)), int(params.get('code', -1001)),
+                    params.get('msg'), int(params.get('count', 1))
+                )
+                return 200, {'scheduled': True}, {}
+        except MockAPIError as e:
+            return e.status, {'code': e.code, 'msg': e.message}, {}
+        return 404, {'code': -1000, 'msg': f"Unknown mock action {method} {action}"}, {}
+
+def create_mock_exchange(speed=None, price=0.65, volatility=0.04, seed=None, replay=None, balances=None,
+                         liquidity=None, warmup=7200, maker_fee=None, taker_fee=None):
+    """
+    Build a MockExchange with its clock, price feed and user data stream server
+
+    Args:
+        speed (float): Simulated seconds per real second (default config.MOCK_SPEED)
+        price (float): Starting price of the random walk
+        volatility (float): Daily volatility of the random walk
+        seed (int): Random walk seed
+        replay (str): Klines/trades CSV to replay instead of the random walk (see backtest.py)
+        balances (dict): Starting balances of every new account
+        liquidity (float): Base quantity outside flow can trade per tick (None = unlimited)
+        warmup (float): Simulated seconds of price history generated before the start
+        maker_fee, taker_fee (float): Fee rates
+
+    Returns:
+        MockExchange: Not started; call start() and stream.start()
+    """
+    speed = speed or getattr(config, 'MOCK_SPEED', 60)
+    if replay:
+        from backtest import load_market_data
+        data = load_market_data(replay)
+        feed = ReplayFeed(data)
+        origin = min(float(data['time'][0]) + warmup, float(data['time'][-1]))
+    else:
+        origin = time.time()
+        feed = RandomWalkFeed(price, origin - warmup, volatility, seed=seed)
+    exchange = MockExchange(
+        feed=feed, clock=SimClock(origin, speed), balances=balances, maker_fee=maker_fee,
+        taker_fee=taker_fee, liquidity=liquidity, stream=LocalUserDataServer()
+    )
+    exchange.warm_up()
+    # Jam simulasi mulai berjalan setelah warm-up selesai
+    exchange.clock = SimClock(origin, speed)
+    return exchange
+
+def scale_config_for_speed(speed):
+    """Shrink the bot's real-time waits so the whole stack runs `speed` times faster"""
+    for name, default in (('POLL_INTERVAL', 10), ('RECONCILE_INTERVAL', 120), ('BALANCE_CACHE_TTL', 5)):
+        setattr(config, name, max(getattr(config, name, default) / speed, 0.01))
+
+def main():
+    """Start the mock exchange, optionally with the grid bot and dashboard running against it"""
+    parser = argparse.ArgumentParser(description='Local mock Binance spot exchange for integration and load tests')
+    parser.add_argument('--port', type=int, default=getattr(config, 'MOCK_EXCHANGE_PORT', 9000), help='HTTP port')
+    parser.add_argument('--speed', type=float, default=getattr(config, 'MOCK_SPEED', 60), help='Simulated seconds per real second')
+    parser.add_argument('--price', type=float, default=0.65, help='Starting price of the random walk')
+    parser.add_argument('--volatility', type=float, default=0.04, help='Daily volatility of the random walk')
+    parser.add_argument('--seed', type=int, help='Random walk / fault injection seed')
+    parser.add_argument('--replay', help='Klines or trades CSV to replay instead of the random walk')
+    parser.add_argument('--quote', type=float, default=1000.0, help='Starting quote balance per account')
+    parser.add_argument('--base', type=float, default=1500.0, help='Starting base balance per account')
+    parser.add_argument('--liquidity', type=float, help='Base quantity outside flow trades per tick (default: unlimited)')
+    parser.add_argument('--latency-ms', type=float, default=getattr(config, 'MOCK_LATENCY_MS', 0), help='Added latency per request')
+    parser.add_argument('--jitter-ms', type=float, default=getattr(config, 'MOCK_LATENCY_JITTER_MS', 0), help='Latency jitter')
+    parser.add_argument('--error-rate', type=float, default=getattr(config, 'MOCK_ERROR_RATE', 0.0), help='Fraction of requests failing with a random error')
+    parser.add_argument('--weight-limit', type=int, help='Enforce a request weight limit per minute (429 above it)')
+    parser.add_argument('--bot', action='store_true', help='Run GridTradingBot against the mock in this process')
+    parser.add_argument('--dashboard', action='store_true', help='Also run the dashboard (with --bot)')
+    parser.add_argument('--workdir', default='mock_run', help='Directory for the bot state, logs and analytics (with --bot)')
+    parser.add_argument('--verbose', action='store_true', help='Log at INFO level')
+    args = parser.parse_args()
+
+    if args.bot:
+        # State, bot.log dan analytics mock tidak boleh menimpa milik bot sungguhan
+        os.makedirs(args.workdir, exist_ok=True)
+        os.chdir(args.workdir)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose or args.bot else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler()],
+        force=True
+    )
+
+    symbol = config.SYMBOL
+    exchange = create_mock_exchange(
+        args.speed, args.price, args.volatility, args.seed, args.replay,
+        {'USDT': args.quote, symbol.replace('USDT', ''): args.base}, args.liquidity
+    )
+    faults = FaultInjector(args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    server = MockExchangeServer(exchange, port=args.port, faults=faults, weight_limit=args.weight_limit)
+    exchange.stream.start()
+    exchange.start()
+    server.start()
+    print(f"Mock exchange: {server.url} (stream {exchange.stream.url}), {symbol} at {exchange.price:.4f}, speed {args.speed:g}x")
+    print(f"Use it with BINANCE_API_URL={server.url} USER_DATA_STREAM={exchange.stream.url}")
+
+    try:
+        if args.bot:
+            config.BINANCE_API_URL = server.url
+            config.USER_DATA_STREAM = exchange.stream.url
+            config.API_KEY = config.API_KEY or 'mock-api-key'
+            config.API_SECRET = config.API_SECRET or 'mock-api-secret'
+            scale_config_for_speed(args.speed)
+            from grid_bot import GridTradingBot
+            if args.dashboard:
+                from dashboard import run_dashboard
+                threading.Thread(target=run_dashboard, daemon=True).start()
+                print("Dashboard running at http://localhost:5000")
+            GridTradingBot(clock=exchange.clock.now).run()
+        else:
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        exchange.stop()
+        exchange.stream.stop()
+        state = exchange.get_state()
+        print(f"Mock exchange stopped at {state['price']:.4f}: {state['stats']}")
+
+if __name__ == "__main__":
+    main()
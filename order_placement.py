@@ -0,0 +1,123 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class GridOrderPlacer:
+    """
+    Place a batch of grid limit orders concurrently.
+
+    Orders are submitted from a small thread pool; every request still goes
+    through the client's rate limit governor, and the pool is never larger
+    than the order budget currently available. Results are returned in the
+    order the levels were given. When a level marked as required fails, the
+    orders already placed for the batch are cancelled again so the grid is
+    not left half built; orders that could not be cancelled are reported in
+    'not_cancelled' so the caller can still track or cancel them.
+
+    The pool threads share one client. PooledClient keeps python-binance's
+    per-request response state per thread, so this is safe for BinanceClient.
+    """
+
+    def __init__(self, client, max_workers=None):
+        """
+        Args:
+            client (BinanceClient): Client used to place and cancel orders
+            max_workers (int): Maximum concurrent requests
+        """
+        self.client = client
+        self.max_workers = max_workers or getattr(config, 'ORDER_PLACEMENT_WORKERS', 5)
+
+    def _worker_count(self, n_orders):
+        workers = min(self.max_workers, n_orders)
+        try:
+            budget = self.client.get_rate_budget()
+            workers = min(workers, max(1, int(budget['orders_available'])))
+        except Exception:
+            pass
+        return max(1, workers)
+
+    def _place_one(self, symbol, level):
+        try:
+            order = self.client.place_limit_order(
+                symbol=symbol,
+                side=level['side'],
+                quantity=level['quantity'],
+                price=level['price']
+            )
+            return order, None if order else 'order rejected'
+        except Exception as e:
+            return None, str(e)
+
+    def place(self, symbol, levels):
+        """
+        Place limit orders for several grid levels at once
+
+        Args:
+            symbol (str): Trading pair
+            levels (list): Dicts with 'side', 'price', 'quantity' and optional
+                'required' (bool) - a failed required level rolls the batch back
+
+        Returns:
+            dict: 'results' (one dict per level, same order as levels, with
+                  'order' and 'error'), 'placed', 'failed' (failed levels),
+                  'rolled_back' (bool) and 'elapsed' (seconds)
+        """
+        start = time.time()
+        report = {'results': [], 'placed': 0, 'failed': [], 'rolled_back': False, 'elapsed': 0}
+        if not levels:
+            return report
+
+        workers = self._worker_count(len(levels))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='grid-order') as pool:
+            futures = [pool.submit(self._place_one, symbol, level) for level in levels]
+            # Hasil dikumpulkan sesuai urutan level, bukan urutan selesai
+            for level, future in zip(levels, futures):
+                order, error = future.result()
+                result = dict(level, order=order, error=error)
+                report['results'].append(result)
+                if order:
+                    report['placed'] += 1
+                else:
+                    report['failed'].append(result)
+
+        required_failed = [r for r in report['failed'] if r.get('required')]
+        if required_failed:
+            for r in required_failed:
+                logger.error(f"Required {r['side']} level {r['price']} failed: {r['error']}")
+            self._rollback(symbol, report)
+
+        report['elapsed'] = time.time() - start
+        logger.info(f"Placed {report['placed']}/{len(levels)} orders in {report['elapsed']:.2f}s with {workers} workers"
+                    f"{' (rolled back)' if report['rolled_back'] else ''}")
+        return report
+
+    def _rollback(self, symbol, report):
+        """Cancel every order placed by this batch; failures end up in report['not_cancelled']"""
+        placed = [r for r in report['results'] if r['order']]
+        logger.warning(f"Rolling back {len(placed)} orders of the partially built grid")
+
+        def cancel(result):
+            # Timeout atau koneksi putus pada satu cancel tidak boleh menggagalkan seluruh rollback
+            try:
+                return self.client.cancel_order(result['order']['orderId'], symbol)
+            except Exception as e:
+                logger.error(f"Failed to cancel order {result['order']['orderId']} during rollback: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self._worker_count(max(1, len(placed))), thread_name_prefix='grid-cancel') as pool:
+            cancelled = list(pool.map(cancel, placed))
+
+        not_cancelled = [r['order']['orderId'] for r, ok in zip(placed, cancelled) if not ok]
+        if not_cancelled:
+            logger.error(f"Rollback could not cancel orders: {not_cancelled}")
+        for result in placed:
+            if result['order']['orderId'] not in not_cancelled:
+                result['order'] = None
+                result['error'] = 'rolled back'
+        report['placed'] = len(not_cancelled)
+        report['rolled_back'] = True
+        report['not_cancelled'] = not_cancelled
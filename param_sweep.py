@@ -0,0 +1,248 @@
+import argparse
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import config
+from backtest import Backtest, load_market_data
+from state_journal import atomic_write_json
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Ruang parameter default
+DEFAULT_WIDTHS = [4, 6, 8, 10, 12, 15]           # Lebar grid total dalam % dari harga awal
+DEFAULT_BIASES = [0.4, 0.5, 0.6]                 # Porsi lebar grid di atas harga (0.6 = bias bullish)
+DEFAULT_GRID_NUMBERS = [3, 4, 5, 6, 7, 8, 10, 12]
+DEFAULT_RECENTER_RULES = ['0.02@900', '0.03@900', '0.05@3600', 'off']  # margin@interval detik, 'off' = tidak pernah
+RANK_KEYS = ('sharpe', 'calmar', 'pnl_pct', 'pnl')
+
+def default_quantities():
+    return sorted({max(1, round(config.QUANTITY * factor)) for factor in (0.5, 1, 1.5)})
+
+def parse_recenter_rule(rule):
+    """
+    Parse a re-center rule
+
+    Args:
+        rule (str): 'margin@interval' (e.g. '0.02@900') or 'off'
+
+    Returns:
+        dict: 'recenter_margin' and 'adjust_interval' (0 = never re-center)
+    """
+    if rule == 'off':
+        return {'recenter_margin': None, 'adjust_interval': 0}
+    margin, _, interval = rule.partition('@')
+    return {
+        'recenter_margin': float(margin),
+        'adjust_interval': float(interval) if interval else getattr(config, 'GRID_ADJUST_INTERVAL', 900)
+    }
+
+def grid_range(first_price, width, bias):
+    """Lower and upper price of a grid width% wide with bias of it above first_price"""
+    precision = getattr(config, 'PRICE_PRECISION', 4)
+    lower = round(first_price * (1 - width * (1 - bias) / 100), precision)
+    upper = round(first_price * (1 + width * bias / 100), precision)
+    return lower, upper
+
+def build_combinations(widths=None, biases=None, grid_numbers=None, quantities=None, recenter_rules=None):
+    """Cartesian product of the sweep axes as parameter dicts"""
+    combinations = []
+    for width, bias, grid_number, quantity, rule in itertools.product(
+            widths or DEFAULT_WIDTHS, biases or DEFAULT_BIASES, grid_numbers or DEFAULT_GRID_NUMBERS,
+            quantities or default_quantities(), recenter_rules or DEFAULT_RECENTER_RULES):
+        combination = {'width': width, 'bias': bias, 'grid_number': grid_number, 'quantity': quantity, 'recenter': rule}
+        combination.update(parse_recenter_rule(rule))
+        combinations.append(combination)
+    return combinations
+
+# State per proses worker: data pasar dimuat sekali per worker, bukan per kombinasi
+_market = None
+_settings = None
+
+def _init_worker(path, settings):
+    global _market, _settings
+    # Ribuan backtest: log bot dimatikan di worker
+    logging.disable(logging.CRITICAL)
+    _market = load_market_data(path)
+    _settings = settings
+
+def evaluate(params, data=None, settings=None):
+    """
+    Backtest one parameter combination
+
+    Args:
+        params (dict): Combination from build_combinations
+        data (dict): Market data (default: the data loaded by the worker)
+        settings (dict): Fixed Backtest arguments (balances, fees, risk limits)
+
+    Returns:
+        dict: Params, grid range and the key numbers of the backtest report
+    """
+    data = _market if data is None else data
+    settings = _settings if settings is None else settings
+    lower, upper = grid_range(float(data['open'][0]), params['width'], params['bias'])
+    result = {'params': params, 'lower_price': lower, 'upper_price': upper}
+    try:
+        report = Backtest(
+            data, lower_price=lower, upper_price=upper, grid_number=params['grid_number'],
+            quantity=params['quantity'], adjust_interval=params['adjust_interval'],
+            recenter_margin=params['recenter_margin'], **(settings or {})
+        ).run()
+    except Exception as e:
+        result['error'] = str(e)
+        return result
+    result.update({
+        'pnl': report['pnl'],
+        'pnl_pct': report['pnl_pct'],
+        'sharpe': report['sharpe'],
+        'calmar': report['calmar'],
+        'max_drawdown_pct': report['max_drawdown_pct'],
+        'realized_profit': report['realized_profit'],
+        'fees': report['fees'],
+        'fills': report['fills']['total'],
+        'rejected': report['orders']['rejected'],
+        'inventory_change': report['inventory']['change'],
+        'regrids': report['regrids'],
+        'stop_loss_triggers': report['risk']['stop_loss_triggers'],
+        'emergency_exits': report['risk']['emergency_exits'],
+        'initial_value': report['initial']['value']
+    })
+    return result
+
+def stopped_out(result):
+    """True if the stop loss fired during the run, so its numbers are not the grid's alone"""
+    return bool(result.get('stop_loss_triggers') or result.get('emergency_exits'))
+
+def rank_results(results, rank_by='sharpe'):
+    """
+    Sort results best first by rank_by (ties broken by pnl_pct)
+
+    Runs where the stop loss fired rank after every clean run and failed runs
+    go last, so the top result is always a grid that survived the data.
+    """
+    def score(result):
+        if 'error' in result:
+            return (2, 0, 0)
+        value = result.get(rank_by)
+        return (1 if stopped_out(result) else 0, -(value if value is not None else float('-inf')), -result['pnl_pct'])
+    ranked = sorted(results, key=score)
+    for rank, result in enumerate(ranked, 1):
+        result['rank'] = rank
+    return ranked
+
+def run_sweep(path, combinations, settings=None, workers=None, rank_by='sharpe'):
+    """
+    Evaluate all combinations in parallel, one backtest per combination
+
+    Args:
+        path (str): Market data CSV (see backtest.load_market_data)
+        combinations (list): Parameter dicts from build_combinations
+        settings (dict): Fixed Backtest arguments shared by every run
+        workers (int): Worker processes (default: all cores)
+        rank_by (str): Ranking key, one of RANK_KEYS
+
+    Returns:
+        dict: Sweep summary with the ranked 'results'
+    """
+    if rank_by not in RANK_KEYS:
+        raise ValueError(f"rank_by must be one of {RANK_KEYS}")
+    data = load_market_data(path)
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(combinations) // (workers * 4))
+    started = time.time()
+    results = []
+    logger.info(f"Evaluating {len(combinations)} combinations on {len(data['time'])} {data['kind']} with {workers} workers")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path, settings)) as pool:
+        step = max(1, len(combinations) // 10)
+        for i, result in enumerate(pool.map(evaluate, combinations, chunksize=chunksize), 1):
+            results.append(result)
+            if i % step == 0 or i == len(combinations):
+                logger.info(f"{i}/{len(combinations)} combinations evaluated ({time.time() - started:.1f}s)")
+
+    return {
+        'data': os.path.abspath(path),
+        'bars': len(data['time']),
+        'first_price': float(data['open'][0]),
+        'last_price': float(data['close'][-1]),
+        'rank_by': rank_by,
+        'settings': settings or {},
+        'evaluated': len(results),
+        'failed': sum(1 for r in results if 'error' in r),
+        'stopped_out': sum(1 for r in results if stopped_out(r)),
+        'elapsed': time.time() - started,
+        'results': rank_results(results, rank_by)
+    }
+
+def _float_list(value):
+    return [float(v) for v in value.split(',')] if value else None
+
+def _int_list(value):
+    return [int(v) for v in value.split(',')] if value else None
+
+def main():
+    """Run a parameter sweep from the command line"""
+    parser = argparse.ArgumentParser(description='Rank grid parameter combinations by backtesting them in parallel')
+    parser.add_argument('data', help='CSV with klines or trades (see backtest.py)')
+    parser.add_argument('--widths', help=f'Grid widths in %% of the first price (default: {DEFAULT_WIDTHS})')
+    parser.add_argument('--biases', help=f'Share of the width above the price (default: {DEFAULT_BIASES})')
+    parser.add_argument('--grids', help=f'Grid numbers (default: {DEFAULT_GRID_NUMBERS})')
+    parser.add_argument('--quantities', help='Order quantities (default: 0.5x, 1x and 1.5x config.QUANTITY)')
+    parser.add_argument('--recenter', help=f'Re-center rules margin@seconds or off (default: {",".join(DEFAULT_RECENTER_RULES)})')
+    parser.add_argument('--rank-by', default='sharpe', choices=RANK_KEYS, help='Ranking key (default: sharpe)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--output', default=getattr(config, 'SWEEP_RESULTS_FILE', 'trading_logs/param_sweep.json'),
+                        help='Ranked results JSON (read by auto-config)')
+    parser.add_argument('--top', type=int, default=10, help='Number of results to print')
+    parser.add_argument('--quote', type=float, help='Starting quote balance (default: per combination, see backtest.py)')
+    parser.add_argument('--base', type=float, help='Starting base balance (default: per combination)')
+    parser.add_argument('--maker-fee', type=float, help='Maker fee rate')
+    parser.add_argument('--taker-fee', type=float, help='Taker fee rate')
+    parser.add_argument('--max-investment', type=float, help='Override MAX_INVESTMENT')
+    parser.add_argument('--stop-loss', type=float, help='Override STOP_LOSS_PERCENTAGE')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler()],
+        force=True
+    )
+
+    combinations = build_combinations(
+        _float_list(args.widths), _float_list(args.biases), _int_list(args.grids),
+        _float_list(args.quantities), args.recenter.split(',') if args.recenter else None
+    )
+    settings = {
+        key: value for key, value in (
+            ('quote_balance', args.quote), ('base_balance', args.base),
+            ('maker_fee', args.maker_fee), ('taker_fee', args.taker_fee),
+            ('max_investment', args.max_investment), ('stop_loss_percentage', args.stop_loss)
+        ) if value is not None
+    }
+    sweep = run_sweep(args.data, combinations, settings, args.workers, args.rank_by)
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    atomic_write_json(args.output, sweep, indent=2)
+
+    print(f"\nEvaluated {sweep['evaluated']} combinations in {sweep['elapsed']:.1f}s "
+          f"({sweep['failed']} failed, {sweep['stopped_out']} hit the stop loss and rank last)")
+    print(f"Top {args.top} by {args.rank_by}:")
+    for result in sweep['results'][:args.top]:
+        if 'error' in result:
+            continue
+        params = result['params']
+        calmar = f"{result['calmar']:.2f}" if result['calmar'] is not None else '-'
+        print(f"  #{result['rank']:<4} {result['lower_price']:.4f}-{result['upper_price']:.4f} "
+              f"width {params['width']}% bias {params['bias']} grids {params['grid_number']} qty {params['quantity']} "
+              f"recenter {params['recenter']}: PnL {result['pnl_pct']:.2f}%, Sharpe {result['sharpe']:.2f}, "
+              f"Calmar {calmar}, DD {result['max_drawdown_pct']:.2f}%, {result['fills']} fills, "
+              f"{result['stop_loss_triggers']} stop loss / {result['emergency_exits']} emergency exits"
+              f"{' STOPPED OUT' if stopped_out(result) else ''}")
+    print(f"\nResults written to {args.output}; apply the best with: python run.py auto-config --sweep")
+
+if __name__ == "__main__":
+    main()
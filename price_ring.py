@@ -0,0 +1,187 @@
+import datetime
+import logging
+import threading
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def _to_epoch(value):
+    """Timestamp as epoch seconds; accepts epoch numbers, ISO strings and datetimes"""
+    if value is None:
+        return datetime.datetime.now().timestamp()
+    if isinstance(value, (int, float, np.floating)):
+        return float(value)
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    # Format log lama memakai koma untuk milidetik
+    return datetime.datetime.fromisoformat(str(value).replace(',', '.')).timestamp()
+
+class PriceRing:
+    """
+    Fixed-capacity ring buffer of (timestamp, price, USDT/IDR rate) in NumPy arrays.
+
+    Every sample is written twice, at i and i + capacity, so the last n
+    samples are always one contiguous slice: window() returns views without
+    copying and append() is O(1). Views stay valid until the samples they
+    cover are overwritten; use to_records() or copy() for a stable snapshot.
+    """
+
+    FIELDS = ('time', 'price', 'usdt_idr')
+
+    def __init__(self, capacity=1000):
+        """
+        Args:
+            capacity (int): Number of samples kept; older ones are overwritten
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = int(capacity)
+        self._data = np.full((3, 2 * self.capacity), np.nan)
+        self._next = 0   # Posisi tulis berikutnya dalam [0, capacity)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.read_only = False  # True untuk salinan dari frozen()/from_array()
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def append(self, price, usdt_idr=None, ts=None):
+        """
+        Add one sample, overwriting the oldest when full
+
+        Args:
+            price (float): Price
+            usdt_idr (float): USDT/IDR rate, NaN if unknown
+            ts: Epoch seconds, ISO string or datetime (default: now)
+        """
+        sample = (_to_epoch(ts), float(price), np.nan if usdt_idr is None else float(usdt_idr))
+        with self._lock:
+            i = self._next
+            self._data[:, i] = sample
+            self._data[:, i + self.capacity] = sample
+            self._next = (i + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def append_record(self, record):
+        """Add a {'time'/'timestamp', 'price', 'usdt_idr'} dict"""
+        self.append(record['price'], record.get('usdt_idr'), record.get('time') or record.get('timestamp'))
+
+    def extend(self, records):
+        for record in records:
+            self.append_record(record)
+
+    def clear(self):
+        with self._lock:
+            self._next = 0
+            self._size = 0
+
+    def _window(self, n=None):
+        """Contiguous (3, n) view of the last n samples, oldest first"""
+        n = self._size if n is None else max(0, min(int(n), self._size))
+        end = self._next + self.capacity
+        view = self._data[:, end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def window(self, n=None):
+        """
+        Zero-copy views of the last n samples (all samples if n is None)
+
+        Returns:
+            tuple: (timestamps, prices, usdt_idr) read-only arrays, oldest first
+        """
+        view = self._window(n)
+        return view[0], view[1], view[2]
+
+    def prices(self, n=None):
+        return self._window(n)[1]
+
+    def timestamps(self, n=None):
+        return self._window(n)[0]
+
+    def rates(self, n=None):
+        return self._window(n)[2]
+
+    def last(self):
+        """Latest sample as a record, None when empty"""
+        if not self._size:
+            return None
+        return self.to_records(1)[0]
+
+    def last_time(self):
+        """Epoch seconds of the latest sample, None when empty"""
+        return float(self._window(1)[0][0]) if self._size else None
+
+    def stats(self, n=None):
+        """
+        Vectorized statistics over the last n prices
+
+        Returns:
+            dict: count, min, max, mean, std and change_pct (first to last), None values when empty
+        """
+        prices = self.prices(n)
+        if not len(prices):
+            return {'count': 0, 'min': None, 'max': None, 'mean': None, 'std': None, 'change_pct': None}
+        first = prices[0]
+        return {
+            'count': int(len(prices)),
+            'min': float(prices.min()),
+            'max': float(prices.max()),
+            'mean': float(prices.mean()),
+            'std': float(prices.std()),
+            'change_pct': float((prices[-1] - first) / first * 100) if first else None
+        }
+
+    def copy(self, n=None):
+        """Independent (3, n) array of the last n samples"""
+        with self._lock:
+            return self._window(n).copy()
+
+    def frozen(self, n=None):
+        """
+        Read-only ring holding a copy of the last n samples (for published snapshots)
+
+        Returns:
+            PriceRing: Ring whose append() raises ValueError
+        """
+        return PriceRing.from_array(self.copy(n))
+
+    @classmethod
+    def from_array(cls, data):
+        """
+        Read-only ring over a (3, n) array of samples, oldest first (e.g. decoded from the state bus)
+
+        Returns:
+            PriceRing: Ring whose append() raises ValueError
+        """
+        size = data.shape[1]
+        ring = cls(max(size, 1))
+        if size:
+            ring._data[:, :size] = data
+            ring._data[:, ring.capacity:ring.capacity + size] = data
+        ring._next = size % ring.capacity
+        ring._size = size
+        ring._data.flags.writeable = False
+        ring.read_only = True
+        return ring
+
+    def to_records(self, n=None):
+        """
+        Last n samples as JSON-friendly dicts (for the dashboard and APIs)
+
+        Returns:
+            list: {'time': ISO string, 'price': float, 'usdt_idr': float or None}
+        """
+        data = self.copy(n)
+        return [
+            {
+                'time': datetime.datetime.fromtimestamp(ts).isoformat(),
+                'price': float(price),
+                'usdt_idr': None if np.isnan(rate) else float(rate)
+            }
+            for ts, price, rate in data.T
+        ]
@@ -0,0 +1,277 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qs
+import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Prioritas request: order/cancel selalu didahulukan dari pembacaan data
+PRIORITY_HIGH = 0    # Place/cancel order
+PRIORITY_NORMAL = 1  # Harga, open orders, status order
+PRIORITY_LOW = 2     # Logging balance, pembacaan dashboard
+
+PRIORITY_NAMES = {PRIORITY_HIGH: 'high', PRIORITY_NORMAL: 'normal', PRIORITY_LOW: 'low'}
+
+# Request weight per endpoint (Binance spot REST API)
+ENDPOINT_WEIGHTS = {
+    'GET /api/v3/ping': 1,
+    'GET /api/v3/time': 1,
+    'GET /api/v3/exchangeInfo': 20,
+    'GET /api/v3/depth': 5,
+    'GET /api/v3/klines': 2,
+    'GET /api/v3/ticker/price': 2,
+    'GET /api/v3/ticker/24hr': 2,
+    'GET /api/v3/account': 20,
+    'GET /api/v3/order': 4,
+    'GET /api/v3/openOrders': 6,
+    'GET /api/v3/allOrders': 20,
+    'GET /api/v3/myTrades': 20,
+    'POST /api/v3/order': 1,
+    'DELETE /api/v3/order': 1,
+    'DELETE /api/v3/openOrders': 1,
+    'POST /api/v3/userDataStream': 2,
+    'PUT /api/v3/userDataStream': 2,
+    'DELETE /api/v3/userDataStream': 2,
+}
+
+# Endpoint tanpa parameter symbol jauh lebih mahal
+UNSCOPED_WEIGHTS = {
+    'GET /api/v3/ticker/price': 4,
+    'GET /api/v3/ticker/24hr': 80,
+    'GET /api/v3/openOrders': 80,
+}
+
+ORDER_ENDPOINTS = {'POST /api/v3/order'}
+HIGH_PRIORITY_ENDPOINTS = {'POST /api/v3/order', 'DELETE /api/v3/order', 'DELETE /api/v3/openOrders'}
+
+_context = threading.local()
+
+@contextmanager
+def request_priority(priority):
+    """Run the enclosed REST calls of this thread at the given priority"""
+    previous = getattr(_context, 'priority', None)
+    _context.priority = priority
+    try:
+        yield
+    finally:
+        _context.priority = previous
+
+def _has_symbol(query, params):
+    """Check whether the call is scoped to a symbol (URL query or requests params)"""
+    if 'symbol' in parse_qs(query):
+        return True
+    if isinstance(params, dict):
+        return 'symbol' in params
+    if isinstance(params, (list, tuple)):
+        return any(item[0] == 'symbol' for item in params)
+    if isinstance(params, str):
+        return 'symbol' in parse_qs(params)
+    return False
+
+def endpoint_weight(method, url, params=None):
+    """
+    Request weight of a call
+
+    Args:
+        method (str): HTTP method
+        url (str): Request URL
+        params: Query parameters passed separately to requests
+
+    Returns:
+        tuple: (endpoint key, weight, order count)
+    """
+    parsed = urlparse(url)
+    key = f"{method.upper()} {parsed.path}"
+    weight = ENDPOINT_WEIGHTS.get(key, 1)
+    if key in UNSCOPED_WEIGHTS and not _has_symbol(parsed.query, params):
+        weight = UNSCOPED_WEIGHTS[key]
+    orders = 1 if key in ORDER_ENDPOINTS else 0
+    return key, weight, orders
+
+class RateLimitGovernor:
+    """
+    Client-side token bucket for Binance request weight and order count.
+
+    Every REST call takes its endpoint weight from a bucket that refills at
+    the per-minute limit. The bucket is re-synced with the server's
+    X-MBX-USED-WEIGHT-1M / X-MBX-ORDER-COUNT-10S headers after each response,
+    so weight used by other processes on the same IP is accounted for too.
+
+    Low and normal priority calls may not dip into a reserve kept for order
+    placement and cancellation, and they wait while a high priority call is
+    queued. A 429/418 response blocks all calls until its Retry-After expires.
+    """
+
+    def __init__(self, weight_limit=None, order_limit=None, reserve=None):
+        """
+        Args:
+            weight_limit (int): Request weight per minute
+            order_limit (int): Orders per 10 seconds
+            reserve (float): Fraction of the weight budget reserved for high priority calls
+        """
+        self.weight_limit = weight_limit or getattr(config, 'RATE_LIMIT_WEIGHT_1M', 1200)
+        self.order_limit = order_limit or getattr(config, 'RATE_LIMIT_ORDERS_10S', 50)
+        self.reserve = reserve if reserve is not None else getattr(config, 'RATE_LIMIT_RESERVE', 0.2)
+
+        self.weight_rate = self.weight_limit / 60.0
+        self.order_rate = self.order_limit / 10.0
+        self._weight_tokens = float(self.weight_limit)
+        self._order_tokens = float(self.order_limit)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._server_used_weight = None
+        self._server_order_count = None
+
+        self._cond = threading.Condition()
+        self._waiting = {PRIORITY_HIGH: 0, PRIORITY_NORMAL: 0, PRIORITY_LOW: 0}
+        self.stats = {'requests': 0, 'delayed': 0, 'wait_time': 0.0, 'rate_limited': 0}
+
+    def _refill(self, now):
+        """Add tokens for the elapsed time (caller holds the lock)"""
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._weight_tokens = min(self.weight_limit, self._weight_tokens + elapsed * self.weight_rate)
+            self._order_tokens = min(self.order_limit, self._order_tokens + elapsed * self.order_rate)
+            self._last_refill = now
+
+    def _floor(self, priority):
+        """Tokens a call of this priority must leave in the bucket"""
+        if priority == PRIORITY_HIGH:
+            return 0.0
+        if priority == PRIORITY_NORMAL:
+            return self.weight_limit * self.reserve / 2
+        return self.weight_limit * self.reserve
+
+    def _wait_time(self, weight, orders, priority, now):
+        """Seconds until the call may proceed, 0 if it can go now (caller holds the lock)"""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        # Call prioritas rendah mengantri di belakang call prioritas lebih tinggi
+        if any(self._waiting[p] for p in self._waiting if p < priority):
+            return 0.05
+        needed = weight + self._floor(priority) - self._weight_tokens
+        wait = needed / self.weight_rate if needed > 0 else 0.0
+        if orders:
+            order_needed = orders - self._order_tokens
+            if order_needed > 0:
+                wait = max(wait, order_needed / self.order_rate)
+        return wait
+
+    def acquire(self, weight, orders=0, priority=PRIORITY_NORMAL):
+        """
+        Block until the call fits the budget, then consume its weight
+
+        Args:
+            weight (int): Request weight of the call
+            orders (int): Number of orders the call places
+            priority (int): PRIORITY_HIGH, PRIORITY_NORMAL or PRIORITY_LOW
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        start = time.monotonic()
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = self._wait_time(weight, orders, priority, now)
+                    if wait <= 0:
+                        break
+                    self._cond.wait(min(wait, 1.0))
+            finally:
+                self._waiting[priority] -= 1
+
+            self._weight_tokens -= weight
+            self._order_tokens -= orders
+            waited = time.monotonic() - start
+            self.stats['requests'] += 1
+            if waited > 0.001:
+                self.stats['delayed'] += 1
+                self.stats['wait_time'] += waited
+            # Bangunkan antrian di belakang call ini
+            self._cond.notify_all()
+
+        if waited > 1:
+            logger.info(f"Rate limit governor delayed {PRIORITY_NAMES[priority]} priority call by {waited:.1f}s")
+        return waited
+
+    def acquire_for(self, method, url, params=None):
+        """Acquire the budget for a REST call, priority taken from context or endpoint"""
+        key, weight, orders = endpoint_weight(method, url, params)
+        priority = getattr(_context, 'priority', None)
+        if key in HIGH_PRIORITY_ENDPOINTS:
+            priority = PRIORITY_HIGH
+        elif priority is None:
+            priority = PRIORITY_NORMAL
+        return self.acquire(weight, orders, priority)
+
+    def update_from_headers(self, headers, status=None):
+        """Re-sync the buckets with the server's used-weight/order-count headers"""
+        used_weight = headers.get('x-mbx-used-weight-1m')
+        order_count = headers.get('x-mbx-order-count-10s')
+        with self._cond:
+            if used_weight is not None:
+                try:
+                    self._server_used_weight = int(used_weight)
+                    # Server tahu weight dari semua proses pada IP ini
+                    self._weight_tokens = min(self._weight_tokens, self.weight_limit - self._server_used_weight)
+                except ValueError:
+                    pass
+            if order_count is not None:
+                try:
+                    self._server_order_count = int(order_count)
+                    self._order_tokens = min(self._order_tokens, self.order_limit - self._server_order_count)
+                except ValueError:
+                    pass
+            if status in (418, 429):
+                try:
+                    retry_after = float(headers.get('Retry-After', 60))
+                except ValueError:
+                    retry_after = 60.0
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+                self.stats['rate_limited'] += 1
+                logger.warning(f"Binance returned {status}, pausing REST calls for {retry_after:.0f}s")
+            self._cond.notify_all()
+
+    def get_budget(self):
+        """
+        Current budget, for callers that adapt their polling rate
+
+        Returns:
+            dict: available weight/orders, utilization (0-1), waiting calls and counters
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            available = max(0.0, self._weight_tokens)
+            return {
+                'weight_limit': self.weight_limit,
+                'weight_available': round(available, 1),
+                'low_priority_available': round(max(0.0, available - self._floor(PRIORITY_LOW)), 1),
+                'utilization': round(1 - available / self.weight_limit, 3),
+                'orders_available': round(max(0.0, self._order_tokens), 1),
+                'server_used_weight_1m': self._server_used_weight,
+                'server_order_count_10s': self._server_order_count,
+                'blocked_for': max(0.0, self._blocked_until - now),
+                'waiting': {PRIORITY_NAMES[p]: n for p, n in self._waiting.items()},
+                'requests': self.stats['requests'],
+                'delayed': self.stats['delayed'],
+                'wait_time': round(self.stats['wait_time'], 3),
+                'rate_limited': self.stats['rate_limited']
+            }
+
+_governor = None
+_governor_lock = threading.Lock()
+
+def get_rate_governor():
+    """Process-wide governor shared by all Binance sessions"""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = RateLimitGovernor()
+        return _governor
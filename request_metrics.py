@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Batas atas bucket histogram latency dalam milidetik (bucket terakhir = sisanya)
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class EndpointStats:
+    """Latency histogram and counters for one endpoint"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.status_codes = {}
+        self.last_weight = None
+
+    def record(self, latency_ms, status=None, weight=None, error=False):
+        self.count += 1
+        self.total_ms += latency_ms
+        if latency_ms > self.max_ms:
+            self.max_ms = latency_ms
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        if status is not None:
+            self.status_codes[status] = self.status_codes.get(status, 0) + 1
+        if weight is not None:
+            self.last_weight = weight
+        if error:
+            self.errors += 1
+
+    def percentile(self, pct):
+        """Upper bucket bound containing the given percentile (ms)"""
+        if not self.count:
+            return None
+        target = self.count * pct / 100.0
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else 0,
+            'max_ms': round(self.max_ms, 2),
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'histogram': dict(zip([f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"], self.buckets)),
+            'status_codes': dict(self.status_codes),
+            'last_weight': self.last_weight
+        }
+
+class RequestMetrics:
+    """
+    Thread-safe per-endpoint request metrics.
+
+    Endpoints are keyed as "METHOD /path" (query string excluded). Binance
+    responses also carry the used request weight in X-MBX-USED-WEIGHT-1M,
+    which is tracked as the most recent account-wide weight.
+    """
+
+    WEIGHT_HEADER = 'x-mbx-used-weight-1m'
+    ORDER_COUNT_HEADER = 'x-mbx-order-count-10s'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.started_at = time.time()
+        self.used_weight_1m = None
+        self.order_count_10s = None
+        self.weight_updated_at = None
+
+    @staticmethod
+    def endpoint_key(method, url):
+        parsed = urlparse(url)
+        return f"{method.upper()} {parsed.path or '/'}"
+
+    def record(self, method, url, latency_ms, status=None, headers=None, error=False):
+        key = self.endpoint_key(method, url)
+        weight = None
+        if headers is not None:
+            raw_weight = headers.get(self.WEIGHT_HEADER)
+            if raw_weight is not None:
+                try:
+                    weight = int(raw_weight)
+                except ValueError:
+                    weight = None
+            raw_orders = headers.get(self.ORDER_COUNT_HEADER)
+        else:
+            raw_orders = None
+
+        with self._lock:
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = EndpointStats()
+                self._endpoints[key] = stats
+            stats.record(latency_ms, status, weight, error)
+            if weight is not None:
+                self.used_weight_1m = weight
+                self.weight_updated_at = time.time()
+            if raw_orders is not None:
+                try:
+                    self.order_count_10s = int(raw_orders)
+                except ValueError:
+                    pass
+
+    def get_snapshot(self):
+        """All metrics as a JSON-serializable dict"""
+        with self._lock:
+            endpoints = {key: stats.to_dict() for key, stats in self._endpoints.items()}
+            total = sum(s['count'] for s in endpoints.values())
+            errors = sum(s['errors'] for s in endpoints.values())
+            total_ms = sum(stats.total_ms for stats in self._endpoints.values())
+            return {
+                'uptime': time.time() - self.started_at,
+                'requests': total,
+                'errors': errors,
+                'total_time_ms': round(total_ms, 2),
+                'used_weight_1m': self.used_weight_1m,
+                'order_count_10s': self.order_count_10s,
+                'weight_age': time.time() - self.weight_updated_at if self.weight_updated_at else None,
+                'endpoints': dict(sorted(endpoints.items(), key=lambda item: -item[1]['count']))
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+            self.started_at = time.time()
+
+class InstrumentedSession(requests.Session):
+    """
+    requests.Session with a keep-alive connection pool that records every
+    request, optionally passing each call through a rate limit governor first
+    """
+
+    def __init__(self, metrics=None, pool_connections=4, pool_maxsize=16, governor=None):
+        super().__init__()
+        self.metrics = metrics if metrics is not None else get_request_metrics()
+        self.governor = governor
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        if self.governor is not None:
+            params = kwargs.get('params', args[0] if args else None)
+            self.governor.acquire_for(method, url, params)
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.RequestException:
+            self.metrics.record(method, url, (time.perf_counter() - start) * 1000, error=True)
+            raise
+        latency_ms = (time.perf_counter() - start) * 1000
+        if self.governor is not None:
+            self.governor.update_from_headers(response.headers, response.status_code)
+        self.metrics.record(
+            method, url, latency_ms,
+            status=response.status_code,
+            headers=response.headers,
+            error=response.status_code >= 400
+        )
+        return response
+
+_metrics = RequestMetrics()
+
+def get_request_metrics():
+    """Process-wide request metrics shared by all sessions"""
+    return _metrics
+
+def create_session(headers=None, metrics=None, governor=None):
+    """
+    Create a pooled, instrumented session
+
+    Args:
+        headers (dict): Default headers for every request
+        metrics (RequestMetrics): Metrics sink, defaults to the shared one
+        governor (RateLimitGovernor): Optional rate limit governor for the session's calls
+
+    Returns:
+        InstrumentedSession
+    """
+    session = InstrumentedSession(metrics, governor=governor)
+    if headers:
+        session.headers.update(headers)
+    return session
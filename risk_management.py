@@ -13,6 +13,7 @@ class RiskManager:
         self.symbol = config.SYMBOL
         self.max_investment = config.MAX_INVESTMENT
         self.stop_loss_percentage = config.STOP_LOSS_PERCENTAGE
+        self.stats = {'stop_loss_triggers': 0, 'emergency_exits': 0}
         
         # Extract base and quote assets from symbol (e.g., BTCUSDT -> BTC, USDT)
         if 'USDT' in self.symbol:
@@ -87,6 +88,7 @@ class RiskManager:
             stop_loss_price = entry_price * (1 - self.stop_loss_percentage / 100)
             
             if current_price < stop_loss_price:
+                self.stats['stop_loss_triggers'] += 1
                 logger.warning(f"Stop loss triggered! Entry price: {entry_price}, "
                                f"Current price: {current_price}, Stop loss price: {stop_loss_price}")
                 return True
@@ -99,28 +101,35 @@ class RiskManager:
     def execute_emergency_exit(self):
         """Cancel all orders and sell all holdings in case of emergency"""
         logger.warning("Executing emergency exit strategy")
+        self.stats['emergency_exits'] += 1
         
         try:
-            # Cancel all open orders
-            open_orders = self.client.get_open_orders(self.symbol)
-            if open_orders:
-                for order in open_orders:
-                    self.client.cancel_order(order['orderId'], self.symbol)
-                logger.info("Cancelled all open orders")
+            # Cancel all open orders in one request
+            cancel_result = self.client.cancel_all_orders(self.symbol)
+            if cancel_result['cancelled']:
+                logger.info(f"Cancelled all open orders ({len(cancel_result['cancelled'])}, {cancel_result['method']})")
+            if cancel_result['failed']:
+                logger.warning(f"Failed to cancel orders: {cancel_result['failed']}")
             
             # Sell all base asset at market price
             base_balance = self.client.get_account_balance(self.base_asset)
             if base_balance and base_balance['free'] > 0:
-                # Get minimum order quantity from exchange info (not implemented)
-                # For simplicity, assume we can sell the entire balance
+                # Bulatkan ke bawah ke step size dan cek LOT_SIZE/MIN_NOTIONAL seperti order limit
+                quantity = self.client.format_quantity(self.symbol, base_balance['free'])
+                current_price = self.client.get_symbol_price(self.symbol)
+                rejection = self.client.validate_order(self.symbol, quantity, current_price) if current_price else None
+                if rejection:
+                    logger.error(f"Emergency sell of {quantity} {self.base_asset} rejected locally: {rejection}")
+                    return False
                 try:
                     result = self.client.client.create_order(
                         symbol=self.symbol,
                         side="SELL",
                         type="MARKET",
-                        quantity=base_balance['free']
+                        quantity=quantity
                     )
                     logger.info(f"Emergency sell executed: {result}")
+                    self.client.invalidate_balance_cache()
                     return True
                 except BinanceAPIException as e:
                     logger.error(f"Failed to execute emergency sell: {e}")
@@ -8,6 +8,10 @@ from grid_bot import GridTradingBot
 from dashboard import run_dashboard
 from auto_balancer import AutoBalancer
 from auto_config import auto_configure  # Import fungsi auto_configure
+import config
+from state_journal import load_state
+from metrics_engine import MetricsEngine, audit
+from trading_analytics import get_analytics
 
 # Konfigurasi logging
 logging.basicConfig(
@@ -50,6 +54,52 @@ def run_bot(with_auto_balance=False):
     except Exception as e:
         logger.error(f"Error dalam bot trading: {e}")
 
+def _log_audit_report(name, report):
+    """Tulis hasil audit metrik ke log"""
+    totals = report['recalculated']
+    logger.info(f"[AUDIT] {name}: {report['trades']} trades, profit {totals['profit']:.4f} USDT, "
+                f"{totals['sells']} SELL / {totals['buys']} BUY, win rate {totals['win_rate']:.2f}%")
+    if report['ok']:
+        logger.info(f"[AUDIT] {name}: running aggregates match the full recalculation")
+    else:
+        logger.warning(f"[AUDIT] {name}: {len(report['differences'])} differences found")
+        for difference in report['differences']:
+            logger.warning(f"[AUDIT] {name}: {difference['field']} expected {difference['expected']}, got {difference['actual']}")
+
+def run_audit():
+    """
+    Hitung ulang semua metrik dari riwayat trade lengkap dan bandingkan dengan
+    agregat yang disimpan (checkpoint + trade sesudahnya), tanpa menjalankan bot
+    
+    Returns:
+        bool: True jika semua agregat cocok
+    """
+    ok = True
+    
+    # Riwayat trade bot dari snapshot + journal
+    state_file = f"grid_state_{config.SYMBOL}.json"
+    state = load_state(state_file)
+    if state:
+        trades = state.get('trades', [])
+        engine = MetricsEngine.from_dict(state.get('metrics'))
+        engine.catch_up(trades)
+        report = audit(trades, engine, state.get('total_profit'))
+        _log_audit_report(state_file, report)
+        ok = ok and report['ok']
+    else:
+        logger.info(f"[AUDIT] {state_file} not found, skipping bot trades")
+    
+    # Transaksi yang dicatat analytics
+    analytics = get_analytics(config.SYMBOL)
+    try:
+        report = analytics.audit_metrics()
+        _log_audit_report(f"analytics {config.SYMBOL}", report)
+        ok = ok and report['ok']
+    finally:
+        analytics.close()
+    
+    return ok
+
 def run_dashboard_thread():
     """Jalankan dashboard web dalam thread terpisah"""
     try:
@@ -105,6 +155,9 @@ def run_dashboard_production():
                 "gunicorn", 
                 "--bind", "0.0.0.0:5000", 
                 "--workers", "4", 
+                # Tiap klien /stream memegang satu thread; worker sync akan tertahan selamanya
+                "--worker-class", "gthread",
+                "--threads", "8",
                 "--timeout", "120",
                 "wsgi:app"
             ]
@@ -129,10 +182,12 @@ def main():
     disable_sse = False
     auto_config = False  # Tambahkan flag untuk auto-config
     with_auto_balance = False  # Tambahkan flag untuk Auto Balancer
+    sweep_file = None  # Hasil param_sweep.py untuk auto-config
+    use_sweep = False
     
     # Parse arguments
     for arg in sys.argv[1:]:
-        if arg.lower() in ["bot", "dashboard", "both", "auto-config", "balance"]:  # Tambahkan opsi balance
+        if arg.lower() in ["bot", "dashboard", "both", "auto-config", "balance", "audit"]:  # Tambahkan opsi balance dan audit
             mode = arg.lower()
         elif arg.lower() in ["--production", "-p"]:
             production = True
@@ -140,6 +195,10 @@ def main():
             disable_sse = True
         elif arg.lower() in ["--with-balance", "--balancer"]:  # Support kedua flag
             with_auto_balance = True
+        elif arg.lower() == "--sweep":
+            use_sweep = True
+        elif arg.lower().startswith("--sweep="):
+            sweep_file = arg.split("=", 1)[1]
     
     # Set environment variable untuk disable SSE jika diminta
     if disable_sse:
@@ -149,13 +208,16 @@ def main():
     if mode == "auto-config":  # Tambahkan handler untuk mode auto-config
         # Jalankan proses auto-config
         logger.info("Menjalankan Auto-Configure untuk menyesuaikan konfigurasi bot...")
-        result = auto_configure()
+        result = auto_configure(sweep_file, use_sweep)
         if result:
             logger.info("Auto-Configure berhasil. Konfigurasi bot telah diperbarui.")
         else:
             logger.warning("Auto-Configure tidak selesai atau dibatalkan.")
         return
     
+    if mode == "audit":  # Verifikasi metrik dengan perhitungan ulang penuh
+        sys.exit(0 if run_audit() else 1)
+    
     if mode == "balance":  # Mode khusus untuk Auto Balancer
         logger.info("Menjalankan Auto Balancer sebagai mode independen")
         run_auto_balancer(safe_mode=False)
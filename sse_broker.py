@@ -0,0 +1,175 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+HEARTBEAT = ": heartbeat\n\n"
+
+def format_message(data, event=None, event_id=None):
+    """
+    Serialize data once into a Server-Sent Events message
+
+    Args:
+        data: JSON-serializable payload
+        event (str): Optional event name (default: the "message" event)
+        event_id: Optional event id, resent by the browser as Last-Event-ID
+
+    Returns:
+        str: SSE message ending with a blank line
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+class SSEClient:
+    """One connected stream: a bounded queue of serialized messages"""
+
+    def __init__(self, queue_size):
+        self.id = str(uuid.uuid4())
+        self.queue = deque(maxlen=queue_size)  # Penuh: pesan tertua dibuang
+        self.dropped = 0
+        self.resync = False  # Ada pesan terbuang: kirim state lengkap, bukan sisa antrian
+        self.closed = False
+        self.connected_at = time.time()
+
+class SSEBroker:
+    """
+    Push-based fan-out of dashboard updates to Server-Sent Events clients.
+
+    publish() serializes a message once and appends the same string to
+    every client queue, then wakes the waiting streams through one
+    condition variable. Idle streams block in Condition.wait until a message
+    or the heartbeat timeout, so hundreds of connected clients cost no CPU.
+    Queues are bounded deques that drop the oldest message when a client
+    falls behind, and a message identical to the previous one is not sent.
+    With a resync callback, a client that lost messages gets the full state
+    it returns instead of the rest of its queue.
+    """
+
+    def __init__(self, queue_size=None, heartbeat_interval=None, resync=None):
+        """
+        Args:
+            queue_size (int): Messages kept per client before the oldest is dropped
+            heartbeat_interval (float): Seconds of silence before a heartbeat comment is sent
+            resync (callable): Returns a serialized full-state message for a client that dropped messages
+        """
+        self.queue_size = queue_size or getattr(config, 'SSE_QUEUE_SIZE', 50)
+        self.heartbeat_interval = heartbeat_interval or getattr(config, 'SSE_HEARTBEAT_INTERVAL', 15)
+        self.resync = resync
+        self._cond = threading.Condition()
+        self._clients = {}
+        self._last_message = None
+        self.stats = {'published': 0, 'unchanged': 0, 'dropped': 0, 'resyncs': 0, 'connects': 0, 'peak_clients': 0}
+
+    def subscribe(self, initial=None):
+        """
+        Register a client
+
+        Args:
+            initial (str): Serialized message queued before any broadcast (e.g. the full state)
+
+        Returns:
+            SSEClient: The client, to be passed to stream()
+        """
+        client = SSEClient(self.queue_size)
+        if initial is not None:
+            client.queue.append(initial)
+        with self._cond:
+            self._clients[client.id] = client
+            self.stats['connects'] += 1
+            self.stats['peak_clients'] = max(self.stats['peak_clients'], len(self._clients))
+        logger.info(f"SSE client {client.id} connected ({len(self._clients)} clients)")
+        return client
+
+    def unsubscribe(self, client):
+        with self._cond:
+            client.closed = True
+            if self._clients.pop(client.id, None) is not None:
+                logger.info(f"Removed SSE client {client.id} ({len(self._clients)} clients)")
+            self._cond.notify_all()
+
+    def client_count(self):
+        return len(self._clients)
+
+    def publish(self, message):
+        """
+        Queue a serialized message for every client
+
+        Args:
+            message (str): Output of format_message
+
+        Returns:
+            bool: False if the message equals the previous one and was not sent
+        """
+        with self._cond:
+            if message == self._last_message:
+                self.stats['unchanged'] += 1
+                return False
+            self._last_message = message
+            for client in self._clients.values():
+                if len(client.queue) == client.queue.maxlen:
+                    client.dropped += 1
+                    client.resync = True
+                    self.stats['dropped'] += 1
+                client.queue.append(message)
+            self.stats['published'] += 1
+            self._cond.notify_all()
+        return True
+
+    def stream(self, client):
+        """
+        Generator of SSE chunks for a client; unsubscribes when the connection closes
+
+        Yields:
+            str: Queued messages, or a heartbeat comment after heartbeat_interval of silence
+        """
+        try:
+            while True:
+                with self._cond:
+                    if not client.queue and not client.closed:
+                        self._cond.wait(self.heartbeat_interval)
+                    if client.closed:
+                        return
+                    messages = list(client.queue)
+                    client.queue.clear()
+                    resync, client.resync = client.resync and self.resync is not None, False
+                if resync:
+                    # State lengkap menggantikan pesan yang tersisa (sudah tercakup di dalamnya)
+                    message = self.resync()
+                    if message is not None:
+                        messages = [message]
+                        with self._cond:
+                            self.stats['resyncs'] += 1
+                # Tulis ke socket di luar lock; klien lambat tidak menahan publish
+                if messages:
+                    for message in messages:
+                        yield message
+                else:
+                    yield HEARTBEAT
+        finally:
+            self.unsubscribe(client)
+
+    def close(self):
+        """Disconnect all clients (shutdown)"""
+        with self._cond:
+            for client in self._clients.values():
+                client.closed = True
+            self._clients.clear()
+            self._cond.notify_all()
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats['clients'] = len(self._clients)
+            stats['queued'] = sum(len(client.queue) for client in self._clients.values())
+        return stats
@@ -0,0 +1,304 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import numpy as np
+import config
+from bot_snapshot import BotSnapshot
+from price_ring import PriceRing
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Layout file: header 64 byte, lalu price history (float64, 3 x samples), field JSON dan trades JSON
+MAGIC = b'GSB1'
+HEADER_SIZE = 64
+_HEADER = struct.Struct('<4s4xQQQQd')  # magic, seq, samples, fields_len, trades_len, published_at
+_SEQ = struct.Struct('<Q')
+_SEQ_OFFSET = 8
+_SAMPLE_BYTES = 3 * 8
+READ_RETRIES = 100
+
+def state_bus_path():
+    """Path of the state bus file (STATE_BUS_FILE, default state_bus_<symbol>.mmap in the working directory)"""
+    return getattr(config, 'STATE_BUS_FILE', '') or f"state_bus_{config.SYMBOL}.mmap"
+
+def decode_snapshot(payload, samples, fields_len, published_at):
+    """
+    Rebuild a BotSnapshot from a consistent copy of the bus payload
+
+    Args:
+        payload (bytes): Price history, field JSON and trades JSON
+        samples (int): Number of price history samples
+        fields_len (int): Length of the field JSON in bytes
+        published_at (float): Publish time from the header
+    """
+    history_size = samples * _SAMPLE_BYTES
+    history = np.frombuffer(payload, dtype='<f8', count=samples * 3).reshape(3, samples)
+    fields = json.loads(payload[history_size:history_size + fields_len])
+    # Field dari versi bot yang lebih baru diabaikan
+    fields = {name: value for name, value in fields.items() if name in BotSnapshot.__slots__}
+    fields['grid_levels'] = tuple(fields.get('grid_levels') or ())
+    fields['buy_orders'] = tuple(tuple(order) for order in fields.get('buy_orders') or ())
+    fields['sell_orders'] = tuple(tuple(order) for order in fields.get('sell_orders') or ())
+    fields['price_history'] = PriceRing.from_array(history)
+    fields['trades'] = tuple(json.loads(payload[history_size + fields_len:]))
+    fields['published_at'] = published_at
+    return BotSnapshot(**fields)
+
+class StateBusWriter:
+    """
+    Publishes bot snapshots into a memory-mapped file for other processes (gunicorn workers).
+
+    Writes are guarded by a sequence counter (seqlock): the counter is odd
+    while a snapshot is being written and even once it is complete, so
+    readers never need a lock shared with the bot. Only one writer (the bot
+    process) may use a bus file.
+    """
+
+    def __init__(self, path=None, size=None):
+        """
+        Args:
+            path (str): Bus file, default state_bus_path()
+            size (int): Initial file size in bytes; the file grows when a snapshot does not fit
+        """
+        self.path = path or state_bus_path()
+        size = max(size or getattr(config, 'STATE_BUS_SIZE', 4 * 1024 * 1024), HEADER_SIZE)
+        self._file = open(self.path, 'r+b' if os.path.exists(self.path) else 'w+b')
+        if os.fstat(self._file.fileno()).st_size < size:
+            self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        self._lock = threading.Lock()
+
+        magic, seq = _HEADER.unpack_from(self._mmap, 0)[:2]
+        if magic != MAGIC:
+            seq = 0
+            _HEADER.pack_into(self._mmap, 0, MAGIC, seq, 0, 0, 0, 0.0)
+        # Lanjutkan nomor urut bot sebelumnya; nilai ganjil berarti writer lama mati di tengah penulisan
+        self._seq = seq + (seq & 1)
+
+        # Trades hanya bertambah: JSON per trade di-cache, hanya trade baru yang di-encode
+        self._trades = ()
+        self._trade_chunks = []
+        self.stats = {'publishes': 0, 'bytes': 0, 'grows': 0}
+
+    def _encode_trades(self, trades):
+        kept = len(self._trades)
+        if kept > len(trades) or (kept and trades[kept - 1] is not self._trades[-1]):
+            kept = 0
+            self._trade_chunks = []
+        self._trade_chunks.extend(json.dumps(trade).encode() for trade in trades[kept:])
+        self._trades = trades
+        return b'[' + b','.join(self._trade_chunks) + b']'
+
+    def _grow(self, needed):
+        """Enlarge the file; readers remap when a payload runs past their mapping"""
+        size = max(needed, 2 * len(self._mmap))
+        self._mmap.close()
+        self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        self.stats['grows'] += 1
+        logger.info(f"State bus {self.path} grown to {size} bytes")
+
+    def _write(self, samples, fields_bytes, trades_bytes, history_bytes, published_at):
+        """Write one payload between an odd and an even sequence number (caller holds the lock)"""
+        end = HEADER_SIZE + len(history_bytes) + len(fields_bytes) + len(trades_bytes)
+        if end > len(self._mmap):
+            self._grow(end)
+        mm = self._mmap
+
+        self._seq += 1
+        _SEQ.pack_into(mm, _SEQ_OFFSET, self._seq)
+        offset = HEADER_SIZE
+        for chunk in (history_bytes, fields_bytes, trades_bytes):
+            mm[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+        _HEADER.pack_into(mm, 0, MAGIC, self._seq, samples, len(fields_bytes), len(trades_bytes), published_at)
+        self._seq += 1
+        _SEQ.pack_into(mm, _SEQ_OFFSET, self._seq)
+
+        self.stats['publishes'] += 1
+        self.stats['bytes'] = end
+
+    def publish(self, snapshot):
+        """Write a snapshot; readers see it once the sequence number is even again"""
+        if snapshot.price_history is not None:
+            history = snapshot.price_history.copy()
+        else:
+            history = np.empty((3, 0))
+        history_bytes = np.ascontiguousarray(history, dtype='<f8').tobytes()
+        fields = {
+            name: getattr(snapshot, name) for name in BotSnapshot.__slots__
+            if name not in ('price_history', 'trades', 'published_at')
+        }
+        fields_bytes = json.dumps(fields).encode()
+        with self._lock:
+            trades_bytes = self._encode_trades(snapshot.trades or ())
+            self._write(history.shape[1], fields_bytes, trades_bytes, history_bytes, snapshot.published_at)
+
+    def clear(self):
+        """Mark the bus empty (bot stopped)"""
+        with self._lock:
+            self._trades = ()
+            self._trade_chunks = []
+            self._write(0, b'', b'', b'', time.time())
+
+    def close(self):
+        with self._lock:
+            self._mmap.close()
+            self._file.close()
+
+class StateBusReader:
+    """
+    Reads the latest snapshot from a state bus file written by the bot process.
+
+    An unchanged sequence number costs one 8-byte read from the mapping and
+    returns the cached snapshot; a new one is copied out of the mapping,
+    verified against the sequence number and decoded once per process.
+    """
+
+    def __init__(self, path=None, max_age=None):
+        """
+        Args:
+            path (str): Bus file, default state_bus_path()
+            max_age (float): Snapshots older than this many seconds count as "no bot running"
+        """
+        self.path = path or state_bus_path()
+        self.max_age = max_age if max_age is not None else getattr(config, 'STATE_BUS_MAX_AGE', 120)
+        self._file = None
+        self._mmap = None
+        self._seq = None
+        self._snapshot = None
+        self._next_open = 0
+        self._lock = threading.Lock()
+        self.stats = {'reads': 0, 'decodes': 0, 'retries': 0, 'failed': 0}
+
+    def _open(self):
+        """Map the bus file read-only, False if it does not exist (yet)"""
+        try:
+            self._file = open(self.path, 'rb')
+            if os.fstat(self._file.fileno()).st_size < HEADER_SIZE:
+                self._file.close()
+                self._file = None
+                return False
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _remap(self):
+        """Map the file again after the writer has grown it"""
+        self._mmap.close()
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _refresh(self):
+        """Decode the current payload if the sequence number changed (caller holds the lock)"""
+        mm = self._mmap
+        for _ in range(READ_RETRIES):
+            seq = _SEQ.unpack_from(mm, _SEQ_OFFSET)[0]
+            if seq == self._seq:
+                return
+            if seq & 1:
+                # Writer sedang menulis
+                self.stats['retries'] += 1
+                time.sleep(0)
+                continue
+
+            magic, _, samples, fields_len, trades_len, published_at = _HEADER.unpack_from(mm, 0)
+            end = HEADER_SIZE + samples * _SAMPLE_BYTES + fields_len + trades_len
+            if magic != MAGIC:
+                self.stats['failed'] += 1
+                return
+            if end > len(mm):
+                self._remap()
+                mm = self._mmap
+                continue
+
+            payload = mm[HEADER_SIZE:end]
+            if _SEQ.unpack_from(mm, _SEQ_OFFSET)[0] != seq:
+                # Ditimpa saat disalin, coba lagi
+                self.stats['retries'] += 1
+                continue
+
+            self._snapshot = decode_snapshot(payload, samples, fields_len, published_at) if fields_len else None
+            self._seq = seq
+            self.stats['decodes'] += 1
+            return
+        # Writer terus menulis; pakai snapshot sebelumnya
+        self.stats['failed'] += 1
+
+    def read(self):
+        """
+        Latest snapshot published by the bot process
+
+        Returns:
+            BotSnapshot: Snapshot, or None if no bot is publishing (missing, cleared or stale bus)
+        """
+        with self._lock:
+            self.stats['reads'] += 1
+            if self._mmap is None:
+                # File bus belum ada (bot belum start): coba lagi paling cepat tiap detik
+                if time.time() < self._next_open:
+                    return None
+                if not self._open():
+                    self._next_open = time.time() + 1
+                    return None
+            try:
+                self._refresh()
+            except Exception as e:
+                self.stats['failed'] += 1
+                logger.error(f"Failed to read state bus {self.path}: {e}")
+            snapshot = self._snapshot
+
+        if snapshot is None or (self.max_age and time.time() - snapshot.published_at > self.max_age):
+            return None
+        return snapshot
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._file.close()
+                self._mmap = None
+                self._file = None
+
+_writer = None
+_reader = None
+_bus_lock = threading.Lock()
+
+def get_state_bus_writer():
+    """State bus writer of the bot process"""
+    global _writer
+    with _bus_lock:
+        if _writer is None:
+            _writer = StateBusWriter()
+        return _writer
+
+def get_state_bus_reader():
+    """State bus reader shared by the dashboard threads of this process"""
+    global _reader
+    with _bus_lock:
+        if _reader is None:
+            _reader = StateBusReader()
+        return _reader
+
+def publish_snapshot(snapshot):
+    """Publish a snapshot to the state bus when STATE_BUS_ENABLED"""
+    if not getattr(config, 'STATE_BUS_ENABLED', True):
+        return
+    try:
+        get_state_bus_writer().publish(snapshot)
+    except Exception as e:
+        logger.error(f"Failed to publish snapshot to state bus: {e}")
+
+def clear_snapshot():
+    """Mark the state bus empty when STATE_BUS_ENABLED (bot stopped)"""
+    if not getattr(config, 'STATE_BUS_ENABLED', True):
+        return
+    try:
+        get_state_bus_writer().clear()
+    except Exception as e:
+        logger.error(f"Failed to clear state bus: {e}")
@@ -0,0 +1,257 @@
+import json
+import logging
+import os
+import threading
+import time
+import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+FSYNC_ALWAYS = 'always'      # fsync setiap record (paling aman, paling lambat)
+FSYNC_INTERVAL = 'interval'  # fsync paling lambat STATE_FSYNC_INTERVAL detik setelah record ditulis
+FSYNC_NEVER = 'never'        # Serahkan ke OS
+
+def _fsync_dir(path):
+    """fsync the directory holding path so a rename survives a crash"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def atomic_write_json(path, data, indent=None):
+    """Write JSON to a temp file, fsync it and rename it over path"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path)
+
+def journal_path_for(snapshot_path):
+    """Journal file that belongs to a snapshot (grid_state_X.json -> grid_state_X.journal)"""
+    base, ext = os.path.splitext(snapshot_path)
+    return f"{base}.journal" if ext == '.json' else f"{snapshot_path}.journal"
+
+def _apply_record(state, record):
+    """Apply one journal record to a state dict"""
+    kind = record.get('type')
+    data = record.get('data', {})
+    if kind == 'trade':
+        state.setdefault('trades', []).append(data)
+    elif kind == 'state':
+        state.update(data)
+    else:
+        # Record dengan tipe lain disimpan per tipe, misalnya oleh modul lain
+        state.setdefault('journal_records', {}).setdefault(kind, []).append(data)
+
+def read_state(snapshot_path):
+    """
+    Recover state from a snapshot plus the journal tail written after it
+
+    A torn last line (crash in the middle of an append) is ignored.
+
+    Args:
+        snapshot_path (str): Path of the snapshot file
+
+    Returns:
+        tuple: (state dict, last applied sequence number, journal records replayed,
+                length in bytes of the intact part of the journal)
+    """
+    state = {}
+    if os.path.exists(snapshot_path):
+        with open(snapshot_path, 'r') as f:
+            state = json.load(f)
+    snapshot_seq = state.get('journal_seq', 0)
+    last_seq = snapshot_seq
+    replayed = 0
+    valid_bytes = 0
+
+    journal_path = journal_path_for(snapshot_path)
+    if os.path.exists(journal_path):
+        with open(journal_path, 'rb') as f:
+            for line_number, raw_line in enumerate(f, 1):
+                line = raw_line.strip()
+                if line:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Record terakhir terpotong; semua setelahnya tidak valid
+                        logger.warning(f"Ignoring torn journal record at {journal_path}:{line_number}")
+                        break
+                    seq = record.get('seq', 0)
+                    # Record yang sudah masuk snapshot (crash sebelum journal dipotong)
+                    if seq > snapshot_seq:
+                        _apply_record(state, record)
+                        last_seq = max(last_seq, seq)
+                        replayed += 1
+                if not raw_line.endswith(b"\n"):
+                    break
+                valid_bytes += len(raw_line)
+
+    if state:
+        state['journal_seq'] = last_seq
+    return state, last_seq, replayed, valid_bytes
+
+def load_state(snapshot_path):
+    """
+    Read-only view of persisted state (snapshot + journal), for readers such as the dashboard
+
+    Returns:
+        dict: Recovered state, empty if nothing was persisted or it could not be read
+    """
+    try:
+        state, _, _, _ = read_state(snapshot_path)
+        return state
+    except Exception as e:
+        logger.error(f"Failed to read state {snapshot_path}: {e}")
+        return {}
+
+class StateJournal:
+    """
+    Append-only write-ahead journal with periodic compacted snapshots.
+
+    Every change is appended as one JSON line to <name>.journal, so the cost
+    of a save does not grow with the trade history. When enough records have
+    accumulated the full state is written to the snapshot file with an atomic
+    rename and the journal is truncated. Recovery replays the journal tail on
+    top of the snapshot.
+    """
+
+    def __init__(self, snapshot_path, fsync_policy=None, fsync_interval=None, snapshot_every=None):
+        """
+        Args:
+            snapshot_path (str): Snapshot file, e.g. grid_state_ADAUSDT.json
+            fsync_policy (str): 'always', 'interval' or 'never'
+            fsync_interval (float): Seconds between fsyncs for the 'interval' policy
+            snapshot_every (int): Journal records before a compacted snapshot is due
+        """
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path_for(snapshot_path)
+        self.fsync_policy = fsync_policy or getattr(config, 'STATE_FSYNC_POLICY', FSYNC_INTERVAL)
+        self.fsync_interval = fsync_interval if fsync_interval is not None else getattr(config, 'STATE_FSYNC_INTERVAL', 1.0)
+        self.snapshot_every = snapshot_every or getattr(config, 'STATE_SNAPSHOT_EVERY', 500)
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._seq = 0
+        self._records_since_snapshot = 0
+        self._last_fsync = 0
+        self._dirty = False
+        self._timer = None  # fsync tertunda untuk record yang ditulis sebelum periode sepi
+
+    def load(self):
+        """
+        Recover state and prepare the journal for appending
+
+        Returns:
+            dict: Recovered state (empty if nothing persisted yet)
+        """
+        with self._lock:
+            state, self._seq, self._records_since_snapshot, valid_bytes = read_state(self.snapshot_path)
+            # Buang ekor yang terpotong supaya append berikutnya mulai di baris baru
+            if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > valid_bytes:
+                logger.warning(f"Truncating torn tail of {self.journal_path}")
+                os.truncate(self.journal_path, valid_bytes)
+            if self._records_since_snapshot:
+                logger.info(f"Replayed {self._records_since_snapshot} journal records from {self.journal_path}")
+            return state
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.journal_path, 'a')
+
+    def _sync(self, force=False):
+        """Apply the fsync policy (caller holds the lock)"""
+        if not self._dirty or self._file is None:
+            return
+        self._file.flush()
+        now = time.time()
+        if force or self.fsync_policy == FSYNC_ALWAYS or \
+                (self.fsync_policy == FSYNC_INTERVAL and now - self._last_fsync >= self.fsync_interval):
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+            self._dirty = False
+        elif self.fsync_policy == FSYNC_INTERVAL and self._timer is None:
+            # Tanpa append berikutnya, record ini tetap di-fsync saat intervalnya habis
+            self._timer = threading.Timer(self.fsync_interval - (now - self._last_fsync), self._deferred_sync)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _deferred_sync(self):
+        """Timer callback: fsync records still pending after the interval"""
+        with self._lock:
+            self._timer = None
+            try:
+                self._sync(force=True)
+            except Exception as e:
+                logger.error(f"Failed to fsync {self.journal_path}: {e}")
+
+    def append(self, record_type, data):
+        """
+        Append one record to the journal
+
+        Args:
+            record_type (str): 'trade', 'state' or a custom type
+            data (dict): JSON-serializable payload
+
+        Returns:
+            int: Sequence number of the record
+        """
+        with self._lock:
+            self._open()
+            self._seq += 1
+            self._file.write(json.dumps({'seq': self._seq, 'type': record_type, 'data': data}) + "\n")
+            self._records_since_snapshot += 1
+            self._dirty = True
+            self._sync()
+            return self._seq
+
+    def needs_snapshot(self):
+        return self._records_since_snapshot >= self.snapshot_every
+
+    def write_snapshot(self, state):
+        """
+        Write a compacted snapshot of the full state and truncate the journal
+
+        Args:
+            state (dict): Complete state; journal_seq is added automatically
+        """
+        with self._lock:
+            self._sync(force=True)
+            snapshot = dict(state)
+            snapshot['journal_seq'] = self._seq
+            atomic_write_json(self.snapshot_path, snapshot, indent=2)
+
+            # Snapshot sudah aman di disk, journal lama boleh dipotong
+            if self._file is not None:
+                self._file.close()
+            self._file = open(self.journal_path, 'w')
+            os.fsync(self._file.fileno())
+            self._records_since_snapshot = 0
+            self._dirty = False
+
+    def flush(self):
+        """Force pending records to disk"""
+        with self._lock:
+            self._sync(force=True)
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._sync(force=True)
+            if self._file is not None:
+                self._file.close()
+                self._file = None
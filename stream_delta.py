@@ -0,0 +1,142 @@
+import logging
+import threading
+from sse_broker import format_message
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+
+class StreamDeltaEncoder:
+    """
+    Versioned delta protocol for the dashboard stream.
+
+    A client receives one "snapshot" event with the full state and then
+    "delta" events that carry only the price points appended to the chart
+    window, the fields that changed and the new trades. Every message has a
+    sequence number; a delta also names the sequence it applies to (base),
+    so a client that missed one detects the gap and resyncs from a new
+    snapshot. A state that cannot be expressed as a delta (price history
+    replaced, trade history rewritten) is published as a snapshot.
+
+    The state is a dict with a 'prices' list of [timestamp, price] points
+    (at most price_window, oldest first), a 'trades' list holding the last
+    trade_window trades, a 'trade_count' of all trades, and any other
+    JSON-serializable fields.
+    """
+
+    def __init__(self, price_window=100, trade_window=10):
+        """
+        Args:
+            price_window (int): Price points kept by the client
+            trade_window (int): Trades kept by the client
+        """
+        self.price_window = price_window
+        self.trade_window = trade_window
+        self._lock = threading.Lock()
+        self._state = None
+        self._seq = 0
+        self._snapshot_message = None  # (seq, pesan) snapshot terakhir yang diserialisasi
+        self.stats = {'snapshots': 0, 'deltas': 0, 'snapshot_bytes': 0, 'delta_bytes': 0}
+
+    def _delta(self, state):
+        """Delta from the current state to state, None if only a snapshot can express it"""
+        previous = self._state
+        delta = {}
+
+        old_prices, prices = previous['prices'], state['prices']
+        if old_prices:
+            last_ts = old_prices[-1][0]
+            timestamps = [point[0] for point in prices]
+            if last_ts in timestamps:
+                appended = prices[timestamps.index(last_ts) + 1:]
+            elif prices and prices[0][0] > last_ts:
+                appended = prices
+            else:
+                return None
+        else:
+            appended = prices
+        if appended:
+            delta['prices'] = appended
+
+        added = state['trade_count'] - previous['trade_count']
+        trades, old_trades = state['trades'], previous['trades']
+        if added < 0 or added > len(trades):
+            return None
+        # Trade lama yang masih terlihat harus sama persis, kalau tidak riwayat ditulis ulang
+        kept = len(trades) - added
+        if trades[:kept] != old_trades[len(old_trades) - kept:]:
+            return None
+        if added:
+            delta['trades'] = trades[kept:]
+
+        fields = {
+            name: value for name, value in state.items()
+            if name not in ('prices', 'trades') and previous.get(name) != value
+        }
+        if fields:
+            delta['fields'] = fields
+        return delta
+
+    def update(self, state):
+        """
+        Take a new state
+
+        Args:
+            state (dict): Full dashboard state
+
+        Returns:
+            str: Serialized delta (or snapshot) message for connected clients, None if nothing changed
+        """
+        state = dict(state)
+        state['prices'] = [list(point) for point in state.get('prices') or ()][-self.price_window:]
+        state['trades'] = list(state.get('trades') or ())[-self.trade_window:]
+        state.setdefault('trade_count', len(state['trades']))
+
+        with self._lock:
+            delta = self._delta(state) if self._state is not None else None
+            if delta == {}:
+                return None
+            self._state = state
+            self._seq += 1
+            if delta is None:
+                return self._snapshot()
+            delta['seq'] = self._seq
+            delta['base'] = self._seq - 1
+            message = format_message(delta, event='delta', event_id=self._seq)
+            self.stats['deltas'] += 1
+            self.stats['delta_bytes'] += len(message)
+            return message
+
+    def _snapshot(self):
+        """Serialized snapshot of the current state, built once per sequence (caller holds the lock)"""
+        if self._snapshot_message is None or self._snapshot_message[0] != self._seq:
+            message = format_message({
+                'protocol': PROTOCOL_VERSION,
+                'seq': self._seq,
+                'price_window': self.price_window,
+                'trade_window': self.trade_window,
+                'state': self._state
+            }, event='snapshot', event_id=self._seq)
+            self._snapshot_message = (self._seq, message)
+            self.stats['snapshots'] += 1
+            self.stats['snapshot_bytes'] += len(message)
+        return self._snapshot_message[1]
+
+    def snapshot_message(self):
+        """
+        Full state for a connecting or resyncing client
+
+        Returns:
+            str: Serialized snapshot message, None before the first update()
+        """
+        with self._lock:
+            if self._state is None:
+                return None
+            return self._snapshot()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['seq'] = self._seq
+        return stats
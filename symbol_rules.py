@@ -0,0 +1,173 @@
+import logging
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP, InvalidOperation
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class SymbolRules:
+    """
+    Trading rules of one symbol, compiled once from its exchange info filters.
+
+    Tick size, step size, lot limits and min notional are kept as exact
+    Decimals so prices and quantities can be quantized and validated locally,
+    without re-scanning the filter list or going through float/log10 on every
+    order.
+    """
+
+    def __init__(self, symbol, base_asset, quote_asset, tick_size=None, step_size=None,
+                 min_price=None, max_price=None, min_qty=None, max_qty=None,
+                 min_notional=None, quantity_precision=None):
+        """
+        Args:
+            symbol (str): Trading pair, e.g. ADAUSDT
+            base_asset (str): Base asset, e.g. ADA
+            quote_asset (str): Quote asset, e.g. USDT
+            tick_size, step_size, min_price, max_price, min_qty, max_qty, min_notional:
+                Filter values as strings or Decimals (None / 0 = not enforced)
+            quantity_precision (int): Coarser quantity precision forced by config
+        """
+        self.symbol = symbol
+        self.base_asset = base_asset
+        self.quote_asset = quote_asset
+        self.tick_size = self._positive(tick_size)
+        self.step_size = self._positive(step_size)
+        self.min_price = self._positive(min_price)
+        self.max_price = self._positive(max_price)
+        self.min_qty = self._positive(min_qty)
+        self.max_qty = self._positive(max_qty)
+        self.min_notional = self._positive(min_notional)
+
+        # QUANTITY_PRECISION di config boleh lebih kasar dari stepSize exchange
+        if quantity_precision is not None:
+            forced_step = Decimal(1).scaleb(-int(quantity_precision))
+            if self.step_size is None or forced_step > self.step_size:
+                self.step_size = forced_step
+
+        self.price_precision = self._precision(self.tick_size, default=2)
+        self.quantity_precision = self._precision(self.step_size, default=2)
+
+    @staticmethod
+    def _to_decimal(value):
+        if isinstance(value, Decimal):
+            return value
+        try:
+            return Decimal(str(value))
+        except (InvalidOperation, TypeError, ValueError):
+            return None
+
+    @classmethod
+    def _positive(cls, value):
+        """Decimal value of a filter field, None when absent or zero"""
+        value = cls._to_decimal(value) if value is not None else None
+        if value is None or value <= 0:
+            return None
+        return value
+
+    @staticmethod
+    def _precision(size, default):
+        """Decimal places of a tick/step size (0.0001 -> 4, 1 -> 0)"""
+        if size is None:
+            return default
+        return max(0, -size.normalize().as_tuple().exponent)
+
+    @classmethod
+    def from_symbol_info(cls, symbol_data, quantity_precision=None):
+        """
+        Build rules from one entry of exchangeInfo['symbols']
+
+        Args:
+            symbol_data (dict): Symbol entry with 'filters'
+            quantity_precision (int): Optional override from config
+
+        Returns:
+            SymbolRules
+        """
+        filters = {f['filterType']: f for f in symbol_data.get('filters', [])}
+        price_filter = filters.get('PRICE_FILTER', {})
+        lot_size = filters.get('LOT_SIZE', {})
+        # Binance mengganti MIN_NOTIONAL dengan NOTIONAL; dukung keduanya
+        notional = filters.get('NOTIONAL') or filters.get('MIN_NOTIONAL') or {}
+
+        return cls(
+            symbol=symbol_data['symbol'],
+            base_asset=symbol_data.get('baseAsset'),
+            quote_asset=symbol_data.get('quoteAsset'),
+            tick_size=price_filter.get('tickSize'),
+            step_size=lot_size.get('stepSize'),
+            min_price=price_filter.get('minPrice'),
+            max_price=price_filter.get('maxPrice'),
+            min_qty=lot_size.get('minQty'),
+            max_qty=lot_size.get('maxQty'),
+            min_notional=notional.get('minNotional'),
+            quantity_precision=quantity_precision
+        )
+
+    def quantize_price(self, price):
+        """Round a price to the nearest tick (half up)"""
+        price = self._to_decimal(price)
+        if self.tick_size is None:
+            return price.quantize(Decimal(1).scaleb(-self.price_precision), rounding=ROUND_HALF_UP)
+        ticks = (price / self.tick_size).to_integral_value(rounding=ROUND_HALF_UP)
+        return (ticks * self.tick_size).quantize(self.tick_size.normalize())
+
+    def quantize_quantity(self, quantity):
+        """Round a quantity down to the step size so it never exceeds the available balance"""
+        quantity = self._to_decimal(quantity)
+        if self.step_size is None:
+            return quantity.quantize(Decimal(1).scaleb(-self.quantity_precision), rounding=ROUND_DOWN)
+        steps = (quantity / self.step_size).to_integral_value(rounding=ROUND_DOWN)
+        return (steps * self.step_size).quantize(self.step_size.normalize())
+
+    def format_price(self, price):
+        """Quantized price as the string sent to the API"""
+        return "{:.{}f}".format(self.quantize_price(price), self.price_precision)
+
+    def format_quantity(self, quantity):
+        """Quantized quantity as the string sent to the API"""
+        return "{:.{}f}".format(self.quantize_quantity(quantity), self.quantity_precision)
+
+    def validate(self, price, quantity):
+        """
+        Check an order against PRICE_FILTER, LOT_SIZE and MIN_NOTIONAL locally
+
+        Args:
+            price: Order price (already quantized)
+            quantity: Order quantity (already quantized)
+
+        Returns:
+            str: Reason the exchange would reject the order, or None if valid
+        """
+        price = self._to_decimal(price)
+        quantity = self._to_decimal(quantity)
+        if price is None or quantity is None:
+            return "invalid price or quantity"
+        if price <= 0:
+            return f"price {price} must be positive"
+        if quantity <= 0:
+            return f"quantity {quantity} must be positive"
+        if self.min_price is not None and price < self.min_price:
+            return f"PRICE_FILTER: price {price} below minPrice {self.min_price}"
+        if self.max_price is not None and price > self.max_price:
+            return f"PRICE_FILTER: price {price} above maxPrice {self.max_price}"
+        if self.min_qty is not None and quantity < self.min_qty:
+            return f"LOT_SIZE: quantity {quantity} below minQty {self.min_qty}"
+        if self.max_qty is not None and quantity > self.max_qty:
+            return f"LOT_SIZE: quantity {quantity} above maxQty {self.max_qty}"
+        if self.min_notional is not None and price * quantity < self.min_notional:
+            return f"MIN_NOTIONAL: order value {price * quantity} below {self.min_notional}"
+        return None
+
+    def to_dict(self):
+        """Plain representation for logging/dashboard"""
+        return {
+            'symbol': self.symbol,
+            'baseAsset': self.base_asset,
+            'quoteAsset': self.quote_asset,
+            'tickSize': str(self.tick_size) if self.tick_size is not None else None,
+            'stepSize': str(self.step_size) if self.step_size is not None else None,
+            'minQty': str(self.min_qty) if self.min_qty is not None else None,
+            'maxQty': str(self.max_qty) if self.max_qty is not None else None,
+            'minNotional': str(self.min_notional) if self.min_notional is not None else None,
+            'pricePrecision': self.price_precision,
+            'quantityPrecision': self.quantity_precision
+        }
@@ -0,0 +1,117 @@
+import datetime
+import unittest
+from backtest import SimulatedExchange, NullStateJournal, BacktestAnalytics
+from grid_bot import GridTradingBot
+
+def make_bot(exchange):
+    """Bot on a 0.98 - 1.02 grid with 8 levels, trading against exchange"""
+    bot = GridTradingBot(client=exchange, analytics=BacktestAnalytics('ADAUSDT'),
+                         state_journal=NullStateJournal(), clock=lambda: exchange.now)
+    bot.symbol = 'ADAUSDT'
+    bot.lower_price = 0.98
+    bot.upper_price = 1.02
+    bot.grid_number = 8
+    bot.grid_size = (bot.upper_price - bot.lower_price) / bot.grid_number
+    bot.quantity = 21
+    bot.grid_prices = bot._calculate_grid_prices()
+    bot.recenter_margin = 0.02
+    bot.risk_manager.stop_loss_percentage = 2.0
+    return bot
+
+class StopLossReferenceTest(unittest.TestCase):
+    """The overall stop loss must follow the grid when it is re-centered"""
+
+    def setUp(self):
+        self.exchange = SimulatedExchange('ADAUSDT', quote_balance=10000, base_balance=10000)
+        self.exchange.set_market(1.0, datetime.datetime(2024, 1, 1))
+        self.bot = make_bot(self.exchange)
+        self.assertTrue(self.bot.setup_grid())
+
+    def tearDown(self):
+        GridTradingBot.instance = None
+
+    def _shift_to(self, price):
+        lower = self.bot.lower_price
+        placed = self.exchange.stats['placed']
+        self.exchange.set_market(price, self.exchange.now)
+        self.bot.adjust_grid()
+        self.assertNotEqual(self.bot.lower_price, lower)
+        # Geser incremental, bukan bangun ulang penuh
+        self.assertLess(self.exchange.stats['placed'] - placed, self.bot.grid_number)
+
+    def test_incremental_shift_moves_stop_loss_reference(self):
+        self._shift_to(0.984)
+        self.assertEqual(self.bot.initial_price, 0.984)
+        self._shift_to(0.969)
+        self.assertEqual(self.bot.initial_price, 0.969)
+
+        # 4% di bawah harga awal, tetapi di atas stop loss dari grid yang sekarang
+        self.exchange.set_market(0.96, self.exchange.now)
+        self.bot.check_filled_orders(reconcile=False)
+        self.assertEqual(self.exchange.stats['market_orders'], 0)
+        self.assertTrue(self.bot.buy_orders or self.bot.sell_orders)
+
+    def test_emergency_exit_stops_tracking_orders(self):
+        self.exchange.set_market(0.97, self.exchange.now)
+        self.bot.check_filled_orders(reconcile=False)
+        self.assertEqual(self.exchange.stats['market_orders'], 1)
+        self.assertEqual(self.bot.buy_orders, {})
+        self.assertEqual(self.bot.sell_orders, {})
+        self.assertIsNone(self.bot.initial_price)
+
+        # Stop loss tidak terpicu lagi di putaran berikutnya
+        self.bot.check_filled_orders(reconcile=True)
+        self.assertEqual(self.exchange.stats['market_orders'], 1)
+
+class RestoreAfterCrashTest(unittest.TestCase):
+    """Reconciling the saved order map against the exchange after a restart"""
+
+    def setUp(self):
+        self.exchange = SimulatedExchange('ADAUSDT', quote_balance=10000, base_balance=10000)
+        self.exchange.set_market(1.0, datetime.datetime(2024, 1, 1))
+        bot = make_bot(self.exchange)
+        self.assertTrue(bot.setup_grid())
+        self.state = bot._state_fields()
+        self.grid_size = bot.grid_size
+        self.buy_level = max(bot.buy_orders)
+
+    def tearDown(self):
+        GridTradingBot.instance = None
+
+    def _sells_at(self, price):
+        return [o for o in self.exchange.get_open_orders()
+                if o['side'] == 'SELL' and abs(float(o['price']) - price) < 1e-6]
+
+    def test_counter_order_placed_before_crash_is_not_duplicated(self):
+        # Buy terisi dan order jual pengganti terpasang, lalu bot mati sebelum state disimpan
+        self.assertTrue(self.exchange.fill_next(self.buy_level - 0.001))
+        counter_price = self.buy_level + self.grid_size
+        counter = self.exchange.place_limit_order('ADAUSDT', 'SELL', 21, counter_price)
+        placed = self.exchange.stats['placed']
+
+        bot = make_bot(self.exchange)
+        bot._restored_state = self.state
+        self.assertTrue(bot._restore_grid_from_state())
+
+        self.assertEqual(self.exchange.stats['placed'], placed)
+        self.assertEqual(len(self._sells_at(counter_price)), 1)
+        self.assertIn(counter['orderId'], bot.sell_orders.values())
+        # Fill tetap dibukukan
+        self.assertEqual([t['order_id'] for t in bot.trades if t['side'] == 'BUY'],
+                         [dict(self.state['buy_orders'])[self.buy_level]])
+
+    def test_offline_fill_without_counter_order_places_one(self):
+        self.assertTrue(self.exchange.fill_next(self.buy_level - 0.001))
+        counter_price = self.buy_level + self.grid_size
+        placed = self.exchange.stats['placed']
+
+        bot = make_bot(self.exchange)
+        bot.risk_manager.max_investment = float('inf')
+        bot._restored_state = self.state
+        self.assertTrue(bot._restore_grid_from_state())
+
+        self.assertEqual(self.exchange.stats['placed'], placed + 1)
+        self.assertEqual(len(self._sells_at(counter_price)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+import numpy as np
+import state_bus
+from bot_snapshot import BotSnapshot
+from price_ring import PriceRing
+from state_bus import StateBusWriter, StateBusReader, decode_snapshot, HEADER_SIZE, _HEADER, _SEQ, _SEQ_OFFSET
+
+def make_snapshot(last_price=1.0, trades=(), samples=5):
+    """Snapshot of an ADAUSDT bot with samples price points and the given trades"""
+    history = PriceRing(max(samples, 1))
+    for i in range(samples):
+        history.append(1.0 + i / 1000, usdt_idr=16000.0, ts=1700000000 + i)
+    return BotSnapshot(
+        version=1, published_at=time.time(), symbol='ADAUSDT', status='Aktif', last_price=last_price,
+        price_history=history.frozen(), upper_price=1.02, lower_price=0.98, grid_number=8, quantity=21,
+        grid_levels=(0.98, 0.99, 1.0, 1.01, 1.02), quote_asset='USDT', base_asset='ADA',
+        balances={'USDT': {'free': 100.0, 'locked': 5.0}}, balances_updated_at='2024-01-01T00:00:00',
+        usdt_idr_rate=16000.0, buy_orders=((0.99, 11),), sell_orders=((1.01, 12),), total_profit=1.5,
+        trades=tuple(trades)
+    )
+
+def make_trades(count, start=0):
+    return tuple({'side': 'BUY', 'price': 1.0, 'quantity': 21, 'order_id': i} for i in range(start, start + count))
+
+class StateBusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'state_bus_ADAUSDT.mmap')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _open(self, size=None):
+        writer = StateBusWriter(self.path, size=size)
+        reader = StateBusReader(self.path, max_age=0)
+        self.addCleanup(reader.close)
+        self.addCleanup(writer.close)
+        return writer, reader
+
+    def test_decode_snapshot_round_trip(self):
+        writer, _ = self._open()
+        snapshot = make_snapshot(trades=make_trades(3))
+        writer.publish(snapshot)
+
+        magic, _, samples, fields_len, trades_len, published_at = _HEADER.unpack_from(writer._mmap, 0)
+        end = HEADER_SIZE + samples * state_bus._SAMPLE_BYTES + fields_len + trades_len
+        decoded = decode_snapshot(writer._mmap[HEADER_SIZE:end], samples, fields_len, published_at)
+
+        for name in BotSnapshot.__slots__:
+            if name != 'price_history':
+                self.assertEqual(getattr(decoded, name), getattr(snapshot, name), name)
+        np.testing.assert_array_equal(decoded.price_history.copy(), snapshot.price_history.copy())
+        self.assertTrue(decoded.price_history.read_only)
+
+    def test_torn_read_is_retried(self):
+        writer, reader = self._open()
+        writer.publish(make_snapshot(last_price=1.0))
+        self.assertEqual(reader.read().last_price, 1.0)
+
+        # Writer berhenti di tengah penulisan (nomor urut ganjil); selesai saat reader menunggu
+        _SEQ.pack_into(writer._mmap, _SEQ_OFFSET, writer._seq + 1)
+        newer = make_snapshot(last_price=2.0)
+        with mock.patch.object(state_bus.time, 'sleep', side_effect=lambda _: writer.publish(newer)) as sleep:
+            self.assertEqual(reader.read().last_price, 2.0)
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual(reader.stats['retries'], 1)
+        self.assertEqual(reader.stats['failed'], 0)
+
+    def test_write_that_never_finishes_keeps_previous_snapshot(self):
+        writer, reader = self._open()
+        writer.publish(make_snapshot(last_price=1.0))
+        reader.read()
+
+        _SEQ.pack_into(writer._mmap, _SEQ_OFFSET, writer._seq + 3)
+        with mock.patch.object(state_bus.time, 'sleep'):
+            self.assertEqual(reader.read().last_price, 1.0)
+        self.assertEqual(reader.stats['retries'], state_bus.READ_RETRIES)
+        self.assertEqual(reader.stats['failed'], 1)
+
+    def test_reader_remaps_after_writer_grows_file(self):
+        writer, reader = self._open(size=4096)
+        writer.publish(make_snapshot(trades=make_trades(1)))
+        self.assertEqual(len(reader.read().trades), 1)
+        self.assertEqual(len(reader._mmap), 4096)
+
+        writer.publish(make_snapshot(trades=make_trades(500)))
+        self.assertEqual(writer.stats['grows'], 1)
+
+        snapshot = reader.read()
+        self.assertEqual(len(snapshot.trades), 500)
+        self.assertEqual(snapshot.trades[-1]['order_id'], 499)
+        self.assertEqual(len(reader._mmap), os.path.getsize(self.path))
+
+    def test_cleared_bus_reads_as_no_bot(self):
+        writer, reader = self._open()
+        writer.publish(make_snapshot())
+        self.assertIsNotNone(reader.read())
+        writer.clear()
+        self.assertIsNone(reader.read())
+
+    def test_new_writer_continues_sequence_of_dead_writer(self):
+        writer = StateBusWriter(self.path)
+        writer.publish(make_snapshot())
+        # Writer mati di tengah penulisan
+        _SEQ.pack_into(writer._mmap, _SEQ_OFFSET, writer._seq + 1)
+        stale_seq = writer._seq + 1
+        writer.close()
+
+        writer, reader = self._open()
+        self.assertEqual(writer._seq, stale_seq + 1)
+        writer.publish(make_snapshot(last_price=3.0))
+        self.assertEqual(reader.read().last_price, 3.0)
+
+if __name__ == '__main__':
+    unittest.main()
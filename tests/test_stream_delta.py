@@ -0,0 +1,76 @@
+import json
+import unittest
+from stream_delta import StreamDeltaEncoder, PROTOCOL_VERSION
+
+def parse(message):
+    """(event, data) of a serialized SSE message"""
+    event, data = None, None
+    for line in message.strip().split('\n'):
+        if line.startswith('event: '):
+            event = line[len('event: '):]
+        elif line.startswith('data: '):
+            data = json.loads(line[len('data: '):])
+    return event, data
+
+def make_state(prices=3, trades=2, price=1.0):
+    return {
+        'latest_price': price,
+        'prices': [[1700000000 + i, 1.0 + i / 1000] for i in range(prices)],
+        'trades': [{'order_id': i, 'side': 'BUY'} for i in range(trades)],
+        'trade_count': trades
+    }
+
+class StreamDeltaEncoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.encoder = StreamDeltaEncoder(price_window=5, trade_window=3)
+        event, data = parse(self.encoder.update(make_state()))
+        self.assertEqual(event, 'snapshot')
+        self.assertEqual(data['protocol'], PROTOCOL_VERSION)
+        self.assertEqual(data['seq'], 1)
+
+    def test_unchanged_state_sends_nothing(self):
+        self.assertIsNone(self.encoder.update(make_state()))
+
+    def test_delta_carries_only_changes(self):
+        event, data = parse(self.encoder.update(make_state(prices=4, trades=3, price=1.1)))
+        self.assertEqual(event, 'delta')
+        self.assertEqual((data['seq'], data['base']), (2, 1))
+        self.assertEqual(data['prices'], [[1700000003, 1.003]])
+        self.assertEqual(data['trades'], [{'order_id': 2, 'side': 'BUY'}])
+        self.assertEqual(data['fields'], {'latest_price': 1.1, 'trade_count': 3})
+
+    def test_trades_beyond_window_are_still_a_delta(self):
+        self.encoder.update(make_state(trades=3))
+        event, data = parse(self.encoder.update(make_state(trades=5)))
+        self.assertEqual(event, 'delta')
+        self.assertEqual([trade['order_id'] for trade in data['trades']], [3, 4])
+
+    def test_rewritten_trade_history_falls_back_to_snapshot(self):
+        state = make_state()
+        state['trades'][0] = {'order_id': 0, 'side': 'SELL'}
+        event, data = parse(self.encoder.update(state))
+        self.assertEqual(event, 'snapshot')
+        self.assertEqual(data['seq'], 2)
+        self.assertEqual(data['state']['trades'][0]['side'], 'SELL')
+
+    def test_shrinking_trade_count_falls_back_to_snapshot(self):
+        event, _ = parse(self.encoder.update(make_state(trades=1)))
+        self.assertEqual(event, 'snapshot')
+
+    def test_replaced_price_history_falls_back_to_snapshot(self):
+        state = make_state()
+        state['prices'] = [[1600000000, 2.0]]
+        event, data = parse(self.encoder.update(state))
+        self.assertEqual(event, 'snapshot')
+        self.assertEqual(data['state']['prices'], [[1600000000, 2.0]])
+
+    def test_snapshot_message_matches_latest_state(self):
+        self.encoder.update(make_state(prices=4))
+        event, data = parse(self.encoder.snapshot_message())
+        self.assertEqual(event, 'snapshot')
+        self.assertEqual(data['seq'], 2)
+        self.assertEqual(len(data['state']['prices']), 4)
+
+if __name__ == '__main__':
+    unittest.main()
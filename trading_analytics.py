@@ -6,6 +6,13 @@ import pandas as pd
 from pathlib import Path
 import matplotlib.pyplot as plt
 import time
+import threading
+import atexit
+import config
+from analytics_writer import JsonAnalyticsStore, AnalyticsWriter
+from analytics_db import SqliteAnalyticsStore
+from price_ring import PriceRing
+from metrics_engine import MetricsEngine, transaction_profit, audit
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -16,22 +23,38 @@ class TradingAnalytics:
     Provides enhanced logging for analysis and visualization
     """
     
-    def __init__(self, symbol, log_dir="trading_logs"):
-        """Initialize the trading analytics"""
+    def __init__(self, symbol, log_dir="trading_logs", backend=None):
+        """
+        Initialize the trading analytics
+        
+        Args:
+            symbol: Trading pair
+            log_dir: Directory of the log files / database
+            backend: 'sqlite' (indexed database) or 'json' (JSON/CSV files),
+                defaults to config.ANALYTICS_BACKEND
+        """
         self.symbol = symbol
         self.log_dir = log_dir
+        self.backend = backend or getattr(config, 'ANALYTICS_BACKEND', 'sqlite')
         self.transactions_log_file = f"{log_dir}/transactions_{symbol}.json"
         self.price_log_file = f"{log_dir}/price_history_{symbol}.csv"
         self.balance_log_file = f"{log_dir}/balance_history.json"
         self.performance_log_file = f"{log_dir}/performance_metrics_{symbol}.json"
+        self.db_file = f"{log_dir}/{getattr(config, 'ANALYTICS_DB_FILE', 'analytics.db')}"
         
         # Ensure log directory exists
         os.makedirs(log_dir, exist_ok=True)
         
         # Store transactions
+        # Dengan backend sqlite riwayat tidak disimpan di memori, cukup di database
+        self.db = SqliteAnalyticsStore(self.db_file, symbol) if self.backend == 'sqlite' else None
         self.transactions = []
-        self.price_history = []
+        self.price_history = PriceRing(getattr(config, 'ANALYTICS_PRICE_HISTORY_SIZE', 10000))
         self.balance_history = []
+        self.transaction_count = 0
+        self.balance_count = 0
+        self.initial_balance = None
+        self._metrics_lock = threading.Lock()  # Thread trading mengubah metrik, thread writer menyalinnya
         self.performance_metrics = {
             'daily_profits': {},
             'cumulative_profit': 0,
@@ -46,11 +69,30 @@ class TradingAnalytics:
         
         # Load existing data if available
         self._load_data()
+        self._restore_metrics_engine()
+        
+        # Penulisan file dilakukan di thread terpisah; loop trading hanya enqueue
+        if self.db is not None:
+            store = self.db
+        else:
+            store = JsonAnalyticsStore(
+                self.transactions_log_file,
+                self.balance_log_file,
+                self.performance_log_file,
+                self.price_log_file
+            )
+        self.writer = AnalyticsWriter(store)
+        self.writer.start()
+        atexit.register(self.close)
         
         logger.info(f"Trading Analytics initialized for {symbol}")
         
     def _load_data(self):
         """Load existing analytics data if available"""
+        if self.db is not None:
+            self._load_from_db()
+            return
+        
         try:
             # Load transactions
             if os.path.exists(self.transactions_log_file):
@@ -60,7 +102,8 @@ class TradingAnalytics:
             
             # Load price history
             if os.path.exists(self.price_log_file):
-                self.price_history = pd.read_csv(self.price_log_file).to_dict('records')
+                price_data = pd.read_csv(self.price_log_file).tail(self.price_history.capacity)
+                self.price_history.extend(price_data.dropna(subset=['price']).to_dict('records'))
                 logger.info(f"Loaded {len(self.price_history)} price data points from log")
             
             # Load balance history
@@ -74,10 +117,57 @@ class TradingAnalytics:
                 with open(self.performance_log_file, 'r') as f:
                     self.performance_metrics = json.load(f)
                 logger.info(f"Loaded performance metrics from log")
+            
+            self.transaction_count = len(self.transactions)
+            self.balance_count = len(self.balance_history)
+            self.initial_balance = self.balance_history[0] if self.balance_history else None
                 
         except Exception as e:
             logger.error(f"Error loading analytics data: {e}")
     
+    def _load_from_db(self):
+        """Import old JSON/CSV logs once, then read only metrics and counters from the database"""
+        try:
+            self.db.import_json_logs(
+                self.transactions_log_file,
+                self.balance_log_file,
+                self.performance_log_file,
+                self.price_log_file
+            )
+            metrics = self.db.load_metrics()
+            if metrics:
+                self.performance_metrics.update(metrics)
+            self.transaction_count = self.db.count_transactions()
+            self.price_history.extend(p for p in self.db.get_prices(limit=self.price_history.capacity, newest=True)
+                                      if p.get('price') is not None)
+            self.balance_count = self.db.count_balances()
+            self.initial_balance = self.db.first_balance()
+            logger.info(f"Analytics database {self.db_file}: {self.transaction_count} transactions for {self.symbol}")
+        except Exception as e:
+            logger.error(f"Error loading analytics data from database: {e}")
+    
+    def _restore_metrics_engine(self):
+        """Restore the aggregates checkpoint and apply only the transactions logged after it"""
+        # Agregat hanya hidup di engine; checkpoint-nya ditambahkan saat metrik ditulis
+        checkpoint = self.performance_metrics.pop('aggregates', None)
+        self.metrics_engine = MetricsEngine.from_dict(checkpoint, transaction_profit)
+        try:
+            if self.db is None:
+                applied = self.metrics_engine.catch_up(self.transactions)
+            else:
+                missing = self.transaction_count - self.metrics_engine.applied
+                if missing < 0:
+                    logger.warning("Metrics checkpoint is ahead of the transaction log; rebuilding aggregates")
+                    self.metrics_engine.reset()
+                    missing = self.transaction_count
+                if missing:
+                    self.metrics_engine.apply_many(self.db.get_transactions(limit=missing, newest=True))
+                applied = missing
+            if applied:
+                logger.info(f"Applied {applied} transactions after the metrics checkpoint")
+        except Exception as e:
+            logger.error(f"Error restoring metrics aggregates: {e}")
+    
     def log_transaction(self, transaction_data):
         """
         Log a completed transaction with detailed data
@@ -98,11 +188,28 @@ class TradingAnalytics:
             transaction_data['timestamp'] = datetime.datetime.now().isoformat()
             
         # Add unique transaction ID
-        transaction_data['transaction_id'] = f"tx_{int(time.time() * 1000)}_{len(self.transactions)}"
+        transaction_data['transaction_id'] = f"tx_{int(time.time() * 1000)}_{self.transaction_count}"
+        self.transaction_count += 1
         
         # Add to transactions list
-        self.transactions.append(transaction_data)
+        if self.db is None:
+            self.transactions.append(transaction_data)
+        
+        with self._metrics_lock:
+            self._update_metrics(transaction_data)
+            
+        # Queue only the new record and the latest metrics
+        self.writer.submit('transaction', dict(transaction_data))
+        self._submit_metrics()
         
+        # Log transaction details
+        details_str = ", ".join([f"{k}: {v}" for k, v in transaction_data.items() if k != 'market_conditions'])
+        logger.info(f"[TRANSACTION] {details_str}")
+        
+        return transaction_data['transaction_id']
+    
+    def _update_metrics(self, transaction_data):
+        """Apply a transaction to the performance metrics (caller holds _metrics_lock)"""
         # Update performance metrics if it's a SELL (profit-generating) transaction
         if transaction_data.get('type') == 'SELL' and 'profit' in transaction_data:
             profit = transaction_data['profit']
@@ -129,15 +236,9 @@ class TradingAnalytics:
             
             # Update total volume
             self.performance_metrics['total_volume_traded'] += transaction_data.get('quantity', 0) * transaction_data.get('price', 0)
-            
-        # Save updated data
-        self._save_data()
         
-        # Log transaction details
-        details_str = ", ".join([f"{k}: {v}" for k, v in transaction_data.items() if k != 'market_conditions'])
-        logger.info(f"[TRANSACTION] {details_str}")
-        
-        return transaction_data['transaction_id']
+        # Running aggregates per day/week/level/side
+        self.metrics_engine.apply(transaction_data)
     
     def log_price_data(self, price_data):
         """
@@ -156,16 +257,11 @@ class TradingAnalytics:
         if 'timestamp' not in price_data:
             price_data['timestamp'] = datetime.datetime.now().isoformat()
             
-        # Add to price history
-        self.price_history.append(price_data)
-        
-        # Limit size to prevent memory issues (keep last 10000 data points)
-        if len(self.price_history) > 10000:
-            self.price_history = self.price_history[-10000:]
+        # Add to price history (ring buffer keeps the latest samples)
+        self.price_history.append_record(price_data)
         
-        # Save periodically (every 100 entries to avoid constant writes)
-        if len(self.price_history) % 100 == 0:
-            self._save_price_data()
+        # Appended to the CSV by the background writer
+        self.writer.submit('price', dict(price_data))
             
         return len(self.price_history)
     
@@ -187,26 +283,32 @@ class TradingAnalytics:
             balance_data['timestamp'] = datetime.datetime.now().isoformat()
             
         # Add to balance history
-        self.balance_history.append(balance_data)
+        if self.db is None:
+            self.balance_history.append(balance_data)
         
         # Calculate ROI if we have initial balance
-        if len(self.balance_history) > 1:
-            initial_value = self.balance_history[0].get('total_value_usdt', 0)
+        if self.initial_balance is None:
+            self.initial_balance = balance_data
+        elif self.initial_balance is not balance_data:
+            initial_value = self.initial_balance.get('total_value_usdt', 0)
             current_value = balance_data.get('total_value_usdt', 0)
             
             if initial_value > 0:
                 roi = ((current_value - initial_value) / initial_value) * 100
-                self.performance_metrics['roi'] = roi
+                with self._metrics_lock:
+                    self.performance_metrics['roi'] = roi
         
-        # Save balance history
-        self._save_data()
+        # Queue balance entry and metrics
+        self.writer.submit('balance', dict(balance_data))
+        self._submit_metrics()
         
         # Log balance summary
         logger.info(f"[BALANCE SNAPSHOT] Base free: {balance_data.get('base_free', 0):.4f}, " +
                    f"Quote free: {balance_data.get('quote_free', 0):.4f}, " +
                    f"Total USDT value: {balance_data.get('total_value_usdt', 0):.4f}")
         
-        return len(self.balance_history)
+        self.balance_count += 1
+        return self.balance_count
     
     def get_performance_summary(self):
         """Get a summary of trading performance metrics"""
@@ -226,33 +328,107 @@ class TradingAnalytics:
             return (self.performance_metrics['win_count'] / total_trades) * 100
         return 0
         
-    def _save_data(self):
-        """Save all data to respective files"""
-        try:
-            # Save transactions
-            with open(self.transactions_log_file, 'w') as f:
-                json.dump(self.transactions, f, indent=2)
-                
-            # Save balance history
-            with open(self.balance_log_file, 'w') as f:
-                json.dump(self.balance_history, f, indent=2)
-                
-            # Save performance metrics
-            with open(self.performance_log_file, 'w') as f:
-                json.dump(self.performance_metrics, f, indent=2)
-                
-            # Save price data separately
-            self._save_price_data()
-                
-        except Exception as e:
-            logger.error(f"Error saving analytics data: {e}")
+    def _submit_metrics(self):
+        """Mark the metrics changed; the writer copies them once per batch (_metrics_snapshot)"""
+        self.writer.submit('metrics', self._metrics_snapshot)
     
-    def _save_price_data(self):
-        """Save price data to CSV file"""
-        try:
-            pd.DataFrame(self.price_history).to_csv(self.price_log_file, index=False)
-        except Exception as e:
-            logger.error(f"Error saving price data: {e}")
+    def _metrics_snapshot(self):
+        """Copy of the metrics plus the aggregates checkpoint to persist (called on the writer thread)"""
+        with self._metrics_lock:
+            metrics = dict(self.performance_metrics)
+            metrics['daily_profits'] = dict(metrics['daily_profits'])
+            metrics['aggregates'] = self.metrics_engine.to_dict()
+        return metrics
+    
+    def flush(self, timeout=10):
+        """Block until everything queued so far is written to disk"""
+        return self.writer.flush(timeout)
+    
+    def close(self, timeout=10):
+        """Flush pending writes and stop the background writer"""
+        if not self.writer.is_running():
+            # Sudah berhenti: tulis sisa event (jika ada) langsung
+            self.writer.flush(timeout)
+            return
+        if self.writer.stop(timeout):
+            logger.info(f"Analytics writer for {self.symbol} stopped ({self.writer.get_stats()['written']} events written)")
+        else:
+            logger.warning(f"Analytics writer for {self.symbol} did not finish within {timeout}s")
+    
+    @staticmethod
+    def _in_range(records, start, end):
+        """Filter in-memory records on their ISO 'time'/'timestamp' (file backend)"""
+        result = []
+        for record in records:
+            ts = str(record.get('time') or record.get('timestamp') or '')
+            if (not start or ts >= start) and (not end or ts < end):
+                result.append(record)
+        return result
+    
+    @staticmethod
+    def _limit(records, limit, newest):
+        if not limit:
+            return records
+        return records[-limit:] if newest else records[:limit]
+    
+    def get_transactions(self, start=None, end=None, tx_type=None, limit=None, newest=False):
+        """
+        Transactions in a time range
+        
+        Args:
+            start: ISO time or date, inclusive
+            end: ISO time or date, exclusive
+            tx_type: Only 'BUY' or 'SELL' transactions
+            limit: Maximum number of transactions
+            newest: With limit, return the most recent ones
+        """
+        if self.db is not None:
+            self.writer.flush()
+            return self.db.get_transactions(start, end, tx_type, limit, newest)
+        records = [t for t in self._in_range(self.transactions, start, end)
+                   if tx_type is None or t.get('type') == tx_type]
+        return self._limit(records, limit, newest)
+    
+    def count_transactions(self, start=None, end=None, tx_type=None):
+        """Number of transactions in a time range"""
+        if self.db is not None:
+            self.writer.flush()
+            return self.db.count_transactions(start, end, tx_type)
+        return len(self.get_transactions(start, end, tx_type))
+    
+    def get_price_history(self, start=None, end=None, limit=None, newest=False):
+        """Price data points in a time range"""
+        if self.db is not None:
+            self.writer.flush()
+            return self.db.get_prices(start, end, limit, newest)
+        return self._limit(self._in_range(self.price_history.to_records(), start, end), limit, newest)
+    
+    def get_balance_history(self, start=None, end=None, limit=None, newest=False):
+        """Balance snapshots in a time range"""
+        if self.db is not None:
+            self.writer.flush()
+            return self.db.get_balances(start, end, limit, newest)
+        return self._limit(self._in_range(self.balance_history, start, end), limit, newest)
+    
+    def get_latest_balance(self):
+        """Most recent balance snapshot, empty dict if none"""
+        balances = self.get_balance_history(limit=1, newest=True)
+        return balances[-1] if balances else {}
+    
+    def get_metrics_summary(self, date=None):
+        """Daily, weekly and all-time aggregates (constant time)"""
+        return self.metrics_engine.summary(date)
+    
+    def audit_metrics(self):
+        """
+        Recalculate the aggregates from every logged transaction and compare them
+        with the running ones
+        
+        Returns:
+            dict: Audit report from metrics_engine.audit
+        """
+        transactions = self.get_transactions()
+        return audit(transactions, self.metrics_engine, self.performance_metrics.get('cumulative_profit'))
     
     def generate_daily_report(self):
         """Generate a daily summary report"""
@@ -263,12 +439,12 @@ class TradingAnalytics:
         today_profit = self.performance_metrics['daily_profits'].get(today, 0)
         yesterday_profit = self.performance_metrics['daily_profits'].get(yesterday, 0)
         
-        # Count today's trades
-        today_trades = sum(1 for t in self.transactions 
-                          if t.get('time', '').startswith(today))
+        # Today's and this week's trades from the running aggregates
+        today_trades = self.metrics_engine.day(today)['trades']
+        week = self.metrics_engine.week(today)
         
         # Get current balance if available
-        current_balance = self.balance_history[-1] if self.balance_history else {}
+        current_balance = self.get_latest_balance()
         
         report = {
             'date': today,
@@ -276,6 +452,8 @@ class TradingAnalytics:
             'today_profit': today_profit,
             'yesterday_profit': yesterday_profit,
             'today_trades': today_trades,
+            'week_profit': week['profit'],
+            'week_trades': week['trades'],
             'win_rate': self._calculate_win_rate(),
             'current_base_balance': current_balance.get('base_free', 0) + current_balance.get('base_locked', 0),
             'current_quote_balance': current_balance.get('quote_free', 0) + current_balance.get('quote_locked', 0),
@@ -288,6 +466,7 @@ class TradingAnalytics:
         logger.info(f"[DAILY REPORT] Yesterday's profit: {report['yesterday_profit']:.4f} USDT")
         logger.info(f"[DAILY REPORT] Total profit to date: {report['total_profit_to_date']:.4f} USDT")
         logger.info(f"[DAILY REPORT] Today's trades: {report['today_trades']}")
+        logger.info(f"[DAILY REPORT] This week: {report['week_profit']:.4f} USDT from {report['week_trades']} trades")
         logger.info(f"[DAILY REPORT] Overall win rate: {report['win_rate']:.2f}%")
         logger.info(f"[DAILY REPORT] Current ROI: {report['roi']:.2f}%")
         
@@ -300,4 +479,9 @@ def get_analytics(symbol):
     """Get or create an analytics instance for the given symbol"""
     if symbol not in _instances:
         _instances[symbol] = TradingAnalytics(symbol)
-    return _instances[symbol] 
\ No newline at end of file
+    return _instances[symbol]
+
+def close_analytics():
+    """Flush and stop the writers of all analytics instances"""
+    for analytics in list(_instances.values()):
+        analytics.close()
\ No newline at end of file
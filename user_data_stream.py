@@ -0,0 +1,278 @@
+import json
+import logging
+import socket
+import socketserver
+import threading
+import time
+import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class ExecutionReportFeed:
+    """
+    Base class for push-based execution report feeds.
+
+    A feed delivers Binance `executionReport` events (the payload format of the
+    user data stream) to a single callback as soon as they arrive, so the bot
+    does not have to poll get_open_orders to notice fills.
+    """
+
+    def __init__(self):
+        self._callback = None
+        self.connected = False
+
+    def start(self, callback):
+        """Start delivering execution reports to callback(event)"""
+        raise NotImplementedError
+
+    def stop(self):
+        """Stop the feed and release its resources"""
+        raise NotImplementedError
+
+    def _dispatch(self, event):
+        """Forward an execution report to the registered callback"""
+        if not isinstance(event, dict) or event.get('e') != 'executionReport':
+            return
+        if self._callback is None:
+            return
+        try:
+            self._callback(event)
+        except Exception as e:
+            logger.error(f"Error handling execution report {event.get('i')}: {e}")
+
+class BinanceUserDataFeed(ExecutionReportFeed):
+    """Execution reports from the Binance websocket user data stream"""
+
+    def __init__(self, api_key=None, api_secret=None, testnet=None):
+        super().__init__()
+        self.api_key = api_key or config.API_KEY
+        self.api_secret = api_secret or config.API_SECRET
+        self.testnet = config.TESTNET if testnet is None else testnet
+        self._twm = None
+
+    def start(self, callback):
+        from binance import ThreadedWebsocketManager
+
+        self._callback = callback
+        # ThreadedWebsocketManager mengurus listenKey dan keepalive-nya sendiri
+        self._twm = ThreadedWebsocketManager(
+            api_key=self.api_key,
+            api_secret=self.api_secret,
+            testnet=self.testnet
+        )
+        self._twm.start()
+        self._twm.start_user_socket(callback=self._handle_message)
+        # Belum dianggap terhubung: listenKey atau koneksi bisa gagal di thread websocket
+        # tanpa pesan error. Bot tetap rekonsiliasi tiap loop sampai pesan pertama datang.
+        logger.info(f"User data stream starting{' (testnet)' if self.testnet else ''}, polling open orders until the first event")
+
+    def _handle_message(self, msg):
+        """Handle a raw message from the websocket manager"""
+        if msg.get('e') == 'error':
+            # Stream putus, bot akan kembali ke polling sampai stream pulih
+            if self.connected:
+                logger.warning(f"User data stream error: {msg.get('m')}")
+            self.connected = False
+            return
+        if not self.connected:
+            logger.info("User data stream connected")
+            self.connected = True
+        self._dispatch(msg)
+
+    def stop(self):
+        self.connected = False
+        if self._twm is not None:
+            try:
+                self._twm.stop()
+            except Exception as e:
+                logger.warning(f"Error stopping user data stream: {e}")
+            self._twm = None
+
+class _LocalStreamHandler(socketserver.BaseRequestHandler):
+    """Keep a client connection open so the server can push events to it"""
+
+    def handle(self):
+        server = self.server
+        with server.clients_lock:
+            server.clients.append(self.request)
+        try:
+            # Blok sampai client menutup koneksi atau server dihentikan
+            while not server.stopping.is_set():
+                try:
+                    if not self.request.recv(1024):
+                        break
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+        finally:
+            with server.clients_lock:
+                if self.request in server.clients:
+                    server.clients.remove(self.request)
+
+class _LocalStreamTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class LocalUserDataServer:
+    """
+    Localhost stand-in for the Binance user data stream.
+
+    Pushes newline-delimited JSON execution reports to every connected
+    LocalUserDataFeed. Used by tests and by the mock exchange so the
+    event-driven fill path can run without a Binance connection.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self._server = _LocalStreamTCPServer((host, port), _LocalStreamHandler)
+        self._server.clients = []
+        self._server.clients_lock = threading.Lock()
+        self._server.stopping = threading.Event()
+        self._thread = None
+
+    @property
+    def address(self):
+        """(host, port) the server is listening on"""
+        return self._server.server_address
+
+    @property
+    def url(self):
+        """Feed URL usable as config.USER_DATA_STREAM"""
+        host, port = self.address
+        return f"tcp://{host}:{port}"
+
+    @property
+    def client_count(self):
+        with self._server.clients_lock:
+            return len(self._server.clients)
+
+    def start(self):
+        """Start serving in a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Local user data server listening on {self.url}")
+        return self.address
+
+    def publish(self, event):
+        """Send an execution report to all connected feeds"""
+        payload = (json.dumps(event) + "\n").encode()
+        with self._server.clients_lock:
+            clients = list(self._server.clients)
+        for conn in clients:
+            try:
+                conn.sendall(payload)
+            except OSError as e:
+                logger.debug(f"Dropping local stream client: {e}")
+                with self._server.clients_lock:
+                    if conn in self._server.clients:
+                        self._server.clients.remove(conn)
+
+    def stop(self):
+        self._server.stopping.set()
+        self._server.shutdown()
+        self._server.server_close()
+        with self._server.clients_lock:
+            for conn in self._server.clients:
+                try:
+                    conn.close()
+                except OSError:
+                    pass
+            self._server.clients = []
+
+class LocalUserDataFeed(ExecutionReportFeed):
+    """Execution reports from a LocalUserDataServer"""
+
+    def __init__(self, host, port, reconnect_delay=1.0):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.reconnect_delay = reconnect_delay
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._sock = None
+
+    def start(self, callback):
+        self._callback = callback
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """Reader loop with reconnect"""
+        while not self._stop_event.is_set():
+            try:
+                self._sock = socket.create_connection((self.host, self.port), timeout=5)
+                self._sock.settimeout(None)
+                self.connected = True
+                logger.info(f"Connected to local user data stream {self.host}:{self.port}")
+                reader = self._sock.makefile('r', encoding='utf-8')
+                for line in reader:
+                    if self._stop_event.is_set():
+                        break
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        logger.debug(f"Ignoring malformed stream line: {line[:100]}")
+                        continue
+                    self._dispatch(event)
+            except OSError as e:
+                if not self._stop_event.is_set():
+                    logger.debug(f"Local user data stream unavailable: {e}")
+            finally:
+                self.connected = False
+                if self._sock is not None:
+                    try:
+                        self._sock.close()
+                    except OSError:
+                        pass
+                    self._sock = None
+            self._stop_event.wait(self.reconnect_delay)
+
+    def stop(self):
+        self._stop_event.set()
+        self.connected = False
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+def create_execution_feed(stream_setting=None):
+    """
+    Create the execution report feed selected by config.USER_DATA_STREAM
+
+    Args:
+        stream_setting (str): 'binance', 'tcp://host:port' or 'off'
+
+    Returns:
+        ExecutionReportFeed or None if the feed is disabled
+    """
+    if stream_setting is None:
+        stream_setting = getattr(config, 'USER_DATA_STREAM', 'off')
+    setting = (stream_setting or 'off').strip()
+
+    if setting.lower() in ('', 'off', 'false', 'none', '0'):
+        return None
+    if setting.lower() == 'binance':
+        return BinanceUserDataFeed()
+    if setting.startswith('tcp://'):
+        host, _, port = setting[len('tcp://'):].rpartition(':')
+        return LocalUserDataFeed(host or '127.0.0.1', int(port))
+
+    logger.warning(f"Unknown USER_DATA_STREAM setting '{setting}', falling back to polling")
+    return None
+
+def wait_for_connection(feed, timeout=5.0):
+    """Block until the feed reports connected or timeout expires"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if feed.connected:
+            return True
+        time.sleep(0.05)
+    return feed.connected